@@ -3,20 +3,21 @@
 # -*- coding: UTF-8 -*-
 
 from .models import ActivityComment, ActivityNoticeSeed, ActivityManager, ActivityNotice, ActivityPost, \
-    NOTICE_ACTIVITY_POST_SEED, \
+    NOTICE_ACTIVITY_POST_SEED, NOTICE_KIND_ASSEMBLED_ON_READ_BY_KIND_OF_SEED, \
     NOTICE_CAMPAIGNX_FRIEND_HAS_SUPPORTED, \
     NOTICE_CAMPAIGNX_NEWS_ITEM, NOTICE_CAMPAIGNX_NEWS_ITEM_AUTHORED, NOTICE_CAMPAIGNX_NEWS_ITEM_SEED, \
     NOTICE_CAMPAIGNX_SUPER_SHARE_ITEM_AUTHORED, NOTICE_CAMPAIGNX_SUPER_SHARE_ITEM_SEED, \
     NOTICE_CAMPAIGNX_SUPPORTER_INITIAL_RESPONSE, NOTICE_CAMPAIGNX_SUPPORTER_INITIAL_RESPONSE_SEED, \
-    NOTICE_FRIEND_ACTIVITY_POSTS, \
-    NOTICE_FRIEND_ENDORSEMENTS, NOTICE_FRIEND_ENDORSEMENTS_SEED, \
+    NOTICE_FRIEND_ACTIVITY_POSTS, NOTICE_FRIEND_ENDORSEMENTS, NOTICE_FRIEND_ENDORSEMENTS_SEED, \
     NOTICE_VOTER_DAILY_SUMMARY, NOTICE_VOTER_DAILY_SUMMARY_SEED
-from config.base import get_environment_variable
+from config.base import get_environment_variable, get_environment_variable_default
+from django.core.cache import caches
+from django.db.models import Count, Q
 from django.utils.timezone import now
 from friend.models import FriendManager
 import json
-from datetime import timedelta
-from reaction.models import ReactionManager
+from datetime import datetime, timedelta, timezone
+from reaction.models import ReactionLike, ReactionManager
 from voter.models import \
     NOTIFICATION_FRIEND_OPINIONS_OTHER_REGIONS_EMAIL, NOTIFICATION_FRIEND_OPINIONS_OTHER_REGIONS_SMS, \
     NOTIFICATION_FRIEND_OPINIONS_YOUR_BALLOT_EMAIL, NOTIFICATION_FRIEND_OPINIONS_YOUR_BALLOT_SMS,\
@@ -25,11 +26,134 @@ from voter.models import \
 import wevote_functions.admin
 from wevote_functions.functions import is_voter_device_id_valid, positive_value_exists, return_first_x_words
 from wevote_functions.functions_date import DATE_FORMAT_YMD_HMS
+from wevote_functions.functions_status import StatusTrace
 
 logger = wevote_functions.admin.get_logger(__name__)
 
 WE_VOTE_SERVER_ROOT_URL = get_environment_variable("WE_VOTE_SERVER_ROOT_URL")
 
+# Each voter's friend list and feed cursor, used to assemble their notices on read. Alias is a key in Django CACHES.
+#  Seen and clicked are written through, so the time to live only bounds how long a new friend's activity is missed.
+ACTIVITY_NOTICE_FEED_CACHE_ALIAS = get_environment_variable_default("ACTIVITY_NOTICE_FEED_CACHE_ALIAS", "default")
+ACTIVITY_NOTICE_FEED_CACHE_SECONDS = int(get_environment_variable_default("ACTIVITY_NOTICE_FEED_CACHE_SECONDS", 300))
+# How many notices we show in the header drop-down
+ACTIVITY_NOTICE_FEED_LIMIT = 30
+# The kinds of notices activityNoticeListRetrieve returns, and the badge on the app icon counts
+ACTIVITY_NOTICE_KIND_SHOWN_LIST = [
+    NOTICE_CAMPAIGNX_FRIEND_HAS_SUPPORTED,
+    NOTICE_CAMPAIGNX_NEWS_ITEM,
+    NOTICE_CAMPAIGNX_NEWS_ITEM_AUTHORED,
+    NOTICE_CAMPAIGNX_SUPPORTER_INITIAL_RESPONSE,
+    NOTICE_FRIEND_ACTIVITY_POSTS,
+    NOTICE_FRIEND_ENDORSEMENTS,
+]
+
+
+def assemble_activity_notice_list_for_recipient(recipient_voter_we_vote_id):
+    """
+    The notices for the header drop-down. These are the ActivityNotice entries stored for this voter, plus notices
+    assembled from the ActivityNoticeSeed entries of this voter's friends, which are not stored for each friend.
+    Assembled notices are unsaved ActivityNotice objects: id is None and activity_notice_seed_id is the seed they were
+    assembled from. The voter marks them seen or clicked by that seed id. See
+    update_activity_notice_feed_cursor_for_voter.
+    :param recipient_voter_we_vote_id:
+    :return:
+    """
+    status = ''
+    activity_manager = ActivityManager()
+    results = activity_manager.retrieve_activity_notice_list_for_recipient(
+        recipient_voter_we_vote_id=recipient_voter_we_vote_id)
+    status += results['status']
+    if not results['success']:
+        results = {
+            'success':                  False,
+            'status':                   status,
+            'activity_notice_list':     [],
+        }
+        return results
+    stored_activity_notice_list = list(results['activity_notice_list'])
+
+    feed_state = fetch_activity_notice_feed_state(recipient_voter_we_vote_id)
+    results = activity_manager.retrieve_activity_notice_seed_list_from_speakers(
+        speaker_voter_we_vote_id_list=feed_state['friend_we_vote_id_list'],
+        kind_of_seed_list=list(NOTICE_KIND_ASSEMBLED_ON_READ_BY_KIND_OF_SEED.keys()),
+        limit=ACTIVITY_NOTICE_FEED_LIMIT)
+    status += results['status']
+    activity_notice_seed_list = results['activity_notice_seed_list']
+
+    activity_tidbit_we_vote_id_by_seed_id = {}
+    for activity_notice_seed in activity_notice_seed_list:
+        if activity_notice_seed.kind_of_seed == NOTICE_ACTIVITY_POST_SEED:
+            activity_tidbit_we_vote_id_by_seed_id[activity_notice_seed.id] = \
+                fetch_latest_activity_tidbit_we_vote_id_from_seed(activity_notice_seed)
+    number_of_comments_dict, number_of_likes_dict = \
+        retrieve_number_of_comments_and_likes_dicts(list(activity_tidbit_we_vote_id_by_seed_id.values()))
+
+    clicked_seed_id_set = set(feed_state['clicked_activity_notice_seed_id_list'])
+    seen_seed_id_set = set(feed_state['seen_activity_notice_seed_id_list'])
+    assembled_activity_notice_by_seed_id = {}
+    for activity_notice_seed in activity_notice_seed_list:
+        if not positive_value_exists(activity_notice_seed.speaker_organization_we_vote_id):
+            continue
+        activity_notice = ActivityNotice(
+            activity_notice_clicked=activity_notice_seed.id in clicked_seed_id_set,
+            activity_notice_seed_id=activity_notice_seed.id,
+            activity_notice_seen=activity_notice_seed.id in seen_seed_id_set,
+            date_last_changed=activity_notice_seed.date_last_changed,
+            date_of_notice=activity_notice_seed.date_of_notice or activity_notice_seed.date_last_changed,
+            kind_of_notice=NOTICE_KIND_ASSEMBLED_ON_READ_BY_KIND_OF_SEED[activity_notice_seed.kind_of_seed],
+            kind_of_seed=activity_notice_seed.kind_of_seed,
+            recipient_voter_we_vote_id=recipient_voter_we_vote_id,
+            speaker_name=activity_notice_seed.speaker_name,
+            speaker_organization_we_vote_id=activity_notice_seed.speaker_organization_we_vote_id,
+            speaker_voter_we_vote_id=activity_notice_seed.speaker_voter_we_vote_id,
+            speaker_profile_image_url_medium=activity_notice_seed.speaker_profile_image_url_medium,
+            speaker_profile_image_url_tiny=activity_notice_seed.speaker_profile_image_url_tiny,
+            statement_text_preview=activity_notice_seed.statement_text_preview)
+        if activity_notice_seed.kind_of_seed == NOTICE_ACTIVITY_POST_SEED:
+            activity_tidbit_we_vote_id = activity_tidbit_we_vote_id_by_seed_id[activity_notice_seed.id]
+            if not positive_value_exists(activity_tidbit_we_vote_id):
+                continue
+            activity_notice.activity_tidbit_we_vote_id = activity_tidbit_we_vote_id
+            activity_notice.number_of_comments = number_of_comments_dict.get(activity_tidbit_we_vote_id, 0)
+            activity_notice.number_of_likes = number_of_likes_dict.get(activity_tidbit_we_vote_id, 0)
+        elif activity_notice_seed.kind_of_seed == NOTICE_CAMPAIGNX_SUPPORTER_INITIAL_RESPONSE_SEED:
+            if not positive_value_exists(activity_notice_seed.campaignx_we_vote_id):
+                continue
+            activity_notice.campaignx_we_vote_id = activity_notice_seed.campaignx_we_vote_id
+        elif activity_notice_seed.kind_of_seed == NOTICE_FRIEND_ENDORSEMENTS_SEED:
+            activity_notice.activity_tidbit_we_vote_id = activity_notice_seed.we_vote_id
+            activity_notice.position_name_list_serialized, activity_notice.position_we_vote_id_list_serialized = \
+                generate_position_lists_serialized_from_seed(activity_notice_seed)
+            activity_notice.new_positions_entered_count = \
+                len(json.loads(activity_notice.position_we_vote_id_list_serialized))
+        assembled_activity_notice_by_seed_id[activity_notice_seed.id] = activity_notice
+
+    # Notices stored for friends before we assembled them on read, or stored because they were also emailed, are
+    #  replaced by the assembled notice from the same seed, which has the current comment and like counts
+    activity_notice_list = list(assembled_activity_notice_by_seed_id.values())
+    for activity_notice in stored_activity_notice_list:
+        assembled_activity_notice = assembled_activity_notice_by_seed_id.get(activity_notice.activity_notice_seed_id)
+        if assembled_activity_notice is not None and \
+                activity_notice.kind_of_notice == assembled_activity_notice.kind_of_notice:
+            assembled_activity_notice.activity_notice_seen |= activity_notice.activity_notice_seen
+            assembled_activity_notice.activity_notice_clicked |= activity_notice.activity_notice_clicked
+        else:
+            activity_notice_list.append(activity_notice)
+    oldest_date = datetime.min.replace(tzinfo=timezone.utc)
+    activity_notice_list.sort(
+        key=lambda notice: notice.date_of_notice or notice.date_last_changed or oldest_date, reverse=True)
+    activity_notice_list = activity_notice_list[:ACTIVITY_NOTICE_FEED_LIMIT]
+    status += "ACTIVITY_NOTICE_LIST_ASSEMBLED: " + str(len(activity_notice_list)) + " " \
+              "FROM_SEEDS: " + str(len(assembled_activity_notice_by_seed_id)) + " "
+
+    results = {
+        'success':                  True,
+        'status':                   status,
+        'activity_notice_list':     activity_notice_list,
+    }
+    return results
+
 
 def delete_activity_comments_for_voter(voter_to_delete_we_vote_id, from_organization_we_vote_id):
     status = ''
@@ -183,6 +307,156 @@ def delete_activity_posts_for_voter(voter_to_delete_we_vote_id, from_organizatio
     return results
 
 
+def fetch_activity_notice_feed_state(voter_we_vote_id):
+    """
+    The friend list and feed cursor we need to assemble a voter's notices, from the shared cache when we can
+    :param voter_we_vote_id:
+    :return: dict with friend_we_vote_id_list, seen_activity_notice_seed_id_list and
+      clicked_activity_notice_seed_id_list
+    """
+    feed_cache_key = generate_activity_notice_feed_cache_key(voter_we_vote_id)
+    try:
+        feed_state = caches[ACTIVITY_NOTICE_FEED_CACHE_ALIAS].get(feed_cache_key)
+    except Exception as e:
+        feed_state = None
+        logger.error('fetch_activity_notice_feed_state shared cache error: ' + str(e))
+    if feed_state is not None:
+        return feed_state
+
+    friend_we_vote_id_list = []
+    friend_manager = FriendManager()
+    friend_results = friend_manager.retrieve_friends_we_vote_id_list(voter_we_vote_id)
+    if friend_results['friends_we_vote_id_list_found']:
+        friend_we_vote_id_list = friend_results['friends_we_vote_id_list']
+    activity_manager = ActivityManager()
+    cursor_results = activity_manager.retrieve_activity_notice_feed_cursor(voter_we_vote_id=voter_we_vote_id)
+    activity_notice_feed_cursor = cursor_results['activity_notice_feed_cursor']
+    feed_state = {
+        'friend_we_vote_id_list':               friend_we_vote_id_list,
+        'seen_activity_notice_seed_id_list':    activity_notice_feed_cursor.fetch_seen_activity_notice_seed_id_list(),
+        'clicked_activity_notice_seed_id_list':
+            activity_notice_feed_cursor.fetch_clicked_activity_notice_seed_id_list(),
+    }
+    if friend_results['success'] and cursor_results['success']:
+        store_activity_notice_feed_state(voter_we_vote_id, feed_state)
+    return feed_state
+
+
+def fetch_activity_notice_unseen_count_for_recipient(recipient_voter_we_vote_id):
+    """
+    How many of the notices activityNoticeListRetrieve returns to this voter they haven't seen yet. We send this as
+    the badge to every friend of a poster, so instead of assembling the notices, we compare the ids of the newest
+    friends' seeds with the voter's feed cursor, and count the unseen stored notices.
+    :param recipient_voter_we_vote_id:
+    :return:
+    """
+    feed_state = fetch_activity_notice_feed_state(recipient_voter_we_vote_id)
+    try:
+        activity_notice_seed_id_list = []
+        if len(feed_state['friend_we_vote_id_list']):
+            queryset = ActivityNoticeSeed.objects.using('readonly').filter(
+                deleted=False,
+                kind_of_seed__in=list(NOTICE_KIND_ASSEMBLED_ON_READ_BY_KIND_OF_SEED.keys()),
+                speaker_voter_we_vote_id__in=feed_state['friend_we_vote_id_list'])
+            queryset = queryset.exclude(
+                Q(speaker_organization_we_vote_id=None) | Q(speaker_organization_we_vote_id=""))
+            queryset = queryset.order_by('-id').values_list('id', flat=True)
+            activity_notice_seed_id_list = list(queryset[:ACTIVITY_NOTICE_FEED_LIMIT])
+        unseen_seed_id_set = set(activity_notice_seed_id_list) - set(feed_state['seen_activity_notice_seed_id_list'])
+        if len(unseen_seed_id_set):
+            # Seen on a notice stored from the same seed counts too
+            queryset = ActivityNotice.objects.using('readonly').filter(
+                activity_notice_seed_id__in=list(unseen_seed_id_set),
+                activity_notice_seen=True,
+                deleted=False,
+                recipient_voter_we_vote_id=recipient_voter_we_vote_id)
+            unseen_seed_id_set -= set(queryset.values_list('activity_notice_seed_id', flat=True))
+
+        queryset = ActivityNotice.objects.using('readonly').filter(
+            activity_notice_seen=False,
+            deleted=False,
+            kind_of_notice__in=ACTIVITY_NOTICE_KIND_SHOWN_LIST,
+            recipient_voter_we_vote_id=recipient_voter_we_vote_id)
+        if len(activity_notice_seed_id_list):
+            queryset = queryset.exclude(activity_notice_seed_id__in=activity_notice_seed_id_list)
+        stored_unseen_count = queryset.count()
+    except Exception as e:
+        logger.error('fetch_activity_notice_unseen_count_for_recipient: ' + str(e))
+        return 0
+    return min(len(unseen_seed_id_set) + stored_unseen_count, ACTIVITY_NOTICE_FEED_LIMIT)
+
+
+def fetch_latest_activity_tidbit_we_vote_id_from_seed(activity_notice_seed):
+    """
+    The post a NOTICE_ACTIVITY_POST_SEED notice is about: the most recent friends-only post, or else the most
+    recent public post
+    """
+    for activity_tidbit_we_vote_ids_serialized in [
+            activity_notice_seed.activity_tidbit_we_vote_ids_for_friends_serialized,
+            activity_notice_seed.activity_tidbit_we_vote_ids_for_public_serialized]:
+        if positive_value_exists(activity_tidbit_we_vote_ids_serialized):
+            activity_tidbit_we_vote_id_list = json.loads(activity_tidbit_we_vote_ids_serialized)
+            if len(activity_tidbit_we_vote_id_list) > 0:
+                return activity_tidbit_we_vote_id_list[-1]
+    return ''
+
+
+def generate_activity_notice_feed_cache_key(voter_we_vote_id):
+    return 'activity_notice_feed_state:' + voter_we_vote_id
+
+
+def generate_activity_notice_seeds_to_process(
+        when_process_must_stop,
+        notices_to_be_created=False,
+        notices_to_be_scheduled=False,
+        notices_to_be_updated=False,
+        to_be_added_to_voter_daily_summary=False):
+    """
+    Generator of the seeds needing processing, most recent first, retrieved ACTIVITY_NOTICE_SEED_PROCESS_BATCH_SIZE
+    at a time, until when_process_must_stop. Each batch starts below the last seed handed out, so a seed that is
+    still in need of processing after its turn isn't handed out again in this run.
+    """
+    activity_manager = ActivityManager()
+    activity_notice_seed_id_less_than = 0
+    while when_process_must_stop > now():
+        results = activity_manager.retrieve_activity_notice_seed_list_to_process(
+            notices_to_be_created=notices_to_be_created,
+            notices_to_be_scheduled=notices_to_be_scheduled,
+            notices_to_be_updated=notices_to_be_updated,
+            to_be_added_to_voter_daily_summary=to_be_added_to_voter_daily_summary,
+            activity_notice_seed_id_less_than=activity_notice_seed_id_less_than)
+        if not results['success']:
+            logger.error('generate_activity_notice_seeds_to_process: ' + results['status'])
+            return
+        if not results['activity_notice_seed_list_found']:
+            return
+        for activity_notice_seed in results['activity_notice_seed_list']:
+            if when_process_must_stop <= now():
+                return
+            activity_notice_seed_id_less_than = activity_notice_seed.id
+            yield activity_notice_seed
+
+
+def generate_position_lists_serialized_from_seed(activity_notice_seed):
+    """
+    Combine the friends-only and public positions in a NOTICE_FRIEND_ENDORSEMENTS_SEED
+    :return: position_name_list_serialized, position_we_vote_id_list_serialized
+    """
+    # Names for quick summaries
+    position_name_list = []
+    if positive_value_exists(activity_notice_seed.position_names_for_friends_serialized):
+        position_name_list += json.loads(activity_notice_seed.position_names_for_friends_serialized)
+    if positive_value_exists(activity_notice_seed.position_names_for_public_serialized):
+        position_name_list += json.loads(activity_notice_seed.position_names_for_public_serialized)
+    # We Vote Ids for full position display
+    position_we_vote_id_list = []
+    if positive_value_exists(activity_notice_seed.position_we_vote_ids_for_friends_serialized):
+        position_we_vote_id_list += json.loads(activity_notice_seed.position_we_vote_ids_for_friends_serialized)
+    if positive_value_exists(activity_notice_seed.position_we_vote_ids_for_public_serialized):
+        position_we_vote_id_list += json.loads(activity_notice_seed.position_we_vote_ids_for_public_serialized)
+    return json.dumps(position_name_list), json.dumps(position_we_vote_id_list)
+
+
 def move_activity_comments_to_another_voter(
         from_voter_we_vote_id, to_voter_we_vote_id, from_organization_we_vote_id, to_organization_we_vote_id,
         to_voter=None):
@@ -712,7 +986,7 @@ def notice_friend_endorsements_send(
             if schedule_results['email_scheduled_saved']:
                 # messages_to_send.append(schedule_results['email_scheduled_id'])
                 email_scheduled = schedule_results['email_scheduled']
-                send_results = email_manager.send_scheduled_email(email_scheduled)
+                send_results = email_manager.queue_scheduled_email(email_scheduled)
                 email_scheduled_sent = send_results['email_scheduled_sent']
                 status += send_results['status']
                 success = send_results['success']
@@ -1008,7 +1282,7 @@ def notice_voter_daily_summary_send(  # NOTICE_VOTER_DAILY_SUMMARY
             if schedule_results['email_scheduled_saved']:
                 # messages_to_send.append(schedule_results['email_scheduled_id'])
                 email_scheduled = schedule_results['email_scheduled']
-                send_results = email_manager.send_scheduled_email(email_scheduled)
+                send_results = email_manager.queue_scheduled_email(email_scheduled)
                 email_scheduled_sent = send_results['email_scheduled_sent']
                 status += send_results['status']
                 success = send_results['success']
@@ -1025,13 +1299,12 @@ def process_activity_notice_seeds_triggered_by_batch_process():
     We assume only one of this function is running at any time.
     :return:
     """
-    status = ''
+    status = StatusTrace()
     success = True
     activity_notice_seed_count = 0
     activity_notice_count = 0
 
     # Retrieve ActivityNoticeSeeds that need to have some processing done, including ActivityNotice entries created
-    activity_manager = ActivityManager()
     # We want this process to stop before it has run for 5 minutes, so that we don't collide with another process
     #  starting. Please also see: activity_notice_processing_time_out_duration & checked_out_expiration_time
     # We adjust timeout for ACTIVITY_NOTICE_PROCESS in retrieve_batch_process_list
@@ -1045,157 +1318,102 @@ def process_activity_notice_seeds_triggered_by_batch_process():
     update_interval = 5
     time_now = now()
     if time_now.minute % update_interval == 0:
-        continue_retrieving_notices_to_be_updated = True
-        activity_notice_seed_id_already_reviewed_list = []
-        safety_valve_count = 0
-        while continue_retrieving_notices_to_be_updated and \
-                safety_valve_count < 1000 and \
-                when_process_must_stop > now():
-            safety_valve_count += 1
-            results = activity_manager.retrieve_next_activity_notice_seed_to_process(
-                notices_to_be_updated=True,
-                activity_notice_seed_id_already_reviewed_list=activity_notice_seed_id_already_reviewed_list)
-            if results['activity_notice_seed_found']:
-                # We retrieve from these seed types:
-                #   NOTICE_ACTIVITY_POST_SEED
-                #   NOTICE_FRIEND_ENDORSEMENTS_SEED
-                # We do not need to update (we create once elsewhere and do not update):
-                #   NOTICE_CAMPAIGNX_NEWS_ITEM_SEED
-                #   NOTICE_CAMPAIGNX_SUPPORTER_INITIAL_RESPONSE_SEED
-                #   NOTICE_VOTER_DAILY_SUMMARY_SEED
-                activity_notice_seed = results['activity_notice_seed']
-                activity_notice_seed_id_already_reviewed_list.append(activity_notice_seed.id)
-                activity_notice_seed_count += 1
-                status += "[updated:: "
-                status += "activity_notice_seed_id: " + str(activity_notice_seed.id) + " "
-                status += "kind_of_seed: " + str(activity_notice_seed.kind_of_seed) + ""
-                status += "] "
-                update_activity_notices = False
-
-                if activity_notice_seed.kind_of_seed == NOTICE_ACTIVITY_POST_SEED:
-                    # We are storing number_of_comments and number_of_likes in NOTICE_ACTIVITY_POST_SEED, so we need
-                    #  to update in case there have been changes.
-                    update_seed_results = \
-                        update_activity_notice_seed_date_of_notice_earlier_than_update_window(activity_notice_seed)
-                    status += update_seed_results['status']
-                    if update_seed_results['success']:
-                        activity_notice_seed = update_seed_results['activity_notice_seed']
-                    if not activity_notice_seed.date_of_notice_earlier_than_update_window:
-                        update_activity_notices = True
-                elif activity_notice_seed.kind_of_seed == NOTICE_FRIEND_ENDORSEMENTS_SEED:
-                    update_seed_results = \
-                        update_activity_notice_seed_date_of_notice_earlier_than_update_window(activity_notice_seed)
-                    status += update_seed_results['status']
-                    if update_seed_results['success']:
-                        activity_notice_seed = update_seed_results['activity_notice_seed']
-                    if not activity_notice_seed.date_of_notice_earlier_than_update_window:
-                        # Only update if the number of positions has changed
-                        update_seed_results = update_activity_notice_seed_with_positions(activity_notice_seed)
-                        activity_notice_seed = update_seed_results['activity_notice_seed']
-                        update_activity_notices = True
-
-                if update_activity_notices:
-                    # Update the activity drop down in each voter touched (friends of the voter acting)
-                    update_results = update_or_create_activity_notices_from_seed(activity_notice_seed)
-                    status += update_results['status']  # Show all status for now
-                    # if not update_results['success']:
-                    #     status += update_results['status']
-            else:
-                continue_retrieving_notices_to_be_updated = False
-
-    # Create new ActivityNotice entries, which appear in header notification menu (notices_to_be_created=True)
-    continue_retrieving_notices_to_be_created = True
-    activity_notice_seed_id_already_reviewed_list = []  # Reset
-    safety_valve_count = 0
-    while continue_retrieving_notices_to_be_created and safety_valve_count < 1000 and when_process_must_stop > now():
-        safety_valve_count += 1
-        results = activity_manager.retrieve_next_activity_notice_seed_to_process(
-            notices_to_be_created=True,
-            activity_notice_seed_id_already_reviewed_list=activity_notice_seed_id_already_reviewed_list)
-        if results['activity_notice_seed_found']:
+        for activity_notice_seed in generate_activity_notice_seeds_to_process(
+                when_process_must_stop, notices_to_be_updated=True):
             # We retrieve from these seed types:
             #   NOTICE_ACTIVITY_POST_SEED
+            #   NOTICE_FRIEND_ENDORSEMENTS_SEED
+            # We do not need to update (we create once elsewhere and do not update):
             #   NOTICE_CAMPAIGNX_NEWS_ITEM_SEED
             #   NOTICE_CAMPAIGNX_SUPPORTER_INITIAL_RESPONSE_SEED
-            #   NOTICE_FRIEND_ENDORSEMENTS_SEED
-            activity_notice_seed = results['activity_notice_seed']
-            activity_notice_seed_id_already_reviewed_list.append(activity_notice_seed.id)
+            #   NOTICE_VOTER_DAILY_SUMMARY_SEED
             activity_notice_seed_count += 1
-            status += "[created:: "
+            status += "[updated:: "
             status += "activity_notice_seed_id: " + str(activity_notice_seed.id) + " "
             status += "kind_of_seed: " + str(activity_notice_seed.kind_of_seed) + ""
             status += "] "
+            update_activity_notices = False
 
-            # Create the activity drop down in each voter's header for each voter touched (friends of the voter acting)
-            create_results = update_or_create_activity_notices_from_seed(activity_notice_seed)
-            # activity_notice_seed.activity_notices_created = True  # Marked in function immediately above
-            activity_notice_count += create_results['activity_notice_count']
+            if activity_notice_seed.kind_of_seed == NOTICE_ACTIVITY_POST_SEED:
+                # number_of_comments and number_of_likes are counted when friends read their notices, so all we need
+                #  to do is stop updating once the seed is older than the update window
+                update_seed_results = \
+                    update_activity_notice_seed_date_of_notice_earlier_than_update_window(activity_notice_seed)
+                status += update_seed_results['status']
+            elif activity_notice_seed.kind_of_seed == NOTICE_FRIEND_ENDORSEMENTS_SEED:
+                update_seed_results = \
+                    update_activity_notice_seed_date_of_notice_earlier_than_update_window(activity_notice_seed)
+                status += update_seed_results['status']
+                if update_seed_results['success']:
+                    activity_notice_seed = update_seed_results['activity_notice_seed']
+                if not activity_notice_seed.date_of_notice_earlier_than_update_window:
+                    # Only update if the number of positions has changed
+                    update_seed_results = update_activity_notice_seed_with_positions(activity_notice_seed)
+                    activity_notice_seed = update_seed_results['activity_notice_seed']
+                    update_activity_notices = True
+
+            if update_activity_notices:
+                # Update the activity drop down in each voter touched (friends of the voter acting)
+                update_results = update_or_create_activity_notices_from_seed(activity_notice_seed)
+                status += update_results['status']  # Show all status for now
+                # if not update_results['success']:
+                #     status += update_results['status']
 
-            # NOTE: Since the daily summary is only sent once per day, wait to create NOTICE_VOTER_DAILY_SUMMARY_SEED
-            #  in the update step above
-        else:
-            continue_retrieving_notices_to_be_created = False
+    # Create new ActivityNotice entries, which appear in header notification menu (notices_to_be_created=True)
+    for activity_notice_seed in generate_activity_notice_seeds_to_process(
+            when_process_must_stop, notices_to_be_created=True):
+        # We retrieve from these seed types:
+        #   NOTICE_ACTIVITY_POST_SEED
+        #   NOTICE_CAMPAIGNX_NEWS_ITEM_SEED
+        #   NOTICE_CAMPAIGNX_SUPPORTER_INITIAL_RESPONSE_SEED
+        #   NOTICE_FRIEND_ENDORSEMENTS_SEED
+        activity_notice_seed_count += 1
+        status += "[created:: "
+        status += "activity_notice_seed_id: " + str(activity_notice_seed.id) + " "
+        status += "kind_of_seed: " + str(activity_notice_seed.kind_of_seed) + ""
+        status += "] "
+
+        # Create the activity drop down entries that aren't assembled when each voter reads their notices
+        create_results = update_or_create_activity_notices_from_seed(activity_notice_seed)
+        # activity_notice_seed.activity_notices_created = True  # Marked in function immediately above
+        activity_notice_count += create_results['activity_notice_count']
+
+        # NOTE: Since the daily summary is only sent once per day, wait to create NOTICE_VOTER_DAILY_SUMMARY_SEED
+        #  in the update step above
 
     # Create NOTICE_VOTER_DAILY_SUMMARY_SEED entries for any other SEED that needs to go into the DAILY_SUMMARY
     # We retrieve from these seed types: NOTICE_ACTIVITY_POST_SEED, NOTICE_FRIEND_ENDORSEMENTS_SEED
-    continue_retrieving_to_be_added_to_voter_summary = True
-    activity_notice_seed_id_already_reviewed_list = []
-    safety_valve_count = 0
-    while continue_retrieving_to_be_added_to_voter_summary and \
-            safety_valve_count < 1000 and \
-            when_process_must_stop > now():
-        safety_valve_count += 1
-        results = activity_manager.retrieve_next_activity_notice_seed_to_process(
-            to_be_added_to_voter_daily_summary=True,
-            activity_notice_seed_id_already_reviewed_list=activity_notice_seed_id_already_reviewed_list)
-        if results['activity_notice_seed_found']:
-            # We retrieve from these seed types: NOTICE_ACTIVITY_POST_SEED, NOTICE_FRIEND_ENDORSEMENTS_SEED
-            activity_notice_seed = results['activity_notice_seed']
-            activity_notice_seed_id_already_reviewed_list.append(activity_notice_seed.id)
-            activity_notice_seed_count += 1
-            status += "[daily_summary:: "
-            status += "activity_notice_seed_id: " + str(activity_notice_seed.id) + " "
-            status += "kind_of_seed: " + str(activity_notice_seed.kind_of_seed) + ""
-            status += "] "
-            # Create the seeds (one for each voter touched) which will be used to send a daily summary
-            #  to each voter touched. So we end up with new NOTICE_VOTER_DAILY_SUMMARY_SEED entries for the friends
-            #  of the creators of these seeds: NOTICE_ACTIVITY_POST_SEED, NOTICE_FRIEND_ENDORSEMENTS_SEED
-            update_results = update_or_create_voter_daily_summary_seeds_from_seed(activity_notice_seed)
-            # if not update_results['success']:
-            status += update_results['status']
-        else:
-            continue_retrieving_to_be_added_to_voter_summary = False
+    for activity_notice_seed in generate_activity_notice_seeds_to_process(
+            when_process_must_stop, to_be_added_to_voter_daily_summary=True):
+        activity_notice_seed_count += 1
+        status += "[daily_summary:: "
+        status += "activity_notice_seed_id: " + str(activity_notice_seed.id) + " "
+        status += "kind_of_seed: " + str(activity_notice_seed.kind_of_seed) + ""
+        status += "] "
+        # Create the seeds (one for each voter touched) which will be used to send a daily summary
+        #  to each voter touched. So we end up with new NOTICE_VOTER_DAILY_SUMMARY_SEED entries for the friends
+        #  of the creators of these seeds: NOTICE_ACTIVITY_POST_SEED, NOTICE_FRIEND_ENDORSEMENTS_SEED
+        update_results = update_or_create_voter_daily_summary_seeds_from_seed(activity_notice_seed)
+        # if not update_results['success']:
+        status += update_results['status']
 
     # Send email notifications (notices_to_be_scheduled=True)
-    continue_retrieving_notices_to_be_scheduled = True
-    activity_notice_seed_id_already_reviewed_list = []  # Reset
-    safety_valve_count = 0
-    while continue_retrieving_notices_to_be_scheduled and safety_valve_count < 1000 and when_process_must_stop > now():
-        safety_valve_count += 1
-        results = activity_manager.retrieve_next_activity_notice_seed_to_process(
-            notices_to_be_scheduled=True,
-            activity_notice_seed_id_already_reviewed_list=activity_notice_seed_id_already_reviewed_list)
-        if results['activity_notice_seed_found']:
-            # We retrieve from these seed types:
-            #  NOTICE_CAMPAIGNX_NEWS_ITEM_SEED
-            #  NOTICE_CAMPAIGNX_SUPER_SHARE_ITEM_SEED
-            #  NOTICE_CAMPAIGNX_SUPPORTER_INITIAL_RESPONSE_SEED
-            #  NOTICE_FRIEND_ENDORSEMENTS_SEED
-            #  NOTICE_VOTER_DAILY_SUMMARY_SEED
-            activity_notice_seed = results['activity_notice_seed']
-            activity_notice_seed_id_already_reviewed_list.append(activity_notice_seed.id)
-            # activity_notice_seed_count += 1
-            schedule_results = schedule_activity_notices_from_seed(activity_notice_seed)
-            # activity_notice_seed.activity_notices_scheduled = True  # Marked in function immediately above
-            # if not schedule_results['success']:
-            status += schedule_results['status']
-            # activity_notice_count += create_results['activity_notice_count']
-        else:
-            continue_retrieving_notices_to_be_scheduled = False
+    for activity_notice_seed in generate_activity_notice_seeds_to_process(
+            when_process_must_stop, notices_to_be_scheduled=True):
+        # We retrieve from these seed types:
+        #  NOTICE_CAMPAIGNX_NEWS_ITEM_SEED
+        #  NOTICE_CAMPAIGNX_SUPER_SHARE_ITEM_SEED
+        #  NOTICE_CAMPAIGNX_SUPPORTER_INITIAL_RESPONSE_SEED
+        #  NOTICE_FRIEND_ENDORSEMENTS_SEED
+        #  NOTICE_VOTER_DAILY_SUMMARY_SEED
+        schedule_results = schedule_activity_notices_from_seed(activity_notice_seed)
+        # activity_notice_seed.activity_notices_scheduled = True  # Marked in function immediately above
+        # if not schedule_results['success']:
+        status += schedule_results['status']
 
     results = {
         'success':                      success,
-        'status':                       status,
+        'status':                       str(status),
         'activity_notice_seed_count':   activity_notice_seed_count,
         'activity_notice_count':        activity_notice_count,
     }
@@ -1210,7 +1428,6 @@ def update_or_create_activity_notices_from_seed(activity_notice_seed):
     campaignx_manager = CampaignXManager()
     activity_manager = ActivityManager()
     friend_manager = FriendManager()
-    reaction_manager = ReactionManager()
 
     # Create or update ActivityNotice entries for the person who generated activity_notice_seed
     if positive_value_exists(activity_notice_seed.campaignx_we_vote_id):
@@ -1271,9 +1488,10 @@ def update_or_create_activity_notices_from_seed(activity_notice_seed):
             else:
                 status += activity_results['status']
 
-    # Seeds that require a friend list to be found
+    # Notices to friends are assembled from this seed when each friend reads their notices (see
+    #  assemble_activity_notice_list_for_recipient), so we only store an ActivityNotice for a friend when we also
+    #  need to send that friend an email or SMS. NOTICE_ACTIVITY_POST_SEED never sends either.
     if activity_notice_seed.kind_of_seed in [
-        NOTICE_ACTIVITY_POST_SEED,
         NOTICE_CAMPAIGNX_SUPPORTER_INITIAL_RESPONSE_SEED,
         NOTICE_FRIEND_ENDORSEMENTS_SEED,
     ]:
@@ -1286,94 +1504,48 @@ def update_or_create_activity_notices_from_seed(activity_notice_seed):
         status += retrieve_current_friends_as_voters_results['status']
         if retrieve_current_friends_as_voters_results['friend_list_found']:
             current_friend_list = retrieve_current_friends_as_voters_results['friend_list']
-            if activity_notice_seed.kind_of_seed == NOTICE_ACTIVITY_POST_SEED:
-                # Pop the last activity_tidbit_we_vote_id
-                activity_tidbit_we_vote_id = ''
-                if positive_value_exists(activity_notice_seed.activity_tidbit_we_vote_ids_for_friends_serialized):
-                    activity_tidbit_we_vote_id_list_for_friends = \
-                        json.loads(activity_notice_seed.activity_tidbit_we_vote_ids_for_friends_serialized)
-                    if len(activity_tidbit_we_vote_id_list_for_friends) > 0:
-                        activity_tidbit_we_vote_id = activity_tidbit_we_vote_id_list_for_friends.pop()
-                if not positive_value_exists(activity_tidbit_we_vote_id):
-                    if positive_value_exists(activity_notice_seed.activity_tidbit_we_vote_ids_for_public_serialized):
-                        activity_tidbit_we_vote_id_list_for_public = \
-                            json.loads(activity_notice_seed.activity_tidbit_we_vote_ids_for_public_serialized)
-                        if len(activity_tidbit_we_vote_id_list_for_public) > 0:
-                            activity_tidbit_we_vote_id = activity_tidbit_we_vote_id_list_for_public.pop()
-                if positive_value_exists(activity_tidbit_we_vote_id):
-                    number_of_comments = activity_manager.fetch_number_of_comments(
-                        parent_we_vote_id=activity_tidbit_we_vote_id)
-                    number_of_likes = reaction_manager.fetch_number_of_likes(activity_tidbit_we_vote_id)
-                    kind_of_notice = NOTICE_FRIEND_ACTIVITY_POSTS
-                    for friend_voter in current_friend_list:
-                        # ###########################
-                        # NOTE: We call update_or_create_voter_daily_summary_seeds_from_seed from the same place
-                        #  (process_activity_notice_seeds_triggered_by_batch_process) we call the function
-                        #  we are currently in. We don't do it here.
-
-                        # ###########################
-                        # This is the entry that goes in the header drop-down
-                        activity_results = update_or_create_activity_notice_for_friend_posts(
-                            activity_notice_seed_id=activity_notice_seed.id,
-                            activity_tidbit_we_vote_id=activity_tidbit_we_vote_id,
-                            kind_of_seed=activity_notice_seed.kind_of_seed,
-                            kind_of_notice=kind_of_notice,
-                            number_of_comments=number_of_comments,
-                            number_of_likes=number_of_likes,
-                            recipient_voter_we_vote_id=friend_voter.we_vote_id,
-                            send_to_email=False,
-                            send_to_sms=False,
-                            speaker_name=activity_notice_seed.speaker_name,
-                            speaker_organization_we_vote_id=activity_notice_seed.speaker_organization_we_vote_id,
-                            speaker_voter_we_vote_id=activity_notice_seed.speaker_voter_we_vote_id,
-                            speaker_profile_image_url_medium=activity_notice_seed.speaker_profile_image_url_medium,
-                            speaker_profile_image_url_tiny=activity_notice_seed.speaker_profile_image_url_tiny,
-                            statement_text_preview=activity_notice_seed.statement_text_preview)
-                        if activity_results['success']:
-                            activity_notice_count += 1
-                        else:
-                            status += activity_results['status']
-            elif activity_notice_seed.kind_of_seed == NOTICE_CAMPAIGNX_SUPPORTER_INITIAL_RESPONSE_SEED:
+            if activity_notice_seed.kind_of_seed == NOTICE_CAMPAIGNX_SUPPORTER_INITIAL_RESPONSE_SEED:
                 if positive_value_exists(activity_notice_seed.campaignx_we_vote_id):
                     # #########
-                    # Notices (and emails) to the creator's friends
+                    # Emails to the creator's friends
                     kind_of_notice = NOTICE_CAMPAIGNX_FRIEND_HAS_SUPPORTED
                     twelve_hours_of_seconds = 12 * 60 * 60
                     for friend_voter in current_friend_list:
+                        # Decide whether to send email or sms based on friend's notification settings
+                        # We will need to figure out if this endorsement is on this voter's ballot
+                        # NOTIFICATION_FRIEND_OPINIONS_OTHER_REGIONS_EMAIL
+                        # NOTIFICATION_FRIEND_OPINIONS_YOUR_BALLOT_EMAIL
+                        # 2023-08-06 Dale: Turning this off because it could lead to too many notifications
+                        # send_to_email = friend_voter.is_notification_status_flag_set(
+                        #     NOTIFICATION_FRIEND_OPINIONS_OTHER_REGIONS_EMAIL)
+                        send_to_email = False
+                        # NOTIFICATION_FRIEND_OPINIONS_YOUR_BALLOT_SMS
+                        # NOTIFICATION_FRIEND_OPINIONS_OTHER_REGIONS_SMS
+                        # 2023-08-06 Dale: Turning this off because it could lead to too many notifications
+                        # send_to_sms = friend_voter.is_notification_status_flag_set(
+                        #     NOTIFICATION_FRIEND_OPINIONS_OTHER_REGIONS_SMS)
+                        send_to_sms = False
+                        if not send_to_email and not send_to_sms:
+                            continue
+
                         # Has the friend already signed this campaign? If so, don't send another email.
                         is_voter_campaignx_supporter = campaignx_manager.is_voter_campaignx_supporter(
                             campaignx_we_vote_id=activity_notice_seed.campaignx_we_vote_id,
                             voter_we_vote_id=friend_voter.we_vote_id)
                         # Has the friend already received an email about this supporter signing a campaign recently?
                         # If so, don't email any more notices for twelve_hours_of_seconds
-                        activity_notice_count = activity_manager.fetch_activity_notice_count(
+                        recent_activity_notice_count = activity_manager.fetch_activity_notice_count(
                             activity_in_last_x_seconds=twelve_hours_of_seconds,
                             kind_of_notice=kind_of_notice,
                             recipient_voter_we_vote_id=friend_voter.we_vote_id,
                             send_to_email=True,
                             speaker_voter_we_vote_id=activity_notice_seed.speaker_voter_we_vote_id,
                         )
-                        if is_voter_campaignx_supporter or activity_notice_count > 0:
-                            send_to_email = False
-                            send_to_sms = False
-                        else:
-                            # Decide whether to send email or sms based on friend's notification settings
-                            # We will need to figure out if this endorsement is on this voter's ballot
-                            # NOTIFICATION_FRIEND_OPINIONS_OTHER_REGIONS_EMAIL
-                            # NOTIFICATION_FRIEND_OPINIONS_YOUR_BALLOT_EMAIL
-                            # 2023-08-06 Dale: Turning this off because it could lead to too many notifications
-                            # send_to_email = friend_voter.is_notification_status_flag_set(
-                            #     NOTIFICATION_FRIEND_OPINIONS_OTHER_REGIONS_EMAIL)
-                            send_to_email = False
-                            # NOTIFICATION_FRIEND_OPINIONS_YOUR_BALLOT_SMS
-                            # NOTIFICATION_FRIEND_OPINIONS_OTHER_REGIONS_SMS
-                            # 2023-08-06 Dale: Turning this off because it could lead to too many notifications
-                            # send_to_sms = friend_voter.is_notification_status_flag_set(
-                            #     NOTIFICATION_FRIEND_OPINIONS_OTHER_REGIONS_SMS)
-                            send_to_sms = False
+                        if is_voter_campaignx_supporter or recent_activity_notice_count > 0:
+                            continue
 
                         # ###########################
-                        # This is the entry that goes in the header drop-down
+                        # This entry is emailed, and shown in the header drop-down instead of the assembled one
                         activity_results = update_or_create_activity_notice_for_friend_campaignx_support(
                             activity_notice_seed_id=activity_notice_seed.id,
                             campaignx_we_vote_id=activity_notice_seed.campaignx_we_vote_id,
@@ -1394,34 +1566,9 @@ def update_or_create_activity_notices_from_seed(activity_notice_seed):
                             status += activity_results['status']
             elif activity_notice_seed.kind_of_seed == NOTICE_FRIEND_ENDORSEMENTS_SEED:
                 kind_of_notice = NOTICE_FRIEND_ENDORSEMENTS
-                # Names for quick summaries
-                position_name_list = []
-                if positive_value_exists(activity_notice_seed.position_names_for_friends_serialized):
-                    position_name_list_for_friends = \
-                        json.loads(activity_notice_seed.position_names_for_friends_serialized)
-                    position_name_list += position_name_list_for_friends
-                if positive_value_exists(activity_notice_seed.position_names_for_public_serialized):
-                    position_name_list_for_public = \
-                        json.loads(activity_notice_seed.position_names_for_public_serialized)
-                    position_name_list += position_name_list_for_public
-                position_name_list_serialized = json.dumps(position_name_list)
-                # We Vote Ids for full position display
-                position_we_vote_id_list = []
-                if positive_value_exists(
-                        activity_notice_seed.position_we_vote_ids_for_friends_serialized):
-                    position_we_vote_id_list_for_friends = \
-                        json.loads(activity_notice_seed.position_we_vote_ids_for_friends_serialized)
-                    position_we_vote_id_list += position_we_vote_id_list_for_friends
-                if positive_value_exists(
-                        activity_notice_seed.position_we_vote_ids_for_public_serialized):
-                    position_we_vote_id_list_for_public = \
-                        json.loads(activity_notice_seed.position_we_vote_ids_for_public_serialized)
-                    position_we_vote_id_list += position_we_vote_id_list_for_public
-                position_we_vote_id_list_serialized = json.dumps(position_we_vote_id_list)
-
+                position_name_list_serialized = None
+                position_we_vote_id_list_serialized = None
                 for friend_voter in current_friend_list:
-                    # Add switch for NOTICE_FRIEND_ACTIVITY_POSTS here
-
                     # Decide whether to send email or sms based on friend's notification settings
                     # We will need to figure out if this endorsement is on this voter's ballot
                     # NOTIFICATION_FRIEND_OPINIONS_OTHER_REGIONS_EMAIL
@@ -1438,9 +1585,14 @@ def update_or_create_activity_notices_from_seed(activity_notice_seed):
                     # send_to_sms = friend_voter.is_notification_status_flag_set(
                     #     NOTIFICATION_FRIEND_OPINIONS_OTHER_REGIONS_SMS)
                     send_to_sms = False
+                    if not send_to_email and not send_to_sms:
+                        continue
 
+                    if position_we_vote_id_list_serialized is None:
+                        position_name_list_serialized, position_we_vote_id_list_serialized = \
+                            generate_position_lists_serialized_from_seed(activity_notice_seed)
                     # ###########################
-                    # This is the entry that goes in the header drop-down
+                    # This entry is emailed, and shown in the header drop-down instead of the assembled one
                     activity_results = update_or_create_activity_notice_for_friend_endorsements(
                         activity_notice_seed_id=activity_notice_seed.id,
                         activity_tidbit_we_vote_id=activity_notice_seed.we_vote_id,
@@ -1708,6 +1860,36 @@ def update_or_create_voter_daily_summary_seeds_from_seed(activity_notice_seed):
     return results
 
 
+def retrieve_number_of_comments_and_likes_dicts(activity_tidbit_we_vote_id_list):
+    """
+    Comment and like counts for many posts, with one query each
+    :param activity_tidbit_we_vote_id_list:
+    :return: number_of_comments_dict, number_of_likes_dict. Both are activity_tidbit_we_vote_id -> count, and leave
+      out posts with none.
+    """
+    number_of_comments_dict = {}
+    number_of_likes_dict = {}
+    activity_tidbit_we_vote_id_list = [we_vote_id for we_vote_id in activity_tidbit_we_vote_id_list if we_vote_id]
+    if not activity_tidbit_we_vote_id_list:
+        return number_of_comments_dict, number_of_likes_dict
+    try:
+        # Like ActivityManager.retrieve_number_of_comments, this doesn't count comments on comments
+        queryset = ActivityComment.objects.using('readonly') \
+            .filter(parent_we_vote_id__in=activity_tidbit_we_vote_id_list, deleted=False) \
+            .filter(Q(parent_comment_we_vote_id=None) | Q(parent_comment_we_vote_id="")) \
+            .values('parent_we_vote_id') \
+            .annotate(number_of_comments=Count('id'))
+        number_of_comments_dict = {row['parent_we_vote_id']: row['number_of_comments'] for row in queryset}
+        queryset = ReactionLike.objects.using('readonly') \
+            .filter(liked_item_we_vote_id__in=activity_tidbit_we_vote_id_list) \
+            .values('liked_item_we_vote_id') \
+            .annotate(number_of_likes=Count('id'))
+        number_of_likes_dict = {row['liked_item_we_vote_id']: row['number_of_likes'] for row in queryset}
+    except Exception as e:
+        logger.error('retrieve_number_of_comments_and_likes_dicts: ' + str(e))
+    return number_of_comments_dict, number_of_likes_dict
+
+
 def schedule_activity_notices_from_seed(activity_notice_seed):
     status = ''
     success = True
@@ -2484,89 +2666,6 @@ def update_or_create_activity_notice_for_friend_endorsements(
     return results
 
 
-def update_or_create_activity_notice_for_friend_posts(
-        activity_notice_seed_id=0,
-        activity_tidbit_we_vote_id='',
-        kind_of_seed='',
-        kind_of_notice='',
-        number_of_comments=0,
-        number_of_likes=0,
-        recipient_voter_we_vote_id='',
-        send_to_email=False,
-        send_to_sms=False,
-        speaker_name='',
-        speaker_organization_we_vote_id='',
-        speaker_voter_we_vote_id='',
-        speaker_profile_image_url_medium='',
-        speaker_profile_image_url_tiny='',
-        statement_text_preview=''):
-    status = ''
-    success = True
-    activity_manager = ActivityManager()
-
-    results = activity_manager.retrieve_recent_activity_notice_from_speaker_and_recipient(
-        activity_notice_seed_id=activity_notice_seed_id,
-        kind_of_notice=kind_of_notice,
-        recipient_voter_we_vote_id=recipient_voter_we_vote_id,
-        speaker_organization_we_vote_id=speaker_organization_we_vote_id,
-        speaker_voter_we_vote_id=speaker_voter_we_vote_id,
-    )
-    if results['activity_notice_found']:
-        try:
-            activity_notice = results['activity_notice']
-            change_found = False
-            if positive_value_exists(activity_tidbit_we_vote_id) and \
-                    activity_tidbit_we_vote_id != activity_notice.activity_tidbit_we_vote_id:
-                activity_notice.activity_tidbit_we_vote_id = activity_tidbit_we_vote_id
-                change_found = True
-            if positive_value_exists(number_of_comments) and number_of_comments != activity_notice.number_of_comments:
-                activity_notice.number_of_comments = number_of_comments
-                change_found = True
-            if positive_value_exists(number_of_likes) and number_of_likes != activity_notice.number_of_likes:
-                activity_notice.number_of_likes = number_of_likes
-                change_found = True
-            if positive_value_exists(speaker_name) and speaker_name != activity_notice.speaker_name:
-                activity_notice.speaker_name = speaker_name
-                change_found = True
-            if positive_value_exists(statement_text_preview) and \
-                    statement_text_preview != activity_notice.statement_text_preview:
-                activity_notice.statement_text_preview = statement_text_preview
-                change_found = True
-            if change_found:
-                activity_notice.save()
-        except Exception as e:
-            status += "FAILED_ACTIVITY_NOTICE_SAVE: " + str(e) + ' '
-        status += results['status']
-    elif results['success']:
-        date_of_notice = now()
-        create_results = activity_manager.create_activity_notice(
-            activity_notice_seed_id=activity_notice_seed_id,
-            activity_tidbit_we_vote_id=activity_tidbit_we_vote_id,
-            date_of_notice=date_of_notice,
-            kind_of_notice=kind_of_notice,
-            kind_of_seed=kind_of_seed,
-            number_of_comments=number_of_comments,
-            number_of_likes=number_of_likes,
-            recipient_voter_we_vote_id=recipient_voter_we_vote_id,
-            send_to_email=send_to_email,
-            send_to_sms=send_to_sms,
-            speaker_name=speaker_name,
-            speaker_organization_we_vote_id=speaker_organization_we_vote_id,
-            speaker_voter_we_vote_id=speaker_voter_we_vote_id,
-            speaker_profile_image_url_medium=speaker_profile_image_url_medium,
-            speaker_profile_image_url_tiny=speaker_profile_image_url_tiny,
-            statement_text_preview=statement_text_preview)
-        status += create_results['status']
-    else:
-        status += results['status']
-
-    results = {
-        'success':              success,
-        'status':               status,
-    }
-    return results
-
-
 def update_or_create_activity_notice_seed_for_activity_posts(
         activity_post_we_vote_id='',
         visibility_is_public=False,
@@ -3088,6 +3187,42 @@ def update_or_create_activity_notice_seed_for_voter_position(
     return results
 
 
+def store_activity_notice_feed_state(voter_we_vote_id, feed_state):
+    try:
+        caches[ACTIVITY_NOTICE_FEED_CACHE_ALIAS].set(
+            generate_activity_notice_feed_cache_key(voter_we_vote_id), feed_state,
+            timeout=ACTIVITY_NOTICE_FEED_CACHE_SECONDS)
+    except Exception as e:
+        logger.error('store_activity_notice_feed_state shared cache error: ' + str(e))
+
+
+def update_activity_notice_feed_cursor_for_voter(
+        voter_we_vote_id='',
+        activity_notice_seed_id_list_seen=None,
+        activity_notice_seed_id_list_clicked=None):
+    """
+    Mark notices assembled from friends' seeds as seen or clicked, and write the new cursor through to the cache
+    """
+    activity_manager = ActivityManager()
+    results = activity_manager.update_activity_notice_feed_cursor(
+        voter_we_vote_id=voter_we_vote_id,
+        activity_notice_seed_id_list_seen=activity_notice_seed_id_list_seen,
+        activity_notice_seed_id_list_clicked=activity_notice_seed_id_list_clicked)
+    if results['activity_notice_feed_cursor_updated']:
+        feed_state = fetch_activity_notice_feed_state(voter_we_vote_id)
+        activity_notice_feed_cursor = results['activity_notice_feed_cursor']
+        feed_state['seen_activity_notice_seed_id_list'] = \
+            activity_notice_feed_cursor.fetch_seen_activity_notice_seed_id_list()
+        feed_state['clicked_activity_notice_seed_id_list'] = \
+            activity_notice_feed_cursor.fetch_clicked_activity_notice_seed_id_list()
+        store_activity_notice_feed_state(voter_we_vote_id, feed_state)
+    results = {
+        'success':  results['success'],
+        'status':   results['status'],
+    }
+    return results
+
+
 def update_activity_notice_seed_date_of_notice_earlier_than_update_window(activity_notice_seed):
     status = ''
     success = True
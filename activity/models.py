@@ -30,6 +30,18 @@ NOTICE_FRIEND_ACTIVITY_POSTS = 'NOTICE_FRIEND_ACTIVITY_POSTS'  # Notice shown in
 NOTICE_FRIEND_ENDORSEMENTS = 'NOTICE_FRIEND_ENDORSEMENTS'
 NOTICE_VOTER_DAILY_SUMMARY = 'NOTICE_VOTER_DAILY_SUMMARY'  # Email sent, not shown in header menu
 
+# Notices to friends we assemble from the seed when the friend reads their notices. We only store an ActivityNotice
+#  per friend for these when we also need to send that friend an email or SMS.
+NOTICE_KIND_ASSEMBLED_ON_READ_BY_KIND_OF_SEED = {
+    NOTICE_ACTIVITY_POST_SEED:                          NOTICE_FRIEND_ACTIVITY_POSTS,
+    NOTICE_CAMPAIGNX_SUPPORTER_INITIAL_RESPONSE_SEED:   NOTICE_CAMPAIGNX_FRIEND_HAS_SUPPORTED,
+    NOTICE_FRIEND_ENDORSEMENTS_SEED:                    NOTICE_FRIEND_ENDORSEMENTS,
+}
+# How many seen, and how many clicked, seed ids we remember for each voter, in ActivityNoticeFeedCursor
+ACTIVITY_NOTICE_FEED_SEED_ID_MAXIMUM = 200
+# How many seeds process_activity_notice_seeds_triggered_by_batch_process retrieves with each query
+ACTIVITY_NOTICE_SEED_PROCESS_BATCH_SIZE = 50
+
 FRIENDS_ONLY = 'FRIENDS_ONLY'
 SHOW_PUBLIC = 'SHOW_PUBLIC'
 
@@ -534,6 +546,38 @@ class ActivityManager(models.Manager):
         }
         return results
 
+    @staticmethod
+    def retrieve_activity_notice_feed_cursor(voter_we_vote_id=''):
+        """
+        :param voter_we_vote_id:
+        :return: activity_notice_feed_cursor is an unsaved ActivityNoticeFeedCursor if this voter doesn't have one yet
+        """
+        status = ""
+        activity_notice_feed_cursor = ActivityNoticeFeedCursor(voter_we_vote_id=voter_we_vote_id)
+        activity_notice_feed_cursor_found = False
+        success = True
+        if not positive_value_exists(voter_we_vote_id):
+            success = False
+            status += 'ACTIVITY_NOTICE_FEED_CURSOR-VALID_VOTER_WE_VOTE_ID_MISSING '
+        else:
+            try:
+                activity_notice_feed_cursor = ActivityNoticeFeedCursor.objects.get(voter_we_vote_id=voter_we_vote_id)
+                activity_notice_feed_cursor_found = True
+                status += 'ACTIVITY_NOTICE_FEED_CURSOR_FOUND '
+            except ActivityNoticeFeedCursor.DoesNotExist:
+                status += 'ACTIVITY_NOTICE_FEED_CURSOR_NOT_FOUND '
+            except Exception as e:
+                success = False
+                status += 'FAILED retrieve_activity_notice_feed_cursor: ' + str(e) + ' '
+
+        results = {
+            'success':                              success,
+            'status':                               status,
+            'activity_notice_feed_cursor_found':    activity_notice_feed_cursor_found,
+            'activity_notice_feed_cursor':          activity_notice_feed_cursor,
+        }
+        return results
+
     @staticmethod
     def retrieve_activity_notice_seed_list(notices_to_be_created=False):
         status = ""
@@ -1010,15 +1054,69 @@ class ActivityManager(models.Manager):
         return results
 
     @staticmethod
-    def retrieve_next_activity_notice_seed_to_process(
+    def retrieve_activity_notice_seed_list_from_speakers(
+            speaker_voter_we_vote_id_list=None,
+            kind_of_seed_list=None,
+            limit=30):
+        """
+        The most recent seeds from these speakers, in one query. Used to assemble a voter's notices from their
+        friends' seeds when the voter reads them.
+        :param speaker_voter_we_vote_id_list:
+        :param kind_of_seed_list:
+        :param limit:
+        :return:
+        """
+        status = ""
+        activity_notice_seed_list = []
+        if not speaker_voter_we_vote_id_list:
+            status += 'NO_SPEAKERS-NO_ACTIVITY_NOTICE_SEED_LIST_RETRIEVED '
+            results = {
+                'success':                          True,
+                'status':                           status,
+                'activity_notice_seed_list_found':  False,
+                'activity_notice_seed_list':        activity_notice_seed_list,
+            }
+            return results
+
+        try:
+            queryset = ActivityNoticeSeed.objects.using('readonly').all()
+            queryset = queryset.filter(deleted=False)
+            queryset = queryset.filter(speaker_voter_we_vote_id__in=speaker_voter_we_vote_id_list)
+            if kind_of_seed_list and len(kind_of_seed_list) > 0:
+                queryset = queryset.filter(kind_of_seed__in=kind_of_seed_list)
+            queryset = queryset.order_by('-id')  # Put most recent at top of list
+            activity_notice_seed_list = list(queryset[:limit])
+            success = True
+            activity_notice_seed_list_found = len(activity_notice_seed_list) > 0
+            status += 'ACTIVITY_NOTICE_SEED_LIST_FROM_SPEAKERS_RETRIEVED '
+        except Exception as e:
+            success = False
+            activity_notice_seed_list_found = False
+            status += 'FAILED retrieve_activity_notice_seed_list_from_speakers: ' + str(e) + ' '
+
+        results = {
+            'success':                          success,
+            'status':                           status,
+            'activity_notice_seed_list_found':  activity_notice_seed_list_found,
+            'activity_notice_seed_list':        activity_notice_seed_list,
+        }
+        return results
+
+    @staticmethod
+    def retrieve_activity_notice_seed_list_to_process(
             notices_to_be_created=False,
             notices_to_be_scheduled=False,
             notices_to_be_updated=False,
             to_be_added_to_voter_daily_summary=False,
-            activity_notice_seed_id_already_reviewed_list=[]):
+            activity_notice_seed_id_less_than=0,
+            limit=ACTIVITY_NOTICE_SEED_PROCESS_BATCH_SIZE):
+        """
+        One batch of seeds needing processing, most recent first. To get the next batch, pass in the id of the last
+        seed in this one as activity_notice_seed_id_less_than.
+        """
         status = ""
 
-        activity_notice_seed = None
+        activity_notice_seed_list = []
         try:
             queryset = ActivityNoticeSeed.objects.all()
             queryset = queryset.filter(deleted=False)
@@ -1057,32 +1155,29 @@ class ActivityManager(models.Manager):
                         NOTICE_FRIEND_ENDORSEMENTS_SEED
                     ])
                 # TODO Add: NOTICE_CAMPAIGNX_NEWS_ITEM_SEED, NOTICE_CAMPAIGNX_SUPPORTER_INITIAL_RESPONSE_SEED
-            if activity_notice_seed_id_already_reviewed_list and len(activity_notice_seed_id_already_reviewed_list) > 0:
-                queryset = queryset.exclude(id__in=activity_notice_seed_id_already_reviewed_list)
+            if positive_value_exists(activity_notice_seed_id_less_than):
+                queryset = queryset.filter(id__lt=activity_notice_seed_id_less_than)
 
             queryset = queryset.order_by('-id')  # Put most recent at top of list
-            activity_notice_seed_list = queryset[:1]
+            activity_notice_seed_list = list(queryset[:limit])
 
+            success = True
             if len(activity_notice_seed_list):
-                success = True
-                activity_notice_seed = activity_notice_seed_list[0]
-                activity_notice_seed_found = True
-                status += 'ACTIVITY_NOTICE_SEED_RETRIEVED '
+                activity_notice_seed_list_found = True
+                status += 'ACTIVITY_NOTICE_SEED_LIST_RETRIEVED '
             else:
-                success = True
-                activity_notice_seed = None
-                activity_notice_seed_found = False
-                status += 'NO_ACTIVITY_NOTICE_SEED_RETRIEVED '
+                activity_notice_seed_list_found = False
+                status += 'NO_ACTIVITY_NOTICE_SEED_LIST_RETRIEVED '
         except Exception as e:
             success = False
-            activity_notice_seed_found = False
-            status += 'FAILED retrieve_activity_notice_seed ActivityNoticeSeed: ' + str(e) + ' '
+            activity_notice_seed_list_found = False
+            status += 'FAILED retrieve_activity_notice_seed_list_to_process ActivityNoticeSeed: ' + str(e) + ' '
 
         results = {
-            'success':                      success,
-            'status':                       status,
-            'activity_notice_seed_found':   activity_notice_seed_found,
-            'activity_notice_seed':         activity_notice_seed,
+            'success':                          success,
+            'status':                           status,
+            'activity_notice_seed_list_found':  activity_notice_seed_list_found,
+            'activity_notice_seed_list':        activity_notice_seed_list,
         }
         return results
 
@@ -1235,6 +1330,69 @@ class ActivityManager(models.Manager):
         }
         return results
 
+    def update_activity_notice_feed_cursor(
+            self,
+            voter_we_vote_id='',
+            activity_notice_seed_id_list_seen=None,
+            activity_notice_seed_id_list_clicked=None):
+        """
+        Record seen and clicked, one seed at a time, for the notices we assemble from friends' seeds. Clicked seeds
+        are also seen.
+        """
+        status = ""
+        activity_notice_seed_id_list_seen = \
+            [convert_to_int(seed_id) for seed_id in activity_notice_seed_id_list_seen or []]
+        activity_notice_seed_id_list_clicked = \
+            [convert_to_int(seed_id) for seed_id in activity_notice_seed_id_list_clicked or []]
+        results = self.retrieve_activity_notice_feed_cursor(voter_we_vote_id=voter_we_vote_id)
+        if not results['success']:
+            results = {
+                'success':                              False,
+                'status':                               results['status'],
+                'activity_notice_feed_cursor_updated':  False,
+                'activity_notice_feed_cursor':          results['activity_notice_feed_cursor'],
+            }
+            return results
+
+        activity_notice_feed_cursor = results['activity_notice_feed_cursor']
+        change_found = False
+        seen_seed_id_list = activity_notice_feed_cursor.fetch_seen_activity_notice_seed_id_list()
+        for activity_notice_seed_id in activity_notice_seed_id_list_seen + activity_notice_seed_id_list_clicked:
+            if positive_value_exists(activity_notice_seed_id) and activity_notice_seed_id not in seen_seed_id_list:
+                seen_seed_id_list.append(activity_notice_seed_id)
+                change_found = True
+        clicked_seed_id_list = activity_notice_feed_cursor.fetch_clicked_activity_notice_seed_id_list()
+        for activity_notice_seed_id in activity_notice_seed_id_list_clicked:
+            if positive_value_exists(activity_notice_seed_id) and activity_notice_seed_id not in clicked_seed_id_list:
+                clicked_seed_id_list.append(activity_notice_seed_id)
+                change_found = True
+        if change_found:
+            try:
+                # Keep the most recent seeds, which are the only ones still in the voter's notices
+                activity_notice_feed_cursor.seen_activity_notice_seed_ids_serialized = \
+                    json.dumps(sorted(seen_seed_id_list)[-ACTIVITY_NOTICE_FEED_SEED_ID_MAXIMUM:])
+                activity_notice_feed_cursor.clicked_activity_notice_seed_ids_serialized = \
+                    json.dumps(sorted(clicked_seed_id_list)[-ACTIVITY_NOTICE_FEED_SEED_ID_MAXIMUM:])
+                activity_notice_feed_cursor.save()
+                status += 'ACTIVITY_NOTICE_FEED_CURSOR_UPDATED '
+            except Exception as e:
+                status += 'FAILED update_activity_notice_feed_cursor: ' + str(e) + ' '
+                results = {
+                    'success':                              False,
+                    'status':                               status,
+                    'activity_notice_feed_cursor_updated':  False,
+                    'activity_notice_feed_cursor':          activity_notice_feed_cursor,
+                }
+                return results
+
+        results = {
+            'success':                              True,
+            'status':                               status,
+            'activity_notice_feed_cursor_updated':  change_found,
+            'activity_notice_feed_cursor':          activity_notice_feed_cursor,
+        }
+        return results
+
     @staticmethod
     def update_activity_notice_list_in_bulk(
             recipient_voter_we_vote_id='',
@@ -1657,6 +1815,28 @@ class ActivityNotice(models.Model):
     # Needed? super_share_item_id = models.PositiveIntegerField(default=None, null=True)
 
 
+class ActivityNoticeFeedCursor(models.Model):
+    """
+    Which of the notices we assemble from their friends' ActivityNoticeSeed entries one voter has seen and clicked.
+    Those notices aren't stored for each friend, so we keep seen and clicked here, by ActivityNoticeSeed id.
+    """
+    voter_we_vote_id = models.CharField(max_length=255, default=None, null=True, unique=True)
+    # The most recent ACTIVITY_NOTICE_FEED_SEED_ID_MAXIMUM seed ids seen, and clicked, as JSON lists
+    seen_activity_notice_seed_ids_serialized = models.TextField(default=None, null=True)
+    clicked_activity_notice_seed_ids_serialized = models.TextField(default=None, null=True)
+    date_last_changed = models.DateTimeField(null=True, auto_now=True)
+
+    def fetch_clicked_activity_notice_seed_id_list(self):
+        if positive_value_exists(self.clicked_activity_notice_seed_ids_serialized):
+            return json.loads(self.clicked_activity_notice_seed_ids_serialized)
+        return []
+
+    def fetch_seen_activity_notice_seed_id_list(self):
+        if positive_value_exists(self.seen_activity_notice_seed_ids_serialized):
+            return json.loads(self.seen_activity_notice_seed_ids_serialized)
+        return []
+
+
 class ActivityNoticeSeed(models.Model):
     """
     This is the "seed" for a notice for the notification drop-down menu, which is used before we "distribute" it
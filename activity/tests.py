@@ -0,0 +1,164 @@
+# activity/tests.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from datetime import timedelta
+import json
+from unittest import mock
+from django.core.cache import caches
+from django.test import TransactionTestCase
+from django.urls import reverse
+from django.utils.timezone import now
+from friend.models import CurrentFriend
+from .controllers import ACTIVITY_NOTICE_FEED_CACHE_ALIAS, assemble_activity_notice_list_for_recipient, \
+    fetch_activity_notice_unseen_count_for_recipient, update_activity_notice_feed_cursor_for_voter
+from .models import ActivityComment, ActivityManager, ActivityNotice, ActivityNoticeSeed, \
+    NOTICE_ACTIVITY_POST_SEED, NOTICE_CAMPAIGNX_NEWS_ITEM, NOTICE_FRIEND_ACTIVITY_POSTS, NOTICE_FRIEND_ENDORSEMENTS, \
+    NOTICE_FRIEND_ENDORSEMENTS_SEED
+
+
+class ActivityNoticeFeedTests(TransactionTestCase):
+    # TransactionTestCase, so the queries we send to the readonly database see the rows saved in these tests
+    databases = ["default", "readonly"]
+
+    def setUp(self):
+        caches[ACTIVITY_NOTICE_FEED_CACHE_ALIAS].clear()
+        self.addCleanup(caches[ACTIVITY_NOTICE_FEED_CACHE_ALIAS].clear)
+        self.voter_we_vote_id = 'wv01voter1'
+        for friend_number in [2, 3]:
+            CurrentFriend.objects.create(
+                viewer_voter_we_vote_id=self.voter_we_vote_id,
+                viewee_voter_we_vote_id='wv01voter' + str(friend_number))
+        self.seed_number = 0
+
+    def create_seed(self, speaker_voter_we_vote_id='wv01voter2', kind_of_seed=NOTICE_ACTIVITY_POST_SEED,
+                    minutes_ago=0):
+        self.seed_number += 1
+        values = {
+            'date_of_notice':                   now() - timedelta(minutes=minutes_ago),
+            'kind_of_seed':                     kind_of_seed,
+            'speaker_name':                     'Friend ' + speaker_voter_we_vote_id,
+            'speaker_organization_we_vote_id':  speaker_voter_we_vote_id.replace('voter', 'org'),
+            'speaker_voter_we_vote_id':         speaker_voter_we_vote_id,
+            'we_vote_id':                       'wv01actseed' + str(self.seed_number),
+        }
+        if kind_of_seed == NOTICE_ACTIVITY_POST_SEED:
+            values['activity_tidbit_we_vote_ids_for_friends_serialized'] = \
+                json.dumps(['wv01post' + str(self.seed_number)])
+        else:
+            values['position_names_for_friends_serialized'] = json.dumps(['Supports Measure A'])
+            values['position_we_vote_ids_for_friends_serialized'] = json.dumps(['wv01pos' + str(self.seed_number)])
+        return ActivityNoticeSeed.objects.create(**values)
+
+    def test_assemble_activity_notice_list_for_recipient(self):
+        post_seed = self.create_seed(minutes_ago=30)
+        endorsement_seed = self.create_seed(
+            speaker_voter_we_vote_id='wv01voter3', kind_of_seed=NOTICE_FRIEND_ENDORSEMENTS_SEED, minutes_ago=20)
+        self.create_seed(speaker_voter_we_vote_id='wv01voter9', minutes_ago=10)  # Not a friend
+        ActivityComment.objects.create(parent_we_vote_id='wv01post1', we_vote_id='wv01comment1')
+        # Stored for this voter before we assembled friend notices on read, and already seen
+        ActivityNotice.objects.create(
+            activity_notice_seed_id=post_seed.id, activity_notice_seen=True, date_of_notice=post_seed.date_of_notice,
+            kind_of_notice=NOTICE_FRIEND_ACTIVITY_POSTS, recipient_voter_we_vote_id=self.voter_we_vote_id)
+        stored_notice = ActivityNotice.objects.create(
+            date_of_notice=now() - timedelta(minutes=40), kind_of_notice=NOTICE_CAMPAIGNX_NEWS_ITEM,
+            recipient_voter_we_vote_id=self.voter_we_vote_id)
+
+        results = assemble_activity_notice_list_for_recipient(self.voter_we_vote_id)
+        self.assertTrue(results['success'])
+        activity_notice_list = results['activity_notice_list']
+        self.assertEqual(
+            [(notice.id, notice.activity_notice_seed_id) for notice in activity_notice_list],
+            [(None, endorsement_seed.id), (None, post_seed.id), (stored_notice.id, None)])
+        endorsement_notice, post_notice = activity_notice_list[0], activity_notice_list[1]
+        self.assertEqual(endorsement_notice.kind_of_notice, NOTICE_FRIEND_ENDORSEMENTS)
+        self.assertEqual(endorsement_notice.new_positions_entered_count, 1)
+        self.assertFalse(endorsement_notice.activity_notice_seen)
+        self.assertEqual(post_notice.activity_tidbit_we_vote_id, 'wv01post1')
+        self.assertEqual(post_notice.number_of_comments, 1)
+        self.assertTrue(post_notice.activity_notice_seen)  # From the stored notice it replaces
+        self.assertEqual(fetch_activity_notice_unseen_count_for_recipient(self.voter_we_vote_id), 2)
+
+    def test_seen_and_clicked_are_kept_per_seed(self):
+        oldest_seed = self.create_seed(minutes_ago=30)
+        middle_seed = self.create_seed(speaker_voter_we_vote_id='wv01voter3', minutes_ago=20)
+        newest_seed = self.create_seed(minutes_ago=10)
+
+        # The voter sees only the newest two, and marks them seen
+        with mock.patch('activity.controllers.ACTIVITY_NOTICE_FEED_LIMIT', 2):
+            results = assemble_activity_notice_list_for_recipient(self.voter_we_vote_id)
+        first_page_seed_id_list = [notice.activity_notice_seed_id for notice in results['activity_notice_list']]
+        self.assertEqual(first_page_seed_id_list, [newest_seed.id, middle_seed.id])
+        results = update_activity_notice_feed_cursor_for_voter(
+            voter_we_vote_id=self.voter_we_vote_id, activity_notice_seed_id_list_seen=first_page_seed_id_list)
+        self.assertTrue(results['success'])
+
+        # The older seed, never shown, is still not seen
+        results = assemble_activity_notice_list_for_recipient(self.voter_we_vote_id)
+        seen_by_seed_id = {notice.activity_notice_seed_id: notice.activity_notice_seen
+                           for notice in results['activity_notice_list']}
+        self.assertEqual(seen_by_seed_id, {newest_seed.id: True, middle_seed.id: True, oldest_seed.id: False})
+
+        update_activity_notice_feed_cursor_for_voter(
+            voter_we_vote_id=self.voter_we_vote_id, activity_notice_seed_id_list_clicked=[oldest_seed.id])
+        caches[ACTIVITY_NOTICE_FEED_CACHE_ALIAS].clear()  # Read back from the database this time
+        results = assemble_activity_notice_list_for_recipient(self.voter_we_vote_id)
+        oldest_notice = results['activity_notice_list'][-1]
+        self.assertTrue(oldest_notice.activity_notice_seen)
+        self.assertTrue(oldest_notice.activity_notice_clicked)
+        self.assertEqual(fetch_activity_notice_unseen_count_for_recipient(self.voter_we_vote_id), 0)
+
+    def test_assembled_notices_marked_seen_by_activity_notice_id(self):
+        post_seed = self.create_seed(minutes_ago=20)
+        endorsement_seed = self.create_seed(
+            speaker_voter_we_vote_id='wv01voter3', kind_of_seed=NOTICE_FRIEND_ENDORSEMENTS_SEED, minutes_ago=10)
+        url = reverse('apis_v1:activityNoticeListRetrieveView')
+        with mock.patch('apis_v1.views.views_activity.fetch_voter_we_vote_id_from_voter_device_link',
+                        return_value=self.voter_we_vote_id):
+            json_data = json.loads(self.client.get(url, {'voter_device_id': 'device1'}).content.decode())
+            self.assertEqual([(notice['activity_notice_id'], notice['activity_notice_seen'])
+                              for notice in json_data['activity_notice_list']],
+                             [(-endorsement_seed.id, False), (-post_seed.id, False)])
+
+            # What clients that only know activity_notice_id send back
+            json_data = json.loads(self.client.get(url, {
+                'voter_device_id':                      'device1',
+                'activity_notice_id_list_seen[]':       [-endorsement_seed.id, -post_seed.id],
+                'activity_notice_id_list_clicked[]':    [-post_seed.id],
+            }).content.decode())
+        self.assertTrue(json_data['success'], json_data['status'])
+        self.assertEqual([(notice['activity_notice_seen'], notice['activity_notice_clicked'])
+                          for notice in json_data['activity_notice_list']], [(True, False), (True, True)])
+        self.assertEqual(fetch_activity_notice_unseen_count_for_recipient(self.voter_we_vote_id), 0)
+
+    def test_unseen_count_does_not_assemble_notices(self):
+        seed_list = [self.create_seed(minutes_ago=minutes_ago) for minutes_ago in [30, 20, 10]]
+        ActivityNotice.objects.create(date_of_notice=now(), kind_of_notice=NOTICE_CAMPAIGNX_NEWS_ITEM,
+                                      recipient_voter_we_vote_id=self.voter_we_vote_id)
+        update_activity_notice_feed_cursor_for_voter(
+            voter_we_vote_id=self.voter_we_vote_id, activity_notice_seed_id_list_seen=[seed_list[0].id])
+        with mock.patch('activity.controllers.assemble_activity_notice_list_for_recipient',
+                        side_effect=AssertionError('assembled')):
+            self.assertEqual(fetch_activity_notice_unseen_count_for_recipient(self.voter_we_vote_id), 3)
+
+    def test_activity_notice_feed_cursor_round_trip(self):
+        activity_manager = ActivityManager()
+        results = activity_manager.retrieve_activity_notice_feed_cursor(voter_we_vote_id=self.voter_we_vote_id)
+        self.assertFalse(results['activity_notice_feed_cursor_found'])
+        self.assertEqual(results['activity_notice_feed_cursor'].fetch_seen_activity_notice_seed_id_list(), [])
+
+        with mock.patch('activity.models.ACTIVITY_NOTICE_FEED_SEED_ID_MAXIMUM', 3):
+            results = activity_manager.update_activity_notice_feed_cursor(
+                voter_we_vote_id=self.voter_we_vote_id, activity_notice_seed_id_list_seen=['7', 2, 5, 9],
+                activity_notice_seed_id_list_clicked=[4])
+        self.assertTrue(results['activity_notice_feed_cursor_updated'])
+        results = activity_manager.update_activity_notice_feed_cursor(
+            voter_we_vote_id=self.voter_we_vote_id, activity_notice_seed_id_list_seen=[9])
+        self.assertFalse(results['activity_notice_feed_cursor_updated'])
+
+        results = activity_manager.retrieve_activity_notice_feed_cursor(voter_we_vote_id=self.voter_we_vote_id)
+        self.assertTrue(results['activity_notice_feed_cursor_found'])
+        activity_notice_feed_cursor = results['activity_notice_feed_cursor']
+        # Only the most recent seeds are kept
+        self.assertEqual(activity_notice_feed_cursor.fetch_seen_activity_notice_seed_id_list(), [5, 7, 9])
+        self.assertEqual(activity_notice_feed_cursor.fetch_clicked_activity_notice_seed_id_list(), [4])
@@ -13,14 +13,18 @@ from django.shortcuts import render
 from django.urls import reverse
 
 import wevote_functions
+from api_internal_cache.controllers import api_response_cache_stats
 from ballot.models import BallotReturned, VoterBallotSaved
 from candidate.controllers import candidates_import_from_sample_file
 from candidate.models import CandidateCampaign, CandidateManager
 from config.base import get_environment_variable, LOGIN_URL, BASE_DIR, PROJECT_PATH
 from election.controllers import elections_import_from_sample_file
 from election.models import Election
+from email_outbound.controllers_send_queue import email_send_queue_stats
 from email_outbound.models import EmailAddress
 from follow.models import FollowOrganizationList
+from geoip.controllers import geocode_cache_stats, geoip_location_cache_stats
+from googlebot_site_map.controllers import site_map_local_cache
 from friend.models import CurrentFriend, FriendManager, SuggestedFriend
 from import_export_ctcl.models import CTCLApiCounterManager
 from import_export_facebook.models import FacebookLinkToVoter, FacebookManager
@@ -40,9 +44,10 @@ from twitter.functions import retrieve_twitter_rate_limit_info
 from twitter.models import TwitterApiCounterManager, TwitterLinkToOrganization, TwitterLinkToVoter, TwitterUserManager
 from voter.models import Voter, VoterAddress, VoterAddressManager, VoterDeviceLinkManager, \
     VoterManager, VoterMetricsManager, \
-    voter_has_authority, voter_setup
+    voter_has_authority, voter_identity_cache_stats, voter_setup
 from wevote_functions.functions import convert_to_int, delete_voter_api_device_id_cookie, generate_voter_device_id, \
     get_voter_api_device_id, positive_value_exists, set_voter_api_device_id, STATE_CODE_MAP
+from wevote_functions.functions_http import http_client_stats
 from wevote_functions.utils import get_node_version, get_postgres_version, get_python_version, get_git_commit_hash, \
     get_git_commit_date
 
@@ -1946,9 +1951,21 @@ def statistics_summary_view(request):
     vote_usa_api_counter_manager = VoteUSAApiCounterManager()
     vote_usa_daily_summary_list = vote_usa_api_counter_manager.retrieve_daily_summaries(days_to_display=15)
 
+    # In-memory cache counters are per-process, so these only describe the process that served this page
+    cache_stats_list = [
+        voter_identity_cache_stats(),
+        api_response_cache_stats(),
+        geoip_location_cache_stats(),
+        geocode_cache_stats(),
+        site_map_local_cache.stats(),
+    ]
+
     template_values = {
+        'cache_stats_list':                 cache_stats_list,
         'ctcl_daily_summary_list':          ctcl_daily_summary_list,
+        'email_send_queue_stats':           email_send_queue_stats(),
         'google_civic_daily_summary_list':  google_civic_daily_summary_list,
+        'http_client_stats_list':           http_client_stats(),
         'twitter_daily_summary_list':       twitter_daily_summary_list,
         'twitter_api_limits':               twitter_api_limits,
         'vote_usa_daily_summary_list':      vote_usa_daily_summary_list,
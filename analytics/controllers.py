@@ -3,7 +3,7 @@
 # -*- coding: UTF-8 -*-
 
 from .models import AnalyticsAction, AnalyticsCountManager, AnalyticsManager, \
-    ACTIONS_THAT_REQUIRE_ORGANIZATION_IDS
+    ACTIONS_THAT_REQUIRE_ORGANIZATION_IDS, lock_analytics_actions, save_analytics_voter_tombstone
 from candidate.models import CandidateManager
 from config.base import get_environment_variable
 from datetime import date, datetime, timedelta
@@ -27,10 +27,18 @@ from share.models import ShareManager
 from voter.models import VoterManager, VoterMetricsManager
 import wevote_functions.admin
 from wevote_functions.functions import convert_to_int, positive_value_exists
+from wevote_functions.functions_cache import CACHE_VALUE_NOT_FOUND, LocalTTLCache
 from wevote_functions.functions_date import convert_date_to_date_as_integer
 
 logger = wevote_functions.admin.get_logger(__name__)
 
+# seo_friendly_path -> politician_we_vote_id (None if not found), so saveAnalyticsAction doesn't look up the
+#  politician on every view of a politician page
+politician_we_vote_id_from_seo_friendly_path_cache = LocalTTLCache(
+    cache_name='politician_we_vote_id_from_seo_friendly_path',
+    max_entries=20000,
+    time_to_live_seconds=600)
+
 WE_VOTE_API_KEY = get_environment_variable("WE_VOTE_API_KEY")
 
 
@@ -278,7 +286,8 @@ def process_one_analytics_batch_process_augment_with_first_visit(batch_process,
         analysis_success = True
         try:
             first_visit_query = AnalyticsAction.objects.using('analytics').all()
-            first_visit_query = first_visit_query.order_by("id")  # order by oldest first
+            # Order by oldest first. Buffered actions from different processes aren't saved in exact_time order.
+            first_visit_query = first_visit_query.order_by("exact_time", "id")
             first_visit_query = first_visit_query.filter(date_as_integer=batch_process.analytics_date_as_integer)
             first_visit_query = first_visit_query.filter(voter_we_vote_id__iexact=voter_we_vote_id)
             analytics_action = first_visit_query.first()
@@ -364,7 +373,7 @@ def augment_analytics_action_with_election_id_one_voter(
         voter_history_query = AnalyticsAction.objects.using('analytics').all()
         voter_history_query = voter_history_query.filter(voter_we_vote_id__iexact=voter_we_vote_id)
         voter_history_query = voter_history_query.filter(date_as_integer=analytics_date_as_integer)
-        voter_history_query = voter_history_query.order_by("id")  # order by oldest first
+        voter_history_query = voter_history_query.order_by("exact_time", "id")  # order by oldest first
         voter_history_list = list(voter_history_query)
     except Exception as e:
         status += "COULD_NOT_RETRIEVE_ANALYTICS_FOR_VOTER-ONE_VOTER: " + str(e) + " "
@@ -509,7 +518,7 @@ def augment_one_voter_analytics_action_entries_without_election_id(voter_we_vote
         voter_history_query = voter_history_query.filter(voter_we_vote_id__iexact=voter_we_vote_id)
         if positive_value_exists(starting_analytics_action_id):
             voter_history_query = voter_history_query.filter(id__gte=starting_analytics_action_id)
-        voter_history_query = voter_history_query.order_by("id")  # order by oldest first
+        voter_history_query = voter_history_query.order_by("exact_time", "id")  # order by oldest first
         voter_history_list = list(voter_history_query)
     except Exception as e:
         status += "COULD_NOT_RETRIEVE_ANALYTICS_FOR_VOTER-gte=starting_analytics_action: " + str(e) + " "
@@ -874,13 +883,21 @@ def save_analytics_action_for_api(  # saveAnalyticsAction
 
     if positive_value_exists(seo_friendly_path) and not positive_value_exists(politician_we_vote_id):
         # Look up the politician_we_vote_id based on the seo_friendly_path
-        try:
-            queryset = Politician.objects.using('readonly').filter(seo_friendly_path=seo_friendly_path)
-            one_politician = queryset.first()
-            politician_we_vote_id = one_politician.we_vote_id
-        except Exception as e:
-            politician_we_vote_id = None
-            status += "POLITICIAN_NOT_FOUND-FROM_SEO_FRIENDLY_PATH: " + str(e) + " "
+        politician_we_vote_id = politician_we_vote_id_from_seo_friendly_path_cache.get(seo_friendly_path)
+        if politician_we_vote_id is CACHE_VALUE_NOT_FOUND:
+            try:
+                queryset = Politician.objects.using('readonly').filter(seo_friendly_path=seo_friendly_path)
+                one_politician = queryset.first()
+                politician_we_vote_id = one_politician.we_vote_id
+                politician_we_vote_id_from_seo_friendly_path_cache.set(seo_friendly_path, politician_we_vote_id)
+            except Exception as e:
+                politician_we_vote_id = None
+                if isinstance(e, AttributeError):
+                    # queryset.first() found nobody
+                    politician_we_vote_id_from_seo_friendly_path_cache.set(seo_friendly_path, None)
+                status += "POLITICIAN_NOT_FOUND-FROM_SEO_FRIENDLY_PATH: " + str(e) + " "
+        elif politician_we_vote_id is None:
+            status += "POLITICIAN_NOT_FOUND-FROM_SEO_FRIENDLY_PATH "
 
     save_results = analytics_manager.save_action(
         action_constant,
@@ -1358,25 +1375,17 @@ def delete_analytics_info_for_voter(voter_to_delete_we_vote_id):
         }
         return results
 
-    analytics_manager = AnalyticsManager()
-    analytics_action_list_results = analytics_manager.retrieve_analytics_action_list(
-        voter_to_delete_we_vote_id, read_only=False)
-    if analytics_action_list_results['analytics_action_list_found']:
-        analytics_action_list = analytics_action_list_results['analytics_action_list']
-
-        for analytics_action_object in analytics_action_list:
-            try:
-                analytics_action_object.delete()
-                analytics_action_deleted += 1
-            except Exception as e:
-                analytics_action_not_deleted += 1
-                status += "UNABLE_TO_SAVE_ANALYTICS_ACTION " + str(e) + " "
-                success = False
-
-        status += " DELETE_ANALYTICS_ACTION, moved: " + str(analytics_action_deleted) + \
-                  ", not moved: " + str(analytics_action_not_deleted) + " "
-    else:
-        status += " " + analytics_action_list_results['status']
+    try:
+        # Buffered actions for this voter, in any process, are dropped when they are saved after this
+        with lock_analytics_actions(exclusive=True):
+            save_analytics_voter_tombstone(voter_to_delete_we_vote_id)
+            delete_tuple = AnalyticsAction.objects.using('analytics').filter(
+                voter_we_vote_id__iexact=voter_to_delete_we_vote_id).delete()
+            analytics_action_deleted = delete_tuple[0]
+        status += " DELETE_ANALYTICS_ACTION, deleted: " + str(analytics_action_deleted) + " "
+    except Exception as e:
+        status += "UNABLE_TO_DELETE_ANALYTICS_ACTIONS: " + str(e) + " "
+        success = False
 
     results = {
         'status':                       status,
@@ -1418,9 +1427,12 @@ def move_analytics_info_to_another_voter(from_voter_we_vote_id, to_voter_we_vote
         return results
 
     try:
-        analytics_action_moved = AnalyticsAction.objects.using('analytics').filter(
-            voter_we_vote_id__iexact=from_voter_we_vote_id).update(
-            voter_we_vote_id=to_voter_we_vote_id)
+        # Buffered actions for from_voter, in any process, are moved when they are saved after this
+        with lock_analytics_actions(exclusive=True):
+            save_analytics_voter_tombstone(from_voter_we_vote_id, moved_to_voter_we_vote_id=to_voter_we_vote_id)
+            analytics_action_moved = AnalyticsAction.objects.using('analytics').filter(
+                voter_we_vote_id__iexact=from_voter_we_vote_id).update(
+                voter_we_vote_id=to_voter_we_vote_id)
     except Exception as e:
         status += "UNABLE_TO_MOVE_ANALYTICS_ACTIONS: " + str(e) + " "
         success = False
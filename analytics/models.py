@@ -2,7 +2,14 @@
 # Brought to you by We Vote. Be good.
 # -*- coding: UTF-8 -*-
 
-from django.db import models
+from contextlib import contextmanager
+import io
+import json
+import os
+import threading
+
+from config.base import get_environment_variable_default
+from django.db import connections, DataError, IntegrityError, models, transaction
 from django.db.models import Q
 from django.utils.timezone import now
 from datetime import datetime, timedelta
@@ -12,8 +19,9 @@ from follow.models import FollowOrganizationList
 from organization.models import Organization
 import wevote_functions.admin
 from wevote_functions.functions import convert_to_int, positive_value_exists
+from wevote_functions.functions_buffer import SpillingRowBuffer
 from wevote_functions.functions_date import convert_date_as_integer_to_date, convert_date_to_date_as_integer, \
-    get_current_date_as_integer
+    generate_date_as_integer, get_current_date_as_integer
 from wevote_settings.models import WeVoteSetting, WeVoteSettingsManager
 
 ACTION_VOTER_GUIDE_VISIT = 1
@@ -108,6 +116,37 @@ ACTIONS_THAT_REQUIRE_ORGANIZATION_IDS = \
 
 logger = wevote_functions.admin.get_logger(__name__)
 
+# When ANALYTICS_ACTION_BUFFER_ENABLED, AnalyticsManager.save_action (saveAnalyticsAction, on every page view) adds
+#  the action to an in-process SpillingRowBuffer instead of inserting it. The buffer writes AnalyticsAction rows with
+#  one COPY every ANALYTICS_ACTION_BUFFER_ROWS actions, or once the oldest has waited ANALYTICS_ACTION_BUFFER_SECONDS.
+#  exact_time and date_as_integer are set when the action comes in, so the rows are the same as with an insert.
+#  Actions for a voter that was moved or deleted (AnalyticsVoterTombstone) while they waited are moved or dropped when
+#  they are saved, whichever process or host saves them.
+# Unsaved actions wait in spill files in ANALYTICS_ACTION_BUFFER_SPILL_DIRECTORY. A process that crashes leaves its
+#  spill files for the other processes using that directory to save. Actions waiting on a host that never comes back
+#  are lost, unless the directory is on storage another host also uses (with working flock, ex/ NFSv4).
+ANALYTICS_ACTION_BUFFER_ENABLED = \
+    positive_value_exists(get_environment_variable_default("ANALYTICS_ACTION_BUFFER_ENABLED", False))
+ANALYTICS_ACTION_BUFFER_ROWS = int(get_environment_variable_default("ANALYTICS_ACTION_BUFFER_ROWS", 500))
+ANALYTICS_ACTION_BUFFER_SECONDS = float(get_environment_variable_default("ANALYTICS_ACTION_BUFFER_SECONDS", 5))
+ANALYTICS_ACTION_BUFFER_SPILL_DIRECTORY = get_environment_variable_default(
+    "ANALYTICS_ACTION_BUFFER_SPILL_DIRECTORY",
+    os.path.join(get_environment_variable_default("PATH_FOR_TEMP_FILES", "/tmp"), "analytics_action_buffer"))
+# More actions than this waiting to be written (ex/ the analytics database is down) is logged as a backlog
+ANALYTICS_ACTION_BUFFER_MAXIMUM_ROWS_WAITING = 100000
+analytics_action_buffer_state = {
+    'analytics_action_buffer':  None,
+}
+analytics_action_buffer_lock = threading.Lock()
+# Postgres advisory lock: held shared while saving buffered actions, and exclusive while moving or deleting a voter's
+#  actions. See lock_analytics_actions.
+ANALYTICS_ACTION_ADVISORY_LOCK_ID = 20170901
+# How long we remember that a voter's actions were moved or deleted. Buffered actions wait seconds, unless the
+#  analytics database is down, or a spill file waits for its host to come back.
+ANALYTICS_VOTER_TOMBSTONE_DAYS = 30
+# Voter moved to a voter that was then moved... We follow this many moves at most
+ANALYTICS_VOTER_TOMBSTONE_MAXIMUM_MOVES = 10
+
 
 class AnalyticsAction(models.Model):
     """
@@ -524,7 +563,7 @@ class AnalyticsCountManager(models.Manager):
         try:
             fetch_query = AnalyticsAction.objects.using('readonly').all()  # 'analytics'
             fetch_query = fetch_query.filter(voter_we_vote_id=voter_we_vote_id)
-            fetch_query = fetch_query.order_by('-id')
+            fetch_query = fetch_query.order_by('-exact_time', '-id')
             fetch_query = fetch_query[:1]
             fetch_result = list(fetch_query)
             analytics_action = fetch_result.pop()
@@ -568,6 +607,206 @@ class AnalyticsCountManager(models.Manager):
         return count_result
 
 
+def generate_analytics_action_row(analytics_action_values):
+    """
+    :param analytics_action_values: field name -> value, like we would pass to AnalyticsAction.objects.create
+    :return: Every AnalyticsAction column except id, prepared for the database and json.dumps. Raises ValueError if
+      the database would refuse the row (ex/ a user_agent too long for its column), so it never holds up a COPY.
+    """
+    analytics_action_row = {}
+    for field in AnalyticsAction._meta.concrete_fields:
+        if field.primary_key:
+            continue
+        value = field.get_prep_value(analytics_action_values.get(field.attname, field.get_default()))
+        if value is None:
+            if not field.null:
+                raise ValueError(field.attname + " is required")
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, str):
+            if field.max_length and len(value) > field.max_length:
+                raise ValueError(field.attname + " is longer than " + str(field.max_length))
+        elif isinstance(field, (models.PositiveIntegerField, models.PositiveSmallIntegerField)) and value < 0:
+            raise ValueError(field.attname + " is negative")
+        analytics_action_row[field.attname] = value
+    return analytics_action_row
+
+
+def buffer_analytics_action(analytics_action_values):
+    """
+    Add an action to this process's analytics action buffer
+    :param analytics_action_values: field name -> value, like we would pass to AnalyticsAction.objects.create
+    :return: An unsaved AnalyticsAction with the values it will be saved with, or None if the action can't be
+      buffered, so the caller can save it (or fail to) the usual way
+    """
+    analytics_action_values = dict(
+        analytics_action_values,
+        exact_time=now(),
+        date_as_integer=generate_date_as_integer())
+    try:
+        analytics_action_row = generate_analytics_action_row(analytics_action_values)
+        retrieve_analytics_action_buffer().accept(analytics_action_row)
+    except Exception as e:
+        logger.info("buffer_analytics_action, saving without the buffer: " + str(e))
+        return None
+    return AnalyticsAction(**analytics_action_values)
+
+
+def apply_analytics_voter_tombstones(analytics_action_row_list):
+    """
+    Buffered actions may wait past the moment their voter was moved to another voter, or deleted. Move them to the
+    voter they would have been moved to, and drop the ones for deleted voters. Call with lock_analytics_actions held.
+    :param analytics_action_row_list: Rows from generate_analytics_action_row
+    :return: The rows to save
+    """
+    moved_to_by_voter_we_vote_id = {}
+    voter_we_vote_id_list_to_look_up = list({
+        analytics_action_row['voter_we_vote_id'].lower() for analytics_action_row in analytics_action_row_list
+        if positive_value_exists(analytics_action_row['voter_we_vote_id'])})
+    for move_number in range(ANALYTICS_VOTER_TOMBSTONE_MAXIMUM_MOVES):
+        if not voter_we_vote_id_list_to_look_up:
+            break
+        queryset = AnalyticsVoterTombstone.objects.using('analytics') \
+            .filter(voter_we_vote_id__in=voter_we_vote_id_list_to_look_up) \
+            .values_list('voter_we_vote_id', 'moved_to_voter_we_vote_id')
+        voter_we_vote_id_list_to_look_up = []
+        for voter_we_vote_id, moved_to_voter_we_vote_id in queryset:
+            moved_to_by_voter_we_vote_id[voter_we_vote_id] = moved_to_voter_we_vote_id
+            if moved_to_voter_we_vote_id and moved_to_voter_we_vote_id not in moved_to_by_voter_we_vote_id:
+                voter_we_vote_id_list_to_look_up.append(moved_to_voter_we_vote_id)
+    if not moved_to_by_voter_we_vote_id:
+        return analytics_action_row_list
+
+    analytics_action_row_list_to_save = []
+    for analytics_action_row in analytics_action_row_list:
+        voter_we_vote_id = (analytics_action_row['voter_we_vote_id'] or '').lower()
+        for move_number in range(ANALYTICS_VOTER_TOMBSTONE_MAXIMUM_MOVES):
+            if voter_we_vote_id not in moved_to_by_voter_we_vote_id:
+                break
+            voter_we_vote_id = moved_to_by_voter_we_vote_id[voter_we_vote_id]
+            if not voter_we_vote_id:
+                break
+        if voter_we_vote_id is None:
+            continue  # Voter deleted
+        if voter_we_vote_id != (analytics_action_row['voter_we_vote_id'] or '').lower():
+            analytics_action_row = dict(analytics_action_row, voter_we_vote_id=voter_we_vote_id)
+        analytics_action_row_list_to_save.append(analytics_action_row)
+    return analytics_action_row_list_to_save
+
+
+def copy_analytics_action_row_list(analytics_action_row_list):
+    """
+    Save rows from generate_analytics_action_row in one round trip, keeping exact_time as it was when the action came
+    in. On Postgres that is a COPY.
+    """
+    from import_export_batches.models import generate_copy_text_value
+    connection = connections['analytics']
+    column_name_list = list(analytics_action_row_list[0].keys())
+    field_list = [AnalyticsAction._meta.get_field(column_name) for column_name in column_name_list]
+    db_column_name_list = [connection.ops.quote_name(field.column) for field in field_list]
+    if connection.vendor == 'postgresql':
+        copy_buffer = io.StringIO()
+        for analytics_action_row in analytics_action_row_list:
+            copy_buffer.write('\t'.join([generate_copy_text_value(analytics_action_row[column_name])
+                                         for column_name in column_name_list]) + '\n')
+        copy_buffer.seek(0)
+        sql = "COPY " + AnalyticsAction._meta.db_table + " (" + ", ".join(db_column_name_list) + ") FROM STDIN"
+        with connection.cursor() as cursor:
+            # Django doesn't turn errors from copy_expert into DataError, IntegrityError... for us
+            with connection.wrap_database_errors:
+                cursor.copy_expert(sql, copy_buffer)
+    else:
+        # Not bulk_create, which would set exact_time (auto_now_add) to the time of this insert
+        sql = "INSERT INTO " + connection.ops.quote_name(AnalyticsAction._meta.db_table) + \
+              " (" + ", ".join(db_column_name_list) + ") VALUES (" + ", ".join(["%s"] * len(field_list)) + ")"
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, [
+                [field.get_db_prep_save(field.to_python(analytics_action_row[field.attname]), connection)
+                 for field in field_list]
+                for analytics_action_row in analytics_action_row_list])
+
+
+def create_analytics_action_list(analytics_action_row_list):
+    """
+    What the analytics action buffer calls to save the actions waiting in it. Raises if they were not saved (ex/ the
+    analytics database is down), so the buffer tries again later. If the database refuses a row, we save the rest
+    one at a time, so one bad row can't hold up the others.
+    """
+    with lock_analytics_actions():
+        analytics_action_row_list = apply_analytics_voter_tombstones(analytics_action_row_list)
+        if not analytics_action_row_list:
+            return
+        try:
+            with transaction.atomic(using='analytics'):
+                copy_analytics_action_row_list(analytics_action_row_list)
+        except (DataError, IntegrityError) as e:
+            logger.error("create_analytics_action_list, saving one at a time: " + str(e))
+            for analytics_action_row in analytics_action_row_list:
+                try:
+                    with transaction.atomic(using='analytics'):
+                        copy_analytics_action_row_list([analytics_action_row])
+                except (DataError, IntegrityError) as e:
+                    logger.error("create_analytics_action_list, skipped: " + str(e) + " " +
+                                 json.dumps(analytics_action_row))
+
+
+@contextmanager
+def lock_analytics_actions(exclusive=False):
+    """
+    A transaction on the analytics database. On Postgres it also holds ANALYTICS_ACTION_ADVISORY_LOCK_ID: shared to save
+    buffered actions, exclusive to move or delete a voter's actions. So a buffer flush in any process, on any host,
+    either saves its rows before a voter's actions are moved, or reads that voter's tombstone first.
+    """
+    connection = connections['analytics']
+    with transaction.atomic(using='analytics'):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                if exclusive:
+                    cursor.execute("SELECT pg_advisory_xact_lock(%s)", [ANALYTICS_ACTION_ADVISORY_LOCK_ID])
+                else:
+                    cursor.execute("SELECT pg_advisory_xact_lock_shared(%s)", [ANALYTICS_ACTION_ADVISORY_LOCK_ID])
+        yield
+
+
+def retrieve_analytics_action_buffer():
+    analytics_action_buffer = analytics_action_buffer_state['analytics_action_buffer']
+    if analytics_action_buffer is None:
+        with analytics_action_buffer_lock:
+            if analytics_action_buffer_state['analytics_action_buffer'] is None:
+                analytics_action_buffer_state['analytics_action_buffer'] = SpillingRowBuffer(
+                    'analytics_action',
+                    create_analytics_action_list,
+                    ANALYTICS_ACTION_BUFFER_SPILL_DIRECTORY,
+                    maximum_rows=ANALYTICS_ACTION_BUFFER_ROWS,
+                    maximum_seconds=ANALYTICS_ACTION_BUFFER_SECONDS,
+                    maximum_rows_waiting=ANALYTICS_ACTION_BUFFER_MAXIMUM_ROWS_WAITING)
+            analytics_action_buffer = analytics_action_buffer_state['analytics_action_buffer']
+    return analytics_action_buffer
+
+
+def retrieve_analytics_action_buffer_metrics():
+    analytics_action_buffer = analytics_action_buffer_state['analytics_action_buffer']
+    if analytics_action_buffer is None:
+        return {}
+    return analytics_action_buffer.metrics()
+
+
+def save_analytics_voter_tombstone(voter_we_vote_id, moved_to_voter_we_vote_id=None):
+    """
+    Remember that this voter's actions were moved to another voter, or deleted (moved_to_voter_we_vote_id None), for
+    the buffered actions that are saved later. Call with lock_analytics_actions(exclusive=True) held.
+    """
+    AnalyticsVoterTombstone.objects.using('analytics').update_or_create(
+        voter_we_vote_id=voter_we_vote_id.lower(),
+        defaults={
+            'moved_to_voter_we_vote_id':
+                moved_to_voter_we_vote_id.lower() if positive_value_exists(moved_to_voter_we_vote_id) else None,
+        })
+    AnalyticsVoterTombstone.objects.using('analytics') \
+        .filter(date_last_changed__lt=now() - timedelta(days=ANALYTICS_VOTER_TOMBSTONE_DAYS)) \
+        .delete()
+
+
 class AnalyticsManager(models.Manager):
 
     @staticmethod
@@ -616,27 +855,32 @@ class AnalyticsManager(models.Manager):
             }
             return results
 
+        analytics_action_values = {
+            'action_constant':          action_constant,
+            'voter_we_vote_id':         voter_we_vote_id,
+            'voter_id':                 voter_id,
+            'is_signed_in':             is_signed_in,
+            'state_code':               state_code,
+            'organization_we_vote_id':  organization_we_vote_id,
+            'organization_id':          organization_id,
+            'politician_we_vote_id':    politician_we_vote_id,
+            'google_civic_election_id': google_civic_election_id,
+            'ballot_item_we_vote_id':   ballot_item_we_vote_id,
+            'user_agent':               user_agent_string,
+            'is_bot':                   is_bot,
+            'is_mobile':                is_mobile,
+            'is_desktop':               is_desktop,
+            'is_tablet':                is_tablet,
+        }
         try:
-            action = AnalyticsAction.objects.using('analytics').create(
-                action_constant=action_constant,
-                voter_we_vote_id=voter_we_vote_id,
-                voter_id=voter_id,
-                is_signed_in=is_signed_in,
-                state_code=state_code,
-                organization_we_vote_id=organization_we_vote_id,
-                organization_id=organization_id,
-                politician_we_vote_id=politician_we_vote_id,
-                google_civic_election_id=google_civic_election_id,
-                ballot_item_we_vote_id=ballot_item_we_vote_id,
-                user_agent=user_agent_string,
-                is_bot=is_bot,
-                is_mobile=is_mobile,
-                is_desktop=is_desktop,
-                is_tablet=is_tablet
-            )
+            action = buffer_analytics_action(analytics_action_values) if ANALYTICS_ACTION_BUFFER_ENABLED else None
+            if action is not None:
+                status += 'ACTION_TYPE1_BUFFERED '
+            else:
+                action = AnalyticsAction.objects.using('analytics').create(**analytics_action_values)
+                status += 'ACTION_TYPE1_SAVED '
             success = True
             action_saved = True
-            status += 'ACTION_TYPE1_SAVED '
         except Exception as e:
             success = False
             status += 'COULD_NOT_SAVE_ACTION_TYPE1: ' + str(e) + ' '
@@ -691,26 +935,31 @@ class AnalyticsManager(models.Manager):
             }
             return results
 
+        analytics_action_values = {
+            'action_constant':          action_constant,
+            'voter_we_vote_id':         voter_we_vote_id,
+            'voter_id':                 voter_id,
+            'is_signed_in':             is_signed_in,
+            'state_code':               state_code,
+            'organization_we_vote_id':  organization_we_vote_id,
+            'politician_we_vote_id':    politician_we_vote_id,
+            'google_civic_election_id': google_civic_election_id,
+            'ballot_item_we_vote_id':   ballot_item_we_vote_id,
+            'user_agent':               user_agent_string,
+            'is_bot':                   is_bot,
+            'is_mobile':                is_mobile,
+            'is_desktop':               is_desktop,
+            'is_tablet':                is_tablet,
+        }
         try:
-            action = AnalyticsAction.objects.using('analytics').create(
-                action_constant=action_constant,
-                voter_we_vote_id=voter_we_vote_id,
-                voter_id=voter_id,
-                is_signed_in=is_signed_in,
-                state_code=state_code,
-                organization_we_vote_id=organization_we_vote_id,
-                politician_we_vote_id=politician_we_vote_id,
-                google_civic_election_id=google_civic_election_id,
-                ballot_item_we_vote_id=ballot_item_we_vote_id,
-                user_agent=user_agent_string,
-                is_bot=is_bot,
-                is_mobile=is_mobile,
-                is_desktop=is_desktop,
-                is_tablet=is_tablet
-            )
+            action = buffer_analytics_action(analytics_action_values) if ANALYTICS_ACTION_BUFFER_ENABLED else None
+            if action is not None:
+                status += 'ACTION_TYPE2_BUFFERED '
+            else:
+                action = AnalyticsAction.objects.using('analytics').create(**analytics_action_values)
+                status += 'ACTION_TYPE2_SAVED '
             success = True
             action_saved = True
-            status += 'ACTION_TYPE2_SAVED '
         except Exception as e:
             success = False
             status += 'COULD_NOT_SAVE_ACTION_TYPE2: ' + str(e) + ' '
@@ -1640,7 +1889,7 @@ class AnalyticsManager(models.Manager):
 
                 try:
                     first_visit_query = AnalyticsAction.objects.using('analytics').all()
-                    first_visit_query = first_visit_query.order_by("id")  # order by oldest first
+                    first_visit_query = first_visit_query.order_by("exact_time", "id")  # order by oldest first
                     first_visit_query = first_visit_query.filter(date_as_integer=one_date_as_integer)
                     first_visit_query = first_visit_query.filter(voter_we_vote_id=voter_we_vote_id)
                     analytics_action = first_visit_query.first()
@@ -1688,7 +1937,7 @@ class AnalyticsManager(models.Manager):
         for one_date_as_integer in simple_distinct_days_list:
             try:
                 first_visit_query = AnalyticsAction.objects.using('analytics').all()
-                first_visit_query = first_visit_query.order_by("id")  # order by oldest first
+                first_visit_query = first_visit_query.order_by("exact_time", "id")  # order by oldest first
                 first_visit_query = first_visit_query.filter(date_as_integer=one_date_as_integer)
                 first_visit_query = first_visit_query.filter(voter_we_vote_id=voter_we_vote_id)
                 analytics_action = first_visit_query.first()
@@ -1707,6 +1956,17 @@ class AnalyticsManager(models.Manager):
         return results
 
 
+class AnalyticsVoterTombstone(models.Model):
+    """
+    A voter whose AnalyticsAction entries were moved to another voter, or deleted. Buffered actions for this voter
+    that are saved afterwards are moved, or dropped, the same way. See apply_analytics_voter_tombstones.
+    """
+    voter_we_vote_id = models.CharField(max_length=255, unique=True)
+    # None if this voter's actions were deleted
+    moved_to_voter_we_vote_id = models.CharField(max_length=255, default=None, null=True)
+    date_last_changed = models.DateTimeField(null=True, auto_now=True, db_index=True)
+
+
 class AnalyticsProcessingStatus(models.Model):
     """
     When we have finished analyzing one element of the analytics data for a day, store our completion here
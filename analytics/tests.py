@@ -0,0 +1,92 @@
+# analytics/tests.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from datetime import timedelta
+from unittest import skipUnless
+from django.db import connections
+from django.test import TransactionTestCase
+from django.utils.timezone import now
+from .controllers import delete_analytics_info_for_voter, move_analytics_info_to_another_voter
+from .models import ACTION_BALLOT_VISIT, AnalyticsAction, AnalyticsVoterTombstone, create_analytics_action_list, \
+    generate_analytics_action_row
+
+
+class AnalyticsActionBufferTests(TransactionTestCase):
+    # TransactionTestCase, so the analytics database, a mirror of default in tests, sees the rows saved in these tests
+    databases = ["default", "readonly", "analytics"]
+
+    def setUp(self):
+        self.exact_time = now() - timedelta(hours=1)
+
+    def generate_row(self, voter_we_vote_id='wv01voter1', **analytics_action_values):
+        return generate_analytics_action_row(dict({
+            'action_constant':          ACTION_BALLOT_VISIT,
+            'date_as_integer':          20241105,
+            'exact_time':               self.exact_time,
+            'organization_we_vote_id':  'wv01org1',
+            'voter_we_vote_id':         voter_we_vote_id,
+        }, **analytics_action_values))
+
+    def test_generate_analytics_action_row(self):
+        analytics_action_row = self.generate_row()
+        self.assertNotIn('id', analytics_action_row)
+        self.assertEqual(analytics_action_row['exact_time'], self.exact_time.isoformat())
+        self.assertFalse(analytics_action_row['is_bot'])
+        with self.assertRaises(ValueError):
+            self.generate_row(user_agent='x' * 256)
+        with self.assertRaises(ValueError):
+            self.generate_row(organization_id=-1)
+
+    def test_create_analytics_action_list_keeps_values(self):
+        user_agent = 'Mozilla\t5.0\nC:\\Windows\\N \\N'
+        create_analytics_action_list([
+            self.generate_row(user_agent=user_agent, voter_device_id=None),
+            self.generate_row(voter_we_vote_id='wv01voter2', is_bot=True),
+        ])
+        analytics_action_list = list(AnalyticsAction.objects.using('analytics').order_by('voter_we_vote_id'))
+        self.assertEqual(len(analytics_action_list), 2)
+        self.assertEqual(analytics_action_list[0].user_agent, user_agent)
+        self.assertIsNone(analytics_action_list[0].voter_device_id)
+        self.assertTrue(analytics_action_list[1].is_bot)
+        # When the action came in, not when it was saved
+        self.assertEqual([analytics_action.exact_time for analytics_action in analytics_action_list],
+                         [self.exact_time, self.exact_time])
+
+    def test_refused_row_is_skipped(self):
+        refused_row = dict(self.generate_row(voter_we_vote_id='wv01voter2'), organization_id=-1)
+        create_analytics_action_list(
+            [self.generate_row(), refused_row, self.generate_row(voter_we_vote_id='wv01voter3')])
+        self.assertEqual(
+            list(AnalyticsAction.objects.using('analytics').order_by('voter_we_vote_id')
+                 .values_list('voter_we_vote_id', flat=True)),
+            ['wv01voter1', 'wv01voter3'])
+
+    @skipUnless(connections['analytics'].vendor == 'postgresql', "Postgres raises DataError for a value too long")
+    def test_row_refused_with_data_error_is_skipped(self):
+        refused_row = dict(self.generate_row(voter_we_vote_id='wv01voter2'), user_agent='x' * 256)
+        create_analytics_action_list([self.generate_row(), refused_row])
+        self.assertEqual(
+            list(AnalyticsAction.objects.using('analytics').values_list('voter_we_vote_id', flat=True)),
+            ['wv01voter1'])
+
+    def test_actions_saved_after_voter_moved_or_deleted(self):
+        create_analytics_action_list([self.generate_row(voter_we_vote_id='wv01voter1')])
+        results = move_analytics_info_to_another_voter('wv01voter1', 'wv01voter2')
+        self.assertTrue(results['success'])
+        self.assertEqual(results['analytics_action_moved'], 1)
+        move_analytics_info_to_another_voter('wv01voter2', 'wv01voter3')
+        results = delete_analytics_info_for_voter('wv01voter4')
+        self.assertTrue(results['success'])
+        self.assertEqual(AnalyticsVoterTombstone.objects.using('analytics').count(), 3)
+
+        # Buffered before the move and delete, saved after
+        create_analytics_action_list([
+            self.generate_row(voter_we_vote_id='WV01VOTER1'),
+            self.generate_row(voter_we_vote_id='wv01voter4'),
+            self.generate_row(voter_we_vote_id='wv01voter5'),
+        ])
+        self.assertEqual(
+            list(AnalyticsAction.objects.using('analytics').order_by('voter_we_vote_id')
+                 .values_list('voter_we_vote_id', flat=True)),
+            ['wv01voter3', 'wv01voter3', 'wv01voter5'])
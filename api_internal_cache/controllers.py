@@ -2,10 +2,217 @@
 # Brought to you by We Vote. Be good.
 # -*- coding: UTF-8 -*-
 
-from config.base import get_environment_variable
+import gzip
+import hashlib
+import json
+from time import monotonic, time
+
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from api_internal_cache.models import ApiInternalCacheManager
+from config.base import get_environment_variable, get_environment_variable_default
+from wevote_functions.functions import convert_to_int, positive_value_exists
+from wevote_functions.functions_cache import CACHE_VALUE_NOT_FOUND, LocalTTLCache
 import wevote_functions.admin
 
 logger = wevote_functions.admin.get_logger(__name__)
 
 WE_VOTE_SERVER_ROOT_URL = get_environment_variable("WE_VOTE_SERVER_ROOT_URL")
 
+# Pre-serialized, gzipped API responses. Lookup order: process-local LRU, then shared Django cache
+#  (API_RESPONSE_CACHE_ALIAS), then the latest ApiInternalCache row in the database.
+# An entry older than API_RESPONSE_CACHE_FRESH_SECONDS is still served (stale-while-revalidate), but triggers
+#  a check for a newer ApiInternalCache row, and if there isn't one, an ApiRefreshRequest.
+API_RESPONSE_CACHE_ALIAS = get_environment_variable_default("API_RESPONSE_CACHE_ALIAS", "default")
+API_RESPONSE_CACHE_LOCAL_SECONDS = int(get_environment_variable_default("API_RESPONSE_CACHE_LOCAL_SECONDS", 300))
+API_RESPONSE_CACHE_SHARED_SECONDS = int(get_environment_variable_default("API_RESPONSE_CACHE_SHARED_SECONDS", 86400))
+API_RESPONSE_CACHE_FRESH_SECONDS = int(get_environment_variable_default("API_RESPONSE_CACHE_FRESH_SECONDS", 3300))
+API_RESPONSE_CACHE_REVALIDATE_SECONDS = \
+    int(get_environment_variable_default("API_RESPONSE_CACHE_REVALIDATE_SECONDS", 300))
+api_response_local_cache = LocalTTLCache(
+    cache_name='api_response',
+    max_entries=500,
+    time_to_live_seconds=API_RESPONSE_CACHE_LOCAL_SECONDS)
+# cache_key -> monotonic() of the last time this process went to the database to revalidate that key
+api_response_last_revalidated = {}
+api_response_cache_counters = {
+    'shared_hit_count':         0,
+    'shared_miss_count':        0,
+    'shared_error_count':       0,
+    'database_lookup_count':    0,
+    'stale_served_count':       0,
+    'revalidation_count':       0,
+}
+
+
+def normalize_election_id_list_serialized(google_civic_election_id_list):
+    """
+    ['6000', '5000', '6000'] and [5000, 6000] should share one cache entry. Returns a sorted, de-duplicated
+    list of election ids (as strings, the way they arrive from the request) serialized as json.
+    """
+    election_id_integer_list = []
+    for google_civic_election_id in google_civic_election_id_list or []:
+        google_civic_election_id = convert_to_int(google_civic_election_id)
+        if positive_value_exists(google_civic_election_id) \
+                and google_civic_election_id not in election_id_integer_list:
+            election_id_integer_list.append(google_civic_election_id)
+    election_id_integer_list.sort()
+    return json.dumps([str(google_civic_election_id) for google_civic_election_id in election_id_integer_list])
+
+
+def generate_api_response_cache_key(api_name, election_id_list_serialized):
+    election_id_list_hash = hashlib.sha1(election_id_list_serialized.encode('utf-8')).hexdigest()
+    return 'api_response:' + api_name + ':' + election_id_list_hash
+
+
+def generate_cached_api_response(
+        api_name='',
+        election_id_list_serialized='',
+        cached_api_response_serialized='',
+        date_cached_timestamp=None,
+        api_internal_cache_id=0):
+    return {
+        'api_name':                     api_name,
+        'election_id_list_serialized':  election_id_list_serialized,
+        'api_internal_cache_id':        api_internal_cache_id,
+        'date_cached_timestamp':        date_cached_timestamp if date_cached_timestamp is not None else time(),
+        'gzipped_response':             gzip.compress(cached_api_response_serialized.encode('utf-8')),
+    }
+
+
+def is_cached_api_response_stale(cached_api_response):
+    return time() - cached_api_response['date_cached_timestamp'] > API_RESPONSE_CACHE_FRESH_SECONDS
+
+
+def store_cached_api_response(cached_api_response):
+    cache_key = generate_api_response_cache_key(
+        cached_api_response['api_name'], cached_api_response['election_id_list_serialized'])
+    api_response_local_cache.set(cache_key, cached_api_response)
+    try:
+        caches[API_RESPONSE_CACHE_ALIAS].set(cache_key, cached_api_response, timeout=API_RESPONSE_CACHE_SHARED_SECONDS)
+    except Exception as e:
+        api_response_cache_counters['shared_error_count'] += 1
+        logger.error('store_cached_api_response shared cache error: ' + str(e))
+
+
+def store_cached_api_response_from_api_internal_cache(api_internal_cache):
+    cached_api_response = generate_cached_api_response(
+        api_name=api_internal_cache.api_name,
+        election_id_list_serialized=api_internal_cache.election_id_list_serialized,
+        cached_api_response_serialized=api_internal_cache.cached_api_response_serialized,
+        date_cached_timestamp=api_internal_cache.date_cached.timestamp() if api_internal_cache.date_cached else None,
+        api_internal_cache_id=api_internal_cache.id)
+    store_cached_api_response(cached_api_response)
+    return cached_api_response
+
+
+def revalidate_cached_api_response(api_name='', election_id_list_serialized='', cached_api_response=None):
+    """
+    Called when we have no entry, or a stale one. At most once per API_RESPONSE_CACHE_REVALIDATE_SECONDS per
+    key per process: pick up a newer ApiInternalCache row if another server has saved one, otherwise make sure
+    an ApiRefreshRequest is scheduled.
+    """
+    status = ''
+    cache_key = generate_api_response_cache_key(api_name, election_id_list_serialized)
+    last_revalidated = api_response_last_revalidated.get(cache_key)
+    if last_revalidated is not None and monotonic() - last_revalidated < API_RESPONSE_CACHE_REVALIDATE_SECONDS:
+        status += "API_RESPONSE_CACHE_REVALIDATED_RECENTLY "
+        return {
+            'status':               status,
+            'cached_api_response':  cached_api_response,
+        }
+    api_response_last_revalidated[cache_key] = monotonic()
+    api_response_cache_counters['revalidation_count'] += 1
+
+    api_internal_cache_manager = ApiInternalCacheManager()
+    api_internal_cache = None
+    results = api_internal_cache_manager.retrieve_latest_api_internal_cache(
+        api_name=api_name,
+        election_id_list_serialized=election_id_list_serialized,
+        parse_json=False)
+    status += results['status']
+    if results['api_internal_cache_found']:
+        api_internal_cache = results['api_internal_cache']
+        if cached_api_response is None \
+                or api_internal_cache.id != cached_api_response['api_internal_cache_id']:
+            status += "NEWER_API_INTERNAL_CACHE_FOUND "
+            cached_api_response = store_cached_api_response_from_api_internal_cache(api_internal_cache)
+
+    if cached_api_response is None or is_cached_api_response_stale(cached_api_response):
+        results = api_internal_cache_manager.schedule_refresh_of_api_internal_cache(
+            api_name=api_name,
+            election_id_list_serialized=election_id_list_serialized,
+            api_internal_cache=api_internal_cache)
+        status += results['status']
+
+    return {
+        'status':               status,
+        'cached_api_response':  cached_api_response,
+    }
+
+
+def retrieve_cached_api_response(api_name='', election_id_list_serialized=''):
+    """
+    A fresh hit in either memory tier doesn't touch the database or parse json.
+    :param api_name:
+    :param election_id_list_serialized: From normalize_election_id_list_serialized
+    :return:
+    """
+    status = ''
+    cache_key = generate_api_response_cache_key(api_name, election_id_list_serialized)
+
+    cached_api_response = api_response_local_cache.get(cache_key)
+    if cached_api_response is CACHE_VALUE_NOT_FOUND:
+        try:
+            cached_api_response = caches[API_RESPONSE_CACHE_ALIAS].get(cache_key)
+        except Exception as e:
+            cached_api_response = None
+            api_response_cache_counters['shared_error_count'] += 1
+            status += "API_RESPONSE_SHARED_CACHE_ERROR: " + str(e) + " "
+        if cached_api_response is None:
+            api_response_cache_counters['shared_miss_count'] += 1
+        else:
+            api_response_cache_counters['shared_hit_count'] += 1
+            api_response_local_cache.set(cache_key, cached_api_response)
+
+    if cached_api_response is None:
+        api_response_cache_counters['database_lookup_count'] += 1
+        results = revalidate_cached_api_response(
+            api_name=api_name,
+            election_id_list_serialized=election_id_list_serialized)
+        status += results['status']
+        cached_api_response = results['cached_api_response']
+    elif is_cached_api_response_stale(cached_api_response):
+        api_response_cache_counters['stale_served_count'] += 1
+        status += "API_RESPONSE_CACHE_STALE "
+        results = revalidate_cached_api_response(
+            api_name=api_name,
+            election_id_list_serialized=election_id_list_serialized,
+            cached_api_response=cached_api_response)
+        status += results['status']
+        cached_api_response = results['cached_api_response']
+
+    return {
+        'success':                      True,
+        'status':                       status,
+        'cached_api_response':          cached_api_response,
+        'cached_api_response_found':    cached_api_response is not None,
+    }
+
+
+def http_response_from_cached_api_response(request, cached_api_response):
+    gzipped_response = cached_api_response['gzipped_response']
+    if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+        response = HttpResponse(gzipped_response, content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(gzip.decompress(gzipped_response), content_type='application/json')
+    response['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def api_response_cache_stats():
+    stats = api_response_local_cache.stats()
+    stats.update(api_response_cache_counters)
+    return stats
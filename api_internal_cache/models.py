@@ -114,9 +114,9 @@ class ApiInternalCacheManager(models.Manager):
 
         try:
             query = ApiRefreshRequest.objects.filter(
-                api_name__iexact=api_name,
+                api_name=api_name,
                 date_refresh_is_needed__gt=now(),
-                election_id_list_serialized__iexact=election_id_list_serialized,
+                election_id_list_serialized=election_id_list_serialized,
                 refresh_completed=False)
             number_found = query.count()
             if positive_value_exists(number_found):
@@ -144,8 +144,8 @@ class ApiInternalCacheManager(models.Manager):
         if positive_value_exists(excluded_api_internal_cache_id):
             try:
                 query = ApiInternalCache.objects.filter(
-                    api_name__iexact=api_name,
-                    election_id_list_serialized__iexact=election_id_list_serialized,
+                    api_name=api_name,
+                    election_id_list_serialized=election_id_list_serialized,
                     replaced=False)
                 query = query.exclude(id=excluded_api_internal_cache_id)
                 number_updated = query.update(
@@ -171,8 +171,8 @@ class ApiInternalCacheManager(models.Manager):
         status = ''
         try:
             number_updated = ApiRefreshRequest.objects.filter(
-                api_name__iexact=api_name,
-                election_id_list_serialized__iexact=election_id_list_serialized,
+                api_name=api_name,
+                election_id_list_serialized=election_id_list_serialized,
                 date_refresh_is_needed__lte=now(),
                 refresh_completed=False)\
                 .update(
@@ -227,7 +227,13 @@ class ApiInternalCacheManager(models.Manager):
         return results
 
     @staticmethod
-    def retrieve_latest_api_internal_cache(api_name='', election_id_list_serialized=''):
+    def retrieve_latest_api_internal_cache(api_name='', election_id_list_serialized='', parse_json=True):
+        """
+        :param api_name:
+        :param election_id_list_serialized: Should come from normalize_election_id_list_serialized
+        :param parse_json: Set to False when the caller only needs the serialized text
+        :return:
+        """
         api_internal_cache = None
         api_internal_cache_found = False
         api_internal_cache_list = []
@@ -248,16 +254,17 @@ class ApiInternalCacheManager(models.Manager):
 
         try:
             query = ApiInternalCache.objects.filter(
-                api_name__iexact=api_name,
-                election_id_list_serialized__iexact=election_id_list_serialized,
+                api_name=api_name,
+                election_id_list_serialized=election_id_list_serialized,
                 replaced=False)
             query = query.exclude(cached_api_response_serialized='')
             query = query.order_by('-date_cached')
-            api_internal_cache_list = list(query)
+            # Each entry is a full API response, so don't pull down older entries we won't use
+            api_internal_cache_list = list(query[:1])
             if len(api_internal_cache_list):
                 api_internal_cache = api_internal_cache_list[0]
                 api_internal_cache_found = True
-                if positive_value_exists(api_internal_cache.cached_api_response_serialized):
+                if parse_json and positive_value_exists(api_internal_cache.cached_api_response_serialized):
                     cached_api_response_json_data = api_internal_cache.cached_api_response_json_data()
             success = True
         except ApiInternalCache.DoesNotExist:
@@ -342,8 +349,9 @@ class ApiInternalCacheManager(models.Manager):
 class ApiInternalCache(models.Model):
     """
     We pre-generate responses for API calls that take too long for a voter to wait.
+    This is the durable tier behind the in-memory response cache in api_internal_cache/controllers.py
     """
-    api_name = models.CharField(max_length=255, null=False, blank=True, default='')
+    api_name = models.CharField(max_length=255, null=False, blank=True, default='', db_index=True)
     election_id_list_serialized = models.TextField(null=False, default='')
     # The full json response, serialized
     cached_api_response_serialized = models.TextField(null=False, default='')
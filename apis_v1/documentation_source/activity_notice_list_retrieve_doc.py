@@ -21,6 +21,30 @@ def activity_notice_list_retrieve_doc_template_values(url_root):
             'value':        'string',  # boolean, integer, long, string
             'description':  'Voters device id',
         },
+        {
+            'name':         'activity_notice_id_list_seen[]',
+            'value':        'integer',  # boolean, integer, long, string
+            'description':  'Mark these notices seen, by activity_notice_id. Includes notices assembled '
+                            'from a friend\'s seed, which have a negative activity_notice_id.',
+        },
+        {
+            'name':         'activity_notice_id_list_clicked[]',
+            'value':        'integer',  # boolean, integer, long, string
+            'description':  'Mark these notices clicked, by activity_notice_id. Includes notices assembled '
+                            'from a friend\'s seed, which have a negative activity_notice_id.',
+        },
+        {
+            'name':         'activity_notice_seed_id_list_seen[]',
+            'value':        'integer',  # boolean, integer, long, string
+            'description':  'Mark these notices seen, by activity_notice_seed_id. The same as sending '
+                            'their negative activity_notice_id.',
+        },
+        {
+            'name':         'activity_notice_seed_id_list_clicked[]',
+            'value':        'integer',  # boolean, integer, long, string
+            'description':  'Mark these notices clicked (and seen), by activity_notice_seed_id. The same '
+                            'as sending their negative activity_notice_id.',
+        },
     ]
 
     potential_status_codes_list = [
@@ -43,9 +67,12 @@ def activity_notice_list_retrieve_doc_template_values(url_root):
                    '  "status": string,\n' \
                    '  "activity_notice_list": list\n' \
                    '   [{\n' \
+                   '     "activity_notice_clicked": boolean,\n' \
+                   '     "activity_notice_id": integer,\n' \
+                   '     "activity_notice_seed_id": integer,\n' \
+                   '     "activity_notice_seen": boolean,\n' \
                    '     "date_last_changed": string,\n' \
                    '     "date_of_notice": string,\n' \
-                   '     "id": integer,\n' \
                    '     "kind_of_notice": string,\n' \
                    '     "new_positions_entered_count": integer,\n' \
                    '     "position_we_vote_id_list": list,\n' \
@@ -70,7 +97,9 @@ def activity_notice_list_retrieve_doc_template_values(url_root):
         'optional_query_parameter_list': optional_query_parameter_list,
         'api_response': api_response,
         'api_response_notes':
-            "",
+            "Notices about a friend's activity are assembled when you ask for them. Their activity_notice_id is "
+            "the negative of their activity_notice_seed_id, which doesn't change. Mark them seen or clicked by "
+            "either one. Other notices are stored, and have a positive activity_notice_id.",
         'potential_status_codes_list': potential_status_codes_list,
     }
     return template_values
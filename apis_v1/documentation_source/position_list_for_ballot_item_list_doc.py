@@ -0,0 +1,119 @@
+# apis_v1/documentation_source/position_list_for_ballot_item_list_doc.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+from wevote_functions.functions_date import DATE_FORMAT_YMD_HMS
+
+
+def position_list_for_ballot_item_list_doc_template_values(url_root):
+    """
+    Show documentation about positionListForBallotItemList
+    """
+    required_query_parameter_list = [
+        {
+            'name':         'api_key',
+            'value':        'string (from post, cookie, or get (in that order))',  # boolean, integer, long, string
+            'description':  'The unique key provided to any organization using the WeVoteServer APIs',
+        },
+        {
+            'name':         'ballot_item_we_vote_id_list[]',
+            'value':        'string',  # boolean, integer, long, string
+            'description':  'The we_vote_ids of the offices, candidates and measures we want positions for. '
+                            'Repeat this parameter once per ballot item.',
+        },
+    ]
+    optional_query_parameter_list = [
+        {
+            'name':         'stance',
+            'value':        'string',  # boolean, integer, long, string
+            'description':  'Default is ANY_STANCE. '
+                            'Other options include SUPPORT, STILL_DECIDING, INFO_ONLY, NO_STANCE, OPPOSE, '
+                            'PERCENT_RATING',
+        },
+        {
+            'name':         'private_citizens_only',
+            'value':        'boolean',  # boolean, integer, long, string
+            'description':  'Defaults to False. '
+                            'If False, only retrieve positions from groups and public figures. '
+                            'If True, only return positions from private citizens.',
+        },
+    ]
+
+    potential_status_codes_list = [
+        {
+            'code':         'POSITION_LIST_RETRIEVE_MISSING_BALLOT_ITEM_WE_VOTE_ID_LIST',
+            'description':  'Cannot proceed. No ballot_item_we_vote_id_list[] values were included.',
+        },
+    ]
+
+    try_now_link_variables_dict = {
+        'ballot_item_we_vote_id_list[]': 'wv01cand1',
+        'stance': 'ANY_STANCE',
+    }
+
+    api_response = '{\n' \
+                   '  "status": string,\n' \
+                   '  "success": boolean,\n' \
+                   '  "count": integer (total positions across all ballot items),\n' \
+                   '  "ballot_item_we_vote_ids_not_found": list of strings,\n' \
+                   '  "private_citizens_only": boolean,\n' \
+                   '  "ballot_item_list": list\n' \
+                   '   [\n' \
+                   '     "count": integer,\n' \
+                   '     "kind_of_ballot_item": string (One of these: \'CANDIDATE\', \'MEASURE\', \'OFFICE\'),\n' \
+                   '     "ballot_item_id": integer,\n' \
+                   '     "ballot_item_we_vote_id": string,\n' \
+                   '     "position_list": list\n' \
+                   '      [\n' \
+                   '        "ballot_item_display_name": string (either measure name or candidate name),\n' \
+                   '        "ballot_item_image_url_https_large": string,\n' \
+                   '        "ballot_item_image_url_https_medium": string,\n' \
+                   '        "ballot_item_image_url_https_tiny": string,\n' \
+                   '        "ballot_item_we_vote_id": string,\n' \
+                   '        "is_support": boolean,\n' \
+                   '        "is_positive_rating": boolean,\n' \
+                   '        "is_support_or_positive_rating": boolean,\n' \
+                   '        "is_oppose": boolean,\n' \
+                   '        "is_negative_rating": boolean,\n' \
+                   '        "is_oppose_or_negative_rating": boolean,\n' \
+                   '        "is_information_only": boolean,\n' \
+                   '        "is_public_position": boolean,\n' \
+                   '        "last_updated": string (time in this format ' + DATE_FORMAT_YMD_HMS + '),\n' \
+                   '        "more_info_url": string,\n' \
+                   '        "position_we_vote_id": string (the position identifier that moves server-to-server),\n' \
+                   '        "position_ultimate_election_date": integer,\n' \
+                   '        "position_year": integer,\n' \
+                   '        "speaker_display_name": string,\n' \
+                   '        "speaker_image_url_https_large": string,\n' \
+                   '        "speaker_image_url_https_medium": string,\n' \
+                   '        "speaker_image_url_https_tiny": string,\n' \
+                   '        "speaker_twitter_handle": string,\n' \
+                   '        "speaker_type": string, ' \
+                   '         (One of these: \'ORGANIZATION\', \'VOTER\', \'PUBLIC_FIGURE\', \'UNKNOWN\',)\n' \
+                   '        "speaker_id": integer,\n' \
+                   '        "speaker_we_vote_id": string,\n' \
+                   '        "statement_text": string,\n' \
+                   '        "twitter_followers_count": integer,\n' \
+                   '      ],\n' \
+                   '   ],\n' \
+                   '}'
+
+    template_values = {
+        'api_name': 'positionListForBallotItemList',
+        'api_slug': 'positionListForBallotItemList',
+        'api_introduction':
+            "The public positions (support/oppose/info) for every Ballot Item (Office, Candidate or Measure) "
+            "in ballot_item_we_vote_id_list[], grouped by ballot item. Each entry in ballot_item_list matches "
+            "what positionListForBallotItem returns for that ballot item, so a whole ballot can be "
+            "retrieved in one call.",
+        'try_now_link': 'apis_v1:positionListForBallotItemListView',
+        'try_now_link_variables_dict': try_now_link_variables_dict,
+        'url_root': url_root,
+        'get_or_post': 'GET',
+        'required_query_parameter_list': required_query_parameter_list,
+        'optional_query_parameter_list': optional_query_parameter_list,
+        'api_response': api_response,
+        'api_response_notes':
+            "",
+        'potential_status_codes_list': potential_status_codes_list,
+    }
+    return template_values
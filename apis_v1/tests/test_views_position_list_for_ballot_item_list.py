@@ -0,0 +1,84 @@
+from django.urls import reverse
+from django.test import TestCase
+from django.utils import timezone
+
+from measure.models import ContestMeasure
+from position.models import PositionEntered
+
+import json
+
+
+class WeVoteAPIsV1TestsPositionListForBallotItemList(TestCase):
+    databases = ["default", "readonly"]
+
+    def setUp(self):
+        self.position_list_for_ballot_item_list_url = reverse("apis_v1:positionListForBallotItemListView")
+
+    def test_retrieve_with_missing_ballot_item_we_vote_id_list(self):
+        """
+        Test response when request has no ballot_item_we_vote_id_list[]
+        """
+        response = self.client.get(self.position_list_for_ballot_item_list_url)
+        json_data = json.loads(response.content.decode())
+
+        self.assertEqual(json_data['success'], False)
+        self.assertIn("POSITION_LIST_RETRIEVE_MISSING_BALLOT_ITEM_WE_VOTE_ID_LIST", json_data['status'])
+        self.assertEqual(json_data['count'], 0)
+        self.assertEqual(json_data['ballot_item_list'], [])
+
+    def test_retrieve_positions_grouped_by_ballot_item(self):
+        """
+        Positions come back under the ballot item they are about, ballot items without positions are still
+        returned, and we_vote_ids we don't recognize are reported back
+        """
+        measure_with_position = ContestMeasure(
+            google_civic_election_id=1,
+            measure_title="Measure With Position",
+            district_id=123,
+            district_name='LandTown',
+            state_code='CA')
+        measure_with_position.save()
+        measure_without_position = ContestMeasure(
+            google_civic_election_id=1,
+            measure_title="Measure Without Position",
+            district_id=123,
+            district_name='LandTown',
+            state_code='CA')
+        measure_without_position.save()
+
+        position = PositionEntered(
+            date_entered=timezone.now(),
+            contest_measure_id=measure_with_position.id,
+            contest_measure_we_vote_id=measure_with_position.we_vote_id,
+            organization_id=123,
+            organization_we_vote_id="wvy9org3",
+            stance="SUPPORT",
+            speaker_display_name="REAL DUDE",
+        )
+        position.save()
+
+        response = self.client.get(self.position_list_for_ballot_item_list_url, {
+            "ballot_item_we_vote_id_list[]": [
+                measure_with_position.we_vote_id,
+                measure_without_position.we_vote_id,
+                "wv99meas999999",
+            ],
+        })
+        json_data = json.loads(response.content.decode())
+
+        self.assertEqual(json_data['success'], True, json_data['status'])
+        self.assertEqual(json_data['count'], 1)
+        self.assertEqual(json_data['ballot_item_we_vote_ids_not_found'], ["wv99meas999999"])
+        self.assertEqual(len(json_data['ballot_item_list']), 2)
+
+        ballot_item_with_position = json_data['ballot_item_list'][0]
+        self.assertEqual(ballot_item_with_position['kind_of_ballot_item'], "MEASURE")
+        self.assertEqual(ballot_item_with_position['ballot_item_id'], measure_with_position.id)
+        self.assertEqual(ballot_item_with_position['ballot_item_we_vote_id'], measure_with_position.we_vote_id)
+        self.assertEqual(ballot_item_with_position['count'], 1)
+        self.assertEqual(ballot_item_with_position['position_list'][0]['position_we_vote_id'], position.we_vote_id)
+
+        ballot_item_without_position = json_data['ballot_item_list'][1]
+        self.assertEqual(ballot_item_without_position['ballot_item_we_vote_id'], measure_without_position.we_vote_id)
+        self.assertEqual(ballot_item_without_position['count'], 0)
+        self.assertEqual(ballot_item_without_position['position_list'], [])
@@ -160,6 +160,8 @@ urlpatterns = [
                   re_path(r'retrieveSQLTables/', views_retrieve_tables.retrieve_sql_tables, name='retrieveSQLTables'),
                   re_path(r'retrieveSQLTablesRowCount/', views_retrieve_tables.retrieve_sql_tables_row_count,
                           name='retrieveSQLTablesRowCount'),
+                  re_path(r'retrieveSQLTablesStream/', views_retrieve_tables.retrieve_sql_tables_stream,
+                          name='retrieveSQLTablesStream'),
                   re_path(r'retrieveMaxID/', views_retrieve_tables.retrieve_max_id, name='retrieveMaxID'),
                   re_path(r'^friendInvitationByEmailSend/',
                           views_friend.friend_invitation_by_email_send_view, name='friendInvitationByEmailSendView'),
@@ -289,6 +291,9 @@ urlpatterns = [
                   re_path(r'^positionListForBallotItemFromFriends/',
                           views_position.position_list_for_ballot_item_from_friends_view,
                           name='positionListForBallotItemFromFriendsView'),
+                  re_path(r'^positionListForBallotItemList/',
+                          views_position.position_list_for_ballot_item_list_view,
+                          name='positionListForBallotItemListView'),
                   re_path(r'^positionListForOpinionMaker/',
                           views_position.position_list_for_opinion_maker_view, name='positionListForOpinionMakerView'),
                   re_path(r'^positionListForVoter/',
@@ -704,6 +709,9 @@ urlpatterns = [
                   re_path(r'^docs/positionListForBallotItemFromFriends/',
                           views_docs.position_list_for_ballot_item_from_friends_doc_view,
                           name='positionListForBallotItemFromFriendsDocs'),
+                  re_path(r'^docs/positionListForBallotItemList/',
+                          views_docs.position_list_for_ballot_item_list_doc_view,
+                          name='positionListForBallotItemListDocs'),
                   re_path(r'^docs/positionListForOpinionMaker/',
                           views_docs.position_list_for_opinion_maker_doc_view, name='positionListForOpinionMakerDocs'),
                   re_path(r'^docs/positionListForVoter/',
@@ -7,20 +7,17 @@ from django.http import HttpResponse
 import json
 import threading
 import time
-from activity.controllers import update_or_create_activity_notice_seed_for_activity_posts
-from activity.models import ActivityManager, \
-    NOTICE_CAMPAIGNX_FRIEND_HAS_SUPPORTED, \
-    NOTICE_CAMPAIGNX_NEWS_ITEM, NOTICE_CAMPAIGNX_NEWS_ITEM_AUTHORED, \
-    NOTICE_CAMPAIGNX_SUPPORTER_INITIAL_RESPONSE, \
-    NOTICE_FRIEND_ACTIVITY_POSTS, NOTICE_FRIEND_ENDORSEMENTS, \
-    NOTICE_FRIEND_ENDORSEMENTS_SEED
+from activity.controllers import ACTIVITY_NOTICE_KIND_SHOWN_LIST, assemble_activity_notice_list_for_recipient, \
+    fetch_activity_notice_unseen_count_for_recipient, update_activity_notice_feed_cursor_for_voter, \
+    update_or_create_activity_notice_seed_for_activity_posts
+from activity.models import ActivityManager, NOTICE_FRIEND_ENDORSEMENTS, NOTICE_FRIEND_ENDORSEMENTS_SEED
 from config.base import get_environment_variable
 from friend.models import FriendManager
 from google_firebase_api.cloud_messaging import send_single_message
 from twitter.models import TwitterUserManager
 from voter.models import fetch_voter_we_vote_id_from_voter_device_link, VoterManager, VoterDeviceLinkManager, \
     VoterDeviceLink
-from wevote_functions.functions import get_voter_device_id, positive_value_exists, wevote_functions
+from wevote_functions.functions import convert_to_int, get_voter_device_id, positive_value_exists, wevote_functions
 from wevote_functions.functions_date import DATE_FORMAT_YMD_HMS
 logger = wevote_functions.admin.get_logger(__name__)
 
@@ -361,25 +358,46 @@ def activity_notice_list_retrieve_view(request):  # activityNoticeListRetrieve
         }
         return HttpResponse(json.dumps(json_data), content_type='application/json')
 
-    activity_notice_id_list_clicked = request.GET.getlist('activity_notice_id_list_clicked[]')
-    activity_notice_id_list_seen = request.GET.getlist('activity_notice_id_list_seen[]')
-
-    if activity_notice_id_list_clicked and len(activity_notice_id_list_clicked):
+    # Notices assembled from friends' seeds have activity_notice_id -activity_notice_seed_id, so clients that only
+    #  send back activity_notice_id can mark them seen or clicked too. We record those in the voter's feed cursor.
+    activity_notice_id_list_clicked = \
+        [convert_to_int(activity_notice_id) for activity_notice_id in
+         request.GET.getlist('activity_notice_id_list_clicked[]')]
+    activity_notice_id_list_seen = \
+        [convert_to_int(activity_notice_id) for activity_notice_id in
+         request.GET.getlist('activity_notice_id_list_seen[]')]
+    stored_activity_notice_id_list_clicked = \
+        [notice_id for notice_id in activity_notice_id_list_clicked if positive_value_exists(notice_id)]
+    stored_activity_notice_id_list_seen = \
+        [notice_id for notice_id in activity_notice_id_list_seen if positive_value_exists(notice_id)]
+    activity_notice_seed_id_list_clicked = request.GET.getlist('activity_notice_seed_id_list_clicked[]') + \
+        [-notice_id for notice_id in activity_notice_id_list_clicked if notice_id < 0]
+    activity_notice_seed_id_list_seen = request.GET.getlist('activity_notice_seed_id_list_seen[]') + \
+        [-notice_id for notice_id in activity_notice_id_list_seen if notice_id < 0]
+
+    if len(stored_activity_notice_id_list_clicked):
         results = activity_manager.update_activity_notice_list_in_bulk(
             recipient_voter_we_vote_id=voter_we_vote_id,
-            activity_notice_id_list=activity_notice_id_list_clicked,
+            activity_notice_id_list=stored_activity_notice_id_list_clicked,
             activity_notice_clicked=True
         )
         status += results['status']
-    if activity_notice_id_list_seen and len(activity_notice_id_list_seen):
+    if len(stored_activity_notice_id_list_seen):
         results = activity_manager.update_activity_notice_list_in_bulk(
             recipient_voter_we_vote_id=voter_we_vote_id,
-            activity_notice_id_list=activity_notice_id_list_seen,
+            activity_notice_id_list=stored_activity_notice_id_list_seen,
             activity_notice_seen=True,
         )
         status += results['status']
+    if len(activity_notice_seed_id_list_clicked) or len(activity_notice_seed_id_list_seen):
+        results = update_activity_notice_feed_cursor_for_voter(
+            voter_we_vote_id=voter_we_vote_id,
+            activity_notice_seed_id_list_seen=activity_notice_seed_id_list_seen,
+            activity_notice_seed_id_list_clicked=activity_notice_seed_id_list_clicked,
+        )
+        status += results['status']
 
-    results = activity_manager.retrieve_activity_notice_list_for_recipient(recipient_voter_we_vote_id=voter_we_vote_id)
+    results = assemble_activity_notice_list_for_recipient(recipient_voter_we_vote_id=voter_we_vote_id)
     if not results['success']:
         status += results['status']
         status += "RETRIEVE_ACTIVITY_NOTICE_LIST_FAILED "
@@ -395,7 +413,6 @@ def activity_notice_list_retrieve_view(request):  # activityNoticeListRetrieve
     for activity_notice in activity_notice_list:
         position_name_list = []
         position_we_vote_id_list = []
-        include_this_activity_notice = False
         new_positions_entered_count = 0
         if activity_notice.kind_of_notice == NOTICE_FRIEND_ENDORSEMENTS:
             if positive_value_exists(activity_notice.position_name_list_serialized):
@@ -403,16 +420,7 @@ def activity_notice_list_retrieve_view(request):  # activityNoticeListRetrieve
             if positive_value_exists(activity_notice.position_we_vote_id_list_serialized):
                 position_we_vote_id_list = json.loads(activity_notice.position_we_vote_id_list_serialized)
             new_positions_entered_count = activity_notice.new_positions_entered_count
-            include_this_activity_notice = True
-        elif activity_notice.kind_of_notice in [
-            NOTICE_CAMPAIGNX_FRIEND_HAS_SUPPORTED,
-            NOTICE_CAMPAIGNX_NEWS_ITEM,
-            NOTICE_CAMPAIGNX_NEWS_ITEM_AUTHORED,
-            NOTICE_CAMPAIGNX_SUPPORTER_INITIAL_RESPONSE,
-            NOTICE_FRIEND_ACTIVITY_POSTS,
-        ]:
-            include_this_activity_notice = True
-        if include_this_activity_notice:
+        if activity_notice.kind_of_notice in ACTIVITY_NOTICE_KIND_SHOWN_LIST:
             activity_notice_dict = {
                 'activity_notice_clicked':          activity_notice.activity_notice_clicked,
                 'activity_notice_seen':             activity_notice.activity_notice_seen,
@@ -421,7 +429,9 @@ def activity_notice_list_retrieve_view(request):  # activityNoticeListRetrieve
                 'campaignx_we_vote_id':             activity_notice.campaignx_we_vote_id,
                 'date_last_changed':                activity_notice.date_last_changed.strftime(DATE_FORMAT_YMD_HMS),  # '%Y-%m-%d %H:%M:%S'
                 'date_of_notice':                   activity_notice.date_of_notice.strftime(DATE_FORMAT_YMD_HMS),  # '%Y-%m-%d %H:%M:%S'
-                'activity_notice_id':               activity_notice.id,
+                # Negative when assembled from a seed, so it is unique and clients can send it back as seen
+                'activity_notice_id':               activity_notice.id or -activity_notice.activity_notice_seed_id,
+                'activity_notice_seed_id':          activity_notice.activity_notice_seed_id or 0,
                 'kind_of_notice':                   activity_notice.kind_of_notice,
                 'new_positions_entered_count':      new_positions_entered_count,
                 'number_of_comments':               activity_notice.number_of_comments,
@@ -610,17 +620,14 @@ def firebase_notification_send_to_cordova_apps(we_vote_id, speaker_name, stateme
     """
     start = time.time()
     friend_manager = FriendManager()
-    activity_manager = ActivityManager()
     voter_device_link_manager = VoterDeviceLinkManager()
     friend_results = friend_manager.retrieve_friends_we_vote_id_list(we_vote_id)
     if friend_results['friends_we_vote_id_list_found']:
         friends_we_vote_id_list = friend_results['friends_we_vote_id_list']
         for recipient_voter_id in friends_we_vote_id_list:
             try:
-                results = activity_manager.retrieve_activity_notice_list_for_recipient(
-                    recipient_voter_we_vote_id=recipient_voter_id)
-                activity_notice_list = results['activity_notice_list']
-                badge_number = activity_notice_list.count() + 1
+                # Unseen notices activityNoticeListRetrieve shows this friend, plus this post
+                badge_number = fetch_activity_notice_unseen_count_for_recipient(recipient_voter_id) + 1
                 body = speaker_name + " posted \"" + statement_text + "\""
                 time_threshold = datetime.now() - timedelta(days=15)
                 voter_id = ''.join(filter(str.isdigit, recipient_voter_id))
@@ -2,75 +2,90 @@
 # Brought to you by We Vote. Be good.
 # -*- coding: UTF-8 -*-
 
-from django.http import HttpResponse
+import gzip
+import re
+
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date, parse_etags
 
 import wevote_functions.admin
 from config.base import get_environment_variable
-from googlebot_site_map.views_admin import log_request, get_googlebot_map_file_body, get_googlebot_map_xml_body
-from politician.models import Politician
+from googlebot_site_map.controllers import fetch_site_map_count, generate_site_map_entries, \
+    generate_site_map_html, generate_site_map_index_xml, generate_site_map_xml, retrieve_site_map, \
+    SITE_MAP_INDEX_NAME
+from googlebot_site_map.views_admin import log_request
 
 logger = wevote_functions.admin.get_logger(__name__)
 
 WE_VOTE_SERVER_ROOT_URL = get_environment_variable("WE_VOTE_SERVER_ROOT_URL")
+SITE_MAP_MAX_AGE_SECONDS = 3600
+
+
+def fetch_map_number_from_request(request):
+    map_num_result = re.findall(r'googlebotSiteMap\/map(\d+)', request.path)
+    return int(map_num_result[0])
+
+
+def site_map_response(request, site_map_name, content_type, chunk_generator):
+    """
+    Serve the pre-generated, gzipped copy of site_map_name with its ETag (answering If-None-Match with a 304).
+    If it hasn't been generated yet, stream it straight from the database instead.
+    """
+    site_map = retrieve_site_map(site_map_name)
+    if site_map is None or site_map.gzip_body is None:
+        response = StreamingHttpResponse(chunk_generator, content_type=content_type)
+        response['Cache-Control'] = 'public, max-age=' + str(SITE_MAP_MAX_AGE_SECONDS)
+        return response
+
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match and (site_map.etag in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+        response = HttpResponseNotModified()
+    else:
+        gzip_body = bytes(site_map.gzip_body)
+        if 'gzip' in request.headers.get('accept-encoding', ''):
+            response = HttpResponse(gzip_body, content_type=content_type)
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(gzip.decompress(gzip_body), content_type=content_type)
+    response['ETag'] = site_map.etag
+    response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = 'public, max-age=' + str(SITE_MAP_MAX_AGE_SECONDS)
+    if site_map.date_generated:
+        response['Last-Modified'] = http_date(site_map.date_generated.timestamp())
+    return response
 
 
 # To test XML queries from Chrome try the "Tabbed Postman - REST Client"
 # https://chromewebstore.google.com/detail/tabbed-postman-rest-clien/coohjcphdfgbiolnekdpbcijmhambjff?hl=en-US&utm_source=ext_sidebar
 # Add a header "content-type" "application/xml", put in the URL and press Send
 # Test url is https://wevotedeveloper.com:8000/apis/v1/googlebotSiteMap/sitemap_index.xml
-def xml_for_n_maps(n):
-    xml = '<?xml version="1.0" encoding="UTF-8"?>\n'
-    xml += '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
-    for i in range(n):
-        xml += '  <sitemap>'
-        xml += '    <loc>https://wevote.us/map%s.xml</loc>' % (i)
-        xml += '  </sitemap>'
-    xml += '</sitemapindex>'
-    return xml
-
-
-# Test url is https://wevotedeveloper.com:8000/apis/v1/googlebotSiteMap/map1.xml
 def get_sitemap_index_xml(request):
     log_request(request)
 
-    try:
-        politician_count = Politician.objects.using('readonly').all().count()
-        float_n = politician_count / 40000
-        if float_n < 1:
-            n = 1
-        else:
-            n = int(float_n) + 1
-
-        xml = xml_for_n_maps(n)
-    except Exception as e:
-        logger.error('googlebot_site_map get_sitemap_index_xml threw ', e)
-        xml = "error"
+    def generate_live_site_map_index():
+        try:
+            lastmod_list = [None] * fetch_site_map_count()
+        except Exception as e:
+            logger.error('googlebot_site_map get_sitemap_index_xml threw ' + str(e))
+            lastmod_list = [None]
+        yield from generate_site_map_index_xml(lastmod_list)
 
-    return HttpResponse(xml)
+    return site_map_response(request, SITE_MAP_INDEX_NAME, 'application/xml', generate_live_site_map_index())
 
 
+# Test url is https://wevotedeveloper.com:8000/apis/v1/googlebotSiteMap/map1.html
 def get_sitemap_text_file(request):
     log_request(request)
 
-    # print(request)
-    html = "<html><body>"
-    try:
-        html += get_googlebot_map_file_body(request)
-    except Exception as e:
-        logger.error('googlebost_site_map get_sitemap_text_file threw ', e)
-    html += "</html></body><br>"
-    return HttpResponse(html)
+    map_number = fetch_map_number_from_request(request)
+    return site_map_response(request, 'map' + str(map_number) + '.html', 'text/html',
+                             generate_site_map_html(generate_site_map_entries(map_number)))
 
 
+# Test url is https://wevotedeveloper.com:8000/apis/v1/googlebotSiteMap/map1.xml
 def get_sitemap_xml_file(request):
     log_request(request)
 
-    # print(request)
-    xml = '<?xml version="1.0" encoding="UTF-8"?>\n'
-    xml += '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
-    try:
-        xml += get_googlebot_map_xml_body(request)
-    except Exception as e:
-        logger.error('get_sitemap_xml_file get_googlebot_map_xml_body threw ', e)
-    xml += "</urlset>"
-    return HttpResponse(xml)
+    map_number = fetch_map_number_from_request(request)
+    return site_map_response(request, 'map' + str(map_number) + '.xml', 'application/xml',
+                             generate_site_map_xml(generate_site_map_entries(map_number)))
@@ -8,6 +8,7 @@ from ballot.controllers import figure_out_google_civic_election_id_voter_is_watc
 from ballot.models import OFFICE, CANDIDATE, MEASURE
 from position.controllers import position_list_for_ballot_item_for_api, \
     position_list_for_ballot_item_from_friends_for_api, \
+    position_list_for_ballot_item_list_for_api, \
     position_list_for_opinion_maker_for_api, \
     position_list_for_voter_for_api, \
     position_retrieve_for_api, position_save_for_api
@@ -79,6 +80,25 @@ def position_list_for_ballot_item_view(request):  # positionListForBallotItem
                                                  private_citizens_only=private_citizens_only)
 
 
+def position_list_for_ballot_item_list_view(request):  # positionListForBallotItemList
+    """
+    :param request:
+    :return:
+    """
+    stance = request.GET.get('stance', ANY_STANCE)
+    if stance in (ANY_STANCE, SUPPORT, STILL_DECIDING, INFORMATION_ONLY, NO_STANCE, OPPOSE, PERCENT_RATING):
+        stance_we_are_looking_for = stance
+    else:
+        stance_we_are_looking_for = ANY_STANCE
+
+    ballot_item_we_vote_id_list = request.GET.getlist('ballot_item_we_vote_id_list[]')
+    private_citizens_only = positive_value_exists(request.GET.get('private_citizens_only', False))
+    return position_list_for_ballot_item_list_for_api(
+        ballot_item_we_vote_id_list=ballot_item_we_vote_id_list,
+        stance_we_are_looking_for=stance_we_are_looking_for,
+        private_citizens_only=private_citizens_only)
+
+
 def position_list_for_ballot_item_from_friends_view(request):  # positionListForBallotItemFromFriends
     """
     :param request:
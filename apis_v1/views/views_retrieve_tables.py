@@ -3,12 +3,12 @@
 # -*- coding: UTF-8 -*-
 import json
 
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 
 import wevote_functions.admin
 from config.base import get_environment_variable
 from retrieve_tables.controllers_master import fast_load_status_retrieve, get_total_row_count, get_max_id, \
-    retrieve_sql_tables_as_csv
+    retrieve_sql_tables_as_csv, stream_sql_table_as_csv
 from retrieve_tables.controllers_master import fast_load_status_update
 from wevote_functions.functions import get_voter_api_device_id
 
@@ -44,6 +44,22 @@ def retrieve_sql_tables(request):  # retrieveSQLTables
     return HttpResponse(json.dumps(json_data), content_type='application/json')
 
 
+def retrieve_sql_tables_stream(request):  # retrieveSQLTablesStream
+    """
+    Stream one table as gzipped, pipe-delimited CSV (chunked transfer encoding), instead of wrapping it in json.
+    Used by the streaming mode of retrieve_sql_files_from_master_server
+    :param request:
+    :return:
+    """
+    table_name = request.GET.get('table_name', 'bad_table_param_error')
+    start = request.GET.get('start', '')
+    end = request.GET.get('end', '')
+
+    response = StreamingHttpResponse(stream_sql_table_as_csv(table_name, start, end), content_type='text/csv')
+    response['Content-Encoding'] = 'gzip'
+    return response
+
+
 def retrieve_sql_tables_row_count(request):  # retrieveSQLTablesRowCount
     json_data = {
         'rowCount': str(get_total_row_count())
@@ -6,7 +6,8 @@ from ballot.controllers import choose_election_from_existing_data
 from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 import json
-from api_internal_cache.models import ApiInternalCacheManager
+from api_internal_cache.controllers import generate_cached_api_response, http_response_from_cached_api_response, \
+    normalize_election_id_list_serialized, retrieve_cached_api_response, store_cached_api_response
 from position.models import FRIENDS_AND_PUBLIC, FRIENDS_ONLY, PUBLIC_ONLY
 from voter.models import VoterAddress, VoterAddressManager, VoterDeviceLinkManager, VoterManager
 from voter_guide.controllers import voter_guide_possibility_highlights_retrieve_for_api, \
@@ -439,9 +440,6 @@ def voter_guides_upcoming_retrieve_view(request):  # voterGuidesUpcomingRetrieve
     :return:
     """
     status = ""
-    api_internal_cache = None
-    api_internal_cache_found = False
-    json_data = {}
 
     google_civic_election_id_list = request.GET.getlist('google_civic_election_id_list[]')
 
@@ -452,28 +450,24 @@ def voter_guides_upcoming_retrieve_view(request):  # voterGuidesUpcomingRetrieve
         google_civic_election_id_list = []
 
     # Since this API assembles a lot of data, we pre-cache it. Get the data cached most recently.
-    api_internal_cache_manager = ApiInternalCacheManager()
-    election_id_list_serialized = json.dumps(google_civic_election_id_list)
-    results = api_internal_cache_manager.retrieve_latest_api_internal_cache(
+    # Stale entries are still returned, and a refresh is scheduled behind the scenes.
+    election_id_list_serialized = normalize_election_id_list_serialized(google_civic_election_id_list)
+    results = retrieve_cached_api_response(
         api_name='voterGuidesUpcoming',
         election_id_list_serialized=election_id_list_serialized)
-    if results['api_internal_cache_found']:
-        api_internal_cache_found = True
-        api_internal_cache = results['api_internal_cache']
-        json_data = results['cached_api_response_json_data']
-
-    # Schedule the next retrieve. It is possible for the first retrieve
-    # of the day (above) to be using data from a few days ago.
-    results = api_internal_cache_manager.schedule_refresh_of_api_internal_cache(
-        api_name='voterGuidesUpcoming',
-        election_id_list_serialized=election_id_list_serialized,
-        api_internal_cache=api_internal_cache,
-    )
-    # Add a log entry here
-
-    if not api_internal_cache_found:
-        results = voter_guides_upcoming_retrieve_for_api(google_civic_election_id_list=google_civic_election_id_list)
-        status += results['status']
-        json_data = results['json_data']
+    if results['cached_api_response_found']:
+        return http_response_from_cached_api_response(request, results['cached_api_response'])
 
-    return HttpResponse(json.dumps(json_data), content_type='application/json')
+    results = voter_guides_upcoming_retrieve_for_api(google_civic_election_id_list=google_civic_election_id_list)
+    status += results['status']
+    json_data = results['json_data']
+    cached_api_response_serialized = json.dumps(json_data)
+    if json_data['success']:
+        # Hold on to this until the scheduled refresh saves an ApiInternalCache entry
+        cached_api_response = generate_cached_api_response(
+            api_name='voterGuidesUpcoming',
+            election_id_list_serialized=election_id_list_serialized,
+            cached_api_response_serialized=cached_api_response_serialized)
+        store_cached_api_response(cached_api_response)
+
+    return HttpResponse(cached_api_response_serialized, content_type='application/json')
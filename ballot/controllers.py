@@ -16,7 +16,7 @@ from import_export_google_civic.controllers import \
     refresh_voter_ballot_items_from_google_civic_from_voter_ballot_saved, \
     voter_ballot_items_retrieve_from_google_civic_for_api
 from measure.models import ContestMeasureListManager, ContestMeasureManager
-from office.models import ContestOfficeManager, ContestOfficeListManager
+from office.models import ContestOfficeListManager
 from polling_location.models import PollingLocationManager
 import pytz
 from voter.models import BALLOT_ADDRESS, VoterAddress, VoterAddressManager, VoterDeviceLinkManager, VoterManager
@@ -2859,15 +2859,81 @@ def generate_ballot_item_list_from_object_list(
     status = ''
     success = True
 
-    contest_office_manager = ContestOfficeManager()
-    candidate_list_object = CandidateListManager()
+    candidate_list_manager = CandidateListManager()
+    office_list_manager = ContestOfficeListManager()
 
     # Loop through measures to make sure we have full measure data needed
     contest_measure_we_vote_id_list = []
+    contest_office_we_vote_id_list = []
     for ballot_item in ballot_item_object_list:
         if ballot_item.contest_measure_we_vote_id and \
                 ballot_item.contest_measure_we_vote_id not in contest_measure_we_vote_id_list:
             contest_measure_we_vote_id_list.append(ballot_item.contest_measure_we_vote_id)
+        if ballot_item.contest_office_we_vote_id and \
+                ballot_item.contest_office_we_vote_id not in contest_office_we_vote_id_list:
+            contest_office_we_vote_id_list.append(ballot_item.contest_office_we_vote_id)
+
+    # Retrieve the offices, their candidates, every office each candidate is running for, and those elections,
+    #  for the whole ballot at once. The number of queries doesn't grow with the number of offices or candidates.
+    office_dict = {}
+    candidate_list_by_office_dict = {}
+    candidate_to_office_link_dict = {}
+    election_dict = {}
+    if len(contest_office_we_vote_id_list) > 0:
+        office_results = office_list_manager.retrieve_offices(
+            retrieve_from_this_office_we_vote_id_list=contest_office_we_vote_id_list,
+            return_list_of_objects=True,
+            read_only=True)
+        for one_office in office_results['office_list_objects']:
+            office_dict[one_office.we_vote_id] = one_office
+
+        candidate_results = candidate_list_manager.retrieve_all_candidates_for_office_list(
+            office_we_vote_id_list=contest_office_we_vote_id_list, read_only=True)
+        if not candidate_results['success']:
+            status += candidate_results['status']
+        candidate_list_by_office_dict = candidate_results['candidate_list_by_office_dict']
+
+    candidate_we_vote_id_list = []
+    for candidate_list in candidate_list_by_office_dict.values():
+        for candidate in candidate_list:
+            if candidate.we_vote_id not in candidate_to_office_link_dict:
+                candidate_to_office_link_dict[candidate.we_vote_id] = []
+                candidate_we_vote_id_list.append(candidate.we_vote_id)
+    if len(candidate_we_vote_id_list) > 0:
+        link_results = candidate_list_manager.retrieve_candidate_to_office_link_list(
+            candidate_we_vote_id_list=candidate_we_vote_id_list,
+            read_only=True)
+        other_office_we_vote_id_list = []
+        election_id_list = []
+        for candidate_to_office_link in link_results['candidate_to_office_link_list']:
+            candidate_to_office_link_dict[candidate_to_office_link.candidate_we_vote_id].append(
+                candidate_to_office_link)
+            if positive_value_exists(candidate_to_office_link.contest_office_we_vote_id) and \
+                    candidate_to_office_link.contest_office_we_vote_id not in office_dict and \
+                    candidate_to_office_link.contest_office_we_vote_id not in other_office_we_vote_id_list:
+                other_office_we_vote_id_list.append(candidate_to_office_link.contest_office_we_vote_id)
+            election_id_integer = convert_to_int(candidate_to_office_link.google_civic_election_id)
+            if positive_value_exists(election_id_integer) and election_id_integer not in election_id_list:
+                election_id_list.append(election_id_integer)
+        if len(other_office_we_vote_id_list) > 0:
+            office_results = office_list_manager.retrieve_offices(
+                retrieve_from_this_office_we_vote_id_list=other_office_we_vote_id_list,
+                return_list_of_objects=True,
+                read_only=True)
+            for one_office in office_results['office_list_objects']:
+                office_dict[one_office.we_vote_id] = one_office
+        if len(election_id_list) > 0:
+            election_results = ElectionManager().retrieve_elections_by_google_civic_election_id_list(
+                google_civic_election_id_list=[str(election_id) for election_id in election_id_list],
+                read_only=True)
+            for one_election in election_results['election_list']:
+                election_dict[convert_to_int(one_election.google_civic_election_id)] = one_election
+        # Remember what we looked for and didn't find, so generate_candidate_dict_from_candidate_object
+        #  doesn't go back to the database one candidate at a time
+        for office_we_vote_id in other_office_we_vote_id_list:
+            office_dict.setdefault(office_we_vote_id, None)
+        for election_id_integer in election_id_list:
+            election_dict.setdefault(election_id_integer, None)
 
     measure_results_dict = {}
     if len(contest_measure_we_vote_id_list) > 0:
@@ -2892,38 +2958,31 @@ def generate_ballot_item_list_from_object_list(
             office_we_vote_id = ballot_item.contest_office_we_vote_id
             primary_party = ""
             race_office_level = ""
-            if positive_value_exists(office_we_vote_id):
-                office_results = contest_office_manager.retrieve_contest_office_from_we_vote_id(
-                    office_we_vote_id, read_only=True)
-                if office_results['contest_office_found']:
-                    contest_office = office_results['contest_office']
-                    office_id = contest_office.id
-                    office_name = contest_office.office_name
-                    primary_party = contest_office.primary_party
-                    race_office_level = contest_office.ballotpedia_race_office_level
+            contest_office = office_dict.get(office_we_vote_id)
+            if contest_office:
+                office_id = contest_office.id
+                office_name = contest_office.office_name
+                primary_party = contest_office.primary_party
+                race_office_level = contest_office.ballotpedia_race_office_level
             try:
-                results = candidate_list_object.retrieve_all_candidates_for_office(
-                    office_we_vote_id=office_we_vote_id, read_only=True)
-
                 candidates_to_display = []
-                if results['candidate_list_found']:
-                    candidate_list = results['candidate_list']
-                    for candidate in candidate_list:
-                        candidate_dict_results = generate_candidate_dict_from_candidate_object(
-                            candidate=candidate,
-                            google_civic_election_id=google_civic_election_id,
-                            office_id=office_id,
-                            office_name=office_name,
-                            office_we_vote_id=office_we_vote_id,
-                        )
-                        if candidate_dict_results['success']:
-                            candidate_dict = candidate_dict_results['candidate_dict']
-                            candidates_to_display.append(candidate_dict)
+                for candidate in candidate_list_by_office_dict.get(office_we_vote_id, []):
+                    candidate_dict_results = generate_candidate_dict_from_candidate_object(
+                        candidate=candidate,
+                        candidate_to_office_link_dict=candidate_to_office_link_dict,
+                        election_dict=election_dict,
+                        google_civic_election_id=google_civic_election_id,
+                        office_dict=office_dict,
+                        office_id=office_id,
+                        office_name=office_name,
+                        office_we_vote_id=office_we_vote_id,
+                    )
+                    if candidate_dict_results['success']:
+                        candidate_dict = candidate_dict_results['candidate_dict']
+                        candidates_to_display.append(candidate_dict)
             except Exception as e:
-                status += 'FAILED retrieve_all_candidates_for_office. ' + str(e) + " "
+                status += 'FAILED generate_candidate_dict_from_candidate_object. ' + str(e) + " "
                 candidates_to_display = []
-                if hasattr(results, 'status'):
-                    status += results['status'] + " "
 
             if len(candidates_to_display):
                 one_ballot_item = {
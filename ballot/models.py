@@ -2,25 +2,34 @@
 # Brought to you by We Vote. Be good.
 # -*- coding: UTF-8 -*-
 
+from contextlib import contextmanager
 import sys
+import threading
 from datetime import date, datetime
+from time import monotonic, time
 
+from django.core.cache import caches
 from django.db import models
-from django.db.models import F, Q, Count, FloatField, ExpressionWrapper, Func
+from django.db.models import Q, Count, Func
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from geopy.exc import GeocoderQuotaExceeded
 from geopy.geocoders import get_geocoder_for_service
 
 import wevote_functions.admin
 from candidate.models import CandidateCampaign
-from config.base import get_environment_variable
+from config.base import get_environment_variable, get_environment_variable_default
 from election.models import ElectionManager
 from exception.models import handle_exception, handle_record_found_more_than_one_exception
+from geoip.controllers import geocode_with_cache
 from measure.models import ContestMeasureManager
 from office.models import ContestOfficeManager
 from polling_location.models import PollingLocationManager
 from wevote_functions.functions import convert_to_int, extract_state_code_from_address_string, \
     positive_value_exists, STATE_CODE_MAP
+from wevote_functions.functions_cache import CACHE_VALUE_NOT_FOUND, LocalTTLCache
 from wevote_functions.functions_date import convert_date_to_date_as_integer, DATE_FORMAT_YMD
+from wevote_functions.functions_spatial import LatLongGridIndex
 from wevote_settings.models import fetch_next_we_vote_id_ballot_returned_integer, fetch_site_unique_id_prefix
 
 OFFICE = 'OFFICE'
@@ -40,6 +49,24 @@ RADIUS_OF_EARTH_IN_MILES = 3958.756
 DEG_TO_RADS = 0.0174533
 DISTANCE_LIMIT_IN_MILES = 25
 
+# find_closest_ballot_returned searches an in-memory grid of map point BallotReturned coordinates, one per
+#  election (and state), instead of computing the distance to every map point in SQL.
+# Saving or deleting a map point BallotReturned drops this process's index for that election, and bumps a
+#  generation number in the shared Django cache, so other processes rebuild theirs within
+#  BALLOT_RETURNED_SPATIAL_INDEX_RECHECK_SECONDS. Imports that save many map points run under
+#  defer_ballot_returned_spatial_index_invalidation, so the generation is bumped once per election at the end.
+BALLOT_RETURNED_SPATIAL_INDEX_CACHE_ALIAS = \
+    get_environment_variable_default("BALLOT_RETURNED_SPATIAL_INDEX_CACHE_ALIAS", "default")
+BALLOT_RETURNED_SPATIAL_INDEX_SECONDS = \
+    int(get_environment_variable_default("BALLOT_RETURNED_SPATIAL_INDEX_SECONDS", 3600))
+BALLOT_RETURNED_SPATIAL_INDEX_RECHECK_SECONDS = 15
+ballot_returned_spatial_index_cache = LocalTTLCache(
+    cache_name='ballot_returned_spatial_index',
+    max_entries=200,
+    time_to_live_seconds=BALLOT_RETURNED_SPATIAL_INDEX_SECONDS)
+# google_civic_election_id values whose spatial index invalidation waits for the end of this thread's import
+ballot_returned_spatial_index_deferred = threading.local()
+
 logger = wevote_functions.admin.get_logger(__name__)
 
 
@@ -1920,6 +1947,99 @@ class BallotReturnedEmpty(models.Model):
         verbose_name='date ballot items last retrieved', auto_now=True, db_index=True)
 
 
+def generate_ballot_returned_spatial_index_generation_key(google_civic_election_id):
+    return 'ballot_returned_spatial_index_generation_' + str(convert_to_int(google_civic_election_id))
+
+
+def fetch_ballot_returned_spatial_index_generation(google_civic_election_id):
+    try:
+        return caches[BALLOT_RETURNED_SPATIAL_INDEX_CACHE_ALIAS].get(
+            generate_ballot_returned_spatial_index_generation_key(google_civic_election_id), 0)
+    except Exception as e:
+        logger.error("fetch_ballot_returned_spatial_index_generation: " + str(e))
+        return 0
+
+
+@contextmanager
+def defer_ballot_returned_spatial_index_invalidation():
+    """
+    Saving or deleting map point BallotReturned entries in this thread still drops this process's spatial index,
+    but the generation other processes check is bumped once per election on the way out, instead of once per save.
+    Also usable as a decorator. Nested uses wait for the outermost.
+    """
+    if getattr(ballot_returned_spatial_index_deferred, 'election_id_set', None) is not None:
+        yield
+        return
+    ballot_returned_spatial_index_deferred.election_id_set = set()
+    try:
+        yield
+    finally:
+        election_id_set = ballot_returned_spatial_index_deferred.election_id_set
+        ballot_returned_spatial_index_deferred.election_id_set = None
+        for google_civic_election_id in election_id_set:
+            invalidate_ballot_returned_spatial_index(google_civic_election_id)
+
+
+def invalidate_ballot_returned_spatial_index(google_civic_election_id):
+    google_civic_election_id = convert_to_int(google_civic_election_id)
+    ballot_returned_spatial_index_cache.delete_where(
+        lambda spatial_index_entry: spatial_index_entry['google_civic_election_id'] == google_civic_election_id)
+    election_id_set = getattr(ballot_returned_spatial_index_deferred, 'election_id_set', None)
+    if election_id_set is not None:
+        election_id_set.add(google_civic_election_id)
+        return
+    try:
+        caches[BALLOT_RETURNED_SPATIAL_INDEX_CACHE_ALIAS].set(
+            generate_ballot_returned_spatial_index_generation_key(google_civic_election_id), time(),
+            BALLOT_RETURNED_SPATIAL_INDEX_SECONDS)
+    except Exception as e:
+        logger.error("invalidate_ballot_returned_spatial_index: " + str(e))
+
+
+def retrieve_ballot_returned_spatial_index(google_civic_election_id, state_code='', database='readonly'):
+    """
+    :param google_civic_election_id:
+    :param state_code: Leave empty to search map points in every state
+    :param database:
+    :return: LatLongGridIndex of (ballot_returned.id, latitude, longitude) for map point BallotReturned entries
+    """
+    google_civic_election_id = convert_to_int(google_civic_election_id)
+    state_code = (state_code or '').upper()
+    cache_key = (google_civic_election_id, state_code, database)
+    spatial_index_entry = ballot_returned_spatial_index_cache.get(cache_key)
+    if spatial_index_entry is not CACHE_VALUE_NOT_FOUND:
+        if monotonic() - spatial_index_entry['last_checked'] < BALLOT_RETURNED_SPATIAL_INDEX_RECHECK_SECONDS:
+            return spatial_index_entry['spatial_index']
+        if fetch_ballot_returned_spatial_index_generation(google_civic_election_id) == \
+                spatial_index_entry['generation']:
+            spatial_index_entry['last_checked'] = monotonic()
+            return spatial_index_entry['spatial_index']
+
+    generation = fetch_ballot_returned_spatial_index_generation(google_civic_election_id)
+    ballot_returned_query = BallotReturned.objects.using(database) \
+        .filter(google_civic_election_id=google_civic_election_id) \
+        .exclude(Q(polling_location_we_vote_id__isnull=True) | Q(polling_location_we_vote_id="")) \
+        .exclude(latitude__isnull=True) \
+        .exclude(longitude__isnull=True)
+    if positive_value_exists(state_code):
+        ballot_returned_query = ballot_returned_query.filter(normalized_state__iexact=state_code)
+    spatial_index = LatLongGridIndex(ballot_returned_query.values_list('id', 'latitude', 'longitude').iterator())
+    ballot_returned_spatial_index_cache.set(cache_key, {
+        'google_civic_election_id': google_civic_election_id,
+        'generation':               generation,
+        'last_checked':             monotonic(),
+        'spatial_index':            spatial_index,
+    })
+    return spatial_index
+
+
+@receiver(post_save, sender=BallotReturned)
+@receiver(post_delete, sender=BallotReturned)
+def invalidate_ballot_returned_spatial_index_signal(sender, instance, **kwargs):
+    if positive_value_exists(instance.polling_location_we_vote_id):
+        invalidate_ballot_returned_spatial_index(instance.google_civic_election_id)
+
+
 class BallotReturnedManager(models.Manager):
     """
     Scenario where we get an incomplete address and Google Civic can't find it:
@@ -2615,6 +2735,50 @@ class BallotReturnedManager(models.Manager):
         # If we got through the elections without finding any ballot_returned entries, there is no prior election
         return 0
 
+    @staticmethod
+    def retrieve_closest_ballot_returned_list(
+            latitude,
+            longitude,
+            google_civic_election_id,
+            state_code='',
+            number_to_return=1,
+            max_distance_in_miles=DISTANCE_LIMIT_IN_MILES,
+            read_only=True):
+        """
+        The closest map point BallotReturned entries for this election, from the in-memory spatial index.
+        :param latitude:
+        :param longitude:
+        :param google_civic_election_id:
+        :param state_code: Limit to map points in this state (normalized_state)
+        :param number_to_return:
+        :param max_distance_in_miles:
+        :param read_only:
+        :return: list of BallotReturned, closest first, each with a "distance" attribute in miles
+        """
+        if 'test' in sys.argv or not positive_value_exists(read_only):
+            database = 'default'
+        else:
+            database = 'readonly'
+        for attempt in range(2):
+            spatial_index = retrieve_ballot_returned_spatial_index(
+                google_civic_election_id, state_code=state_code, database=database)
+            distance_and_id_list = spatial_index.find_nearest(
+                latitude, longitude, k=number_to_return, max_distance_in_miles=max_distance_in_miles)
+            ballot_returned_by_id = BallotReturned.objects.using(database) \
+                .in_bulk([ballot_returned_id for distance, ballot_returned_id in distance_and_id_list])
+            if len(ballot_returned_by_id) == len(distance_and_id_list) or attempt:
+                break
+            # An entry was deleted without us hearing about it. Rebuild the index and try again.
+            invalidate_ballot_returned_spatial_index(google_civic_election_id)
+
+        ballot_returned_list = []
+        for distance, ballot_returned_id in distance_and_id_list:
+            ballot_returned = ballot_returned_by_id.get(ballot_returned_id)
+            if ballot_returned is not None:
+                ballot_returned.distance = distance
+                ballot_returned_list.append(ballot_returned)
+        return ballot_returned_list
+
     def find_closest_ballot_returned(self, text_for_map_search, google_civic_election_id=0, read_only=True):
         """
         We search for the closest address for this election in the ballot_returned table. We never have to worry
@@ -2648,7 +2812,7 @@ class BallotReturnedManager(models.Manager):
         # keep using the GeoPy as a wrapper, in case some day we want to swap out google for geolocation, with a better
         # competitor.  (GeoPy doesn't have much value in our use case.)
         try:
-            location = self.google_client.geocode(text_for_map_search, sensor=False, timeout=GEOCODE_TIMEOUT)
+            location = geocode_with_cache(self.google_client, text_for_map_search, timeout=GEOCODE_TIMEOUT)
         except GeocoderQuotaExceeded:
             try_without_maps_key = True
             status += "GEOCODER_QUOTA_EXCEEDED "
@@ -2662,7 +2826,7 @@ class BallotReturnedManager(models.Manager):
             # If we have exceeded our account, try without a maps key
             try:
                 temp_google_client = get_geocoder_for_service('google')()
-                location = temp_google_client.geocode(text_for_map_search, sensor=False, timeout=GEOCODE_TIMEOUT)
+                location = geocode_with_cache(temp_google_client, text_for_map_search, timeout=GEOCODE_TIMEOUT)
             except GeocoderQuotaExceeded:
                 status += "GEOCODER_QUOTA_EXCEEDED "
                 results = {
@@ -2735,89 +2899,45 @@ class BallotReturnedManager(models.Manager):
             status += 'GEOCODER_FOUND_LOCATION '
             address = location.address
             # address has format "line_1, state zip, USA"
-
-            if 'test' in sys.argv:
-                ballot_returned_query = BallotReturned.objects.all()
-            elif positive_value_exists(read_only):
-                ballot_returned_query = BallotReturned.objects.using('readonly').all()
-            else:
-                ballot_returned_query = BallotReturned.objects.all()
-            # Limit this query to entries stored for map points
-            ballot_returned_query = ballot_returned_query.exclude(
-                Q(polling_location_we_vote_id__isnull=True) | Q(polling_location_we_vote_id=""))
             if positive_value_exists(address) and "," in address:
                 raw_state_code = address.split(', ')
                 if positive_value_exists(raw_state_code):
                     state_code = raw_state_code[-2][:2]
-            if positive_value_exists(state_code):
-                # This search for normalized_state is NOT redundant because some elections are in many states
-                ballot_returned_query = ballot_returned_query.filter(normalized_state__iexact=state_code)
-
-            try:
-                lat_rads_ploc = location.latitude * DEG_TO_RADS
-                lon_rads_ploc = location.longitude * DEG_TO_RADS
-                ballot_returned_query = ballot_returned_query.annotate(
-                    # Calculate the approximate great circle distance between two coordinates
-                    # https://medium.com/@petehouston/calculate-distance-of-two-locations-on-earth-using-python-1501b1944d97
-                    distance=ExpressionWrapper(
-                         (RADIUS_OF_EARTH_IN_MILES * (
-                             ACos(
-                                 (Sin(F('latitude') * DEG_TO_RADS) *
-                                  Sin(lat_rads_ploc)) +
-                                 (Cos(F('latitude') * DEG_TO_RADS) *
-                                  Cos(lat_rads_ploc) *
-                                  Cos((F('longitude') * DEG_TO_RADS) - lon_rads_ploc))
-                             )
-                           )),
-                         output_field=FloatField()))
-            except Exception as e:
-                status += "EXCEPTION_IN_ANNOTATE_CALCULATION1-" + str(e) + ' '
-
-            # Do not return ballots more than 25 miles away
-            ballot_returned_query = ballot_returned_query.filter(distance__lte=DISTANCE_LIMIT_IN_MILES)
-
-            ballot_returned_query = ballot_returned_query.order_by('distance')
+            # Limited to normalized_state, which is NOT redundant because some elections are in many states.
+            # Does not return ballots more than DISTANCE_LIMIT_IN_MILES away.
 
             if positive_value_exists(google_civic_election_id):
                 status += "SEARCHING_BY_GOOGLE_CIVIC_ID "
-                ballot_returned_query = ballot_returned_query.filter(google_civic_election_id=google_civic_election_id)
                 try:
-                    ballot = ballot_returned_query.first()
-                    if ballot == None:
+                    ballot_returned_list = self.retrieve_closest_ballot_returned_list(
+                        location.latitude, location.longitude, google_civic_election_id,
+                        state_code=state_code, read_only=read_only)
+                    ballot = ballot_returned_list[0] if len(ballot_returned_list) else None
+                    if ballot is None:
                         status += "BALLOT_RETURNED_QUERY_FIRST_FAILED_HAS_LOCATION_AND_POSITIVE_GOOGLE_CIVIC_ID__BALLOT_NONE "
                     else:
                         status += "SUBSTITUTED_BALLOT_DISTANCE1: " + str(ballot.distance) + " "
-                        # print('===== 1 ===== ballot.distance', ballot.distance, ballot.latitude, ballot.longitude,
-                        #       text_for_map_search)
                 except Exception as e:
                     ballot = None
                     status += "BALLOT_RETURNED_QUERY_FIRST_FAILED_HAS_LOCATION_AND_POSITIVE_GOOGLE_CIVIC_ID: " + str(e) + ' '
-                # ballot_returned_list = list(ballot_returned_query)
-                # if len(ballot_returned_list):
-                #     ballot = ballot_returned_list[0]
             else:
                 # If we have an active election coming up, including today
                 # fetch_next_upcoming_election_in_this_state returns next election with ballot items
                 status += "FETCH_NEXT_UPCOMING_ELECTION_IN_THIS_STATE "
                 upcoming_google_civic_election_id = self.fetch_next_upcoming_election_in_this_state(state_code)
                 if positive_value_exists(upcoming_google_civic_election_id):
-                    ballot_returned_query_without_election_id = ballot_returned_query
-                    ballot_returned_query = ballot_returned_query.filter(
-                        google_civic_election_id=upcoming_google_civic_election_id)
                     try:
-                        ballot = ballot_returned_query.first()
-                        if ballot == None:
+                        ballot_returned_list = self.retrieve_closest_ballot_returned_list(
+                            location.latitude, location.longitude, upcoming_google_civic_election_id,
+                            state_code=state_code, read_only=read_only)
+                        ballot = ballot_returned_list[0] if len(ballot_returned_list) else None
+                        if ballot is None:
                             status += "BALLOT_RETURNED_QUERY_FIRST_FAILED_HAS_LOCATION_AND_POSITIVE_UPCOMING_GOOGLE_CIVIC_ID__BALLOT_NONE "
                         else:
                             status += "SUBSTITUTED_BALLOT_DISTANCE2: " + str(ballot.distance) + " "
-                            # print('===== 2 ===== ballot.distance', ballot.distance, ballot.latitude, ballot.longitude,
-                            #       text_for_map_search)
                     except Exception as e:
                         ballot = None
                         status += "BALLOT_RETURNED_QUERY_FIRST_FAILED_HAS_LOCATION_AND_POSITIVE_UPCOMING_GOOGLE_CIVIC_ID: " + str(e) + ' '
-                    # ballot_returned_list = list(ballot_returned_query)
-                    # if len(ballot_returned_list):
-                    #     ballot = ballot_returned_list[0]
                     # What if this is a National election, but there aren't any races in the state the voter is in?
                     # We want to find the *next* upcoming election
                     if ballot is None:
@@ -2827,28 +2947,22 @@ class BallotReturnedManager(models.Manager):
                         safety_valve_count = 0
                         while ballot_not_found and more_elections_exist and safety_valve_count < 20:
                             safety_valve_count += 1
-                            # Reset ballot_returned_query
-                            ballot_returned_query = ballot_returned_query_without_election_id
                             skip_these_elections.append(upcoming_google_civic_election_id)
                             upcoming_google_civic_election_id = self.fetch_next_upcoming_election_in_this_state(
                                 state_code, skip_these_elections)
                             if positive_value_exists(upcoming_google_civic_election_id):
-                                ballot_returned_query = ballot_returned_query.filter(
-                                    google_civic_election_id=upcoming_google_civic_election_id)
                                 try:
-                                    ballot = ballot_returned_query.first()
-                                    if ballot == None:
+                                    ballot_returned_list = self.retrieve_closest_ballot_returned_list(
+                                        location.latitude, location.longitude, upcoming_google_civic_election_id,
+                                        state_code=state_code, read_only=read_only)
+                                    ballot = ballot_returned_list[0] if len(ballot_returned_list) else None
+                                    if ballot is None:
                                         status += "BALLOT_RETURNED_QUERY_FIRST_FAILED_BALLOT_NONE_POSITIVE_UPCOMING_GOOGLE_CIVIC_ID__BALLOT_NONE "
                                     else:
                                         status += "SUBSTITUTED_BALLOT_DISTANCE3: " + str(ballot.distance) + " "
-                                        # print('===== 3 ===== ballot.distance', ballot.distance, ballot.latitude,
-                                        #       ballot.longitude, text_for_map_search)
                                 except Exception as e:
                                     ballot = None
                                     status += "BALLOT_RETURNED_QUERY_FIRST_FAILED_BALLOT_NONE_POSITIVE_UPCOMING_GOOGLE_CIVIC_ID: " + str(e) + ' '
-                                # ballot_returned_list = list(ballot_returned_query)
-                                # if len(ballot_returned_list):
-                                #     ballot = ballot_returned_list[0]
                                 if ballot is not None:
                                     ballot_not_found = False
                             else:
@@ -2857,19 +2971,6 @@ class BallotReturnedManager(models.Manager):
                     ballot = None
                     status += "NOT_LOOKING_FOR_PREVIOUS_ELECTION "
                     # We no longer want to automatically return the previous election for this voter
-                    # past_google_civic_election_id = self.fetch_last_election_in_this_state(state_code)
-                    # if positive_value_exists(past_google_civic_election_id):
-                    #     # Limit the search to the most recent election with ballot items
-                    #     ballot_returned_query = ballot_returned_query.filter(
-                    #         google_civic_election_id=past_google_civic_election_id)
-                    # try:
-                    #     ballot = ballot_returned_query.first()
-                    # except Exception as e:
-                    #     ballot = None
-                    #     status += "BALLOT_RETURNED_QUERY_FIRST_FAILED_HAS_PAST_GOOGLE_CIVIC_ID: " + str(e) + ' '
-                    # # ballot_returned_list = list(ballot_returned_query)
-                    # # if len(ballot_returned_list):
-                    # #     ballot = ballot_returned_list[0]
 
         if ballot is not None:
             ballot_returned = ballot
@@ -2881,56 +2982,15 @@ class BallotReturnedManager(models.Manager):
             if location is not None and positive_value_exists(google_civic_election_id):
                 # If here, then the geocoder successfully found the address
                 status += 'GEOCODER_FOUND_LOCATION-ATTEMPT2 '
-                address = location.address
-                # address has format "line_1, state zip, USA"
-
-                if 'test' in sys.argv:
-                    ballot_returned_query = BallotReturned.objects.all()
-                elif positive_value_exists(read_only):
-                    ballot_returned_query = BallotReturned.objects.using('readonly').all()
-                else:
-                    ballot_returned_query = BallotReturned.objects.all()
-                # Limit this query to entries stored for map points
-                ballot_returned_query = ballot_returned_query.exclude(
-                    Q(polling_location_we_vote_id__isnull=True) | Q(polling_location_we_vote_id=""))
-
-                try:
-                    lat_rads_ploc = location.latitude * DEG_TO_RADS
-                    lon_rads_ploc = location.longitude * DEG_TO_RADS
-                    ballot_returned_query = ballot_returned_query.annotate(
-                        # Calculate the approximate great circle distance between two coordinates
-                        # https://medium.com/@petehouston/calculate-distance-of-two-locations-on-earth-using-python-1501b1944d97
-                        distance=ExpressionWrapper(
-                            (RADIUS_OF_EARTH_IN_MILES * (
-                                ACos(
-                                    (Sin(F('latitude') * DEG_TO_RADS) *
-                                     Sin(lat_rads_ploc)) +
-                                    (Cos(F('latitude') * DEG_TO_RADS) *
-                                     Cos(lat_rads_ploc) *
-                                     Cos((F('longitude') * DEG_TO_RADS) - lon_rads_ploc))
-                                )
-                            )),
-                            output_field=FloatField()))
-                except Exception as e:
-                    status += "EXCEPTION_IN_ANNOTATE_CALCULATION2-" + str(e) + ' '
-
-                # Do not return ballots more than 25 miles away
-                ballot_returned_query = ballot_returned_query.filter(distance__lte=DISTANCE_LIMIT_IN_MILES)
-
-                ballot_returned_query = ballot_returned_query.order_by('distance')
-
                 status += "SEARCHING_BY_GOOGLE_CIVIC_ID-ATTEMPT2 "
-                ballot_returned_query = ballot_returned_query.filter(
-                    google_civic_election_id=google_civic_election_id)
                 try:
-                    ballot_returned = ballot_returned_query.first()
+                    ballot_returned_list = self.retrieve_closest_ballot_returned_list(
+                        location.latitude, location.longitude, google_civic_election_id, read_only=read_only)
+                    ballot_returned = ballot_returned_list[0] if len(ballot_returned_list) else None
                     status += "SUBSTITUTED_BALLOT_DISTANCE4: " + str(ballot_returned.distance) + " "
                 except Exception as e:
                     ballot_returned = None
                     status += "BALLOT_RETURNED_QUERY_FIRST_FAILED_HAS_BALLOT_LOCATION_AND_POSITIVE_GOOGLE_CIVIC_ID: " + str(e) + ' '
-                # ballot_returned_list = list(ballot_returned_query)
-                # if len(ballot_returned_list):
-                #     ballot_returned = ballot_returned_list[0]
                 if ballot_returned is not None:
                     ballot_returned_found = True
                     status += 'BALLOT_RETURNED_FOUND-ATTEMPT2 '
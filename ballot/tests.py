@@ -1,9 +1,17 @@
 from unittest import mock
 from collections import namedtuple
 
-from django.test import TestCase
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 
-from ballot.models import BallotReturned, BallotReturnedManager
+from ballot.controllers import generate_ballot_item_list_from_object_list
+from ballot.models import BallotItem, BallotReturned, BallotReturnedManager, \
+    defer_ballot_returned_spatial_index_invalidation, invalidate_ballot_returned_spatial_index
+from candidate.models import CandidateCampaign, CandidateToOfficeLink
+from election.models import Election
+from geoip.controllers import geocode_local_cache
+from office.models import ContestOffice
 
 
 Location = namedtuple('Location', ['address', 'latitude', 'longitude'])
@@ -13,6 +21,8 @@ class BallotTestCase(TestCase):
     databases = ["default", "readonly"]
 
     def setUp(self):
+        # Each test stubs the geocoder with its own answer
+        geocode_local_cache.clear()
         BallotReturned.objects.create(**{'google_civic_election_id': 4184,
                                          'latitude': 34.6604854,
                                          'longitude': -90.184124,
@@ -100,3 +110,91 @@ class BallotTestCase(TestCase):
             self.assertFalse(result['geocoder_quota_exceeded'])
             self.assertTrue(result['ballot_returned_found'])
             self.assertEqual(result['ballot_returned'], ballot_in_jackson)
+
+
+class BallotItemListTestCase(TransactionTestCase):
+    # TransactionTestCase, so the ballot item lookups, from readonly, see the rows saved here
+    databases = ["default", "readonly"]
+
+    @staticmethod
+    def setUp():
+        Election.objects.create(google_civic_election_id='4184', election_name='General Election',
+                                election_day_text='2026-11-03')
+        Election.objects.create(google_civic_election_id='4183', election_name='Primary Election',
+                                election_day_text='2026-06-02')
+
+    @staticmethod
+    def create_ballot(office_count, first_office_number=0):
+        ballot_item_list = []
+        for office_number in range(first_office_number, first_office_number + office_count):
+            office_we_vote_id = 'wv01off' + str(office_number)
+            ContestOffice.objects.create(we_vote_id=office_we_vote_id, office_name='Office ' + str(office_number),
+                                         google_civic_election_id='4184', district_name='District 1')
+            for candidate_number in range(2):
+                candidate_we_vote_id = 'wv01cand' + str(office_number) + 'x' + str(candidate_number)
+                CandidateCampaign.objects.create(we_vote_id=candidate_we_vote_id,
+                                                 candidate_name='Candidate ' + candidate_we_vote_id,
+                                                 twitter_followers_count=candidate_number)
+                CandidateToOfficeLink.objects.create(candidate_we_vote_id=candidate_we_vote_id,
+                                                     contest_office_we_vote_id=office_we_vote_id,
+                                                     google_civic_election_id=4184, state_code='ca')
+                # Each candidate also ran in the primary, for an office that isn't on this ballot
+                CandidateToOfficeLink.objects.create(candidate_we_vote_id=candidate_we_vote_id,
+                                                     contest_office_we_vote_id='wv01offprimary',
+                                                     google_civic_election_id=4183, state_code='ca')
+            ballot_item_list.append(BallotItem.objects.create(
+                voter_id=1, google_civic_election_id='4184', contest_office_we_vote_id=office_we_vote_id,
+                ballot_item_display_name='Office ' + str(office_number), local_ballot_order=office_number))
+        return ballot_item_list
+
+    @staticmethod
+    def count_queries_to_generate(ballot_item_list):
+        with CaptureQueriesContext(connections['default']) as default_queries, \
+                CaptureQueriesContext(connections['readonly']) as readonly_queries:
+            results = generate_ballot_item_list_from_object_list(
+                ballot_item_object_list=ballot_item_list, google_civic_election_id='4184')
+        return len(default_queries) + len(readonly_queries), results
+
+    def test_ballot_item_list(self):
+        ContestOffice.objects.create(we_vote_id='wv01offprimary', office_name='Primary Office',
+                                     google_civic_election_id='4183', district_name='District 2')
+        query_count, results = self.count_queries_to_generate(self.create_ballot(2))
+        self.assertTrue(results['success'])
+        ballot_item = results['ballot_item_list'][0]
+        self.assertEqual(ballot_item['ballot_item_display_name'], 'Office 0')
+        self.assertEqual([candidate['we_vote_id'] for candidate in ballot_item['candidate_list']],
+                         ['wv01cand0x1', 'wv01cand0x0'])  # Most twitter followers first
+        office_list = sorted(ballot_item['candidate_list'][0]['contest_office_list'],
+                             key=lambda one_office: one_office['google_civic_election_id'])
+        self.assertEqual([(one_office['contest_office_name'], one_office['election_day_text'])
+                          for one_office in office_list],
+                         [('Primary Office', '2026-06-02'), ('Office 0', '2026-11-03')])
+
+    def test_query_count_does_not_grow_with_ballot(self):
+        # The primary office is missing on purpose: not finding it mustn't cost a query per candidate
+        small_ballot_query_count, results = self.count_queries_to_generate(self.create_ballot(1))
+        self.assertEqual(len(results['ballot_item_list']), 1)
+        large_ballot_query_count, results = self.count_queries_to_generate(self.create_ballot(8, 1))
+        self.assertEqual(len(results['ballot_item_list']), 8)
+        self.assertEqual(large_ballot_query_count, small_ballot_query_count)
+        self.assertLessEqual(large_ballot_query_count, 6)
+
+
+class BallotReturnedSpatialIndexTests(SimpleTestCase):
+
+    def test_invalidation_deferred_to_end_of_import(self):
+        with mock.patch('ballot.models.caches') as caches_mock:
+            shared_cache = caches_mock.__getitem__.return_value
+            with defer_ballot_returned_spatial_index_invalidation():
+                for _ in range(3):
+                    invalidate_ballot_returned_spatial_index(4184)
+                with defer_ballot_returned_spatial_index_invalidation():
+                    invalidate_ballot_returned_spatial_index('4185')
+                shared_cache.set.assert_not_called()
+            self.assertEqual(sorted(call_args[0][0] for call_args in shared_cache.set.call_args_list), [
+                'ballot_returned_spatial_index_generation_4184',
+                'ballot_returned_spatial_index_generation_4185',
+            ])
+
+            invalidate_ballot_returned_spatial_index(4184)
+            self.assertEqual(shared_cache.set.call_count, 3)
@@ -2,9 +2,9 @@
 # Brought to you by We Vote. Be good.
 # -*- coding: UTF-8 -*-
 
-from .models import CampaignX, CampaignXListedByOrganization, CampaignXManager, CampaignXNewsItem, CampaignXOwner, \
-    CampaignXPolitician, CampaignXSupporter, CAMPAIGNX_UNIQUE_ATTRIBUTES_TO_BE_CLEARED, CAMPAIGNX_UNIQUE_IDENTIFIERS, \
-    FINAL_ELECTION_DATE_COOL_DOWN
+from .models import CampaignX, CampaignXEntriesAreNotDuplicates, CampaignXListedByOrganization, CampaignXManager, \
+    CampaignXNewsItem, CampaignXOwner, CampaignXPolitician, CampaignXSupporter, \
+    CAMPAIGNX_UNIQUE_ATTRIBUTES_TO_BE_CLEARED, CAMPAIGNX_UNIQUE_IDENTIFIERS, FINAL_ELECTION_DATE_COOL_DOWN
 import base64
 import copy
 from django.contrib import messages
@@ -20,8 +20,10 @@ from follow.models import FOLLOW_DISLIKE, FOLLOWING, FollowOrganization, FollowO
 from position.models import OPPOSE, SUPPORT
 from voter.models import Voter, VoterManager
 import wevote_functions.admin
-from wevote_functions.functions import positive_value_exists
+from wevote_functions.functions import extract_first_name_from_full_name, extract_last_name_from_full_name, \
+    positive_value_exists
 from wevote_functions.functions_date import generate_date_as_integer, get_current_date_as_integer, DATE_FORMAT_YMD_HMS
+from wevote_functions.functions_duplicates import find_duplicates_in_list, normalize_duplicate_key_text
 
 logger = wevote_functions.admin.get_logger(__name__)
 
@@ -34,6 +36,13 @@ CAMPAIGN_PHOTO_MEDIUM_MAX_WIDTH = 224
 CAMPAIGN_PHOTO_MEDIUM_MAX_HEIGHT = 117
 CAMPAIGN_PHOTO_SMALL_MAX_WIDTH = 140
 CAMPAIGN_PHOTO_SMALL_MAX_HEIGHT = 73
+# How much each kind of shared blocking key counts, when ranking possible duplicate campaigns
+CAMPAIGNX_DUPLICATE_KEY_WEIGHTS = {
+    'politician':       10,
+    'title':            5,
+    'politician_name':  5,
+    'last_first':       3,
+}
 
 CAMPAIGNX_ERROR_DICT = {
     'status': 'ERROR ',
@@ -1547,6 +1556,48 @@ def find_duplicate_campaignx(
     return error_results
 
 
+def generate_campaignx_duplicate_blocking_keys(campaignx, politician_name=''):
+    """
+    The blocking keys find_duplicate_campaignx_entries_in_list files a campaign under: its title, its linked
+    politician, and that politician's name, like retrieve_campaignx_entries_from_non_unique_identifiers matches on.
+    """
+    blocking_key_list = []
+    if positive_value_exists(campaignx.campaign_title):
+        blocking_key_list.append(('title', normalize_duplicate_key_text(campaignx.campaign_title)))
+    if positive_value_exists(campaignx.linked_politician_we_vote_id):
+        blocking_key_list.append(('politician', campaignx.linked_politician_we_vote_id.lower()))
+    if positive_value_exists(politician_name):
+        blocking_key_list.append(('politician_name', normalize_duplicate_key_text(politician_name)))
+        first_name = extract_first_name_from_full_name(politician_name)
+        last_name = extract_last_name_from_full_name(politician_name)
+        if positive_value_exists(first_name) and positive_value_exists(last_name):
+            blocking_key_list.append(
+                ('last_first', normalize_duplicate_key_text(last_name), normalize_duplicate_key_text(first_name)))
+    return blocking_key_list
+
+
+def find_duplicate_campaignx_entries_in_list(campaignx_list, politician_name_dict_by_we_vote_id=None, read_only=True):
+    """
+    Pair up possible duplicates among campaignx_list in memory, instead of calling find_duplicate_campaignx for
+    each one. Pairs already marked CampaignXEntriesAreNotDuplicates are skipped, and each campaign is in at most one
+    pair, its best one.
+    :param campaignx_list:
+    :param politician_name_dict_by_we_vote_id: linked_politician_we_vote_id -> politician_name
+    :param read_only:
+    :return: results dict. duplicate_pair_list holds dicts with campaignx1, campaignx2, score and
+      matched_key_kind_list.
+    """
+    politician_name_dict_by_we_vote_id = politician_name_dict_by_we_vote_id or {}
+
+    def generate_blocking_keys(campaignx):
+        politician_name = politician_name_dict_by_we_vote_id.get(campaignx.linked_politician_we_vote_id, '')
+        return generate_campaignx_duplicate_blocking_keys(campaignx, politician_name)
+
+    return find_duplicates_in_list(
+        campaignx_list, CAMPAIGNX_DUPLICATE_KEY_WEIGHTS, generate_blocking_keys,
+        CampaignXEntriesAreNotDuplicates, 'campaignx', read_only=positive_value_exists(read_only))
+
+
 def generate_campaignx_dict_list_from_campaignx_object_list(
         campaignx_object_list=[],
         hostname='',
@@ -190,7 +190,7 @@ def campaignx_friend_has_supported_send(  # CAMPAIGNX_FRIEND_HAS_SUPPORTED_TEMPL
         if schedule_results['email_scheduled_saved']:
             # messages_to_send.append(schedule_results['email_scheduled_id'])
             email_scheduled = schedule_results['email_scheduled']
-            send_results = email_manager.send_scheduled_email(email_scheduled)
+            send_results = email_manager.queue_scheduled_email(email_scheduled)
             email_scheduled_sent = send_results['email_scheduled_sent']
             status += send_results['status']
             success = send_results['success']
@@ -360,7 +360,7 @@ def campaignx_news_item_send(  # CAMPAIGNX_NEWS_ITEM_TEMPLATE
         if schedule_results['email_scheduled_saved']:
             # messages_to_send.append(schedule_results['email_scheduled_id'])
             email_scheduled = schedule_results['email_scheduled']
-            send_results = email_manager.send_scheduled_email(email_scheduled)
+            send_results = email_manager.queue_scheduled_email(email_scheduled)
             email_scheduled_sent = send_results['email_scheduled_sent']
             status += send_results['status']
             success = send_results['success']
@@ -473,7 +473,7 @@ def campaignx_super_share_item_send(  # CAMPAIGNX_SUPER_SHARE_ITEM_TEMPLATE
         success = schedule_results['success']
         if schedule_results['email_scheduled_saved']:
             email_scheduled = schedule_results['email_scheduled']
-            send_results = email_manager.send_scheduled_email(email_scheduled)
+            send_results = email_manager.queue_scheduled_email(email_scheduled)
             email_scheduled_sent = send_results['email_scheduled_sent']
             status += send_results['status']
             success = send_results['success']
@@ -665,7 +665,7 @@ def campaignx_supporter_initial_response_send(  # CAMPAIGNX_SUPPORTER_INITIAL_RE
         if schedule_results['email_scheduled_saved']:
             # messages_to_send.append(schedule_results['email_scheduled_id'])
             email_scheduled = schedule_results['email_scheduled']
-            send_results = email_manager.send_scheduled_email(email_scheduled)
+            send_results = email_manager.queue_scheduled_email(email_scheduled)
             email_scheduled_sent = send_results['email_scheduled_sent']
             status += send_results['status']
             success = send_results['success']
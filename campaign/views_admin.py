@@ -28,9 +28,9 @@ from voter.models import fetch_voter_from_voter_device_link, voter_has_authority
 from wevote_functions.functions import convert_state_code_to_state_text, convert_to_int, \
     get_voter_api_device_id, positive_value_exists, STATE_CODE_MAP
 from wevote_functions.functions_date import generate_date_as_integer
-from .controllers import fetch_duplicate_campaignx_count, \
-    figure_out_campaignx_conflict_values, find_duplicate_campaignx, merge_if_duplicate_campaignx_entries, \
-    refresh_campaignx_supporters_count_in_all_children, merge_these_two_campaignx_entries
+from .controllers import figure_out_campaignx_conflict_values, find_duplicate_campaignx_entries_in_list, \
+    merge_if_duplicate_campaignx_entries, refresh_campaignx_supporters_count_in_all_children, \
+    merge_these_two_campaignx_entries
 from .models import CampaignX, CampaignXEntriesAreNotDuplicates, CampaignXEntriesArePossibleDuplicates, \
     CampaignXManager, CampaignXOwner, CampaignXPolitician, CampaignXSEOFriendlyPath, CampaignXSupporter, \
     CAMPAIGNX_UNIQUE_ATTRIBUTES_TO_BE_CLEARED, \
@@ -1937,8 +1937,6 @@ def find_and_merge_duplicate_campaignx_entries_view(request):
     find_number_of_duplicates = request.GET.get('find_number_of_duplicates', 0)
     state_code = request.GET.get('state_code', "")
     status = ""
-    campaignx_manager = CampaignXManager()
-    ignore_campaignx_we_vote_id_list = []
 
     queryset = CampaignXEntriesAreNotDuplicates.objects.using('readonly').all()
     # if positive_value_exists(state_code):
@@ -1979,24 +1977,11 @@ def find_and_merge_duplicate_campaignx_entries_view(request):
     campaignx_query = campaignx_query.exclude(we_vote_id__in=exclude_campaignx_we_vote_id_list)
     if positive_value_exists(state_code):
         campaignx_query = campaignx_query.filter(state_code__iexact=state_code)
-    campaignx_list = list(campaignx_query[:1000])
-
-    # Loop through all the campaignx_entries to see how many have possible duplicates
-    if positive_value_exists(find_number_of_duplicates):
-        duplicate_campaignx_count = 0
-        for one_campaignx in campaignx_list:
-            # Note that we don't reset the ignore_campaignx_list, so we don't search for a duplicate both directions
-            ignore_campaignx_we_vote_id_list.append(one_campaignx.we_vote_id)
-            duplicate_campaignx_count_temp = fetch_duplicate_campaignx_count(
-                campaignx=one_campaignx,
-                ignore_campaignx_we_vote_id_list=ignore_campaignx_we_vote_id_list)
-            duplicate_campaignx_count += duplicate_campaignx_count_temp
+    # Every one, not just the first 1000, so duplicates are compared across the whole list, but only the
+    #  fields find_duplicate_campaignx_entries_in_list files them under.
+    #  We load the whole campaign for each pair it finds, below.
+    campaignx_list = list(campaignx_query.only('we_vote_id', 'campaign_title', 'linked_politician_we_vote_id'))
 
-        if positive_value_exists(duplicate_campaignx_count):
-            messages.add_message(request, messages.INFO,
-                                 "There are approximately {duplicate_campaignx_count} "
-                                 "possible duplicates."
-                                 "".format(duplicate_campaignx_count=duplicate_campaignx_count))
     try:
         # Give the volunteer who entered this credit
         volunteer_task_manager = VolunteerTaskManager()
@@ -2010,8 +1995,6 @@ def find_and_merge_duplicate_campaignx_entries_view(request):
     # Loop through all the campaignx_entries to find linked_politician_we_vote_id
     linked_politician_we_vote_id_list = []
     for one_campaignx in campaignx_list:
-        if one_campaignx.we_vote_id in exclude_campaignx_we_vote_id_list:
-            continue
         if positive_value_exists(one_campaignx.linked_politician_we_vote_id):
             linked_politician_we_vote_id_list.append(one_campaignx.linked_politician_we_vote_id)
 
@@ -2019,84 +2002,76 @@ def find_and_merge_duplicate_campaignx_entries_view(request):
     politician_name_dict_by_we_vote_id = {}
     if positive_value_exists(len(linked_politician_we_vote_id_list)):
         queryset = Politician.objects.using('readonly').filter(we_vote_id__in=linked_politician_we_vote_id_list)
-        politician_list = list(queryset)
-        for one_politician in politician_list:
-            politician_name_dict_by_we_vote_id[one_politician.we_vote_id] = one_politician.politician_name
+        for politician_we_vote_id, politician_name in queryset.values_list('we_vote_id', 'politician_name'):
+            politician_name_dict_by_we_vote_id[politician_we_vote_id] = politician_name
 
-    # Loop through all the campaignx_entries
-    for one_campaignx in campaignx_list:
-        if one_campaignx.we_vote_id in exclude_campaignx_we_vote_id_list:
-            continue
-        # Add current campaignx entry to ignore list
-        ignore_campaignx_we_vote_id_list.append(one_campaignx.we_vote_id)
-        # Now check to for other campaignx_entries we have labeled as "not a duplicate"
-        not_a_duplicate_list = campaignx_manager.fetch_campaignx_entries_are_not_duplicates_list_we_vote_ids(
-            one_campaignx.we_vote_id)
-
-        ignore_campaignx_we_vote_id_list += not_a_duplicate_list
-        politician_name = None
-        state_code = ''
-        try:
-            if one_campaignx.linked_politician_we_vote_id in politician_name_dict_by_we_vote_id:
-                politician_name = politician_name_dict_by_we_vote_id[one_campaignx.linked_politician_we_vote_id]
-            # We might also want to get state_code from politicians
-        except Exception as e:
-            pass
-        results = find_duplicate_campaignx(
-            campaignx=one_campaignx,
-            ignore_campaignx_we_vote_id_list=ignore_campaignx_we_vote_id_list,
-            politician_name=politician_name,
-            state_code=state_code,
-        )
+    # Pair up possible duplicates across all of these campaigns at once, then merge or queue each pair
+    results = find_duplicate_campaignx_entries_in_list(
+        campaignx_list, politician_name_dict_by_we_vote_id=politician_name_dict_by_we_vote_id, read_only=True)
+    status += results['status']
+    if positive_value_exists(find_number_of_duplicates):
+        duplicate_campaignx_count = len(results['duplicate_pair_list'])
+        if positive_value_exists(duplicate_campaignx_count):
+            messages.add_message(request, messages.INFO,
+                                 "There are approximately {duplicate_campaignx_count} "
+                                 "possible duplicates."
+                                 "".format(duplicate_campaignx_count=duplicate_campaignx_count))
 
-        # If we find campaignx_entries to merge, stop and ask for confirmation
-        if results['campaignx_merge_possibility_found']:
-            campaignx_option1_for_template = one_campaignx
-            campaignx_option2_for_template = results['campaignx_merge_possibility']
-
-            # Can we automatically merge these campaignx_entries?
-            merge_results = merge_if_duplicate_campaignx_entries(
-                campaignx_option1_for_template,
-                campaignx_option2_for_template,
-                results['campaignx_merge_conflict_values'])
-
-            if merge_results['campaignx_entries_merged']:
-                campaignx = merge_results['campaignx']
-                if campaignx.we_vote_id not in exclude_campaignx_we_vote_id_list:
-                    exclude_campaignx_we_vote_id_list.append(campaignx.we_vote_id)
-                if one_campaignx.we_vote_id not in exclude_campaignx_we_vote_id_list:
-                    exclude_campaignx_we_vote_id_list.append(one_campaignx.we_vote_id)
-                CampaignXEntriesAreNotDuplicates.objects.create(
-                    campaignx1_we_vote_id=campaignx.we_vote_id,
-                    campaignx2_we_vote_id=None,
-                    # state_code=state_code,
-                )
-                CampaignXEntriesAreNotDuplicates.objects.create(
-                    campaignx1_we_vote_id=one_campaignx.we_vote_id,
+    # The whole campaign on each side of each pair, which we need to compare and merge them
+    pair_we_vote_id_list = []
+    for duplicate_pair in results['duplicate_pair_list']:
+        pair_we_vote_id_list += [duplicate_pair['campaignx1'].we_vote_id, duplicate_pair['campaignx2'].we_vote_id]
+    campaignx_by_we_vote_id = {}
+    if len(pair_we_vote_id_list):
+        queryset = CampaignX.objects.using('readonly').filter(we_vote_id__in=pair_we_vote_id_list)
+        campaignx_by_we_vote_id = {one_campaignx.we_vote_id: one_campaignx for one_campaignx in queryset}
+
+    not_duplicates_list = []
+    possible_duplicates_list = []
+    for duplicate_pair in results['duplicate_pair_list']:
+        campaignx_option1_for_template = campaignx_by_we_vote_id.get(duplicate_pair['campaignx1'].we_vote_id)
+        campaignx_option2_for_template = campaignx_by_we_vote_id.get(duplicate_pair['campaignx2'].we_vote_id)
+        if campaignx_option1_for_template is None or campaignx_option2_for_template is None:
+            continue  # Merged or deleted since we listed them
+        conflict_results = figure_out_campaignx_conflict_values(
+            campaignx_option1_for_template, campaignx_option2_for_template)
+
+        # Can we automatically merge these campaignx_entries?
+        merge_results = merge_if_duplicate_campaignx_entries(
+            campaignx_option1_for_template,
+            campaignx_option2_for_template,
+            conflict_results['conflict_values'])
+
+        if merge_results['campaignx_entries_merged']:
+            campaignx = merge_results['campaignx']
+            not_duplicates_list.append(CampaignXEntriesAreNotDuplicates(
+                campaignx1_we_vote_id=campaignx.we_vote_id,
+                campaignx2_we_vote_id=None,
+            ))
+            if campaignx.we_vote_id != campaignx_option1_for_template.we_vote_id:
+                not_duplicates_list.append(CampaignXEntriesAreNotDuplicates(
+                    campaignx1_we_vote_id=campaignx_option1_for_template.we_vote_id,
                     campaignx2_we_vote_id=None,
-                    # state_code=state_code,
-                )
-                messages.add_message(request, messages.INFO, "CampaignX {campaignx_title} automatically merged."
-                                                             "".format(campaignx_title=campaignx.campaign_title))
-                # No need to start over
-                # return HttpResponseRedirect(reverse('campaign:find_and_merge_duplicate_campaignx_entries', args=()) +
-                #                             "?state_code=" + str(state_code))
-            else:
-                # Add an entry showing that this is a possible match
-                CampaignXEntriesArePossibleDuplicates.objects.create(
-                    campaignx1_we_vote_id=one_campaignx.we_vote_id,
-                    campaignx2_we_vote_id=campaignx_option2_for_template.we_vote_id,
-                    state_code=state_code,
-                )
-                if campaignx_option2_for_template.we_vote_id not in exclude_campaignx_we_vote_id_list:
-                    exclude_campaignx_we_vote_id_list.append(campaignx_option2_for_template.we_vote_id)
+                ))
+            messages.add_message(request, messages.INFO, "CampaignX {campaignx_title} automatically merged."
+                                                         "".format(campaignx_title=campaignx.campaign_title))
         else:
-            # No matches found
-            CampaignXEntriesAreNotDuplicates.objects.create(
-                campaignx1_we_vote_id=one_campaignx.we_vote_id,
-                campaignx2_we_vote_id=None,
-                # state_code=state_code,
-            )
+            # Add an entry showing that this is a possible match
+            possible_duplicates_list.append(CampaignXEntriesArePossibleDuplicates(
+                campaignx1_we_vote_id=campaignx_option1_for_template.we_vote_id,
+                campaignx2_we_vote_id=campaignx_option2_for_template.we_vote_id,
+                state_code=state_code,
+            ))
+    for one_campaignx in results['unmatched_campaignx_list']:
+        # No matches found
+        not_duplicates_list.append(CampaignXEntriesAreNotDuplicates(
+            campaignx1_we_vote_id=one_campaignx.we_vote_id,
+            campaignx2_we_vote_id=None,
+        ))
+    if len(not_duplicates_list):
+        CampaignXEntriesAreNotDuplicates.objects.bulk_create(not_duplicates_list)
+    if len(possible_duplicates_list):
+        CampaignXEntriesArePossibleDuplicates.objects.bulk_create(possible_duplicates_list)
 
     return HttpResponseRedirect(reverse('campaign:duplicates_list', args=()) +
                                 "?state_code={state_code}"
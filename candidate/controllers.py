@@ -1766,6 +1766,7 @@ def generate_candidate_dict_list_from_candidate_object_list(
 
 def generate_candidate_dict_from_candidate_object(
         candidate=None,
+        candidate_to_office_link_dict=None,
         candidate_to_office_link_list_from_multiple_candidates=[],
         election_dict={},
         google_civic_election_id='',
@@ -1790,7 +1791,11 @@ def generate_candidate_dict_from_candidate_object(
         withdrawal_date_string = candidate.withdrawal_date.strftime(DATE_FORMAT_YMD) # "%Y-%m-%d"
     list_found = False
     office_list_for_candidate = []
-    if len(candidate_to_office_link_list_from_multiple_candidates) > 0:
+    if candidate_to_office_link_dict is not None:
+        # Already retrieved for every candidate on the ballot, keyed by candidate_we_vote_id
+        candidate_to_office_link_list = candidate_to_office_link_dict.get(candidate.we_vote_id, [])
+        list_found = len(candidate_to_office_link_list) > 0
+    elif len(candidate_to_office_link_list_from_multiple_candidates) > 0:
         candidate_to_office_link_list = []
         for candidate_to_office_link in candidate_to_office_link_list_from_multiple_candidates:
             if candidate_to_office_link.candidate_we_vote_id == candidate.we_vote_id:
@@ -1831,7 +1836,8 @@ def generate_candidate_dict_from_candidate_object(
                 if election_id_integer in election_dict:
                     election_found = True
                     election = election_dict[election_id_integer]
-                    election_day_text = election.election_day_text
+                    if election:
+                        election_day_text = election.election_day_text
                 if not election_found:
                     results = election_manager.retrieve_election(
                         google_civic_election_id=candidate_to_office_link.google_civic_election_id,
@@ -322,6 +322,74 @@ class CandidateListManager(models.Manager):
         }
         return results
 
+    @staticmethod
+    def retrieve_all_candidates_for_office_list(office_we_vote_id_list=[], read_only=True):
+        """
+        The same candidates retrieve_all_candidates_for_office returns, for a whole ballot's worth of offices,
+        with two queries instead of two per office.
+        :param office_we_vote_id_list:
+        :param read_only:
+        :return: candidate_list_by_office_dict is office_we_vote_id -> candidates, most twitter followers first
+        """
+        candidate_list_by_office_dict = {}
+        status = ""
+        success = True
+
+        if not positive_value_exists(len(office_we_vote_id_list)):
+            status += 'RETRIEVE_ALL_CANDIDATES_FOR_OFFICE_LIST-MISSING_OFFICE_LIST '
+            results = {
+                'success':                          False,
+                'status':                           status,
+                'candidate_list_by_office_dict':    candidate_list_by_office_dict,
+            }
+            return results
+
+        link_results = CandidateListManager.retrieve_candidate_to_office_link_list(
+            contest_office_we_vote_id_list=office_we_vote_id_list,
+            read_only=read_only)
+        if not positive_value_exists(link_results['success']):
+            status += link_results['status']
+            results = {
+                'success':                          False,
+                'status':                           status,
+                'candidate_list_by_office_dict':    candidate_list_by_office_dict,
+            }
+            return results
+        office_we_vote_id_list_by_candidate = {}
+        for one_link in link_results['candidate_to_office_link_list']:
+            if positive_value_exists(one_link.candidate_we_vote_id):
+                office_we_vote_id_list_by_candidate.setdefault(one_link.candidate_we_vote_id, []) \
+                    .append(one_link.contest_office_we_vote_id)
+
+        if len(office_we_vote_id_list_by_candidate):
+            try:
+                if read_only:
+                    candidate_query = CandidateCampaign.objects.using('readonly').all()
+                else:
+                    candidate_query = CandidateCampaign.objects.all()
+                candidate_query = candidate_query.filter(we_vote_id__in=list(office_we_vote_id_list_by_candidate))
+                candidate_query = candidate_query.exclude(do_not_display_on_ballot=True)
+                candidate_query = candidate_query.order_by('-twitter_followers_count')
+                for candidate in candidate_query:
+                    for office_we_vote_id in office_we_vote_id_list_by_candidate.get(candidate.we_vote_id, []):
+                        candidate_list = candidate_list_by_office_dict.setdefault(office_we_vote_id, [])
+                        if candidate not in candidate_list:
+                            candidate_list.append(candidate)
+                status += 'RETRIEVE_ALL_CANDIDATES_FOR_OFFICE_LIST-CANDIDATES_RETRIEVED '
+            except Exception as e:
+                handle_exception(e, logger=logger)
+                status += 'FAILED retrieve_all_candidates_for_office_list ' + str(e) + ' '
+                success = False
+        else:
+            status += 'RETRIEVE_ALL_CANDIDATES_FOR_OFFICE_LIST-NO_CANDIDATES_RETRIEVED '
+
+        results = {
+            'success':                          success,
+            'status':                           status,
+            'candidate_list_by_office_dict':    candidate_list_by_office_dict,
+        }
+        return results
+
     @staticmethod
     def retrieve_candidate_list(
             candidate_id_list=None,
@@ -4,8 +4,8 @@
 
 from .controllers_participant import generate_challenge_participant_dict_from_challenge_participant_object
 from .models import Challenge, ChallengeListedByOrganization, ChallengeManager, ChallengeNewsItem, ChallengeOwner, \
-    ChallengePolitician, ChallengeParticipant, CHALLENGE_UNIQUE_ATTRIBUTES_TO_BE_CLEARED, CHALLENGE_UNIQUE_IDENTIFIERS, \
-    FINAL_ELECTION_DATE_COOL_DOWN
+    ChallengePolitician, ChallengeParticipant, ChallengesAreNotDuplicates, CHALLENGE_UNIQUE_ATTRIBUTES_TO_BE_CLEARED, \
+    CHALLENGE_UNIQUE_IDENTIFIERS, FINAL_ELECTION_DATE_COOL_DOWN
 import base64
 import copy
 from django.contrib import messages
@@ -17,8 +17,10 @@ from PIL import Image, ImageOps
 import re
 from voter.models import Voter, VoterManager
 import wevote_functions.admin
-from wevote_functions.functions import positive_value_exists
+from wevote_functions.functions import extract_first_name_from_full_name, extract_last_name_from_full_name, \
+    positive_value_exists
 from wevote_functions.functions_date import generate_date_as_integer, get_current_date_as_integer, DATE_FORMAT_YMD_HMS
+from wevote_functions.functions_duplicates import find_duplicates_in_list, normalize_duplicate_key_text
 
 logger = wevote_functions.admin.get_logger(__name__)
 
@@ -31,6 +33,13 @@ CHALLENGE_PHOTO_MEDIUM_MAX_WIDTH = 224
 CHALLENGE_PHOTO_MEDIUM_MAX_HEIGHT = 117
 CHALLENGE_PHOTO_SMALL_MAX_WIDTH = 140
 CHALLENGE_PHOTO_SMALL_MAX_HEIGHT = 73
+# How much each kind of shared blocking key counts, when ranking possible duplicate challenges
+CHALLENGE_DUPLICATE_KEY_WEIGHTS = {
+    'politician':       10,
+    'title':            5,
+    'politician_name':  5,
+    'last_first':       3,
+}
 
 CHALLENGE_ERROR_DICT = {
     'status': 'ERROR ',
@@ -1073,6 +1082,48 @@ def find_duplicate_challenge(
     return error_results
 
 
+def generate_challenge_duplicate_blocking_keys(challenge, politician_name=''):
+    """
+    The blocking keys find_duplicate_challenges_in_list files a challenge under: its title, its politician, and that
+    politician's name, like retrieve_challenges_from_non_unique_identifiers matches on.
+    """
+    blocking_key_list = []
+    if positive_value_exists(challenge.challenge_title):
+        blocking_key_list.append(('title', normalize_duplicate_key_text(challenge.challenge_title)))
+    if positive_value_exists(challenge.politician_we_vote_id):
+        blocking_key_list.append(('politician', challenge.politician_we_vote_id.lower()))
+    if positive_value_exists(politician_name):
+        blocking_key_list.append(('politician_name', normalize_duplicate_key_text(politician_name)))
+        first_name = extract_first_name_from_full_name(politician_name)
+        last_name = extract_last_name_from_full_name(politician_name)
+        if positive_value_exists(first_name) and positive_value_exists(last_name):
+            blocking_key_list.append(
+                ('last_first', normalize_duplicate_key_text(last_name), normalize_duplicate_key_text(first_name)))
+    return blocking_key_list
+
+
+def find_duplicate_challenges_in_list(challenge_list, politician_name_dict_by_we_vote_id=None, read_only=True):
+    """
+    Pair up possible duplicates among challenge_list in memory, instead of calling find_duplicate_challenge for
+    each one. Pairs already marked ChallengesAreNotDuplicates are skipped, and each challenge is in at most one
+    pair, its best one.
+    :param challenge_list:
+    :param politician_name_dict_by_we_vote_id: politician_we_vote_id -> politician_name
+    :param read_only:
+    :return: results dict. duplicate_pair_list holds dicts with challenge1, challenge2, score and
+      matched_key_kind_list.
+    """
+    politician_name_dict_by_we_vote_id = politician_name_dict_by_we_vote_id or {}
+
+    def generate_blocking_keys(challenge):
+        politician_name = politician_name_dict_by_we_vote_id.get(challenge.politician_we_vote_id, '')
+        return generate_challenge_duplicate_blocking_keys(challenge, politician_name)
+
+    return find_duplicates_in_list(
+        challenge_list, CHALLENGE_DUPLICATE_KEY_WEIGHTS, generate_blocking_keys,
+        ChallengesAreNotDuplicates, 'challenge', read_only=positive_value_exists(read_only))
+
+
 def generate_challenge_dict_list_from_challenge_object_list(
         challenge_object_list=[],
         hostname='',
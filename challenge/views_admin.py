@@ -28,9 +28,8 @@ from voter.models import fetch_voter_from_voter_device_link, voter_has_authority
 from wevote_functions.functions import convert_state_code_to_state_text, convert_to_int, \
     get_voter_api_device_id, positive_value_exists, STATE_CODE_MAP
 from wevote_functions.functions_date import generate_date_as_integer
-from .controllers import fetch_duplicate_challenge_count, \
-    figure_out_challenge_conflict_values, find_duplicate_challenge, merge_if_duplicate_challenges, \
-    merge_these_two_challenges
+from .controllers import figure_out_challenge_conflict_values, find_duplicate_challenges_in_list, \
+    merge_if_duplicate_challenges, merge_these_two_challenges
 from .models import Challenge, ChallengesAreNotDuplicates, ChallengesArePossibleDuplicates, \
     ChallengeManager, ChallengeOwner, ChallengePolitician, ChallengeSEOFriendlyPath, ChallengeParticipant, \
     CHALLENGE_UNIQUE_ATTRIBUTES_TO_BE_CLEARED, \
@@ -1896,8 +1895,6 @@ def find_and_merge_duplicate_challenges_view(request):
     find_number_of_duplicates = request.GET.get('find_number_of_duplicates', 0)
     state_code = request.GET.get('state_code', "")
     status = ""
-    challenge_manager = ChallengeManager()
-    ignore_challenge_we_vote_id_list = []
 
     queryset = ChallengesAreNotDuplicates.objects.using('readonly').all()
     # if positive_value_exists(state_code):
@@ -1938,24 +1935,11 @@ def find_and_merge_duplicate_challenges_view(request):
     challenge_query = challenge_query.exclude(we_vote_id__in=exclude_challenge_we_vote_id_list)
     if positive_value_exists(state_code):
         challenge_query = challenge_query.filter(state_code__iexact=state_code)
-    challenge_list = list(challenge_query[:1000])
-
-    # Loop through all the challenges to see how many have possible duplicates
-    if positive_value_exists(find_number_of_duplicates):
-        duplicate_challenge_count = 0
-        for one_challenge in challenge_list:
-            # Note that we don't reset the ignore_challenge_list, so we don't search for a duplicate both directions
-            ignore_challenge_we_vote_id_list.append(one_challenge.we_vote_id)
-            duplicate_challenge_count_temp = fetch_duplicate_challenge_count(
-                challenge=one_challenge,
-                ignore_challenge_we_vote_id_list=ignore_challenge_we_vote_id_list)
-            duplicate_challenge_count += duplicate_challenge_count_temp
+    # Every one, not just the first 1000, so duplicates are compared across the whole list, but only the
+    #  fields find_duplicate_challenges_in_list files them under.
+    #  We load the whole challenge for each pair it finds, below.
+    challenge_list = list(challenge_query.only('we_vote_id', 'challenge_title', 'politician_we_vote_id'))
 
-        if positive_value_exists(duplicate_challenge_count):
-            messages.add_message(request, messages.INFO,
-                                 "There are approximately {duplicate_challenge_count} "
-                                 "possible duplicates."
-                                 "".format(duplicate_challenge_count=duplicate_challenge_count))
     try:
         # Give the volunteer who entered this credit
         volunteer_task_manager = VolunteerTaskManager()
@@ -1969,8 +1953,6 @@ def find_and_merge_duplicate_challenges_view(request):
     # Loop through all the challenges to find politician_we_vote_id
     politician_we_vote_id_list = []
     for one_challenge in challenge_list:
-        if one_challenge.we_vote_id in exclude_challenge_we_vote_id_list:
-            continue
         if positive_value_exists(one_challenge.politician_we_vote_id):
             politician_we_vote_id_list.append(one_challenge.politician_we_vote_id)
 
@@ -1978,84 +1960,76 @@ def find_and_merge_duplicate_challenges_view(request):
     politician_name_dict_by_we_vote_id = {}
     if positive_value_exists(len(politician_we_vote_id_list)):
         queryset = Politician.objects.using('readonly').filter(we_vote_id__in=politician_we_vote_id_list)
-        politician_list = list(queryset)
-        for one_politician in politician_list:
-            politician_name_dict_by_we_vote_id[one_politician.we_vote_id] = one_politician.politician_name
+        for politician_we_vote_id, politician_name in queryset.values_list('we_vote_id', 'politician_name'):
+            politician_name_dict_by_we_vote_id[politician_we_vote_id] = politician_name
 
-    # Loop through all the challenges
-    for one_challenge in challenge_list:
-        if one_challenge.we_vote_id in exclude_challenge_we_vote_id_list:
-            continue
-        # Add current challenge entry to ignore list
-        ignore_challenge_we_vote_id_list.append(one_challenge.we_vote_id)
-        # Now check to for other challenges we have labeled as "not a duplicate"
-        not_a_duplicate_list = challenge_manager.fetch_challenges_are_not_duplicates_list_we_vote_ids(
-            one_challenge.we_vote_id)
-
-        ignore_challenge_we_vote_id_list += not_a_duplicate_list
-        politician_name = None
-        state_code = ''
-        try:
-            if one_challenge.politician_we_vote_id in politician_name_dict_by_we_vote_id:
-                politician_name = politician_name_dict_by_we_vote_id[one_challenge.politician_we_vote_id]
-            # We might also want to get state_code from politicians
-        except Exception as e:
-            pass
-        results = find_duplicate_challenge(
-            challenge=one_challenge,
-            ignore_challenge_we_vote_id_list=ignore_challenge_we_vote_id_list,
-            politician_name=politician_name,
-            state_code=state_code,
-        )
+    # Pair up possible duplicates across all of these challenges at once, then merge or queue each pair
+    results = find_duplicate_challenges_in_list(
+        challenge_list, politician_name_dict_by_we_vote_id=politician_name_dict_by_we_vote_id, read_only=True)
+    status += results['status']
+    if positive_value_exists(find_number_of_duplicates):
+        duplicate_challenge_count = len(results['duplicate_pair_list'])
+        if positive_value_exists(duplicate_challenge_count):
+            messages.add_message(request, messages.INFO,
+                                 "There are approximately {duplicate_challenge_count} "
+                                 "possible duplicates."
+                                 "".format(duplicate_challenge_count=duplicate_challenge_count))
 
-        # If we find challenges to merge, stop and ask for confirmation
-        if results['challenge_merge_possibility_found']:
-            challenge_option1_for_template = one_challenge
-            challenge_option2_for_template = results['challenge_merge_possibility']
-
-            # Can we automatically merge these challenges?
-            merge_results = merge_if_duplicate_challenges(
-                challenge_option1_for_template,
-                challenge_option2_for_template,
-                results['challenge_merge_conflict_values'])
-
-            if merge_results['challenges_merged']:
-                challenge = merge_results['challenge']
-                if challenge.we_vote_id not in exclude_challenge_we_vote_id_list:
-                    exclude_challenge_we_vote_id_list.append(challenge.we_vote_id)
-                if one_challenge.we_vote_id not in exclude_challenge_we_vote_id_list:
-                    exclude_challenge_we_vote_id_list.append(one_challenge.we_vote_id)
-                ChallengesAreNotDuplicates.objects.create(
-                    challenge1_we_vote_id=challenge.we_vote_id,
-                    challenge2_we_vote_id=None,
-                    # state_code=state_code,
-                )
-                ChallengesAreNotDuplicates.objects.create(
-                    challenge1_we_vote_id=one_challenge.we_vote_id,
+    # The whole challenge on each side of each pair, which we need to compare and merge them
+    pair_we_vote_id_list = []
+    for duplicate_pair in results['duplicate_pair_list']:
+        pair_we_vote_id_list += [duplicate_pair['challenge1'].we_vote_id, duplicate_pair['challenge2'].we_vote_id]
+    challenge_by_we_vote_id = {}
+    if len(pair_we_vote_id_list):
+        queryset = Challenge.objects.using('readonly').filter(we_vote_id__in=pair_we_vote_id_list)
+        challenge_by_we_vote_id = {one_challenge.we_vote_id: one_challenge for one_challenge in queryset}
+
+    not_duplicates_list = []
+    possible_duplicates_list = []
+    for duplicate_pair in results['duplicate_pair_list']:
+        challenge_option1_for_template = challenge_by_we_vote_id.get(duplicate_pair['challenge1'].we_vote_id)
+        challenge_option2_for_template = challenge_by_we_vote_id.get(duplicate_pair['challenge2'].we_vote_id)
+        if challenge_option1_for_template is None or challenge_option2_for_template is None:
+            continue  # Merged or deleted since we listed them
+        conflict_results = figure_out_challenge_conflict_values(
+            challenge_option1_for_template, challenge_option2_for_template)
+
+        # Can we automatically merge these challenges?
+        merge_results = merge_if_duplicate_challenges(
+            challenge_option1_for_template,
+            challenge_option2_for_template,
+            conflict_results['conflict_values'])
+
+        if merge_results['challenges_merged']:
+            challenge = merge_results['challenge']
+            not_duplicates_list.append(ChallengesAreNotDuplicates(
+                challenge1_we_vote_id=challenge.we_vote_id,
+                challenge2_we_vote_id=None,
+            ))
+            if challenge.we_vote_id != challenge_option1_for_template.we_vote_id:
+                not_duplicates_list.append(ChallengesAreNotDuplicates(
+                    challenge1_we_vote_id=challenge_option1_for_template.we_vote_id,
                     challenge2_we_vote_id=None,
-                    # state_code=state_code,
-                )
-                messages.add_message(request, messages.INFO, "Challenge {challenge_title} automatically merged."
-                                                             "".format(challenge_title=challenge.challenge_title))
-                # No need to start over
-                # return HttpResponseRedirect(reverse('challenge:find_and_merge_duplicate_challenges', args=()) +
-                #                             "?state_code=" + str(state_code))
-            else:
-                # Add an entry showing that this is a possible match
-                ChallengesArePossibleDuplicates.objects.create(
-                    challenge1_we_vote_id=one_challenge.we_vote_id,
-                    challenge2_we_vote_id=challenge_option2_for_template.we_vote_id,
-                    state_code=state_code,
-                )
-                if challenge_option2_for_template.we_vote_id not in exclude_challenge_we_vote_id_list:
-                    exclude_challenge_we_vote_id_list.append(challenge_option2_for_template.we_vote_id)
+                ))
+            messages.add_message(request, messages.INFO, "Challenge {challenge_title} automatically merged."
+                                                         "".format(challenge_title=challenge.challenge_title))
         else:
-            # No matches found
-            ChallengesAreNotDuplicates.objects.create(
-                challenge1_we_vote_id=one_challenge.we_vote_id,
-                challenge2_we_vote_id=None,
-                # state_code=state_code,
-            )
+            # Add an entry showing that this is a possible match
+            possible_duplicates_list.append(ChallengesArePossibleDuplicates(
+                challenge1_we_vote_id=challenge_option1_for_template.we_vote_id,
+                challenge2_we_vote_id=challenge_option2_for_template.we_vote_id,
+                state_code=state_code,
+            ))
+    for one_challenge in results['unmatched_challenge_list']:
+        # No matches found
+        not_duplicates_list.append(ChallengesAreNotDuplicates(
+            challenge1_we_vote_id=one_challenge.we_vote_id,
+            challenge2_we_vote_id=None,
+        ))
+    if len(not_duplicates_list):
+        ChallengesAreNotDuplicates.objects.bulk_create(not_duplicates_list)
+    if len(possible_duplicates_list):
+        ChallengesArePossibleDuplicates.objects.bulk_create(possible_duplicates_list)
 
     return HttpResponseRedirect(reverse('challenge:duplicates_list', args=()) +
                                 "?state_code={state_code}"
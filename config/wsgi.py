@@ -17,4 +17,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 application = get_wsgi_application()  # Without Heroku
+
+# Build the hostname index siteConfigurationRetrieve answers from, before the first WebApp asks
+from organization.models import warm_site_configuration_index  # noqa: E402
+warm_site_configuration_index()
 # application = Cling(get_wsgi_application())  # For Heroku
@@ -28,12 +28,13 @@ from exception.models import handle_record_found_more_than_one_exception, handle
 from image.models import WeVoteImageManager
 from import_export_ballotpedia.models import BallotpediaApiCounter, BallotpediaApiCounterDailySummary, \
     BallotpediaApiCounterWeeklySummary, BallotpediaApiCounterMonthlySummary
+from import_export_batches.controllers_ballot_fetch import fetch_ballot_json_concurrently
 from import_export_batches.models import BatchDescription, BatchManager, BatchProcess, \
     BatchRowActionBallotItem, \
     BatchRowActionCandidate, BatchRowActionContestOffice, BatchRowActionMeasure, BatchRowActionPosition,  \
     BatchRowTranslationMap, BatchSet
-from import_export_google_civic.controllers import retrieve_one_ballot_from_google_civic_api, \
-    store_one_ballot_from_google_civic_api
+from import_export_google_civic.controllers import generate_google_civic_voter_info_fetch_request, \
+    retrieve_one_ballot_from_google_civic_api, store_one_ballot_from_google_civic_api
 from import_export_google_civic.models import GoogleCivicApiCounter, GoogleCivicApiCounterDailySummary, \
     GoogleCivicApiCounterWeeklySummary, GoogleCivicApiCounterMonthlySummary
 from import_export_vote_smart.models import VoteSmartApiCounter, VoteSmartApiCounterDailySummary, \
@@ -225,14 +226,20 @@ def election_all_ballots_retrieve_view(request, election_local_id=0):
     ballot_returned_manager = BallotReturnedManager()
     rate_limit_count = 0
     # Step though our set of map points, until we find one that contains a ballot.  Some won't contain ballots
-    # due to data quality issues.
-    for polling_location in polling_location_list:
+    # due to data quality issues. The ballots are fetched from Google Civic concurrently, and stored as they arrive.
+    fetch_request_list = [
+        (polling_location, generate_google_civic_voter_info_fetch_request(
+            polling_location.get_text_for_map_search_results()['text_for_map_search'],
+            election_on_stage.google_civic_election_id))
+        for polling_location in polling_location_list]
+    for polling_location, ballot_fetch_results in fetch_ballot_json_concurrently(fetch_request_list):
         success = False
         # Get the address for this polling place, and then retrieve the ballot from Google Civic API
         results = polling_location.get_text_for_map_search_results()
         text_for_map_search = results['text_for_map_search']
         one_ballot_results = retrieve_one_ballot_from_google_civic_api(
-            text_for_map_search, election_on_stage.google_civic_election_id)
+            text_for_map_search, election_on_stage.google_civic_election_id,
+            ballot_fetch_results=ballot_fetch_results)
         if one_ballot_results['success']:
             one_ballot_json = one_ballot_results['structured_json']
             store_one_ballot_results = store_one_ballot_from_google_civic_api(one_ballot_json, 0,
@@ -861,7 +861,7 @@ def schedule_verification_email(
         email_scheduled = schedule_results['email_scheduled']
 
         if email_scheduled_saved:
-            send_results = email_manager.send_scheduled_email(email_scheduled)
+            send_results = email_manager.queue_scheduled_email(email_scheduled)
             email_scheduled_sent = send_results['email_scheduled_sent']
 
     results = {
@@ -979,7 +979,7 @@ def schedule_link_to_sign_in_email(
         email_scheduled = schedule_results['email_scheduled']
 
         if email_scheduled_saved:
-            send_results = email_manager.send_scheduled_email(email_scheduled)
+            send_results = email_manager.queue_scheduled_email(email_scheduled)
             email_scheduled_sent = send_results['email_scheduled_sent']
 
     results = {
@@ -1088,7 +1088,7 @@ def schedule_sign_in_code_email(
 
         if email_scheduled_saved:
             status += "EMAIL_SCHEDULED_SAVED "
-            send_results = email_manager.send_scheduled_email(email_scheduled)
+            send_results = email_manager.queue_scheduled_email(email_scheduled)
             status += send_results['status']
             email_scheduled_sent = send_results['email_scheduled_sent']
         else:
@@ -0,0 +1,266 @@
+# email_outbound/controllers_send_queue.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from datetime import timedelta
+import random
+import smtplib
+import threading
+from time import perf_counter
+
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils.timezone import now
+
+from .models import BEING_SENT, EMAIL_OUTBOUND_BACKEND, EMAIL_SEND_MAXIMUM_ATTEMPTS, EMAIL_SEND_RETRY_BASE_SECONDS, \
+    EmailScheduled, generate_email_message_from_email_scheduled, generate_sendgrid_mail_from_email_scheduled, \
+    get_sendgrid_client, get_smtp_connection, QUEUED, SEND_FAILED, SENT
+import wevote_functions.admin
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+EMAIL_SEND_RETRY_MAXIMUM_SECONDS = 6 * 60 * 60
+EMAIL_SEND_STALLED_SECONDS = 15 * 60  # A worker that claimed a batch this long ago, and never finished, has died
+
+email_send_counters_lock = threading.Lock()
+email_send_counters = {
+    'batch_count':      0,
+    'sent_count':       0,
+    'retry_count':      0,
+    'failed_count':     0,
+    'send_seconds':     0.0,
+}
+
+
+def calculate_email_send_retry_seconds(send_attempt_count, retry_base_seconds=EMAIL_SEND_RETRY_BASE_SECONDS):
+    """
+    Exponential backoff: base, 2 x base, 4 x base... capped at EMAIL_SEND_RETRY_MAXIMUM_SECONDS, plus up to 10%
+    jitter so a batch that failed together doesn't retry together.
+    """
+    retry_seconds = min(EMAIL_SEND_RETRY_MAXIMUM_SECONDS, retry_base_seconds * (2 ** max(0, send_attempt_count - 1)))
+    return retry_seconds + random.uniform(0, retry_seconds / 10)
+
+
+def is_permanent_email_send_error(error):
+    """
+    Errors that will fail the same way on every retry, like a rejected recipient
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+    status_code = getattr(error, 'status_code', None)  # python_http_client.exceptions.HTTPError, from SendGrid
+    if status_code is not None:
+        return 400 <= status_code < 500 and status_code != 429
+    return False
+
+
+def claim_queued_email_batch(batch_size=50):
+    """
+    Take up to batch_size QUEUED emails that are due, and mark them BEING_SENT. SKIP LOCKED lets any number of
+    workers, in any number of processes, claim at the same time without waiting on each other or sharing an email.
+    """
+    with transaction.atomic():
+        email_scheduled_list = list(
+            EmailScheduled.objects.select_for_update(skip_locked=True)
+            .filter(send_status=QUEUED)
+            .filter(Q(date_next_attempt__isnull=True) | Q(date_next_attempt__lte=now()))
+            .order_by('date_next_attempt', 'id')[:batch_size])
+        if len(email_scheduled_list):
+            EmailScheduled.objects.filter(id__in=[email_scheduled.id for email_scheduled in email_scheduled_list]) \
+                .update(send_status=BEING_SENT, date_last_changed=now())
+    for email_scheduled in email_scheduled_list:
+        email_scheduled.send_status = BEING_SENT
+    return email_scheduled_list
+
+
+def requeue_stalled_emails(stalled_seconds=EMAIL_SEND_STALLED_SECONDS):
+    """
+    Put emails claimed by a worker that died (or was killed) mid-batch back in the queue
+    """
+    return EmailScheduled.objects \
+        .filter(send_status=BEING_SENT, date_next_attempt__isnull=False,
+                date_last_changed__lt=now() - timedelta(seconds=stalled_seconds)) \
+        .update(send_status=QUEUED, date_next_attempt=now(), date_last_changed=now())
+
+
+def send_email_scheduled_batch_via_sendgrid(email_scheduled_list, sendgrid_client):
+    """
+    :return: One (email_scheduled, error) tuple per email. error is None when it was sent.
+    """
+    send_results_list = []
+    for email_scheduled in email_scheduled_list:
+        try:
+            sendgrid_client.send(generate_sendgrid_mail_from_email_scheduled(email_scheduled))
+            send_results_list.append((email_scheduled, None))
+        except Exception as e:
+            send_results_list.append((email_scheduled, e))
+    return send_results_list
+
+
+def send_email_scheduled_batch_via_smtp(email_scheduled_list, connection):
+    """
+    Send the whole batch over one SMTP session.
+    :return: One (email_scheduled, error) tuple per email. error is None when it was sent.
+    """
+    send_results_list = []
+    try:
+        connection.open()
+    except Exception as e:
+        return [(email_scheduled, e) for email_scheduled in email_scheduled_list]
+    try:
+        for email_scheduled in email_scheduled_list:
+            try:
+                message = generate_email_message_from_email_scheduled(email_scheduled, connection)
+                connection.send_messages([message])
+                send_results_list.append((email_scheduled, None))
+            except Exception as e:
+                send_results_list.append((email_scheduled, e))
+    finally:
+        try:
+            connection.close()
+        except Exception as e:
+            logger.error("send_email_scheduled_batch_via_smtp close: " + str(e))
+    return send_results_list
+
+
+def record_email_send_results(
+        send_results_list,
+        maximum_attempts=EMAIL_SEND_MAXIMUM_ATTEMPTS,
+        retry_base_seconds=EMAIL_SEND_RETRY_BASE_SECONDS):
+    """
+    Mark sent emails SENT, and put the others back in the queue with a later date_next_attempt, or SEND_FAILED once
+    they have used up their attempts (or can never succeed).
+    :return: (sent_count, retry_count, failed_count)
+    """
+    sent_id_list = []
+    retry_count = 0
+    failed_count = 0
+    for email_scheduled, error in send_results_list:
+        if error is None:
+            sent_id_list.append(email_scheduled.id)
+            continue
+        send_attempt_count = email_scheduled.send_attempt_count + 1
+        if send_attempt_count >= maximum_attempts or is_permanent_email_send_error(error):
+            send_status = SEND_FAILED
+            date_next_attempt = email_scheduled.date_next_attempt
+            failed_count += 1
+            logger.error("EMAIL_SEND_FAILED email_scheduled.id:" + str(email_scheduled.id) + " " + str(error))
+        else:
+            send_status = QUEUED
+            date_next_attempt = now() + timedelta(
+                seconds=calculate_email_send_retry_seconds(send_attempt_count, retry_base_seconds))
+            retry_count += 1
+        EmailScheduled.objects.filter(id=email_scheduled.id).update(
+            send_status=send_status,
+            send_attempt_count=send_attempt_count,
+            date_next_attempt=date_next_attempt,
+            last_send_error=str(error)[:1000],
+            date_last_changed=now())
+    if len(sent_id_list):
+        EmailScheduled.objects.filter(id__in=sent_id_list).update(
+            send_status=SENT, last_send_error=None, date_last_changed=now())
+    return len(sent_id_list), retry_count, failed_count
+
+
+def email_send_worker(batch_size=50, poll_seconds=5.0, run_once=False, stop_event=None):
+    """
+    Claim and send batches until stop_event is set. With run_once, stop as soon as the queue is empty instead.
+    Each worker keeps its own SendGrid client (or SMTP connection settings) for its whole life.
+    """
+    stop_event = stop_event or threading.Event()
+    sendgrid_client = None
+    smtp_connection = None
+    try:
+        while not stop_event.is_set():
+            try:
+                email_scheduled_list = claim_queued_email_batch(batch_size)
+            except Exception as e:
+                logger.error("email_send_worker claim_queued_email_batch: " + str(e))
+                connections.close_all()
+                stop_event.wait(poll_seconds)
+                continue
+            if not len(email_scheduled_list):
+                if run_once:
+                    break
+                stop_event.wait(poll_seconds)
+                continue
+
+            t0 = perf_counter()
+            if EMAIL_OUTBOUND_BACKEND == 'smtp':
+                if smtp_connection is None:
+                    smtp_connection = get_smtp_connection()
+                send_results_list = send_email_scheduled_batch_via_smtp(email_scheduled_list, smtp_connection)
+            else:
+                if sendgrid_client is None:
+                    sendgrid_client = get_sendgrid_client()
+                send_results_list = send_email_scheduled_batch_via_sendgrid(email_scheduled_list, sendgrid_client)
+            send_seconds = perf_counter() - t0
+            sent_count, retry_count, failed_count = record_email_send_results(send_results_list)
+            with email_send_counters_lock:
+                email_send_counters['batch_count'] += 1
+                email_send_counters['sent_count'] += sent_count
+                email_send_counters['retry_count'] += retry_count
+                email_send_counters['failed_count'] += failed_count
+                email_send_counters['send_seconds'] += send_seconds
+    finally:
+        # Each thread has its own database connections
+        connections.close_all()
+
+
+def run_email_send_workers(worker_count=4, batch_size=50, poll_seconds=5.0, run_once=False, stop_event=None):
+    """
+    Start worker_count email_send_worker threads, and return them. Sending is almost all waiting on SendGrid
+    (or the SMTP server), so threads get us parallel sends.
+    """
+    stop_event = stop_event or threading.Event()
+    worker_list = []
+    for worker_number in range(worker_count):
+        worker = threading.Thread(
+            target=email_send_worker,
+            name='email_send_worker_' + str(worker_number),
+            kwargs={
+                'batch_size':   batch_size,
+                'poll_seconds': poll_seconds,
+                'run_once':     run_once,
+                'stop_event':   stop_event,
+            },
+            daemon=True)
+        worker.start()
+        worker_list.append(worker)
+    return worker_list
+
+
+def email_send_counters_snapshot():
+    with email_send_counters_lock:
+        return dict(email_send_counters)
+
+
+def email_send_queue_stats():
+    """
+    For the admin statistics page. Read from the database, since the workers run in their own process.
+    """
+    stats = {
+        'queued_count':             0,
+        'due_count':                0,
+        'being_sent_count':         0,
+        'send_failed_count':        0,
+        'sent_last_hour_count':     0,
+        'oldest_due_minutes':       None,
+    }
+    try:
+        queryset = EmailScheduled.objects.using('readonly')
+        right_now = now()
+        stats['queued_count'] = queryset.filter(send_status=QUEUED).count()
+        due_queryset = queryset.filter(send_status=QUEUED, date_next_attempt__lte=right_now)
+        stats['due_count'] = due_queryset.count()
+        stats['being_sent_count'] = queryset.filter(send_status=BEING_SENT).count()
+        stats['send_failed_count'] = queryset.filter(send_status=SEND_FAILED).count()
+        stats['sent_last_hour_count'] = queryset.filter(
+            send_status=SENT, date_last_changed__gte=right_now - timedelta(hours=1)).count()
+        oldest_due = due_queryset.order_by('date_next_attempt').values_list('date_next_attempt', flat=True).first()
+        if oldest_due is not None:
+            stats['oldest_due_minutes'] = round((right_now - oldest_due).total_seconds() / 60, 1)
+    except Exception as e:
+        logger.error("email_send_queue_stats: " + str(e))
+    return stats
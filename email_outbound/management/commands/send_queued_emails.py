@@ -0,0 +1,67 @@
+import threading
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from config.base import get_environment_variable_default
+from email_outbound.controllers_send_queue import email_send_counters_snapshot, requeue_stalled_emails, \
+    run_email_send_workers
+from wevote_functions.functions import convert_to_int
+
+
+class Command(BaseCommand):
+    help = 'Sends the emails API requests have queued (EmailScheduled with send_status QUEUED), with a pool of ' \
+           'worker threads. Failed sends are retried with backoff. Safe to run on more than one server at once.'
+
+    @staticmethod
+    def add_arguments(parser):
+        parser.add_argument('--workers', type=int,
+                            default=convert_to_int(get_environment_variable_default("EMAIL_SEND_QUEUE_WORKERS", 4)))
+        parser.add_argument('--batch_size', type=int, default=50, help='Emails each worker claims at a time')
+        parser.add_argument('--poll_seconds', type=float, default=2.0, help='How long an idle worker waits')
+        parser.add_argument('--report_seconds', type=float, default=60.0, help='How often to print throughput')
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+
+    def handle(self, *args, **options):
+        requeued_count = requeue_stalled_emails()
+        if requeued_count:
+            self.stdout.write('Requeued {:,} emails left BEING_SENT by a stopped worker'.format(requeued_count))
+
+        stop_event = threading.Event()
+        worker_list = run_email_send_workers(
+            worker_count=options['workers'],
+            batch_size=options['batch_size'],
+            poll_seconds=options['poll_seconds'],
+            run_once=options['once'],
+            stop_event=stop_event)
+        t0 = perf_counter()
+        previous_counters = email_send_counters_snapshot()
+        try:
+            while any(worker.is_alive() for worker in worker_list):
+                report_t0 = perf_counter()
+                for worker in worker_list:
+                    worker.join(max(0.0, options['report_seconds'] - (perf_counter() - report_t0)))
+                if not options['once']:
+                    requeue_stalled_emails()
+                previous_counters = self.report(previous_counters, perf_counter() - report_t0)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping after the current batches...')
+            stop_event.set()
+            for worker in worker_list:
+                worker.join()
+        counters = email_send_counters_snapshot()
+        elapsed_seconds = perf_counter() - t0
+        self.stdout.write('Sent {:,}, retrying {:,}, failed {:,} in {:.1f} s ({:.1f} emails/s, {:.0f} ms/batch)'.format(
+            counters['sent_count'], counters['retry_count'], counters['failed_count'], elapsed_seconds,
+            counters['sent_count'] / elapsed_seconds if elapsed_seconds else 0,
+            1000 * counters['send_seconds'] / counters['batch_count'] if counters['batch_count'] else 0))
+
+    def report(self, previous_counters, interval_seconds):
+        counters = email_send_counters_snapshot()
+        sent_count = counters['sent_count'] - previous_counters['sent_count']
+        if sent_count or counters['batch_count'] != previous_counters['batch_count']:
+            self.stdout.write('Sent {:,} ({:.1f}/s), retrying {:,}, failed {:,}'.format(
+                sent_count, sent_count / interval_seconds if interval_seconds else 0,
+                counters['retry_count'] - previous_counters['retry_count'],
+                counters['failed_count'] - previous_counters['failed_count']))
+        return counters
@@ -3,14 +3,19 @@
 # -*- coding: UTF-8 -*-
 
 from datetime import date, timedelta
+import threading
 from django.apps import apps
 from django.db import models
 from django.core.mail import EmailMultiAlternatives, get_connection
-from config.base import get_environment_variable
+from django.utils.timezone import now
+from config.base import get_environment_variable, get_environment_variable_default
+import wevote_functions.admin
 from wevote_functions.functions import convert_to_int, extract_email_addresses_from_string, generate_random_string, \
     positive_value_exists
 from wevote_settings.models import fetch_next_we_vote_id_email_integer, fetch_site_unique_id_prefix
 
+logger = wevote_functions.admin.get_logger(__name__)
+
 CAMPAIGNX_NEWS_ITEM_TEMPLATE = 'CAMPAIGNX_NEWS_ITEM_TEMPLATE'
 CAMPAIGNX_FRIEND_HAS_SUPPORTED_TEMPLATE = 'CAMPAIGNX_FRIEND_HAS_SUPPORTED_TEMPLATE'
 CAMPAIGNX_SUPER_SHARE_ITEM_TEMPLATE = 'CAMPAIGNX_SUPER_SHARE_ITEM_TEMPLATE'
@@ -52,12 +57,16 @@ ASSEMBLY_STATUS_CHOICES = (
 )
 WAITING_FOR_VERIFICATION = 'WAITING_FOR_VERIFICATION'
 
+QUEUED = 'QUEUED'
 BEING_SENT = 'BEING_SENT'
 SENT = 'SENT'
+SEND_FAILED = 'SEND_FAILED'
 SEND_STATUS_CHOICES = (
     (TO_BE_PROCESSED,  'Message to be processed'),
+    (QUEUED, 'Message waiting for the send_queued_emails workers'),
     (BEING_SENT, 'Message being sent'),
     (SENT, 'Message sent'),
+    (SEND_FAILED, 'Message could not be sent'),
 )
 
 EMAIL_SECRET_KEY_LENGTH = 12
@@ -71,6 +80,13 @@ EMAIL_HOST_PASSWORD = get_environment_variable("EMAIL_HOST_PASSWORD", no_excepti
 EMAIL_PORT = get_environment_variable("EMAIL_PORT", no_exception=True)
 EMAIL_USE_TLS = get_environment_variable("EMAIL_USE_TLS", no_exception=True)
 
+# "sendgrid" (the SendGrid web API) or "smtp" (EMAIL_HOST above)
+EMAIL_OUTBOUND_BACKEND = get_environment_variable_default("EMAIL_OUTBOUND_BACKEND", "sendgrid")
+# When on, API requests only queue email. The send_queued_emails management command does the sending.
+EMAIL_SEND_QUEUE_ENABLED = positive_value_exists(get_environment_variable_default("EMAIL_SEND_QUEUE_ENABLED", False))
+EMAIL_SEND_MAXIMUM_ATTEMPTS = convert_to_int(get_environment_variable_default("EMAIL_SEND_MAXIMUM_ATTEMPTS", 6))
+EMAIL_SEND_RETRY_BASE_SECONDS = convert_to_int(get_environment_variable_default("EMAIL_SEND_RETRY_BASE_SECONDS", 60))
+
 
 class EmailAddress(models.Model):
     """
@@ -172,6 +188,111 @@ class EmailScheduled(models.Model):
     email_outbound_description_id = models.PositiveIntegerField(
         verbose_name="the internal id of EmailOutboundDescription", default=0, null=False)
     date_last_changed = models.DateTimeField(verbose_name='date last changed', null=True, auto_now=True)
+    # Used by the send queue (send_status QUEUED)
+    date_next_attempt = models.DateTimeField(null=True)
+    send_attempt_count = models.PositiveIntegerField(default=0, null=False)
+    last_send_error = models.TextField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['send_status', 'date_next_attempt'],
+                name='email_send_queue'),
+            models.Index(
+                fields=['send_status', 'date_last_changed'],
+                name='email_send_status_changed'),
+        ]
+
+
+sendgrid_client_local = threading.local()
+
+
+def get_sendgrid_client():
+    """
+    One SendGridAPIClient per thread, instead of one per email
+    """
+    sendgrid_client = getattr(sendgrid_client_local, 'sendgrid_client', None)
+    if sendgrid_client is None:
+        from sendgrid import SendGridAPIClient
+        sendgrid_client = SendGridAPIClient(SENDGRID_API_KEY)
+        sendgrid_client_local.sendgrid_client = sendgrid_client
+    return sendgrid_client
+
+
+def get_smtp_connection():
+    # For some reason the default Emailbackend doesn't have access to environment_variables.json directly
+    return get_connection(
+        username=EMAIL_HOST_USER,
+        password=EMAIL_HOST_PASSWORD,
+        host=EMAIL_HOST,
+        port=EMAIL_PORT)
+
+
+def generate_list_unsubscribe_headers_dict(email_scheduled):
+    headers_dict = {}
+    if email_scheduled.list_unsubscribe_mailto or email_scheduled.list_unsubscribe_url:
+        list_unsubscribe_text = ''
+        if email_scheduled.list_unsubscribe_mailto:
+            list_unsubscribe_text += \
+                "<mailto:{list_unsubscribe_mailto}>" \
+                "".format(list_unsubscribe_mailto=email_scheduled.list_unsubscribe_mailto)
+            if email_scheduled.list_unsubscribe_url:
+                list_unsubscribe_text += ", "
+        if email_scheduled.list_unsubscribe_url:
+            list_unsubscribe_text += \
+                "<{list_unsubscribe_url}>" \
+                "".format(list_unsubscribe_url=email_scheduled.list_unsubscribe_url)
+        headers_dict["List-Unsubscribe"] = list_unsubscribe_text
+        if email_scheduled.list_unsubscribe_url:
+            headers_dict["List-Unsubscribe-Post"] = "List-Unsubscribe=One-Click"
+    return headers_dict
+
+
+def generate_sendgrid_mail_from_email_scheduled(email_scheduled):
+    from sendgrid.helpers.mail import Content, From, Header, Mail, MimeType, Subject, To, ReplyTo
+    message = Mail()
+    if positive_value_exists(email_scheduled.sender_voter_name):
+        message.from_email = From(
+            'info@wevote.us',
+            "{sender_voter_name} via We Vote".format(sender_voter_name=email_scheduled.sender_voter_name))
+    else:
+        message.from_email = From('info@wevote.us', 'We Vote')
+    message.reply_to = ReplyTo('info@wevote.us', 'We Vote')
+    message.to = To(email_scheduled.recipient_voter_email, email_scheduled.recipient_voter_email, p=0)
+    try:
+        for header_key, header_value in generate_list_unsubscribe_headers_dict(email_scheduled).items():
+            message.add_header(Header(key=header_key, value=header_value))
+    except Exception as e:
+        logger.error("SEND_SCHEDULED_ADD_HEADER_ERROR: " + str(e))
+    message.subject = Subject(email_scheduled.subject)
+    message.content = Content(
+        MimeType.text,
+        email_scheduled.message_text)
+    message.content = Content(
+        MimeType.html,
+        email_scheduled.message_html)
+    return message
+
+
+def generate_email_message_from_email_scheduled(email_scheduled, connection):
+    if positive_value_exists(email_scheduled.sender_voter_name):
+        from_email = "{sender_voter_name} via We Vote <email_address>" \
+                     "".format(email_address='info@wevote.us',
+                               sender_voter_name=email_scheduled.sender_voter_name)
+    else:
+        from_email = "We Vote <email_address>" \
+                     "".format(email_address='info@wevote.us')
+    message = EmailMultiAlternatives(
+        subject=email_scheduled.subject,
+        body=email_scheduled.message_text,
+        from_email=from_email,
+        to=[email_scheduled.recipient_voter_email],
+        connection=connection,
+        reply_to=['We Vote <info@wevote.us>'],
+        headers=generate_list_unsubscribe_headers_dict(email_scheduled),
+    )
+    message.attach_alternative(email_scheduled.message_html, "text/html")
+    return message
 
 
 class EmailManager(models.Manager):
@@ -974,35 +1095,92 @@ class EmailManager(models.Manager):
         }
         return results
 
-    def send_scheduled_email(self, email_scheduled):
-        success = True
+    @staticmethod
+    def validate_scheduled_email(email_scheduled):
+        """
+        :return: Empty string if email_scheduled has everything needed to send it, otherwise the problems found
+        """
         status = ""
-
         # DALE 2016-11-3 sender_voter_email is no longer required, because we use a system email
         # if not positive_value_exists(email_scheduled.sender_voter_email):
         #     status += "MISSING_SENDER_VOTER_EMAIL"
-        #     success = False
 
         if not positive_value_exists(email_scheduled.recipient_voter_email):
             status += "MISSING_EMAIL_SCHEDULED_RECIPIENT_VOTER_EMAIL "
-            success = False
 
         if not positive_value_exists(email_scheduled.subject):
             status += "MISSING_EMAIL_SUBJECT "
-            success = False
 
         # We need either plain text or HTML message
         if not positive_value_exists(email_scheduled.message_text) and \
                 not positive_value_exists(email_scheduled.message_html):
             status += "MISSING_EMAIL_MESSAGE "
+        return status
+
+    def queue_scheduled_email(self, email_scheduled):
+        """
+        Hand email_scheduled to the send_queued_emails workers, so the request doesn't wait on SendGrid.
+        When EMAIL_SEND_QUEUE_ENABLED is off, send it now instead.
+        :param email_scheduled:
+        :return:
+        """
+        status = ""
+        email_scheduled_queued = False
+        email_scheduled_sent = False
+        if not EMAIL_SEND_QUEUE_ENABLED:
+            send_results = self.send_scheduled_email(email_scheduled)
+            status += send_results['status']
+            email_scheduled_sent = send_results['email_scheduled_sent']
+            if email_scheduled_sent:
+                self.update_scheduled_email_with_new_send_status(email_scheduled, SENT)
+            results = {
+                'success':                  send_results['success'],
+                'status':                   status,
+                'email_scheduled_queued':   email_scheduled_queued,
+                'email_scheduled_sent':     email_scheduled_sent,
+            }
+            return results
+
+        validation_status = self.validate_scheduled_email(email_scheduled)
+        if positive_value_exists(validation_status):
+            status += validation_status + "ERROR_DID_NOT_QUEUE: [email_scheduled.id:" + str(email_scheduled.id) + "] "
+            results = {
+                'success':                  False,
+                'status':                   status,
+                'email_scheduled_queued':   email_scheduled_queued,
+                'email_scheduled_sent':     email_scheduled_sent,
+            }
+            return results
+
+        try:
+            email_scheduled.send_status = QUEUED
+            email_scheduled.date_next_attempt = now()
+            email_scheduled.send_attempt_count = 0
+            email_scheduled.last_send_error = None
+            email_scheduled.save()
+            email_scheduled_queued = True
+            success = True
+            status += "EMAIL_SCHEDULED_QUEUED "
+        except Exception as e:
             success = False
+            status += "ERROR_EMAIL_SCHEDULED_NOT_QUEUED: " + str(e) + " "
+            logger.error(status)
 
-        if success:
-            send_via_sendgrid = True
-            if send_via_sendgrid:
-                return self.send_scheduled_email_via_sendgrid(email_scheduled)
-            else:
+        results = {
+            'success':                  success,
+            'status':                   status,
+            'email_scheduled_queued':   email_scheduled_queued,
+            'email_scheduled_sent':     email_scheduled_sent,
+        }
+        return results
+
+    def send_scheduled_email(self, email_scheduled):
+        status = self.validate_scheduled_email(email_scheduled)
+        if not positive_value_exists(status):
+            if EMAIL_OUTBOUND_BACKEND == 'smtp':
                 return self.send_scheduled_email_via_smtp(email_scheduled)
+            else:
+                return self.send_scheduled_email_via_sendgrid(email_scheduled)
         else:
             status += "ERROR_DID_NOT_SEND: ["
             try:
@@ -1013,7 +1191,7 @@ class EmailManager(models.Manager):
             status += "] "
             email_scheduled_sent = False
             results = {
-                'success': success,
+                'success': False,
                 'status': status,
                 'email_scheduled_sent': email_scheduled_sent,
             }
@@ -1026,8 +1204,6 @@ class EmailManager(models.Manager):
         :param email_scheduled:
         :return:
         """
-        from sendgrid import SendGridAPIClient
-        from sendgrid.helpers.mail import Content, From, Header, Mail, MimeType, Subject, To, ReplyTo
         status = ""
         success = True
         email_scheduled_sent = False
@@ -1043,47 +1219,9 @@ class EmailManager(models.Manager):
             return results
 
         try:
-            message = Mail()
-            if positive_value_exists(email_scheduled.sender_voter_name):
-                message.from_email = From(
-                    'info@wevote.us',
-                    "{sender_voter_name} via We Vote".format(sender_voter_name=email_scheduled.sender_voter_name))
-            else:
-                message.from_email = From('info@wevote.us', 'We Vote')
-            message.reply_to = ReplyTo('info@wevote.us', 'We Vote')
-            message.to = To(email_scheduled.recipient_voter_email, email_scheduled.recipient_voter_email, p=0)
-            try:
-                if email_scheduled.list_unsubscribe_mailto or email_scheduled.list_unsubscribe_url:
-                    list_unsubscribe_text = ''
-                    if email_scheduled.list_unsubscribe_mailto:
-                        list_unsubscribe_text += \
-                            "<mailto:{list_unsubscribe_mailto}>" \
-                            "".format(list_unsubscribe_mailto=email_scheduled.list_unsubscribe_mailto)
-                        if email_scheduled.list_unsubscribe_url:
-                            list_unsubscribe_text += ", "
-                    if email_scheduled.list_unsubscribe_url:
-                        list_unsubscribe_text += \
-                            "<{list_unsubscribe_url}>" \
-                            "".format(list_unsubscribe_url=email_scheduled.list_unsubscribe_url)
-                    message.add_header(
-                        Header(key="List-Unsubscribe", value=list_unsubscribe_text)
-                    )
-                    if email_scheduled.list_unsubscribe_url:
-                        message.add_header(
-                            Header(key="List-Unsubscribe-Post", value="List-Unsubscribe=One-Click")
-                        )
-            except Exception as e:
-                status += "SEND_SCHEDULED_ADD_HEADER_ERROR: " + str(e) + " "
-                print(status)
-            message.subject = Subject(email_scheduled.subject)
-            message.content = Content(
-                MimeType.text,
-                email_scheduled.message_text)
-            message.content = Content(
-                MimeType.html,
-                email_scheduled.message_html)
+            message = generate_sendgrid_mail_from_email_scheduled(email_scheduled)
             try:
-                sendgrid_client = SendGridAPIClient(SENDGRID_API_KEY)
+                sendgrid_client = get_sendgrid_client()
                 response = sendgrid_client.send(message)
                 # print(response.status_code)
                 # print(response.body)
@@ -1127,51 +1265,9 @@ class EmailManager(models.Manager):
             return results
 
         try:
-            # Prepare headers_dict
-            headers_dict = {}
-            try:
-                if email_scheduled.list_unsubscribe_mailto or email_scheduled.list_unsubscribe_url:
-                    list_unsubscribe_text = ''
-                    if email_scheduled.list_unsubscribe_mailto:
-                        list_unsubscribe_text += \
-                            "<mailto:{list_unsubscribe_mailto}>" \
-                            "".format(list_unsubscribe_mailto=email_scheduled.list_unsubscribe_mailto)
-                        if email_scheduled.list_unsubscribe_url:
-                            list_unsubscribe_text += ", "
-                    if email_scheduled.list_unsubscribe_url:
-                        list_unsubscribe_text += \
-                            "<{list_unsubscribe_url}>" \
-                            "".format(list_unsubscribe_url=email_scheduled.list_unsubscribe_url)
-                    headers_dict["List-Unsubscribe"] = list_unsubscribe_text
-                    if email_scheduled.list_unsubscribe_url:
-                        headers_dict["List-Unsubscribe-Post"] = "List-Unsubscribe=One-Click"
-            except Exception as e:
-                status += "SEND_SCHEDULED_ADD_HEADER_ERROR: " + str(e) + " "
-                print(status)
-            if positive_value_exists(email_scheduled.sender_voter_name):
-                from_email = "{sender_voter_name} via We Vote <email_address>" \
-                             "".format(email_address='info@wevote.us',
-                                       sender_voter_name=email_scheduled.sender_voter_name)
-            else:
-                from_email = "We Vote <email_address>" \
-                             "".format(email_address='info@wevote.us')
-            # For some reason the default Emailbackend doesn't have access to environment_variables.json directly
-            connection = get_connection(
-                username=EMAIL_HOST_USER,
-                password=EMAIL_HOST_PASSWORD,
-                host=EMAIL_HOST,
-                port=EMAIL_PORT)
+            connection = get_smtp_connection()
             connection.open()
-            message = EmailMultiAlternatives(
-                subject=email_scheduled.subject,
-                body=email_scheduled.message_text,
-                from_email=from_email,
-                to=[email_scheduled.recipient_voter_email],
-                connection=connection,
-                reply_to=['We Vote <info@wevote.us>'],
-                headers=headers_dict,
-            )
-            message.attach_alternative(email_scheduled.message_html, "text/html")
+            message = generate_email_message_from_email_scheduled(email_scheduled, connection)
 
             try:
                 message.send(fail_silently=False)
@@ -1258,21 +1354,11 @@ class EmailManager(models.Manager):
                             status += "ERROR_COULD_NOT_SAVE_SCHEDULED_EMAIL: " + str(e) + " "
                             success = False
                             print(status)
-                send_results = self.send_scheduled_email(scheduled_email)
+                # Moves it from WAITING_FOR_VERIFICATION to QUEUED (or SENT, if the send queue is off)
+                send_results = self.queue_scheduled_email(scheduled_email)
                 if not send_results['success']:
                     success = False
-                email_scheduled_sent = send_results['email_scheduled_sent']
                 status += send_results['status']
-                if email_scheduled_sent:
-                    # If scheduled email sent successfully change their status from WAITING_FOR_VERIFICATION to SENT
-                    send_status = SENT
-                    try:
-                        scheduled_email.send_status = send_status
-                        scheduled_email.save()
-                    except Exception as e:
-                        status += "ERROR_FAILED_TO_UPDATE_SEND_STATUS: " + str(e) + ' '
-                        success = False
-                        print(status)
         results = {
             'success':                  success,
             'status':                   status,
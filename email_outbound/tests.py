@@ -0,0 +1,102 @@
+# email_outbound/tests.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+import smtplib
+import socketserver
+import threading
+from django.core.mail import get_connection
+from django.test import SimpleTestCase
+from email_outbound.controllers_send_queue import calculate_email_send_retry_seconds, \
+    is_permanent_email_send_error, send_email_scheduled_batch_via_smtp
+from email_outbound.models import EmailScheduled
+
+
+class FakeSMTPHandler(socketserver.StreamRequestHandler):
+    """
+    Just enough SMTP to accept mail. Recipients at bounce.example.com are refused.
+    """
+
+    def reply(self, line):
+        self.wfile.write((line + '\r\n').encode('utf-8'))
+
+    def handle(self):
+        self.server.session_count += 1
+        recipient_list = []
+        self.reply('220 fake.example.com ESMTP')
+        for raw_line in self.rfile:
+            command = raw_line.decode('utf-8').strip()
+            verb = command.split(' ', 1)[0].split(':', 1)[0].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.reply('250 fake.example.com')
+            elif verb == 'MAIL':
+                recipient_list = []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                if 'bounce.example.com' in command:
+                    self.reply('550 No such user')
+                else:
+                    recipient_list.append(command.split(':', 1)[1].strip(' <>'))
+                    self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                message_line_list = []
+                for data_line in self.rfile:
+                    if data_line in (b'.\r\n', b'.\n'):
+                        break
+                    message_line_list.append(data_line.decode('utf-8'))
+                self.server.message_list.append((recipient_list, ''.join(message_line_list)))
+                self.reply('250 OK queued')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeSMTPHandler)
+        self.message_list = []
+        self.session_count = 0
+
+
+class EmailSendQueueTests(SimpleTestCase):
+
+    def setUp(self):
+        self.smtp_server = FakeSMTPServer()
+        threading.Thread(target=self.smtp_server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.smtp_server.shutdown()
+        self.smtp_server.server_close()
+
+    def test_smtp_batch_uses_one_session(self):
+        connection = get_connection(
+            'django.core.mail.backends.smtp.EmailBackend',
+            host='127.0.0.1', port=self.smtp_server.server_address[1], username='', password='', use_tls=False)
+        email_scheduled_list = [
+            EmailScheduled(id=email_number, subject='Hello ' + str(email_number), message_text='Plain',
+                           message_html='<p>Html</p>', list_unsubscribe_url='https://wevote.us/unsubscribe',
+                           recipient_voter_email=recipient_voter_email)
+            for email_number, recipient_voter_email in
+            enumerate(['one@example.com', 'nobody@bounce.example.com', 'two@example.com'])]
+        send_results_list = send_email_scheduled_batch_via_smtp(email_scheduled_list, connection)
+
+        self.assertEqual([error is None for email_scheduled, error in send_results_list], [True, False, True])
+        self.assertTrue(is_permanent_email_send_error(send_results_list[1][1]))
+        self.assertEqual([recipient_list for recipient_list, message in self.smtp_server.message_list],
+                         [['one@example.com'], ['two@example.com']])
+        self.assertIn('List-Unsubscribe: <https://wevote.us/unsubscribe>', self.smtp_server.message_list[0][1])
+        self.assertEqual(self.smtp_server.session_count, 1)
+
+    def test_retry_backoff(self):
+        retry_seconds_list = [calculate_email_send_retry_seconds(attempt, 60) for attempt in range(1, 12)]
+        self.assertTrue(60 <= retry_seconds_list[0] <= 66)
+        self.assertTrue(120 <= retry_seconds_list[1] <= 132)
+        self.assertTrue(all(retry_seconds <= 6 * 60 * 60 * 1.1 for retry_seconds in retry_seconds_list))
+        self.assertFalse(is_permanent_email_send_error(smtplib.SMTPServerDisconnected('Connection lost')))
+        self.assertFalse(is_permanent_email_send_error(smtplib.SMTPResponseException(421, 'Try again later')))
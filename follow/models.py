@@ -13,6 +13,7 @@ import pytz
 import wevote_functions.admin
 from wevote_functions.functions import positive_value_exists
 from wevote_functions.functions_date import generate_localized_datetime_from_obj, DATE_FORMAT_YMD
+from wevote_functions.functions_query import exclude_by_value_list
 from voter.models import VoterManager
 
 
@@ -1429,7 +1430,8 @@ class FollowOrganizationList(models.Model):
             queryset = FollowOrganization.objects.all()
             queryset = queryset.filter(voter_id=from_voter_id)
             if len(exclude_organization_we_vote_id_list):
-                queryset = queryset.exclude(organization_we_vote_id__in=exclude_organization_we_vote_id_list)
+                queryset = exclude_by_value_list(
+                    queryset, 'organization_we_vote_id', exclude_organization_we_vote_id_list)
             number_moved = queryset.update(
                 voter_id=to_voter_id,
             )
@@ -13,7 +13,7 @@ from config.base import get_environment_variable
 from email_outbound.controllers import schedule_email_with_email_outbound_description, schedule_verification_email
 from email_outbound.models import EmailAddress, EmailManager, EMAIL_SECRET_KEY_LENGTH, \
     FRIEND_ACCEPTED_INVITATION_TEMPLATE, \
-    FRIEND_INVITATION_TEMPLATE, MESSAGE_TO_FRIEND_TEMPLATE, REMIND_CONTACT, SENT, TO_BE_PROCESSED, \
+    FRIEND_INVITATION_TEMPLATE, MESSAGE_TO_FRIEND_TEMPLATE, REMIND_CONTACT, TO_BE_PROCESSED, \
     WAITING_FOR_VERIFICATION
 from follow.models import FollowIssueList
 from import_export_facebook.models import FacebookManager
@@ -26,6 +26,7 @@ from voter.models import Voter, VoterManager
 import wevote_functions.admin
 from wevote_functions.functions import generate_random_string, is_voter_device_id_valid, positive_value_exists
 from wevote_functions.functions_date import DATE_FORMAT_YMD_HMS
+from wevote_functions.functions_status import StatusTrace
 
 logger = wevote_functions.admin.get_logger(__name__)
 
@@ -370,18 +371,8 @@ def friend_accepted_invitation_send(
             if schedule_results['email_scheduled_saved']:
                 # messages_to_send.append(schedule_results['email_scheduled_id'])
                 email_scheduled = schedule_results['email_scheduled']
-                send_results = email_manager.send_scheduled_email(email_scheduled)
-                email_scheduled_sent = send_results['email_scheduled_sent']
+                send_results = email_manager.queue_scheduled_email(email_scheduled)
                 status += send_results['status']
-                if email_scheduled_sent:
-                    # If scheduled email sent successfully change their status from WAITING_FOR_VERIFICATION to SENT
-                    send_status = SENT
-                    try:
-                        email_scheduled.send_status = send_status
-                        email_scheduled.save()
-                    except Exception as e:
-                        status += "ERROR_FAILED_TO_UPDATE_FRIEND_ACCEPTED_SEND_STATUS: " + str(e) + ' '
-                        print(status)
 
     results = {
         'success':      True,
@@ -673,9 +664,9 @@ def send_reminder_to_one_contact(
         if schedule_results['email_scheduled_saved']:
             # messages_to_send.append(schedule_results['email_scheduled_id'])
             email_scheduled = schedule_results['email_scheduled']
-            send_results = email_manager.send_scheduled_email(email_scheduled)
+            send_results = email_manager.queue_scheduled_email(email_scheduled)
             email_scheduled_sent = send_results['email_scheduled_sent']
-            if positive_value_exists(email_scheduled_sent):
+            if positive_value_exists(email_scheduled_sent) or send_results['email_scheduled_queued']:
                 number_of_messages_sent = 1
             status += send_results['status']
     else:
@@ -1183,7 +1174,7 @@ def send_to_one_friend(
             if schedule_results['email_scheduled_saved']:
                 # messages_to_send.append(schedule_results['email_scheduled_id'])
                 email_scheduled = schedule_results['email_scheduled']
-                send_results = email_manager.send_scheduled_email(email_scheduled)
+                send_results = email_manager.queue_scheduled_email(email_scheduled)
                 email_scheduled_sent = send_results['email_scheduled_sent']
                 status += send_results['status']
         elif not send_now:
@@ -2407,7 +2398,7 @@ def friend_invitation_by_we_vote_id_send_for_api(  # friendInvitationByWeVoteIdS
                     if schedule_results['email_scheduled_saved']:
                         # messages_to_send.append(schedule_results['email_scheduled_id'])
                         email_scheduled = schedule_results['email_scheduled']
-                        send_results = email_manager.send_scheduled_email(email_scheduled)
+                        send_results = email_manager.queue_scheduled_email(email_scheduled)
                         email_scheduled_sent = send_results['email_scheduled_sent']
                         status += send_results['status']
 
@@ -2686,7 +2677,7 @@ def generate_mutual_friends_for_all_voters():
     total_mutual_friends_created_count = 0
     total_mutual_friends_updated_count = 0
     total_mutual_friends_update_suppressed_count = 0
-    status = ""
+    status = StatusTrace()
     success = False
 
     current_friend_queryset = CurrentFriend.objects.all()
@@ -2751,7 +2742,7 @@ def generate_mutual_friends_for_all_voters():
 
     results = {
         'success':                          success,
-        'status':                           status,
+        'status':                           str(status),
     }
     return results
 
@@ -3938,7 +3929,7 @@ def message_to_friend_send_for_api(
                 if schedule_results['email_scheduled_saved']:
                     # messages_to_send.append(schedule_results['email_scheduled_id'])
                     email_scheduled = schedule_results['email_scheduled']
-                    send_results = email_manager.send_scheduled_email(email_scheduled)
+                    send_results = email_manager.queue_scheduled_email(email_scheduled)
                     email_scheduled_sent = send_results['email_scheduled_sent']
                     status += send_results['status']
 
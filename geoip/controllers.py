@@ -2,15 +2,324 @@
 # Brought to you by We Vote. Be good.
 # -*- coding: UTF-8 -*-
 
+import json
+import os
 import sys
-from ipaddress import IPv4Address
+import threading
+from ipaddress import ip_address as parse_ip_address, IPv4Address
+from time import monotonic
 import geoip2.database
+from geopy.location import Location
 import wevote_functions.admin
 from config.base import get_environment_variable_default
+from geoip.models import GeocodeCacheManager, generate_geocode_cache_key, normalize_address_for_geocode
 from wevote_functions.functions import get_ip_from_headers, positive_value_exists
+from wevote_functions.functions_cache import CACHE_VALUE_NOT_FOUND, LocalTTLCache
 
 logger = wevote_functions.admin.get_logger(__name__)
 
+# One memory-mapped Reader per process, instead of opening and parsing the mmdb on every request.
+#  We look at the file's modification time every GEOIP_READER_RECHECK_SECONDS, and reopen it after
+#  update_geoip_data (or a deploy) replaces it.
+GEOIP_READER_RECHECK_SECONDS = 60
+GEOIP_LOCATION_CACHE_MAX_ENTRIES = int(get_environment_variable_default("GEOIP_LOCATION_CACHE_MAX_ENTRIES", 50000))
+geoip_location_cache = LocalTTLCache(
+    cache_name='geoip_location',
+    max_entries=GEOIP_LOCATION_CACHE_MAX_ENTRIES,
+    time_to_live_seconds=86400)
+geoip_reader_state = {
+    'reader':               None,
+    'database_location':    None,
+    'file_modified_time':   None,
+    'last_checked':         0.0,
+}
+geoip_reader_lock = threading.Lock()
+geoip_lookup_counters = {
+    'reader_open_count':            0,
+    'reader_lookup_count':          0,
+    'reader_lookup_milliseconds':   0.0,
+    'single_call_count':            0,
+    'single_call_milliseconds':     0.0,
+    'batch_call_count':             0,
+    'batch_ip_address_count':       0,
+    'batch_call_milliseconds':      0.0,
+}
+
+
+def get_geoip_reader():
+    database_location = get_environment_variable_default(
+        'GEOLITE2_DATABASE_LOCATION', 'geoip2/city-db/GeoLite2-City.mmdb')
+    reader = geoip_reader_state['reader']
+    if reader is not None and database_location == geoip_reader_state['database_location'] \
+            and monotonic() - geoip_reader_state['last_checked'] < GEOIP_READER_RECHECK_SECONDS:
+        return reader
+
+    with geoip_reader_lock:
+        file_modified_time = os.path.getmtime(database_location)
+        geoip_reader_state['last_checked'] = monotonic()
+        if geoip_reader_state['reader'] is not None \
+                and database_location == geoip_reader_state['database_location'] \
+                and file_modified_time == geoip_reader_state['file_modified_time']:
+            return geoip_reader_state['reader']
+        old_reader = geoip_reader_state['reader']
+        geoip_reader_state['reader'] = geoip2.database.Reader(database_location, mode=geoip2.database.MODE_MMAP)
+        geoip_reader_state['database_location'] = database_location
+        geoip_reader_state['file_modified_time'] = file_modified_time
+        geoip_lookup_counters['reader_open_count'] += 1
+        # Locations from the old file may have changed
+        geoip_location_cache.clear()
+        if old_reader is not None:
+            # Another thread may still be reading from it, so let garbage collection close it
+            logger.info("get_geoip_reader reopened " + database_location)
+        return geoip_reader_state['reader']
+
+
+def retrieve_location_from_ip_address(ip_address):
+    """
+    Look up one IP address, from geoip_location_cache if we can. Doesn't do the private IP substitution that
+    voter_location_retrieve_from_ip_for_api does.
+    :param ip_address: string
+    :return: dict with success, status, voter_location_found, voter_location, city, region, postal_code,
+     country_code
+    """
+    location = geoip_location_cache.get(ip_address)
+    if location is not CACHE_VALUE_NOT_FOUND:
+        return location
+
+    location = {
+        'success':              True,
+        'status':               '',
+        'voter_location_found': False,
+        'voter_location':       '',
+        'city':                 '',
+        'region':               '',  # could be state_code
+        'postal_code':          '',
+        'country_code':         '',
+    }
+    t0 = monotonic()
+    try:
+        response = get_geoip_reader().city(ip_address)
+    except geoip2.errors.AddressNotFoundError as e:
+        if 'test' not in sys.argv:
+            logger.error("retrieve_location_from_ip_address ip " + ip_address + " not found: " + str(e))
+        location['status'] = 'LOCATION_NOT_FOUND'
+        # Cache the miss too, so repeated requests from unknown addresses don't keep hitting the reader
+        geoip_location_cache.set(ip_address, location)
+        return location
+    except Exception as e:
+        logger.error("retrieve_location_from_ip_address ip " + ip_address + " lookup failed: " + str(e))
+        location['success'] = False
+        location['status'] = 'GEOIP_LOOKUP_FAILED: ' + str(e)
+        return location
+    finally:
+        geoip_lookup_counters['reader_lookup_count'] += 1
+        geoip_lookup_counters['reader_lookup_milliseconds'] += (monotonic() - t0) * 1000
+
+    voter_location = ''
+    try:
+        if response.city.name:
+            location['city'] = response.city.name
+            voter_location += location['city']
+            if response.subdivisions.most_specific.iso_code or response.postal.code:
+                voter_location += ', '
+        if response.subdivisions.most_specific.iso_code:
+            location['region'] = response.subdivisions.most_specific.iso_code
+            voter_location += location['region']
+            if response.postal.code:
+                voter_location += ' '
+        if response.postal.code:
+            location['postal_code'] = response.postal.code
+            voter_location += location['postal_code']
+        if response.country.iso_code:
+            location['country_code'] = response.country.iso_code
+        location['voter_location'] = voter_location
+        if positive_value_exists(voter_location):
+            location['status'] = 'LOCATION_FOUND'
+            location['voter_location_found'] = True
+        else:
+            location['status'] = 'IP_FOUND_BUT_LOCATION_NOT_RETURNED'
+        geoip_location_cache.set(ip_address, location)
+    except Exception as e:
+        logger.error("retrieve_location_from_ip_address ip " + ip_address + " parse error: " + str(e))
+        location['status'] = str(e)
+        location['success'] = False
+
+    return location
+
+
+def voter_location_list_retrieve_from_ip_list(ip_address_list=[]):
+    """
+    Geolocate many IP addresses at once (ex/ for the analytics pipeline). Each unique address is looked up once.
+    Private and invalid addresses come back with voter_location_found False -- unlike
+    voter_location_retrieve_from_ip_for_api, we don't substitute a test address for them.
+    :param ip_address_list:
+    :return:
+    """
+    status = ''
+    t0 = monotonic()
+    location_by_ip_address = {}
+    for ip_address in ip_address_list:
+        ip_address = str(ip_address).strip()
+        if ip_address in location_by_ip_address:
+            continue
+        try:
+            valid_ip_address = parse_ip_address(ip_address)
+        except ValueError:
+            valid_ip_address = None
+        if valid_ip_address is None or valid_ip_address.is_private:
+            location_by_ip_address[ip_address] = {
+                'success':              True,
+                'status':               'IP_ADDRESS_NOT_VALID' if valid_ip_address is None else 'IP_ADDRESS_PRIVATE',
+                'voter_location_found': False,
+                'voter_location':       '',
+                'city':                 '',
+                'region':               '',
+                'postal_code':          '',
+                'country_code':         '',
+            }
+            continue
+        location_by_ip_address[ip_address] = retrieve_location_from_ip_address(ip_address)
+
+    milliseconds = (monotonic() - t0) * 1000
+    geoip_lookup_counters['batch_call_count'] += 1
+    geoip_lookup_counters['batch_ip_address_count'] += len(location_by_ip_address)
+    geoip_lookup_counters['batch_call_milliseconds'] += milliseconds
+    success = all(location['success'] for location in location_by_ip_address.values())
+    if not success:
+        status += 'SOME_IP_ADDRESS_LOOKUPS_FAILED '
+    status += 'IP_ADDRESSES_GEOLOCATED: ' + str(len(location_by_ip_address)) + ' '
+    results = {
+        'success':                  success,
+        'status':                   status,
+        'location_by_ip_address':   location_by_ip_address,
+        'milliseconds':             round(milliseconds, 3),
+    }
+    return results
+
+
+def geoip_location_cache_stats():
+    stats = geoip_location_cache.stats()
+    stats.update(geoip_lookup_counters)
+    stats['average_reader_lookup_milliseconds'] = \
+        round(stats['reader_lookup_milliseconds'] / stats['reader_lookup_count'], 3) \
+        if stats['reader_lookup_count'] else 0.0
+    stats['average_single_call_milliseconds'] = \
+        round(stats['single_call_milliseconds'] / stats['single_call_count'], 3) \
+        if stats['single_call_count'] else 0.0
+    stats['average_batch_ip_address_milliseconds'] = \
+        round(stats['batch_call_milliseconds'] / stats['batch_ip_address_count'], 3) \
+        if stats['batch_ip_address_count'] else 0.0
+    return stats
+
+
+# Google geocoder answers, keyed by normalized address: in this process first, then in the GeocodeCache table.
+#  Addresses the geocoder could not place are remembered too, for GEOCODE_CACHE_NOT_FOUND_SECONDS.
+GEOCODE_CACHE_FOUND_SECONDS = int(get_environment_variable_default("GEOCODE_CACHE_FOUND_SECONDS", 2592000))
+GEOCODE_CACHE_NOT_FOUND_SECONDS = int(get_environment_variable_default("GEOCODE_CACHE_NOT_FOUND_SECONDS", 86400))
+GEOCODE_COALESCE_WAIT_SECONDS = 15
+geocode_local_cache = LocalTTLCache(
+    cache_name='geocode',
+    max_entries=20000,
+    time_to_live_seconds=3600)
+# geocode_cache_key -> threading.Event, for the lookups that are on their way to the geocoder right now
+geocode_in_flight = {}
+geocode_in_flight_lock = threading.Lock()
+geocode_counters = {
+    'database_hit_count':       0,
+    'database_lookup_count':    0,
+    'geocoder_call_count':      0,
+    'coalesced_count':          0,
+}
+
+
+def generate_location_from_geocode_cache_values(geocode_cache_values):
+    if geocode_cache_values is None:
+        return None
+    address, latitude, longitude, raw = geocode_cache_values
+    return Location(address, (latitude, longitude), raw or {})
+
+
+def geocode_with_cache(google_client, text_for_map_search, timeout=None):
+    """
+    Use in place of google_client.geocode(text_for_map_search, sensor=False, timeout=timeout).
+    Returns the same geopy Location (or None when the address wasn't found), and raises the same exceptions
+    (ex/ GeocoderQuotaExceeded), which are never cached. Concurrent requests in this process for the same address
+    wait for the first one, instead of each calling the geocoder.
+    :param google_client:
+    :param text_for_map_search:
+    :param timeout:
+    :return:
+    """
+    normalized_address = normalize_address_for_geocode(text_for_map_search)
+    if not positive_value_exists(normalized_address):
+        return google_client.geocode(text_for_map_search, sensor=False, timeout=timeout)
+    geocode_cache_key = generate_geocode_cache_key(normalized_address)
+
+    for attempt in range(2):
+        geocode_cache_values = geocode_local_cache.get(geocode_cache_key)
+        if geocode_cache_values is not CACHE_VALUE_NOT_FOUND:
+            return generate_location_from_geocode_cache_values(geocode_cache_values)
+
+        with geocode_in_flight_lock:
+            in_flight_event = geocode_in_flight.get(geocode_cache_key)
+            leader = in_flight_event is None
+            if leader:
+                in_flight_event = threading.Event()
+                geocode_in_flight[geocode_cache_key] = in_flight_event
+        if leader:
+            break
+        geocode_counters['coalesced_count'] += 1
+        # If the leader failed (ex/ quota), nothing was cached, and we make our own attempt below
+        in_flight_event.wait(GEOCODE_COALESCE_WAIT_SECONDS)
+    else:
+        return google_client.geocode(text_for_map_search, sensor=False, timeout=timeout)
+
+    try:
+        geocode_counters['database_lookup_count'] += 1
+        geocode_cache = GeocodeCacheManager.retrieve_geocode_cache(
+            geocode_cache_key,
+            found_seconds=GEOCODE_CACHE_FOUND_SECONDS,
+            not_found_seconds=GEOCODE_CACHE_NOT_FOUND_SECONDS)
+        if geocode_cache is not None:
+            geocode_counters['database_hit_count'] += 1
+            if geocode_cache.location_found:
+                geocode_cache_values = (
+                    geocode_cache.address, geocode_cache.latitude, geocode_cache.longitude,
+                    json.loads(geocode_cache.raw_json or '{}'))
+            else:
+                geocode_cache_values = None
+            geocode_local_cache.set(
+                geocode_cache_key, geocode_cache_values,
+                time_to_live_seconds=None if geocode_cache.location_found else
+                min(GEOCODE_CACHE_NOT_FOUND_SECONDS, geocode_local_cache.time_to_live_seconds))
+            return generate_location_from_geocode_cache_values(geocode_cache_values)
+
+        geocode_counters['geocoder_call_count'] += 1
+        location = google_client.geocode(text_for_map_search, sensor=False, timeout=timeout)
+        if location is None:
+            geocode_cache_values = None
+            local_seconds = min(GEOCODE_CACHE_NOT_FOUND_SECONDS, geocode_local_cache.time_to_live_seconds)
+        else:
+            geocode_cache_values = \
+                (location.address, location.latitude, location.longitude, getattr(location, 'raw', None))
+            local_seconds = None
+        geocode_local_cache.set(geocode_cache_key, geocode_cache_values, time_to_live_seconds=local_seconds)
+        results = GeocodeCacheManager.update_or_create_geocode_cache(
+            geocode_cache_key, normalized_address, location=location)
+        if not results['success']:
+            logger.error("geocode_with_cache: " + results['status'])
+        return location
+    finally:
+        with geocode_in_flight_lock:
+            geocode_in_flight.pop(geocode_cache_key, None)
+        in_flight_event.set()
+
+
+def geocode_cache_stats():
+    stats = geocode_local_cache.stats()
+    stats.update(geocode_counters)
+    return stats
+
 
 def voter_location_retrieve_from_ip_for_api(request, ip_address=''):
     """
@@ -61,75 +370,20 @@ def voter_location_retrieve_from_ip_for_api(request, ip_address=''):
         except Exception as e:
             pass
 
-    try:
-        database_location = get_environment_variable_default('GEOLITE2_DATABASE_LOCATION', 'geoip2/city-db/GeoLite2-City.mmdb')
-        reader = geoip2.database.Reader(database_location)
-        response = reader.city(value)
-
-    except geoip2.errors.AddressNotFoundError as e:
-        if 'test' not in sys.argv:
-            logger.error("voter_location_retrieve_from_ip_for_api ip " + value + " not found: " + str(e))
-
-        response_content = {
-            'success':              True,
-            'status':               'LOCATION_NOT_FOUND',
-            'voter_location_found': False,
-            'voter_location':       '',
-            'city':                 '',
-            'region':               '',
-            'postal_code':          '',
-            'country_code':         '',
-            'ip_address':           value,
-            'x_forwarded_for':      x_forwarded_for,
-            'http_x_forwarded_for': http_x_forwarded_for,
-        }
-
-        return response_content
-
-    voter_location = ''
-    city = ''
-    region = ''  # could be state_code
-    postal_code = ''
-    country_code = ''
-    success = True
-    voter_location_found = False
-    try:
-        if response.city.name:
-            city = response.city.name
-            voter_location += city
-            if response.subdivisions.most_specific.iso_code or response.postal.code:
-                voter_location += ', '
-        if response.subdivisions.most_specific.iso_code:
-            region = response.subdivisions.most_specific.iso_code
-            voter_location += region
-            if response.postal.code:
-                voter_location += ' '
-        if response.postal.code:
-            postal_code = response.postal.code
-            voter_location += postal_code
-        if response.country.iso_code:
-            country_code = response.country.iso_code
-        if positive_value_exists(voter_location):
-            status = 'LOCATION_FOUND'
-            voter_location_found = True
-        else:
-            status = 'IP_FOUND_BUT_LOCATION_NOT_RETURNED'
-            voter_location_found = False
-
-    except Exception as e:
-        logger.error("voter_location_retrieve_from_ip_for_api ip " + value + " parse error: " + str(e))
-        status = str(e)
-        success = False
+    t0 = monotonic()
+    location = retrieve_location_from_ip_address(value)
+    geoip_lookup_counters['single_call_count'] += 1
+    geoip_lookup_counters['single_call_milliseconds'] += (monotonic() - t0) * 1000
 
     response_content = {
-        'success':              success,
-        'status':               status,
-        'voter_location_found': voter_location_found,
-        'voter_location':       voter_location,
-        'city':                 city,
-        'region':               region,
-        'postal_code':          postal_code,
-        'country_code':         country_code,
+        'success':              location['success'],
+        'status':               location['status'],
+        'voter_location_found': location['voter_location_found'],
+        'voter_location':       location['voter_location'],
+        'city':                 location['city'],
+        'region':               location['region'],
+        'postal_code':          location['postal_code'],
+        'country_code':         location['country_code'],
         'ip_address':           value,
         'x_forwarded_for':      x_forwarded_for,
         'http_x_forwarded_for': http_x_forwarded_for,
@@ -1,3 +1,99 @@
+# geoip/models.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+import hashlib
+import json
+from datetime import timedelta
+
 from django.db import models
+from django.utils.timezone import now
+
+import wevote_functions.admin
+from wevote_functions.functions import positive_value_exists
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+
+def normalize_address_for_geocode(text_for_map_search):
+    """
+    "  1200 Broadway Ave ,Oakland, CA  " and "1200 broadway ave, oakland, ca" are the same geocoder request.
+    """
+    if not positive_value_exists(text_for_map_search):
+        return ''
+    address_part_list = [
+        ' '.join(address_part.split()) for address_part in str(text_for_map_search).lower().split(',')]
+    return ', '.join(address_part for address_part in address_part_list if address_part).strip(' .')
+
+
+def generate_geocode_cache_key(normalized_address):
+    return hashlib.sha256(normalized_address.encode('utf-8')).hexdigest()
+
+
+class GeocodeCache(models.Model):
+    """
+    One geocoder answer for a normalized address, so busy election days don't spend quota (and a round trip to
+    Google) on addresses we have already looked up. location_found is False for addresses the geocoder couldn't
+    place, which we remember for a shorter time.
+    """
+    geocode_cache_key = models.CharField(max_length=64, unique=True, null=False)
+    normalized_address = models.TextField(null=True, blank=True)
+    location_found = models.BooleanField(default=False)
+    address = models.TextField(null=True, blank=True)
+    latitude = models.FloatField(null=True)
+    longitude = models.FloatField(null=True)
+    raw_json = models.TextField(null=True, blank=True)
+    date_geocoded = models.DateTimeField(null=True, auto_now=True, db_index=True)
+
+
+class GeocodeCacheManager(models.Manager):
+
+    def __unicode__(self):
+        return "GeocodeCacheManager"
+
+    @staticmethod
+    def retrieve_geocode_cache(geocode_cache_key, found_seconds, not_found_seconds):
+        """
+        :return: The GeocodeCache entry, or None if we don't have one that is still fresh
+        """
+        try:
+            geocode_cache = GeocodeCache.objects.using('readonly').filter(geocode_cache_key=geocode_cache_key).first()
+        except Exception as e:
+            logger.error("retrieve_geocode_cache: " + str(e))
+            return None
+        if geocode_cache is None:
+            return None
+        time_to_live_seconds = found_seconds if geocode_cache.location_found else not_found_seconds
+        if geocode_cache.date_geocoded is None \
+                or geocode_cache.date_geocoded < now() - timedelta(seconds=time_to_live_seconds):
+            return None
+        return geocode_cache
 
-# Create your models here.
+    @staticmethod
+    def update_or_create_geocode_cache(geocode_cache_key, normalized_address, location=None):
+        """
+        :param geocode_cache_key:
+        :param normalized_address:
+        :param location: geopy Location, or None when the geocoder didn't find the address
+        :return:
+        """
+        status = ''
+        success = True
+        try:
+            defaults = {
+                'normalized_address':   normalized_address,
+                'location_found':       location is not None,
+                'address':              location.address if location is not None else None,
+                'latitude':             location.latitude if location is not None else None,
+                'longitude':            location.longitude if location is not None else None,
+                'raw_json':             json.dumps(getattr(location, 'raw', None)) if location is not None else None,
+            }
+            GeocodeCache.objects.update_or_create(geocode_cache_key=geocode_cache_key, defaults=defaults)
+            status += "GEOCODE_CACHE_SAVED "
+        except Exception as e:
+            status += "GEOCODE_CACHE_NOT_SAVED: " + str(e) + " "
+            success = False
+        return {
+            'success':  success,
+            'status':   status,
+        }
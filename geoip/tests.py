@@ -1,3 +1,123 @@
-from django.test import TestCase
+# geoip/tests.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
 
-# Create your tests here.
+import threading
+from time import sleep
+from types import SimpleNamespace
+from unittest import mock
+from django.test import SimpleTestCase
+import geoip2.errors
+from geoip import controllers
+from geoip.controllers import geocode_local_cache, geocode_with_cache, geoip_location_cache, \
+    retrieve_location_from_ip_address, voter_location_list_retrieve_from_ip_list
+from geoip.models import GeocodeCacheManager, normalize_address_for_geocode
+
+
+class FakeGeoIPReader(object):
+
+    def __init__(self):
+        self.lookup_list = []
+
+    def city(self, ip_address):
+        self.lookup_list.append(ip_address)
+        if ip_address == '8.8.4.4':
+            raise geoip2.errors.AddressNotFoundError(ip_address)
+        return SimpleNamespace(
+            city=SimpleNamespace(name='Oakland'),
+            subdivisions=SimpleNamespace(most_specific=SimpleNamespace(iso_code='CA')),
+            postal=SimpleNamespace(code='94607'),
+            country=SimpleNamespace(iso_code='US'))
+
+
+class GeoIPControllersTests(SimpleTestCase):
+
+    def setUp(self):
+        geoip_location_cache.clear()
+        self.reader = FakeGeoIPReader()
+        patcher = mock.patch.object(controllers, 'get_geoip_reader', return_value=self.reader)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(geoip_location_cache.clear)
+
+    def test_location_is_cached(self):
+        location = retrieve_location_from_ip_address('73.158.32.221')
+        self.assertEqual(location['voter_location'], 'Oakland, CA 94607')
+        self.assertEqual(retrieve_location_from_ip_address('73.158.32.221'), location)
+        self.assertEqual(self.reader.lookup_list, ['73.158.32.221'])
+
+    def test_batch_looks_up_each_address_once(self):
+        results = voter_location_list_retrieve_from_ip_list(
+            ['73.158.32.221', '8.8.4.4', '73.158.32.221', '10.0.0.1', 'not an ip', '8.8.4.4'])
+        location_by_ip_address = results['location_by_ip_address']
+        self.assertTrue(results['success'])
+        self.assertEqual(self.reader.lookup_list, ['73.158.32.221', '8.8.4.4'])
+        self.assertTrue(location_by_ip_address['73.158.32.221']['voter_location_found'])
+        self.assertEqual(location_by_ip_address['8.8.4.4']['status'], 'LOCATION_NOT_FOUND')
+        self.assertEqual(location_by_ip_address['10.0.0.1']['status'], 'IP_ADDRESS_PRIVATE')
+        self.assertEqual(location_by_ip_address['not an ip']['status'], 'IP_ADDRESS_NOT_VALID')
+
+
+class StubGeocoder(object):
+
+    def __init__(self, delay_seconds=0.0):
+        self.delay_seconds = delay_seconds
+        self.query_list = []
+
+    def geocode(self, query, sensor=False, timeout=None):
+        self.query_list.append(query)
+        sleep(self.delay_seconds)
+        if 'nowhere' in query.lower():
+            return None
+        return SimpleNamespace(address='1200 Broadway, Oakland, CA 94612, USA', latitude=37.8030442,
+                               longitude=-122.2739699, raw={'place_id': 'stub'})
+
+
+class GeocodeCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        geocode_local_cache.clear()
+        self.saved_list = []
+        patcher_list = [
+            mock.patch.object(GeocodeCacheManager, 'retrieve_geocode_cache', return_value=None),
+            mock.patch.object(GeocodeCacheManager, 'update_or_create_geocode_cache',
+                              side_effect=lambda key, address, location=None: self.saved_list.append(address) or
+                              {'success': True, 'status': ''}),
+        ]
+        for patcher in patcher_list:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(geocode_local_cache.clear)
+
+    def test_normalize_address_for_geocode(self):
+        self.assertEqual(normalize_address_for_geocode('  1200 Broadway  Ave ,Oakland, CA. '),
+                         '1200 broadway ave, oakland, ca')
+
+    def test_second_lookup_is_cached(self):
+        geocoder = StubGeocoder()
+        location = geocode_with_cache(geocoder, '1200 Broadway, Oakland, CA')
+        location_again = geocode_with_cache(geocoder, '1200 BROADWAY,  Oakland, CA')
+        self.assertEqual(geocoder.query_list, ['1200 Broadway, Oakland, CA'])
+        self.assertEqual((location_again.latitude, location_again.longitude), (location.latitude, location.longitude))
+        self.assertEqual(location_again.raw, {'place_id': 'stub'})
+        self.assertEqual(self.saved_list, ['1200 broadway, oakland, ca'])
+
+    def test_not_found_is_cached(self):
+        geocoder = StubGeocoder()
+        self.assertIsNone(geocode_with_cache(geocoder, 'Nowhere, ZZ'))
+        self.assertIsNone(geocode_with_cache(geocoder, 'nowhere, zz'))
+        self.assertEqual(len(geocoder.query_list), 1)
+
+    def test_concurrent_lookups_share_one_geocoder_call(self):
+        geocoder = StubGeocoder(delay_seconds=0.2)
+        location_list = []
+        thread_list = [
+            threading.Thread(target=lambda: location_list.append(geocode_with_cache(geocoder, 'Oakland, CA')))
+            for _ in range(8)]
+        for thread in thread_list:
+            thread.start()
+        for thread in thread_list:
+            thread.join()
+        self.assertEqual(len(geocoder.query_list), 1)
+        self.assertEqual(len(location_list), 8)
+        self.assertTrue(all(location.latitude == 37.8030442 for location in location_list))
@@ -0,0 +1,193 @@
+# googlebot_site_map/controllers.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+import gzip
+import hashlib
+from xml.sax.saxutils import escape
+
+from django.db.models import Max
+from django.utils.html import escape as escape_html
+
+import wevote_functions.admin
+from config.base import get_environment_variable_default
+from googlebot_site_map import supplemental_urls
+from googlebot_site_map.models import GooglebotSiteMap
+from politician.models import Politician
+from wevote_functions.functions import convert_to_int
+from wevote_functions.functions_cache import CACHE_VALUE_NOT_FOUND, LocalTTLCache
+from wevote_functions.functions_date import DATE_FORMAT_YMD
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+SITE_MAP_ROOT_URL = "https://wevote.us/"
+POLITICIANS_PER_SITE_MAP = 40000  # Google allows up to 50,000 urls per sitemap
+SITE_MAP_INDEX_NAME = 'sitemap_index.xml'
+URLS_PER_CHUNK = 500  # How many urls each yield of a streamed sitemap carries
+
+# Each process keeps the gzipped sitemaps it has served, so crawler hits don't go to the database
+site_map_local_cache = LocalTTLCache(
+    cache_name='Googlebot sitemaps',
+    max_entries=200,
+    time_to_live_seconds=convert_to_int(get_environment_variable_default("GOOGLEBOT_SITE_MAP_CACHE_SECONDS", 600)))
+
+
+def fetch_site_map_count():
+    """
+    Politician maps are id ranges, so the count comes from the largest id, not the number of politicians
+    """
+    max_politician_id = Politician.objects.using('readonly').aggregate(Max('id'))['id__max'] or 0
+    return max_politician_id // POLITICIANS_PER_SITE_MAP + 1
+
+
+def generate_site_map_entries(map_number):
+    """
+    :return: (url, lastmod) for every url in one map, without loading whole Politician rows.
+      lastmod is None when we don't know when the page changed.
+    """
+    if map_number == 0:
+        for url in supplemental_urls.crawlable_urls:
+            yield url, None
+
+    queryset = Politician.objects.using('readonly') \
+        .filter(id__gte=map_number * POLITICIANS_PER_SITE_MAP, id__lt=(map_number + 1) * POLITICIANS_PER_SITE_MAP) \
+        .exclude(seo_friendly_path__isnull=True) \
+        .exclude(seo_friendly_path='') \
+        .order_by('id') \
+        .values_list('seo_friendly_path', 'date_last_updated')
+    for seo_friendly_path, date_last_updated in queryset.iterator(chunk_size=2000):
+        yield SITE_MAP_ROOT_URL + seo_friendly_path + '/-/', date_last_updated
+
+
+def generate_site_map_xml(entry_iterable):
+    """
+    Stream a <urlset> as a handful of large strings, instead of building one string by repeated concatenation
+    """
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    chunk = []
+    for url, lastmod in entry_iterable:
+        if lastmod is None:
+            chunk.append('  <url>\n    <loc>' + escape(url) + '</loc>\n  </url>\n')
+        else:
+            chunk.append('  <url>\n    <loc>' + escape(url) + '</loc>\n    <lastmod>' +
+                         lastmod.strftime(DATE_FORMAT_YMD) + '</lastmod>\n  </url>\n')
+        if len(chunk) >= URLS_PER_CHUNK:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+    yield '</urlset>\n'
+
+
+def generate_site_map_html(entry_iterable):
+    yield '<html><body>'
+    chunk = []
+    for url, lastmod in entry_iterable:
+        chunk.append(escape_html(url) + '<br>')
+        if len(chunk) >= URLS_PER_CHUNK:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+    yield '</body></html>'
+
+
+def generate_site_map_index_xml(lastmod_list):
+    """
+    :param lastmod_list: The newest lastmod in each map, or None, in map number order
+    """
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n' \
+          '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for map_number, lastmod in enumerate(lastmod_list):
+        yield '  <sitemap>\n    <loc>' + SITE_MAP_ROOT_URL + 'map' + str(map_number) + '.xml</loc>\n'
+        if lastmod is not None:
+            yield '    <lastmod>' + lastmod.strftime(DATE_FORMAT_YMD) + '</lastmod>\n'
+        yield '  </sitemap>\n'
+    yield '</sitemapindex>\n'
+
+
+def generate_site_map_etag(body):
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def compress_site_map(chunk_iterable):
+    """
+    :return: (gzip_body, etag). mtime=0 keeps the gzip bytes, and so the ETag, the same when nothing changed.
+    """
+    body = ''.join(chunk_iterable).encode('utf-8')
+    return gzip.compress(body, compresslevel=9, mtime=0), generate_site_map_etag(body)
+
+
+def save_site_map(site_map_name, chunk_iterable, url_count=0, date_last_modified=None):
+    gzip_body, etag = compress_site_map(chunk_iterable)
+    GooglebotSiteMap.objects.update_or_create(
+        site_map_name=site_map_name,
+        defaults={
+            'gzip_body':            gzip_body,
+            'etag':                 etag,
+            'url_count':            url_count,
+            'date_last_modified':   date_last_modified,
+        })
+    site_map_local_cache.delete(site_map_name)
+    return gzip_body, etag
+
+
+def generate_all_site_maps():
+    """
+    Pre-generate every map (xml and html) and the sitemap index. Run on a schedule, with the
+    generate_googlebot_site_maps management command.
+    """
+    status = ""
+    success = True
+    site_map_count = 0
+    total_url_count = 0
+    try:
+        site_map_count = fetch_site_map_count()
+        lastmod_list = []
+        for map_number in range(site_map_count):
+            entry_list = list(generate_site_map_entries(map_number))
+            known_lastmod_list = [lastmod for url, lastmod in entry_list if lastmod is not None]
+            date_last_modified = max(known_lastmod_list) if len(known_lastmod_list) else None
+            lastmod_list.append(date_last_modified)
+            save_site_map('map' + str(map_number) + '.xml', generate_site_map_xml(entry_list),
+                          url_count=len(entry_list), date_last_modified=date_last_modified)
+            save_site_map('map' + str(map_number) + '.html', generate_site_map_html(entry_list),
+                          url_count=len(entry_list), date_last_modified=date_last_modified)
+            total_url_count += len(entry_list)
+        save_site_map(SITE_MAP_INDEX_NAME, generate_site_map_index_xml(lastmod_list), url_count=site_map_count,
+                      date_last_modified=max([lastmod for lastmod in lastmod_list if lastmod is not None],
+                                             default=None))
+        # Maps past the end, left from a time when there were more politicians
+        current_name_list = [SITE_MAP_INDEX_NAME]
+        for map_number in range(site_map_count):
+            current_name_list += ['map' + str(map_number) + '.xml', 'map' + str(map_number) + '.html']
+        GooglebotSiteMap.objects.exclude(site_map_name__in=current_name_list).delete()
+        status += "SITE_MAPS_GENERATED "
+    except Exception as e:
+        status += "SITE_MAPS_NOT_GENERATED: " + str(e) + " "
+        logger.error(status)
+        success = False
+
+    results = {
+        'success':          success,
+        'status':           status,
+        'site_map_count':   site_map_count,
+        'url_count':        total_url_count,
+    }
+    return results
+
+
+def retrieve_site_map(site_map_name):
+    """
+    :return: The pre-generated GooglebotSiteMap, or None if it hasn't been generated
+    """
+    site_map = site_map_local_cache.get(site_map_name)
+    if site_map is not CACHE_VALUE_NOT_FOUND:
+        return site_map
+    try:
+        site_map = GooglebotSiteMap.objects.using('readonly').filter(site_map_name=site_map_name).first()
+    except Exception as e:
+        logger.error("retrieve_site_map: " + str(e))
+        return None
+    site_map_local_cache.set(site_map_name, site_map)
+    return site_map
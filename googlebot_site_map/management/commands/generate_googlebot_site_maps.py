@@ -0,0 +1,19 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from googlebot_site_map.controllers import generate_all_site_maps
+
+
+class Command(BaseCommand):
+    help = 'Pre-generates the gzipped Googlebot sitemaps (sitemap_index.xml, mapN.xml and mapN.html) that the ' \
+           'googlebotSiteMap APIs serve. Run on a schedule, ex/ hourly from cron.'
+
+    def handle(self, *args, **options):
+        t0 = perf_counter()
+        results = generate_all_site_maps()
+        self.stdout.write('{status}{site_map_count:,} maps, {url_count:,} urls in {seconds:.1f} s'.format(
+            status=results['status'], site_map_count=results['site_map_count'], url_count=results['url_count'],
+            seconds=perf_counter() - t0))
+        if not results['success']:
+            self.stderr.write('generate_googlebot_site_maps did not finish cleanly')
@@ -16,3 +16,17 @@ class GooglebotRequest(models.Model):
     remote_dns = models.CharField(
         verbose_name="Remote reverse DNS", max_length=255, null=True, blank=True)
     user_agent = models.TextField(null=True, blank=True)
+
+
+class GooglebotSiteMap(models.Model):
+    """
+    One pre-generated sitemap (ex/ "sitemap_index.xml", "map3.xml" or "map3.html"), gzipped and ready to serve.
+    Rebuilt by the generate_googlebot_site_maps management command.
+    """
+    site_map_name = models.CharField(max_length=50, unique=True, null=False)
+    gzip_body = models.BinaryField(null=True)
+    etag = models.CharField(max_length=80, null=True)
+    url_count = models.PositiveIntegerField(default=0)
+    # The newest lastmod of the urls in this sitemap
+    date_last_modified = models.DateTimeField(null=True)
+    date_generated = models.DateTimeField(null=True, auto_now=True)
@@ -0,0 +1,60 @@
+# googlebot_site_map/tests.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+import datetime
+import gzip
+from types import SimpleNamespace
+from unittest import mock
+from xml.etree import ElementTree
+from django.test import RequestFactory, SimpleTestCase
+from apis_v1.views.views_googlebot_site_map import site_map_response
+from googlebot_site_map.controllers import compress_site_map, generate_site_map_index_xml, generate_site_map_xml
+
+SITE_MAP_NAMESPACE = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+
+
+class GooglebotSiteMapTests(SimpleTestCase):
+
+    def test_site_map_xml(self):
+        entry_list = [('https://wevote.us/ballot', None)] + [
+            ('https://wevote.us/jane-doe-' + str(number) + '&co/-/', datetime.datetime(2024, 10, 1 + number % 28))
+            for number in range(1200)]
+        xml = ''.join(generate_site_map_xml(entry_list))
+        url_list = ElementTree.fromstring(xml).findall(SITE_MAP_NAMESPACE + 'url')
+        self.assertEqual(len(url_list), 1201)
+        self.assertIsNone(url_list[0].find(SITE_MAP_NAMESPACE + 'lastmod'))
+        self.assertEqual(url_list[2].find(SITE_MAP_NAMESPACE + 'loc').text, 'https://wevote.us/jane-doe-1&co/-/')
+        self.assertEqual(url_list[2].find(SITE_MAP_NAMESPACE + 'lastmod').text, '2024-10-02')
+
+        index_xml = ''.join(generate_site_map_index_xml([datetime.datetime(2024, 10, 3), None]))
+        sitemap_list = ElementTree.fromstring(index_xml).findall(SITE_MAP_NAMESPACE + 'sitemap')
+        self.assertEqual([sitemap.find(SITE_MAP_NAMESPACE + 'loc').text for sitemap in sitemap_list],
+                         ['https://wevote.us/map0.xml', 'https://wevote.us/map1.xml'])
+
+    def test_cached_response(self):
+        gzip_body, etag = compress_site_map(generate_site_map_xml([('https://wevote.us/ballot', None)]))
+        self.assertEqual(compress_site_map(generate_site_map_xml([('https://wevote.us/ballot', None)])),
+                         (gzip_body, etag))
+        site_map = SimpleNamespace(gzip_body=memoryview(gzip_body), etag=etag,
+                                   date_generated=datetime.datetime(2024, 10, 1, tzinfo=datetime.timezone.utc))
+        request_factory = RequestFactory()
+        with mock.patch('apis_v1.views.views_googlebot_site_map.retrieve_site_map', return_value=site_map):
+            response = site_map_response(request_factory.get('/', HTTP_ACCEPT_ENCODING='gzip, deflate'),
+                                         'map0.xml', 'application/xml', iter([]))
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(response.content, gzip_body)
+            self.assertEqual(response['ETag'], etag)
+
+            response = site_map_response(request_factory.get('/'), 'map0.xml', 'application/xml', iter([]))
+            self.assertIn(b'<loc>https://wevote.us/ballot</loc>', response.content)
+
+            response = site_map_response(request_factory.get('/', HTTP_IF_NONE_MATCH=etag),
+                                         'map0.xml', 'application/xml', iter([]))
+            self.assertEqual(response.status_code, 304)
+
+        with mock.patch('apis_v1.views.views_googlebot_site_map.retrieve_site_map', return_value=None):
+            response = site_map_response(request_factory.get('/'), 'map0.xml', 'application/xml',
+                                         generate_site_map_xml([('https://wevote.us/ballot', None)]))
+            self.assertTrue(response.streaming)
+            self.assertEqual(gzip.decompress(gzip_body), b''.join(response.streaming_content))
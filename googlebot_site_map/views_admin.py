@@ -3,7 +3,6 @@
 # -*- coding: UTF-8 -*-
 
 import datetime
-import re
 import subprocess
 
 import pytz
@@ -12,12 +11,9 @@ from django.shortcuts import render
 
 import wevote_functions.admin
 from admin_tools.views import redirect_to_sign_in_page
-from googlebot_site_map import supplemental_urls
 from googlebot_site_map.models import GooglebotRequest
-from politician.models import Politician
 from voter.models import voter_has_authority
 from wevote_functions.functions import get_ip_from_headers, positive_value_exists
-from wevote_functions.functions_date import DATE_FORMAT_YMD
 
 logger = wevote_functions.admin.get_logger(__name__)
 
@@ -58,54 +54,6 @@ def googlebot_reverse_dns(ip):
     return host
 
 
-# https://localhost:8000/apis/v1/googlebotSiteMap/sitemap_index.xml
-def get_googlebot_map_file_body(request):
-    map_num_result = re.findall(r'googlebotSiteMap\/map(\d+)', request.path)
-    num = int(map_num_result[0])
-    https_root = "https://wevote.us/"
-    map_text = ''
-    if num == 0:
-        for u in supplemental_urls.crawlable_urls:
-            map_text += u + '<br>'
-
-    # Retrieve Politicians, 40,000 at a time
-    queryset = Politician.objects.using('readonly').order_by('id').filter(id__range=(num * 40000, (num + 1) * 40000))
-    politician_list = list(queryset)
-    for pol in politician_list:
-        map_text += https_root + pol.seo_friendly_path + '/-/<br>'
-
-    return map_text
-
-
-def xml_chunk(loc, lastmod):
-    chunk = '  <url>\n'
-    chunk += '    <loc>' + loc + '</loc>\n'
-    chunk += '    <lastmod>' + lastmod + '</lastmod>\n'
-    chunk += '  </url>\n'
-
-    return chunk
-
-
-def get_googlebot_map_xml_body(request):
-    map_num_result = re.findall(r'googlebotSiteMap\/map(\d+)', request.path)
-    num = int(map_num_result[0])
-    https_root = "https://wevote.us/"
-    dt = datetime.date.today()
-    lastmod = dt.strftime(DATE_FORMAT_YMD)  # "%Y-%m-%d"
-    map_xml = ''
-    if num == 0:
-        for loc in supplemental_urls.crawlable_urls:
-            map_xml += xml_chunk(loc, lastmod)
-
-    # Retrieve Politicians, 40,000 at a time
-    queryset = Politician.objects.using('readonly').order_by('id').filter(id__range=(num * 40000, (num + 1) * 40000))
-    politician_list = list(queryset)
-    for pol in politician_list:
-        map_xml += xml_chunk(https_root + pol.seo_friendly_path + "/-/", lastmod)
-
-    return map_xml
-
-
 @login_required
 def googlebot_site_map_list_view(request):
     authority_required = {'admin'}
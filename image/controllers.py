@@ -4,7 +4,6 @@
 
 import time
 
-import requests
 from django.db.models import Q
 
 import wevote_functions.admin
@@ -25,6 +24,7 @@ from twitter.models import TwitterUserManager
 from voter.models import VoterManager, VoterDeviceLink, VoterDeviceLinkManager, VoterAddressManager, Voter
 from voter_guide.models import VoterGuideManager
 from wevote_functions.functions import positive_value_exists, convert_to_int
+from wevote_functions.functions_http import http_get
 from .functions import analyze_remote_url, analyze_image_file, analyze_image_in_memory, \
     change_default_profile_image_if_needed
 from .models import WeVoteImageManager, WeVoteImage, \
@@ -1180,7 +1180,7 @@ def retrieve_facebook_image_url(facebook_user_id):
 
     get_url = "https://graph.facebook.com/v3.1/{facebook_user_id}/picture?width=200&height=200"\
         .format(facebook_user_id=facebook_user_id)
-    response = requests.get(get_url)
+    response = http_get(get_url)
     if response.status_code == HTTP_OK:
         # new facebook profile image url found
         results['facebook_profile_image_url'] = response.url
@@ -5,10 +5,8 @@
 from exception.models import handle_exception
 from io import BytesIO
 from PIL import Image, ImageOps
-from urllib.request import Request, urlopen
-import urllib
-import requests
 import wevote_functions.admin
+from wevote_functions.functions_http import http_get
 
 logger = wevote_functions.admin.get_logger(__name__)
 
@@ -23,20 +21,19 @@ def analyze_remote_url(image_url_https):
     image_height = None
     image_width = None
     image_url_valid = False
+    response = None
     try:
         if image_url_https is not None:
-            # urlopen(Request(image_url_https))
-            remote_url_req = urllib.request.Request(
+            # One request, both to check the url and to read the image
+            response = http_get(
                 image_url_https,
                 headers={
                     'User-Agent': 'Mozilla/5.0 (Windows NT 6.1; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) '
                                   'Chrome/36.0.1941.0 Safari/537.36',
                     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
                     'Accept-Charset': 'ISO-8859-1,utf-8;q=0.7,*;q=0.3',
-                    'Accept-Encoding': 'none',
-                    'Accept-Language': 'en-US,en;q=0.8',
-                    'Connection': 'keep-alive'})
-            remote_url = urlopen(remote_url_req)
+                    'Accept-Language': 'en-US,en;q=0.8'})
+            response.raise_for_status()
             image_url_valid = True
     except Exception as e:
         image_url_valid = False
@@ -46,7 +43,6 @@ def analyze_remote_url(image_url_https):
 
     if image_url_valid:
         try:
-            response = requests.get(image_url_https)
             original_image = Image.open(BytesIO(response.content))
             image_format = original_image.format
             image = ImageOps.exif_transpose(original_image)
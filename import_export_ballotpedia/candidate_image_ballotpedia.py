@@ -1,6 +1,7 @@
 import requests
 from bs4 import BeautifulSoup
 import re
+from wevote_functions.functions_http import http_get
 
 IMG_CLASS_NAME_WE_ARE_SEEKING = "widget-img"
 
@@ -8,7 +9,7 @@ IMG_CLASS_NAME_WE_ARE_SEEKING = "widget-img"
 # Retrieves the parsed HTML content from the given URL.
 def get_parsed_html(url):
     try:
-        page = requests.get(url)
+        page = http_get(url)
         return BeautifulSoup(page.content, "html.parser")
 
     except requests.exceptions.RequestException:
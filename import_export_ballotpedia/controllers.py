@@ -30,6 +30,7 @@ from voter.models import fetch_voter_id_from_voter_device_link, VoterAddressMana
 import wevote_functions.admin
 from wevote_functions.functions import convert_to_int, extract_state_code_from_address_string, positive_value_exists
 from wevote_functions.functions_date import get_current_year_as_integer
+from wevote_functions.functions_http import http_get
 from wevote_settings.models import RemoteRequestHistory, RemoteRequestHistoryManager, \
     RETRIEVE_POSSIBLE_BALLOTPEDIA_PHOTOS, RETRIEVE_POSSIBLE_BALLOTPEDIA_CANDIDATES_LINKS
 
@@ -166,7 +167,7 @@ logger = wevote_functions.admin.get_logger(__name__)
 # Retrieves the parsed HTML content from the given URL.
 def get_parsed_html(url):
     try:
-        page = requests.get(url)
+        page = http_get(url)
         return BeautifulSoup(page.content, "html.parser")
 
     except requests.exceptions.RequestException:
@@ -314,7 +315,7 @@ def attach_ballotpedia_election_by_district_from_api(election, google_civic_elec
             status += "MISSING_DISTRICT_STRING_VALUES "
             continue
 
-        response = requests.get(BALLOTPEDIA_API_ELECTIONS_URL, params={
+        response = http_get(BALLOTPEDIA_API_ELECTIONS_URL, params={
             "access_token":             BALLOTPEDIA_API_KEY,
             "filters[district][in]":    district_string,
             "filters[date][eq]":        election_day_text,
@@ -1013,7 +1014,7 @@ def retrieve_ballotpedia_candidates_by_district_from_api(google_civic_election_i
     kind_of_batch = ""
     from import_export_batches.controllers_ballotpedia import store_ballotpedia_json_response_to_import_batch_system
     for ballotpedia_race_ids_string in chunks_of_race_id_strings:
-        response = requests.get(BALLOTPEDIA_API_CANDIDATES_URL, params={
+        response = http_get(BALLOTPEDIA_API_CANDIDATES_URL, params={
             "access_token": BALLOTPEDIA_API_KEY,
             "filters[race][in]": ballotpedia_race_ids_string,
             "limit": 1000,
@@ -1148,7 +1149,7 @@ def retrieve_ballot_items_from_polling_location(
 
         try:
             latitude_longitude = str(polling_location.latitude) + "," + str(polling_location.longitude)
-            response = requests.get(BALLOTPEDIA_API_CONTAINS_URL, params={
+            response = http_get(BALLOTPEDIA_API_CONTAINS_URL, params={
                 "access_token": BALLOTPEDIA_API_KEY,
                 "point": latitude_longitude,
             })
@@ -1282,7 +1283,7 @@ def retrieve_ballotpedia_ballot_items_from_polling_location_api_v4(
 
         try:
             # Get the electoral_districts at this lat/long
-            response = requests.get(
+            response = http_get(
                 BALLOTPEDIA_API_SAMPLE_BALLOT_ELECTIONS_URL,
                 headers=HEADERS_FOR_BALLOTPEDIA_API_CALL,
                 params={
@@ -1335,7 +1336,7 @@ def retrieve_ballotpedia_ballot_items_from_polling_location_api_v4(
             # chunks_of_district_strings.append(office_district_string)
 
             # Get the electoral_districts at this lat/long
-            response = requests.get(
+            response = http_get(
                 BALLOTPEDIA_API_SAMPLE_BALLOT_RESULTS_URL,
                 headers=HEADERS_FOR_BALLOTPEDIA_API_CALL,
                 params={
@@ -1547,7 +1548,7 @@ def retrieve_ballotpedia_ballot_items_for_one_voter_api_v4(
 
     try:
         # Get the electoral_districts at this lat/long
-        response = requests.get(
+        response = http_get(
             BALLOTPEDIA_API_SAMPLE_BALLOT_ELECTIONS_URL,
             headers=HEADERS_FOR_BALLOTPEDIA_API_CALL,
             params={
@@ -1602,7 +1603,7 @@ def retrieve_ballotpedia_ballot_items_for_one_voter_api_v4(
         # chunks_of_district_strings.append(office_district_string)
 
         # Get the electoral_districts at this lat/long
-        response = requests.get(
+        response = http_get(
             BALLOTPEDIA_API_SAMPLE_BALLOT_RESULTS_URL,
             headers=HEADERS_FOR_BALLOTPEDIA_API_CALL,
             params={
@@ -1756,7 +1757,7 @@ def retrieve_ballotpedia_district_id_list_for_polling_location(
             pass
         else:
             latitude_longitude = str(polling_location.latitude) + "," + str(polling_location.longitude)
-            response = requests.get(BALLOTPEDIA_API_CONTAINS_URL, params={
+            response = http_get(BALLOTPEDIA_API_CONTAINS_URL, params={
                 "access_token": BALLOTPEDIA_API_KEY,
                 "point": latitude_longitude,
             })
@@ -1947,7 +1948,7 @@ def retrieve_ballotpedia_offices_by_district_from_api(google_civic_election_id,
         for kind_of_election_dict in kind_of_election_list:
             ballotpedia_kind_of_election = kind_of_election_dict['kind_of_election']
 
-            response = requests.get(BALLOTPEDIA_API_RACES_URL, params={
+            response = http_get(BALLOTPEDIA_API_RACES_URL, params={
                 "access_token":                                 BALLOTPEDIA_API_KEY,
                 "filters[year][eq]":                            election_day_year,
                 "filters[office_district][in]":                 office_district_string,
@@ -2152,7 +2153,7 @@ def retrieve_ballotpedia_measures_by_district_from_api(google_civic_election_id,
     measures_already_retrieved = []
     from import_export_batches.controllers_ballotpedia import store_ballotpedia_json_response_to_import_batch_system
     for measure_district_string in chunks_of_district_strings:
-        response = requests.get(BALLOTPEDIA_API_MEASURES_URL, params={
+        response = http_get(BALLOTPEDIA_API_MEASURES_URL, params={
             "access_token":             BALLOTPEDIA_API_KEY,
             "filters[election][in]":    ballotpedia_elections_string,
             "filters[district][in]":    measure_district_string,
@@ -2245,9 +2246,10 @@ def retrieve_ballotpedia_candidate_image_from_api(ballotpedia_image_id, google_c
         }
         return results
 
-    response = requests.get(BALLOTPEDIA_API_FILES_URL + "/" + str(ballotpedia_image_id), params={
+    # The file for an image id doesn't change, so re-use the answer for an hour
+    response = http_get(BALLOTPEDIA_API_FILES_URL + "/" + str(ballotpedia_image_id), params={
         "access_token": BALLOTPEDIA_API_KEY,
-    })
+    }, cache_seconds=3600)
 
     if not positive_value_exists(response.text):
         status += "NO_RESPONSE_TEXT_FOUND"
@@ -3504,7 +3506,7 @@ def retrieve_one_ballot_from_ballotpedia_api(latitude, longitude, incoming_googl
     try:
         latitude_longitude = str(latitude) + "," + str(longitude)
         status += "LAT_LONG: " + str(latitude_longitude) + " "
-        response = requests.get(BALLOTPEDIA_API_CONTAINS_URL, params={
+        response = http_get(BALLOTPEDIA_API_CONTAINS_URL, params={
             "access_token": BALLOTPEDIA_API_KEY,
             "point": latitude_longitude,
         })
@@ -3600,7 +3602,7 @@ def retrieve_one_ballot_from_ballotpedia_api_v4(latitude, longitude, google_civi
 
     try:
         # Get the electoral_districts at this lat/long
-        response = requests.get(
+        response = http_get(
             BALLOTPEDIA_API_SAMPLE_BALLOT_ELECTIONS_URL,
             headers=HEADERS_FOR_BALLOTPEDIA_API_CALL,
             params={
@@ -3648,7 +3650,7 @@ def retrieve_one_ballot_from_ballotpedia_api_v4(latitude, longitude, google_civi
         # chunks_of_district_strings.append(office_district_string)
 
         # Get the electoral_districts at this lat/long
-        response = requests.get(
+        response = http_get(
             BALLOTPEDIA_API_SAMPLE_BALLOT_RESULTS_URL,
             headers=HEADERS_FOR_BALLOTPEDIA_API_CALL,
             params={
@@ -2,6 +2,8 @@
 # Brought to you by We Vote. Be good.
 # -*- coding: UTF-8 -*-
 
+from time import perf_counter
+
 from .models import BatchManager, BatchDescription, BatchHeaderMap, BatchRow, BatchRowActionOrganization, \
     BatchRowActionMeasure, BatchRowActionOfficeHeld, BatchRowActionContestOffice, BatchRowActionPolitician, \
     BatchRowActionCandidate, BatchRowActionPollingLocation, BatchRowActionPosition, BatchRowActionBallotItem, \
@@ -13,7 +15,8 @@ from .models import BatchManager, BatchDescription, BatchHeaderMap, BatchRow, Ba
     BATCH_IMPORT_KEYS_ACCEPTED_FOR_ORGANIZATIONS, BATCH_IMPORT_KEYS_ACCEPTED_FOR_POLITICIANS, \
     BATCH_IMPORT_KEYS_ACCEPTED_FOR_POLLING_LOCATIONS, BATCH_IMPORT_KEYS_ACCEPTED_FOR_POSITIONS, \
     BATCH_IMPORT_KEYS_ACCEPTED_FOR_REPRESENTATIVES
-from ballot.models import BallotItem, BallotItemListManager, BallotItemManager, BallotReturnedManager
+from ballot.models import BallotItem, BallotItemListManager, BallotItemManager, BallotReturnedManager, \
+    defer_ballot_returned_spatial_index_invalidation
 from candidate.controllers import retrieve_next_or_most_recent_office_for_candidate
 from candidate.models import CandidateCampaign, CandidateListManager, CandidateManager
 # from django.db import transaction
@@ -21,7 +24,7 @@ from django.db.models import Q
 from django.utils.timezone import now
 from office_held.models import OfficeHeld, OfficeHeldManager
 from electoral_district.controllers import retrieve_electoral_district
-from election.models import ElectionManager
+from election.models import Election, ElectionManager
 from exception.models import handle_exception, print_to_log
 from image.controllers import retrieve_and_save_ballotpedia_candidate_images
 from measure.models import ContestMeasure, ContestMeasureManager, ContestMeasureListManager
@@ -44,6 +47,9 @@ from wevote_functions.functions_date import get_current_year_as_integer
 
 logger = wevote_functions.admin.get_logger(__name__)
 
+# How many batch rows to analyze or import per round of bulk queries
+BATCH_ROW_ACTION_BULK_CHUNK_SIZE = 1000
+
 # VOTE_SMART_API_KEY = get_environment_variable("VOTE_SMART_API_KEY")
 CANDIDATE = 'CANDIDATE'
 CONTEST_OFFICE = 'CONTEST_OFFICE'
@@ -168,24 +174,53 @@ def create_batch_row_actions(
 
     batch_row_action_list = []
     start_create_batch_row_action_time_tracker = []
-    if batch_description_found and batch_header_map_found and batch_row_action_list_found and not delete_analysis_only:
+    if kind_of_batch in [IMPORT_BALLOT_ITEM, REPRESENTATIVES] and \
+            batch_description_found and batch_header_map_found and batch_row_action_list_found and \
+            not delete_analysis_only:
+        start_create_batch_row_action_time_tracker.append(now().strftime("%H:%M:%S:%f"))
+        results = create_batch_row_action_ballot_item_list(
+            batch_description=batch_description,
+            batch_header_map=batch_header_map,
+            batch_row_list=batch_row_list,
+            election_objects_dict=election_objects_dict,
+            measure_objects_dict=measure_objects_dict,
+            office_objects_dict=office_objects_dict,
+        )
+        status += results['status']
+        election_objects_dict = results['election_objects_dict']
+        measure_objects_dict = results['measure_objects_dict']
+        office_objects_dict = results['office_objects_dict']
+        number_of_batch_actions_created += results['number_of_batch_actions_created']
+        number_of_batch_actions_updated += results['number_of_batch_actions_updated']
+        if number_of_batch_actions_created or number_of_batch_actions_updated:
+            success = True
+
+        batch_row_action_list = results['batch_row_action_list']
+        if len(batch_row_action_list):
+            batch_row_action_ballot_item = batch_row_action_list[-1]
+            polling_location_we_vote_id = batch_row_action_ballot_item.polling_location_we_vote_id
+            voter_id = batch_row_action_ballot_item.voter_id
+    elif kind_of_batch in [CANDIDATE, POLITICIAN, POSITION] and \
+            batch_description_found and batch_header_map_found and batch_row_action_list_found and \
+            not delete_analysis_only:
+        start_create_batch_row_action_time_tracker.append(now().strftime("%H:%M:%S:%f"))
+        results = create_batch_row_action_list(
+            batch_description=batch_description,
+            batch_header_map=batch_header_map,
+            batch_row_list=batch_row_list,
+            election_objects_dict=election_objects_dict,
+        )
+        status += results['status']
+        election_objects_dict = results['election_objects_dict']
+        number_of_batch_actions_created += results['number_of_batch_actions_created']
+        number_of_batch_actions_updated += results['number_of_batch_actions_updated']
+        if number_of_batch_actions_created or number_of_batch_actions_updated:
+            success = True
+    elif batch_description_found and batch_header_map_found and batch_row_action_list_found and \
+            not delete_analysis_only:
         for one_batch_row in batch_row_list:
             start_create_batch_row_action_time_tracker.append(now().strftime("%H:%M:%S:%f"))
-            if kind_of_batch == CANDIDATE:
-                results = create_batch_row_action_candidate(batch_description, batch_header_map, one_batch_row)
-
-                if results['batch_row_action_updated']:
-                    number_of_batch_actions_updated += 1
-                    success = True
-                elif results['batch_row_action_created']:
-                    # for now, do not handle batch_row_action_candidate data
-                    # batch_row_action_candidate = results['batch_row_action_candidate']
-                    number_of_batch_actions_created += 1
-                    success = True
-                    # Now check for warnings (like "this is a duplicate"). If warnings are found,
-                    # add the warning to batch_row_action_measure entry
-                    # batch_row_action_measure.kind_of_action = "TEST"
-            elif kind_of_batch == CONTEST_OFFICE:
+            if kind_of_batch == CONTEST_OFFICE:
                 results = create_batch_row_action_contest_office(batch_description, batch_header_map, one_batch_row)
 
                 if results['batch_row_action_updated']:
@@ -227,17 +262,6 @@ def create_batch_row_actions(
                     success = True
                 else:
                     number_of_batch_actions_failed += 1
-            elif kind_of_batch == POLITICIAN:
-                results = create_batch_row_action_politician(batch_description, batch_header_map, one_batch_row)
-
-                if results['batch_row_action_updated']:
-                    number_of_batch_actions_updated += 1
-                    success = True
-                elif results['batch_row_action_created']:
-                    # for now, do not handle batch_row_action_politician data
-                    # batch_row_action_politician = results['batch_row_action_politician']
-                    number_of_batch_actions_created += 1
-                    success = True
             elif kind_of_batch == IMPORT_POLLING_LOCATION:
                 results = create_batch_row_action_polling_location(batch_description, batch_header_map, one_batch_row)
 
@@ -247,78 +271,6 @@ def create_batch_row_actions(
                 elif results['batch_row_action_created']:
                     number_of_batch_actions_created += 1
                     success = True
-            elif kind_of_batch == POSITION:
-                results = create_batch_row_action_position(batch_description, batch_header_map, one_batch_row)
-
-                if results['batch_row_action_updated']:
-                    number_of_batch_actions_updated += 1
-                    success = True
-                elif results['batch_row_action_created']:
-                    # for now, do not handle batch_row_action_politician data
-                    # batch_row_action_politician = results['batch_row_action_politician']
-                    number_of_batch_actions_created += 1
-                    success = True
-                elif not results['success']:
-                    status += results['status']
-                status += "CREATE_BATCH_ROW_ACTION_POSITION-START: "
-                status += results['status']
-                print_to_log(logger=logger, exception_message_optional=status)
-            elif kind_of_batch == IMPORT_BALLOT_ITEM:
-                results = create_batch_row_action_ballot_item(
-                    batch_description=batch_description,
-                    batch_header_map=batch_header_map,
-                    one_batch_row=one_batch_row,
-                    election_objects_dict=election_objects_dict,
-                    measure_objects_dict=measure_objects_dict,
-                    office_objects_dict=office_objects_dict,
-                )
-                election_objects_dict = results['election_objects_dict']
-                measure_objects_dict = results['measure_objects_dict']
-                office_objects_dict = results['office_objects_dict']
-
-                if results['batch_row_action_updated']:
-                    number_of_batch_actions_updated += 1
-                    success = True
-                elif results['batch_row_action_created']:
-                    number_of_batch_actions_created += 1
-                    success = True
-                elif results['batch_row_action_delete_created']:
-                    number_of_batch_actions_created += 1
-                    success = True
-
-                batch_row_action_ballot_item = results['batch_row_action_ballot_item']
-                polling_location_we_vote_id = batch_row_action_ballot_item.polling_location_we_vote_id
-                voter_id = batch_row_action_ballot_item.voter_id
-
-                batch_row_action_list.append(batch_row_action_ballot_item)
-            elif kind_of_batch == REPRESENTATIVES:
-                results = create_batch_row_action_ballot_item(
-                    batch_description=batch_description,
-                    batch_header_map=batch_header_map,
-                    one_batch_row=one_batch_row,
-                    election_objects_dict=election_objects_dict,
-                    measure_objects_dict=measure_objects_dict,
-                    office_objects_dict=office_objects_dict,
-                )
-                election_objects_dict = results['election_objects_dict']
-                measure_objects_dict = results['measure_objects_dict']
-                office_objects_dict = results['office_objects_dict']
-
-                if results['batch_row_action_updated']:
-                    number_of_batch_actions_updated += 1
-                    success = True
-                elif results['batch_row_action_created']:
-                    number_of_batch_actions_created += 1
-                    success = True
-                elif results['batch_row_action_delete_created']:
-                    number_of_batch_actions_created += 1
-                    success = True
-
-                batch_row_action_ballot_item = results['batch_row_action_ballot_item']
-                polling_location_we_vote_id = batch_row_action_ballot_item.polling_location_we_vote_id
-                voter_id = batch_row_action_ballot_item.voter_id
-
-                batch_row_action_list.append(batch_row_action_ballot_item)
     else:
         status += "CREATE_BATCH_ROW_CONDITIONS_NOT_MET " \
                   "[batch_description_found and batch_header_map_found and batch_row_action_list_found " \
@@ -1588,12 +1540,16 @@ def create_batch_row_action_contest_office(batch_description, batch_header_map,
     return results
 
 
-def create_batch_row_action_politician(batch_description, batch_header_map, one_batch_row):
+def create_batch_row_action_politician(batch_description, batch_header_map, one_batch_row,
+                                       batch_row_action_politician=None,
+                                       save_to_database=True):
     """
     Handle batch_row for politician type
     :param batch_description:
     :param batch_header_map:
     :param one_batch_row:
+    :param batch_row_action_politician: Already retrieved, or new and not saved yet, by create_batch_row_action_list
+    :param save_to_database: False when the caller saves batch_row_action_politician and one_batch_row in bulk
     :return:
     """
     batch_manager = BatchManager()
@@ -1606,11 +1562,21 @@ def create_batch_row_action_politician(batch_description, batch_header_map, one_
     # Does a BatchRowActionPolitician entry already exist?
     # We want to start with the BatchRowAction... entry first so we can record our findings line by line while
     #  we are checking for existing duplicate data
-    existing_results = batch_manager.retrieve_batch_row_action_politician(
-        batch_description.batch_header_id, one_batch_row.id)
+    if batch_row_action_politician is not None:
+        existing_results = {
+            'batch_row_action_found':       batch_row_action_politician.id is not None,
+            'batch_row_action_politician':  batch_row_action_politician,
+        }
+    else:
+        existing_results = batch_manager.retrieve_batch_row_action_politician(
+            batch_description.batch_header_id, one_batch_row.id)
     if existing_results['batch_row_action_found']:
         batch_row_action_politician = existing_results['batch_row_action_politician']
         batch_row_action_updated = True
+    elif batch_row_action_politician is not None:
+        # The caller creates it
+        batch_row_action_created = True
+        status += "BATCH_ROW_ACTION_POLITICIAN_CREATED "
     else:
         # If a BatchRowActionPolitician entry does not exist, create one
         try:
@@ -1851,7 +1817,8 @@ def create_batch_row_action_politician(batch_description, batch_header_map, one_
         batch_row_action_politician.kind_of_action = kind_of_action
         batch_row_action_politician.status = status
         batch_row_action_politician.politician_we_vote_id = politician_we_vote_id
-        batch_row_action_politician.save()
+        if save_to_database:
+            batch_row_action_politician.save()
 
         success = True
         status += "CREATE_BATCH_ROW_ACTION_POLITICIAN-BATCH_ROW_ACTION_POLITICIAN_CREATED"
@@ -1864,7 +1831,7 @@ def create_batch_row_action_politician(batch_description, batch_header_map, one_
         handle_exception(e, logger=logger, exception_message=status)
 
     # If a state was figured out, then update the batch_row with the state_code so we can use that for filtering
-    if positive_value_exists(state_code):
+    if positive_value_exists(state_code) and save_to_database:
         try:
             one_batch_row.state_code = state_code
             one_batch_row.save()
@@ -1877,7 +1844,8 @@ def create_batch_row_action_politician(batch_description, batch_header_map, one_
         if batch_row_action_created or batch_row_action_updated:
             # If BatchRowAction was created, this batch_row was analyzed
             one_batch_row.batch_row_analyzed = True
-        if positive_value_exists(state_code) or batch_row_action_created or batch_row_action_updated:
+        if save_to_database and \
+                (positive_value_exists(state_code) or batch_row_action_created or batch_row_action_updated):
             one_batch_row.save()
     except Exception as e:
         pass
@@ -2100,12 +2068,20 @@ def create_batch_row_action_polling_location(batch_description, batch_header_map
     return results
 
 
-def create_batch_row_action_candidate(batch_description, batch_header_map, one_batch_row):
+def create_batch_row_action_candidate(batch_description, batch_header_map, one_batch_row,
+                                      batch_row_action_candidate=None,
+                                      contest_office_batch_header_id=None,
+                                      election_objects_dict=None,
+                                      save_to_database=True):
     """
     Handle batch_row for candidate
     :param batch_description:
     :param batch_header_map:
     :param one_batch_row:
+    :param batch_row_action_candidate: Already retrieved, or new and not saved yet, by create_batch_row_action_list
+    :param contest_office_batch_header_id: Already looked up for this batch_set_id
+    :param election_objects_dict:
+    :param save_to_database: False when the caller saves batch_row_action_candidate and one_batch_row in bulk
     :return:
     """
     batch_manager = BatchManager()
@@ -2122,11 +2098,21 @@ def create_batch_row_action_candidate(batch_description, batch_header_map, one_b
     # Does a BatchRowActionCandidate entry already exist?
     # We want to start with the BatchRowAction... entry first so we can record our findings line by line while
     #  we are checking for existing duplicate data
-    existing_results = batch_manager.retrieve_batch_row_action_candidate(
-        batch_description.batch_header_id, one_batch_row.id)
+    if batch_row_action_candidate is not None:
+        existing_results = {
+            'batch_row_action_found':       batch_row_action_candidate.id is not None,
+            'batch_row_action_candidate':   batch_row_action_candidate,
+        }
+    else:
+        existing_results = batch_manager.retrieve_batch_row_action_candidate(
+            batch_description.batch_header_id, one_batch_row.id)
     if existing_results['batch_row_action_found']:
         batch_row_action_candidate = existing_results['batch_row_action_candidate']
         batch_row_action_updated = True
+    elif batch_row_action_candidate is not None:
+        # The caller creates it
+        batch_row_action_created = True
+        status += "BATCH_ROW_ACTION_CANDIDATE_CREATED "
     else:
         # If a BatchRowActionCandidate entry does not exist, create one
         try:
@@ -2247,7 +2233,8 @@ def create_batch_row_action_candidate(batch_description, batch_header_map, one_b
     # get batch_set_id from batch_description
     batch_set_id = str(batch_description.batch_set_id)
     # Look up batch_description with the given batch_set_id and kind_of_batch as CANDIDATE, get batch_header_id
-    contest_office_batch_header_id = get_batch_header_id_from_batch_description(batch_set_id, CONTEST_OFFICE)
+    if contest_office_batch_header_id is None:
+        contest_office_batch_header_id = get_batch_header_id_from_batch_description(batch_set_id, CONTEST_OFFICE)
 
     if not positive_value_exists(state_code):
         if positive_value_exists(vote_usa_state_code):
@@ -2256,11 +2243,16 @@ def create_batch_row_action_candidate(batch_description, batch_header_map, one_b
     # state_code lookup from the election
     if positive_value_exists(google_civic_election_id) and not positive_value_exists(state_code):
         # Check to see if there is a state served for the election
-        election_manager = ElectionManager()
-        results = election_manager.retrieve_election(google_civic_election_id)
-        if results['election_found']:
-            election = results['election']
-            state_code = election.state_code
+        if election_objects_dict is not None and google_civic_election_id in election_objects_dict:
+            state_code = election_objects_dict[google_civic_election_id].state_code
+        else:
+            election_manager = ElectionManager()
+            results = election_manager.retrieve_election(google_civic_election_id)
+            if results['election_found']:
+                election = results['election']
+                state_code = election.state_code
+                if election_objects_dict is not None:
+                    election_objects_dict[google_civic_election_id] = election
 
     # state code look up: BatchRowActionContestOffice entry stores candidate_selection_ids.
     #  Get the state code and office from matching
@@ -2553,7 +2545,8 @@ def create_batch_row_action_candidate(batch_description, batch_header_map, one_b
         batch_row_action_candidate.vote_usa_office_id = vote_usa_office_id
         batch_row_action_candidate.vote_usa_politician_id = vote_usa_politician_id
         batch_row_action_candidate.vote_usa_profile_image_url_https = vote_usa_profile_image_url_https
-        batch_row_action_candidate.save()
+        if save_to_database:
+            batch_row_action_candidate.save()
     except Exception as e:
         status += "BATCH_ROW_ACTION_CANDIDATE_UNABLE_TO_SAVE: " + str(e) + " "
         success = False
@@ -2565,7 +2558,8 @@ def create_batch_row_action_candidate(batch_description, batch_header_map, one_b
                 # If BatchRowAction was created, this batch_row was analyzed
                 one_batch_row.batch_row_analyzed = True
             one_batch_row.state_code = state_code
-            one_batch_row.save()
+            if save_to_database:
+                one_batch_row.save()
         except Exception as e:
             status += "BATCH_ROW_ACTION_STATE_UNABLE_TO_SAVE: " + str(e) + " "
             success = False
@@ -2580,12 +2574,16 @@ def create_batch_row_action_candidate(batch_description, batch_header_map, one_b
     return results
 
 
-def create_batch_row_action_position(batch_description, batch_header_map, one_batch_row):
+def create_batch_row_action_position(batch_description, batch_header_map, one_batch_row,
+                                     batch_row_action_position=None,
+                                     save_to_database=True):
     """
 
     :param batch_description:
     :param batch_header_map:
     :param one_batch_row:
+    :param batch_row_action_position: Already retrieved, or new and not saved yet, by create_batch_row_action_list
+    :param save_to_database: False when the caller saves batch_row_action_position and one_batch_row in bulk
     :return:
     """
     batch_manager = BatchManager()
@@ -2604,11 +2602,22 @@ def create_batch_row_action_position(batch_description, batch_header_map, one_ba
     # Does a BatchRowActionPosition entry already exist?
     # We want to start with the BatchRowAction... entry first so we can record our findings line by line while
     #  we are checking for existing duplicate data
-    existing_results = batch_manager.retrieve_batch_row_action_position(
-        batch_description.batch_header_id, one_batch_row.id)
+    if batch_row_action_position is not None:
+        existing_results = {
+            'batch_row_action_found':       batch_row_action_position.id is not None,
+            'batch_row_action_position':    batch_row_action_position,
+        }
+    else:
+        existing_results = batch_manager.retrieve_batch_row_action_position(
+            batch_description.batch_header_id, one_batch_row.id)
     if existing_results['batch_row_action_found']:
         batch_row_action_position = existing_results['batch_row_action_position']
         batch_row_action_updated = True
+    elif batch_row_action_position is not None:
+        # The caller creates it
+        batch_row_action_created = True
+        success = True
+        status = "BATCH_ROW_ACTION_POSITION_CREATED "
     else:
         # If a BatchRowActionOrganization entry does not exist, create one
         try:
@@ -2962,7 +2971,8 @@ def create_batch_row_action_position(batch_description, batch_header_map, one_ba
         batch_row_action_position.organization_we_vote_id = organization_we_vote_id
         batch_row_action_position.kind_of_action = kind_of_action
         batch_row_action_position.status = status
-        batch_row_action_position.save()
+        if save_to_database:
+            batch_row_action_position.save()
         success = True
     except Exception as e:
         success = False
@@ -2973,7 +2983,8 @@ def create_batch_row_action_position(batch_description, batch_header_map, one_ba
         if batch_row_action_created or batch_row_action_updated:
             # If BatchRowAction was created, this batch_row was analyzed
             one_batch_row.batch_row_analyzed = True
-            one_batch_row.save()
+            if save_to_database:
+                one_batch_row.save()
     except Exception as e:
         status += "CANNOT_SAVE_ONE_BATCH_ROW: " + str(e) + ' '
         success = False
@@ -2988,6 +2999,150 @@ def create_batch_row_action_position(batch_description, batch_header_map, one_ba
     return results
 
 
+def create_batch_row_action_list(batch_description, batch_header_map, batch_row_list, election_objects_dict=None):
+    """
+    Same results as calling create_batch_row_action_candidate, create_batch_row_action_politician or
+    create_batch_row_action_position for each batch_row, but for each chunk of rows the existing BatchRowAction
+    entries are retrieved with one query, and the BatchRowAction entries and BatchRows are written with
+    bulk_create/bulk_update. Matching each row to an existing candidate, politician, office or position still takes
+    that row's own queries.
+    :param batch_description:
+    :param batch_header_map:
+    :param batch_row_list:
+    :param election_objects_dict:
+    :return:
+    """
+    status = ""
+    success = True
+    number_of_batch_actions_created = 0
+    number_of_batch_actions_updated = 0
+    election_objects_dict = {} if election_objects_dict is None else election_objects_dict
+    t0 = perf_counter()
+
+    kind_of_batch = batch_description.kind_of_batch
+    contest_office_batch_header_id = None
+    if kind_of_batch == CANDIDATE:
+        batch_row_action_model = BatchRowActionCandidate
+        batch_row_action_key = 'batch_row_action_candidate'
+        contest_office_batch_header_id = \
+            get_batch_header_id_from_batch_description(str(batch_description.batch_set_id), CONTEST_OFFICE)
+    elif kind_of_batch == POLITICIAN:
+        batch_row_action_model = BatchRowActionPolitician
+        batch_row_action_key = 'batch_row_action_politician'
+    elif kind_of_batch == POSITION:
+        batch_row_action_model = BatchRowActionPosition
+        batch_row_action_key = 'batch_row_action_position'
+    else:
+        status += "CREATE_BATCH_ROW_ACTION_LIST-KIND_OF_BATCH_NOT_SUPPORTED: " + str(kind_of_batch) + " "
+        results = {
+            'success':                          False,
+            'status':                           status,
+            'number_of_batch_actions_created':  number_of_batch_actions_created,
+            'number_of_batch_actions_updated':  number_of_batch_actions_updated,
+            'election_objects_dict':            election_objects_dict,
+        }
+        return results
+    batch_row_action_field_list = [field for field in batch_row_action_model._meta.concrete_fields
+                                   if not field.primary_key]
+    # bulk_update doesn't set auto_now fields the way save() does
+    auto_now_field_list = [field for field in batch_row_action_field_list if getattr(field, 'auto_now', False)]
+
+    for start_index in range(0, len(batch_row_list), BATCH_ROW_ACTION_BULK_CHUNK_SIZE):
+        batch_row_chunk = batch_row_list[start_index:start_index + BATCH_ROW_ACTION_BULK_CHUNK_SIZE]
+        existing_batch_row_action_dict = {}
+        try:
+            for batch_row_action in batch_row_action_model.objects.filter(
+                    batch_header_id=batch_description.batch_header_id,
+                    batch_row_id__in=[one_batch_row.id for one_batch_row in batch_row_chunk]).order_by('id'):
+                existing_batch_row_action_dict.setdefault(batch_row_action.batch_row_id, batch_row_action)
+        except Exception as e:
+            success = False
+            status += "CREATE_BATCH_ROW_ACTION_LIST-RETRIEVE_ERROR: " + str(e) + " "
+            handle_exception(e, logger=logger, exception_message=status)
+            break
+
+        batch_row_action_to_create_list = []
+        batch_row_action_to_update_list = []
+        for one_batch_row in batch_row_chunk:
+            batch_row_action = existing_batch_row_action_dict.get(one_batch_row.id)
+            if batch_row_action is None:
+                batch_row_action = batch_row_action_model(
+                    batch_header_id=batch_description.batch_header_id,
+                    batch_row_id=one_batch_row.id,
+                    batch_set_id=batch_description.batch_set_id,
+                )
+            if kind_of_batch == CANDIDATE:
+                results = create_batch_row_action_candidate(
+                    batch_description, batch_header_map, one_batch_row,
+                    batch_row_action_candidate=batch_row_action,
+                    contest_office_batch_header_id=contest_office_batch_header_id,
+                    election_objects_dict=election_objects_dict,
+                    save_to_database=False)
+            elif kind_of_batch == POLITICIAN:
+                results = create_batch_row_action_politician(
+                    batch_description, batch_header_map, one_batch_row,
+                    batch_row_action_politician=batch_row_action,
+                    save_to_database=False)
+            else:
+                results = create_batch_row_action_position(
+                    batch_description, batch_header_map, one_batch_row,
+                    batch_row_action_position=batch_row_action,
+                    save_to_database=False)
+                status += "CREATE_BATCH_ROW_ACTION_POSITION-START: " + results['status']
+            if not results['success']:
+                # Like the one row functions, which don't save what they couldn't fill in
+                success = False
+                if kind_of_batch != POSITION:
+                    status += results['status']
+                continue
+            batch_row_action = results[batch_row_action_key]
+            if batch_row_action.id is None:
+                batch_row_action_to_create_list.append(batch_row_action)
+            else:
+                for field in auto_now_field_list:
+                    field.pre_save(batch_row_action, False)
+                batch_row_action_to_update_list.append(batch_row_action)
+
+        try:
+            if len(batch_row_action_to_create_list):
+                batch_row_action_model.objects.bulk_create(batch_row_action_to_create_list)
+            if len(batch_row_action_to_update_list):
+                batch_row_action_model.objects.bulk_update(
+                    batch_row_action_to_update_list, [field.name for field in batch_row_action_field_list])
+        except Exception as e:
+            # One row the database refuses (ex/ a value too long) shouldn't cost us the whole chunk
+            status += "CREATE_BATCH_ROW_ACTION_LIST-BULK_SAVE_FAILED, SAVING_ONE_AT_A_TIME: " + str(e) + " "
+            for batch_row_action in batch_row_action_to_create_list + batch_row_action_to_update_list:
+                try:
+                    batch_row_action.save()
+                except Exception as e:
+                    success = False
+                    status += "BATCH_ROW_ACTION_UNABLE_TO_SAVE: " + str(e) + " "
+                    if batch_row_action in batch_row_action_to_create_list:
+                        batch_row_action_to_create_list.remove(batch_row_action)
+        number_of_batch_actions_created += len(batch_row_action_to_create_list)
+        number_of_batch_actions_updated += len(batch_row_action_to_update_list)
+
+        try:
+            BatchRow.objects.bulk_update(batch_row_chunk, ['state_code', 'batch_row_analyzed'])
+        except Exception as e:
+            status += "COULD_NOT_SAVE_BATCH_ROWS: " + str(e) + " "
+            handle_exception(e, logger=logger, exception_message=status)
+
+    elapsed_seconds = perf_counter() - t0
+    status += "BATCH_ROW_ACTIONS_ANALYZED: " + str(len(batch_row_list)) + \
+              " ROWS_PER_SECOND: " + str(round(len(batch_row_list) / elapsed_seconds if elapsed_seconds else 0)) + " "
+
+    results = {
+        'success':                          success,
+        'status':                           status,
+        'number_of_batch_actions_created':  number_of_batch_actions_created,
+        'number_of_batch_actions_updated':  number_of_batch_actions_updated,
+        'election_objects_dict':            election_objects_dict,
+    }
+    return results
+
+
 def create_batch_row_action_ballot_item(batch_description,
                                         batch_header_map,
                                         one_batch_row,
@@ -3415,6 +3570,319 @@ def create_batch_row_action_ballot_item(batch_description,
     return results
 
 
+def ballot_item_batch_row_needs_matching(row_values):
+    """
+    True when create_batch_row_action_ballot_item would look for the office, measure or candidate by name
+    (or Twitter handle), instead of only by we_vote_id
+    """
+    if positive_value_exists(row_values['candidate_name']):
+        return True
+    if positive_value_exists(row_values['contest_office_we_vote_id']):
+        return False
+    if positive_value_exists(row_values['contest_office_name']) or \
+            positive_value_exists(row_values['candidate_twitter_handle']):
+        return True
+    return not positive_value_exists(row_values['contest_measure_we_vote_id'])
+
+
+def create_batch_row_action_ballot_item_list(
+        batch_description,
+        batch_header_map,
+        batch_row_list,
+        election_objects_dict={},
+        measure_objects_dict={},
+        office_objects_dict={}):
+    """
+    Same results as calling create_batch_row_action_ballot_item for each batch_row, but set-based: for each chunk of
+    rows, the elections, offices, measures, existing ballot items and existing BatchRowActionBallotItem entries are
+    retrieved with one query each, and the BatchRowActionBallotItem entries and BatchRows are written with
+    bulk_create/bulk_update. Rows that identify their office or measure only by name still go through
+    create_batch_row_action_ballot_item, one at a time.
+    :param batch_description:
+    :param batch_header_map:
+    :param batch_row_list:
+    :param election_objects_dict:
+    :param measure_objects_dict:
+    :param office_objects_dict:
+    :return:
+    """
+    batch_manager = BatchManager()
+    status = ""
+    success = True
+    number_of_batch_actions_created = 0
+    number_of_batch_actions_updated = 0
+    batch_row_action_list = []
+    t0 = perf_counter()
+
+    # NOTE: If you add incoming header names here, make sure to update BATCH_IMPORT_KEYS_ACCEPTED_FOR_BALLOT_ITEMS
+    batch_header_name_list = [
+        'polling_location_we_vote_id', 'contest_office_we_vote_id', 'contest_office_name', 'candidate_name',
+        'candidate_twitter_handle', 'contest_measure_we_vote_id', 'contest_measure_name', 'local_ballot_order',
+        'state_code', 'voter_id',
+    ]
+    compared_field_list = [
+        'batch_set_id', 'polling_location_we_vote_id', 'kind_of_action', 'contest_office_we_vote_id',
+        'contest_measure_we_vote_id', 'state_code', 'local_ballot_order', 'google_civic_election_id', 'measure_text',
+        'measure_url', 'no_vote_description', 'yes_vote_description', 'voter_id', 'ballot_item_display_name',
+    ]
+    for start_index in range(0, len(batch_row_list), BATCH_ROW_ACTION_BULK_CHUNK_SIZE):
+        batch_row_chunk = batch_row_list[start_index:start_index + BATCH_ROW_ACTION_BULK_CHUNK_SIZE]
+        row_values_list = []
+        for one_batch_row in batch_row_chunk:
+            row_values = {}
+            for batch_header_name in batch_header_name_list:
+                row_values[batch_header_name] = batch_manager.retrieve_value_from_batch_row(
+                    batch_header_name, batch_header_map, one_batch_row)
+            if positive_value_exists(one_batch_row.google_civic_election_id):
+                row_values['google_civic_election_id'] = str(one_batch_row.google_civic_election_id)
+            else:
+                row_values['google_civic_election_id'] = str(batch_description.google_civic_election_id)
+            row_values['local_ballot_order'] = convert_to_int(row_values['local_ballot_order'])
+            row_values['voter_id'] = convert_to_int(row_values['voter_id'])
+            if ballot_item_batch_row_needs_matching(row_values):
+                results = create_batch_row_action_ballot_item(
+                    batch_description=batch_description,
+                    batch_header_map=batch_header_map,
+                    one_batch_row=one_batch_row,
+                    election_objects_dict=election_objects_dict,
+                    measure_objects_dict=measure_objects_dict,
+                    office_objects_dict=office_objects_dict,
+                )
+                if results['batch_row_action_updated']:
+                    number_of_batch_actions_updated += 1
+                elif results['batch_row_action_created']:
+                    number_of_batch_actions_created += 1
+                if not results['success']:
+                    success = False
+                    status += results['status']
+                if results['batch_row_action_ballot_item']:
+                    batch_row_action_list.append(results['batch_row_action_ballot_item'])
+            else:
+                row_values_list.append((one_batch_row, row_values))
+        if not len(row_values_list):
+            continue
+
+        try:
+            google_civic_election_id_list = list(set(
+                row_values['google_civic_election_id'] for one_batch_row, row_values in row_values_list
+                if positive_value_exists(row_values['google_civic_election_id']) and
+                not positive_value_exists(row_values['state_code']) and
+                row_values['google_civic_election_id'] not in election_objects_dict))
+            if len(google_civic_election_id_list):
+                for election in Election.objects.using('readonly').filter(
+                        google_civic_election_id__in=google_civic_election_id_list):
+                    election_objects_dict[str(election.google_civic_election_id)] = election
+
+            contest_office_we_vote_id_list = list(set(
+                row_values['contest_office_we_vote_id'] for one_batch_row, row_values in row_values_list
+                if positive_value_exists(row_values['contest_office_we_vote_id']) and
+                row_values['contest_office_we_vote_id'] not in office_objects_dict))
+            if len(contest_office_we_vote_id_list):
+                # Not from 'readonly', so we don't get "terminating connection due to conflict with recovery" error
+                for contest_office in ContestOffice.objects.filter(we_vote_id__in=contest_office_we_vote_id_list):
+                    office_objects_dict[contest_office.we_vote_id] = contest_office
+
+            contest_measure_we_vote_id_list = list(set(
+                row_values['contest_measure_we_vote_id'] for one_batch_row, row_values in row_values_list
+                if positive_value_exists(row_values['contest_measure_we_vote_id']) and
+                row_values['contest_measure_we_vote_id'] not in measure_objects_dict))
+            if len(contest_measure_we_vote_id_list):
+                for contest_measure in ContestMeasure.objects.filter(we_vote_id__in=contest_measure_we_vote_id_list):
+                    measure_objects_dict[contest_measure.we_vote_id] = contest_measure
+
+            # Existing ballot items, by (election, map point, office or measure)
+            existing_ballot_item_id_dict = {}
+            existing_ballot_item_query = BallotItem.objects.filter(
+                google_civic_election_id__in=list(set(
+                    row_values['google_civic_election_id'] for one_batch_row, row_values in row_values_list)),
+                polling_location_we_vote_id__in=list(set(
+                    row_values['polling_location_we_vote_id'] or '' for one_batch_row, row_values in row_values_list)))
+            existing_ballot_item_query = existing_ballot_item_query.filter(
+                Q(contest_office_we_vote_id__in=list(set(
+                    row_values['contest_office_we_vote_id'] for one_batch_row, row_values in row_values_list
+                    if positive_value_exists(row_values['contest_office_we_vote_id'])))) |
+                Q(contest_measure_we_vote_id__in=list(set(
+                    row_values['contest_measure_we_vote_id'] for one_batch_row, row_values in row_values_list
+                    if positive_value_exists(row_values['contest_measure_we_vote_id'])))))
+            for ballot_item_id, google_civic_election_id, polling_location_we_vote_id, contest_office_we_vote_id, \
+                    contest_measure_we_vote_id in existing_ballot_item_query.order_by('id').values_list(
+                        'id', 'google_civic_election_id', 'polling_location_we_vote_id',
+                        'contest_office_we_vote_id', 'contest_measure_we_vote_id'):
+                ballot_item_key = (str(google_civic_election_id), polling_location_we_vote_id or '')
+                if positive_value_exists(contest_office_we_vote_id):
+                    existing_ballot_item_id_dict.setdefault(
+                        ballot_item_key + ('office', contest_office_we_vote_id), ballot_item_id)
+                if positive_value_exists(contest_measure_we_vote_id):
+                    existing_ballot_item_id_dict.setdefault(
+                        ballot_item_key + ('measure', contest_measure_we_vote_id), ballot_item_id)
+
+            existing_batch_row_action_dict = {}
+            for batch_row_action_ballot_item in BatchRowActionBallotItem.objects.filter(
+                    batch_header_id=batch_description.batch_header_id,
+                    batch_row_id__in=[one_batch_row.id for one_batch_row, row_values in row_values_list]):
+                existing_batch_row_action_dict.setdefault(
+                    batch_row_action_ballot_item.batch_row_id, batch_row_action_ballot_item)
+        except Exception as e:
+            success = False
+            status += "CREATE_BATCH_ROW_ACTION_BALLOT_ITEM_LIST-RETRIEVE_ERROR: " + str(e) + " "
+            handle_exception(e, logger=logger, exception_message=status)
+            break
+
+        batch_row_action_to_create_list = []
+        batch_row_action_to_update_list = []
+        batch_row_to_update_list = []
+        for one_batch_row, row_values in row_values_list:
+            row_status = "CREATE_BATCH_ROW_ACTION_BALLOT_ITEM_LIST "
+            google_civic_election_id = row_values['google_civic_election_id']
+            polling_location_we_vote_id = row_values['polling_location_we_vote_id']
+            contest_office_we_vote_id = row_values['contest_office_we_vote_id']
+            contest_office_name = row_values['contest_office_name']
+            contest_measure_we_vote_id = row_values['contest_measure_we_vote_id']
+            contest_measure_name = row_values['contest_measure_name']
+            state_code = row_values['state_code']
+            voter_id = row_values['voter_id']
+            contest_measure_text = ""
+            contest_measure_url = ""
+            yes_vote_description = ""
+            no_vote_description = ""
+
+            if positive_value_exists(google_civic_election_id) and not positive_value_exists(state_code):
+                election = election_objects_dict.get(google_civic_election_id)
+                if election:
+                    state_code = election.state_code
+            if positive_value_exists(contest_office_we_vote_id):
+                contest_office = office_objects_dict.get(contest_office_we_vote_id)
+                if contest_office:
+                    contest_office_name = contest_office.office_name
+                elif contest_office_we_vote_id not in office_objects_dict:
+                    row_status += "COULD_NOT_RETRIEVE_OFFICE_FROM_WE_VOTE_ID "
+            if positive_value_exists(contest_measure_we_vote_id):
+                contest_measure = measure_objects_dict.get(contest_measure_we_vote_id)
+                if contest_measure:
+                    contest_measure_name = contest_measure.measure_title
+                    contest_measure_text = contest_measure.get_measure_text()
+                    contest_measure_url = contest_measure.get_measure_url()
+                    yes_vote_description = contest_measure.ballotpedia_yes_vote_description
+                    no_vote_description = contest_measure.ballotpedia_no_vote_description
+
+            ballot_item_key = (google_civic_election_id, polling_location_we_vote_id or '')
+            if positive_value_exists(contest_office_we_vote_id):
+                existing_ballot_item_id = existing_ballot_item_id_dict.get(
+                    ballot_item_key + ('office', contest_office_we_vote_id), 0)
+            else:
+                existing_ballot_item_id = existing_ballot_item_id_dict.get(
+                    ballot_item_key + ('measure', contest_measure_we_vote_id), 0)
+
+            # Do we have the minimum required variables?
+            polling_location_or_voter = \
+                positive_value_exists(polling_location_we_vote_id) or positive_value_exists(voter_id)
+            if polling_location_or_voter and google_civic_election_id:
+                if positive_value_exists(existing_ballot_item_id):
+                    kind_of_action = IMPORT_ADD_TO_EXISTING
+                else:
+                    kind_of_action = IMPORT_CREATE
+            else:
+                if not polling_location_or_voter:
+                    row_status += "MISSING_POLLING_LOCATION_OR_VOTER_ID "
+                if not google_civic_election_id:
+                    row_status += "MISSING_GOOGLE_CIVIC_ELECTION_ID "
+                kind_of_action = IMPORT_TO_BE_DETERMINED
+
+            ballot_item_display_name = ''
+            if positive_value_exists(contest_office_name):
+                ballot_item_display_name = contest_office_name
+            elif positive_value_exists(contest_measure_name):
+                ballot_item_display_name = contest_measure_name
+
+            field_values = {
+                'batch_set_id':                 batch_description.batch_set_id,
+                'polling_location_we_vote_id':  polling_location_we_vote_id,
+                'kind_of_action':               kind_of_action,
+                'contest_office_we_vote_id':    contest_office_we_vote_id,
+                'contest_measure_we_vote_id':   contest_measure_we_vote_id,
+                'state_code':                   state_code,
+                'local_ballot_order':           row_values['local_ballot_order'],
+                'google_civic_election_id':     google_civic_election_id,
+                'measure_text':                 contest_measure_text,
+                'measure_url':                  contest_measure_url,
+                'no_vote_description':          no_vote_description,
+                'yes_vote_description':         yes_vote_description,
+                'voter_id':                     voter_id,
+                'ballot_item_display_name':     ballot_item_display_name,
+            }
+            batch_row_action_ballot_item = existing_batch_row_action_dict.get(one_batch_row.id)
+            if batch_row_action_ballot_item is None:
+                batch_row_action_ballot_item = BatchRowActionBallotItem(
+                    ballot_item_id=existing_ballot_item_id,
+                    batch_header_id=batch_description.batch_header_id,
+                    batch_row_id=one_batch_row.id,
+                    status=row_status + "BATCH_ROW_ACTION_BALLOT_ITEM_CREATED ",
+                    **field_values)
+                batch_row_action_to_create_list.append(batch_row_action_ballot_item)
+            else:
+                batch_row_action_ballot_item_change_found = False
+                for field_name in compared_field_list:
+                    if getattr(batch_row_action_ballot_item, field_name) != field_values[field_name]:
+                        setattr(batch_row_action_ballot_item, field_name, field_values[field_name])
+                        batch_row_action_ballot_item_change_found = True
+                if batch_row_action_ballot_item_change_found:
+                    batch_row_action_ballot_item.status = row_status + "EXISTING_BATCH_ROW_ACTION_BALLOT_ITEM_FOUND "
+                    batch_row_action_to_update_list.append(batch_row_action_ballot_item)
+                number_of_batch_actions_updated += 1
+            batch_row_action_list.append(batch_row_action_ballot_item)
+
+            # This batch_row has been analyzed
+            batch_row_changed = False
+            if positive_value_exists(polling_location_we_vote_id) and \
+                    one_batch_row.polling_location_we_vote_id != polling_location_we_vote_id:
+                one_batch_row.polling_location_we_vote_id = polling_location_we_vote_id
+                batch_row_changed = True
+            if positive_value_exists(voter_id) and one_batch_row.voter_id != voter_id:
+                one_batch_row.voter_id = voter_id
+                batch_row_changed = True
+            if not positive_value_exists(one_batch_row.batch_row_analyzed):
+                one_batch_row.batch_row_analyzed = True
+                batch_row_changed = True
+            if batch_row_changed:
+                batch_row_to_update_list.append(one_batch_row)
+
+        try:
+            if len(batch_row_action_to_create_list):
+                BatchRowActionBallotItem.objects.bulk_create(batch_row_action_to_create_list)
+                number_of_batch_actions_created += len(batch_row_action_to_create_list)
+            if len(batch_row_action_to_update_list):
+                BatchRowActionBallotItem.objects.bulk_update(
+                    batch_row_action_to_update_list, compared_field_list + ['status'])
+        except Exception as e:
+            success = False
+            status += "CREATE_BATCH_ROW_ACTION_BALLOT_ITEM_LIST-UNABLE_TO_SAVE: " + str(e) + " "
+            handle_exception(e, logger=logger, exception_message=status)
+            break
+        try:
+            if len(batch_row_to_update_list):
+                BatchRow.objects.bulk_update(
+                    batch_row_to_update_list, ['polling_location_we_vote_id', 'voter_id', 'batch_row_analyzed'])
+        except Exception as e:
+            status += "COULD_NOT_SAVE_BATCH_ROWS: " + str(e) + " "
+            handle_exception(e, logger=logger, exception_message=status)
+
+    elapsed_seconds = perf_counter() - t0
+    status += "BATCH_ROW_ACTION_BALLOT_ITEMS_ANALYZED: " + str(len(batch_row_list)) + \
+              " ROWS_PER_SECOND: " + str(round(len(batch_row_list) / elapsed_seconds if elapsed_seconds else 0)) + " "
+
+    results = {
+        'success':                          success,
+        'status':                           status,
+        'number_of_batch_actions_created':  number_of_batch_actions_created,
+        'number_of_batch_actions_updated':  number_of_batch_actions_updated,
+        'batch_row_action_list':            batch_row_action_list,
+        'election_objects_dict':            election_objects_dict,
+        'measure_objects_dict':             measure_objects_dict,
+        'office_objects_dict':              office_objects_dict,
+    }
+    return results
+
+
 def create_batch_row_action_ballot_item_delete(batch_description, existing_ballot_item):
     """
     Schedule the delete of existing ballot_item
@@ -5470,6 +5938,7 @@ def import_update_or_create_office_held_entry(batch_header_id, batch_row_id):
     return results
 
 
+@defer_ballot_returned_spatial_index_invalidation()
 def import_ballot_item_data_from_batch_row_actions(batch_header_id, batch_row_id,
                                                    create_entry_flag=False, update_entry_flag=False):
     """
@@ -5584,10 +6053,50 @@ def import_ballot_item_data_from_batch_row_actions(batch_header_id, batch_row_id
         }
         return results
 
+    t0 = perf_counter()
+    batch_row_action_list = list(batch_row_action_list)
+    # Make sure we have both ids for each office and measure, with one query for each kind of id instead of
+    #  one per row
+    office_id_by_we_vote_id = {}
+    office_we_vote_id_by_id = {}
+    measure_id_by_we_vote_id = {}
+    measure_we_vote_id_by_id = {}
+    try:
+        contest_office_we_vote_id_list = list(set(
+            one_batch_row_action.contest_office_we_vote_id for one_batch_row_action in batch_row_action_list
+            if positive_value_exists(one_batch_row_action.contest_office_we_vote_id) and
+            not positive_value_exists(one_batch_row_action.contest_office_id)))
+        contest_office_id_list = list(set(
+            one_batch_row_action.contest_office_id for one_batch_row_action in batch_row_action_list
+            if positive_value_exists(one_batch_row_action.contest_office_id) and
+            not positive_value_exists(one_batch_row_action.contest_office_we_vote_id)))
+        contest_measure_we_vote_id_list = list(set(
+            one_batch_row_action.contest_measure_we_vote_id for one_batch_row_action in batch_row_action_list
+            if positive_value_exists(one_batch_row_action.contest_measure_we_vote_id) and
+            not positive_value_exists(one_batch_row_action.contest_measure_id)))
+        contest_measure_id_list = list(set(
+            one_batch_row_action.contest_measure_id for one_batch_row_action in batch_row_action_list
+            if positive_value_exists(one_batch_row_action.contest_measure_id) and
+            not positive_value_exists(one_batch_row_action.contest_measure_we_vote_id)))
+        if len(contest_office_we_vote_id_list) or len(contest_office_id_list):
+            for contest_office_id, contest_office_we_vote_id in ContestOffice.objects.using('readonly').filter(
+                    Q(we_vote_id__in=contest_office_we_vote_id_list) | Q(id__in=contest_office_id_list))\
+                    .values_list('id', 'we_vote_id'):
+                office_id_by_we_vote_id[contest_office_we_vote_id] = contest_office_id
+                office_we_vote_id_by_id[contest_office_id] = contest_office_we_vote_id
+        if len(contest_measure_we_vote_id_list) or len(contest_measure_id_list):
+            for contest_measure_id, contest_measure_we_vote_id in ContestMeasure.objects.using('readonly').filter(
+                    Q(we_vote_id__in=contest_measure_we_vote_id_list) | Q(id__in=contest_measure_id_list))\
+                    .values_list('id', 'we_vote_id'):
+                measure_id_by_we_vote_id[contest_measure_we_vote_id] = contest_measure_id
+                measure_we_vote_id_by_id[contest_measure_id] = contest_measure_we_vote_id
+    except Exception as e:
+        status += "IMPORT_BALLOT_ITEM_ENTRY-COULD_NOT_RETRIEVE_OFFICE_AND_MEASURE_IDS: " + str(e) + " "
+        handle_exception(e, logger=logger, exception_message=status)
+
     ballot_returned_manager = BallotReturnedManager()
     ballot_returned_entries_that_exist = []
-    measure_manager = ContestMeasureManager()
-    office_manager = ContestOfficeManager()
+    batch_row_action_to_update_list = []
     polling_location_manager = PollingLocationManager()
     for one_batch_row_action in batch_row_action_list:
         # Find the column in the incoming batch_row with the header == ballot_item_display_name
@@ -5603,21 +6112,21 @@ def import_ballot_item_data_from_batch_row_actions(batch_header_id, batch_row_id
         # Make sure we have both ids for office
         if positive_value_exists(one_batch_row_action.contest_office_we_vote_id) \
                 and not positive_value_exists(one_batch_row_action.contest_office_id):
-            one_batch_row_action.contest_office_id = office_manager.fetch_contest_office_id_from_we_vote_id(
-                one_batch_row_action.contest_office_we_vote_id)
+            one_batch_row_action.contest_office_id = \
+                office_id_by_we_vote_id.get(one_batch_row_action.contest_office_we_vote_id, 0)
         elif positive_value_exists(one_batch_row_action.contest_office_id) \
                 and not positive_value_exists(one_batch_row_action.contest_office_we_vote_id):
-            one_batch_row_action.contest_office_we_vote_id = office_manager.fetch_contest_office_we_vote_id_from_id(
-                one_batch_row_action.contest_office_id)
+            one_batch_row_action.contest_office_we_vote_id = \
+                office_we_vote_id_by_id.get(one_batch_row_action.contest_office_id, 0)
         # Make sure we have both ids for measure
         if positive_value_exists(one_batch_row_action.contest_measure_we_vote_id) \
                 and not positive_value_exists(one_batch_row_action.contest_measure_id):
-            one_batch_row_action.contest_measure_id = measure_manager.fetch_contest_measure_id_from_we_vote_id(
-                one_batch_row_action.contest_measure_we_vote_id)
+            one_batch_row_action.contest_measure_id = \
+                measure_id_by_we_vote_id.get(one_batch_row_action.contest_measure_we_vote_id, 0)
         elif positive_value_exists(one_batch_row_action.contest_measure_id) \
                 and not positive_value_exists(one_batch_row_action.contest_measure_we_vote_id):
-            one_batch_row_action.contest_measure_we_vote_id = measure_manager.fetch_contest_measure_we_vote_id_from_id(
-                one_batch_row_action.contest_measure_id)
+            one_batch_row_action.contest_measure_we_vote_id = \
+                measure_we_vote_id_by_id.get(one_batch_row_action.contest_measure_id, 0)
         defaults = {
             'ballot_item_id':               one_batch_row_action.ballot_item_id,
             'contest_office_id':            one_batch_row_action.contest_office_id,
@@ -5643,15 +6152,10 @@ def import_ballot_item_data_from_batch_row_actions(batch_header_id, batch_row_id
                                                                            google_civic_election_id, defaults)
                 if results['new_ballot_item_created']:
                     number_of_ballot_items_created += 1
-                    # now update BatchRowActionBallotItem table entry
-                    try:
-                        one_batch_row_action.kind_of_action = IMPORT_ADD_TO_EXISTING
-                        new_ballot_item = results['ballot_item']
-                        one_batch_row_action.save()
-                    except Exception as e:
-                        success = False
-                        status += "BALLOT_ITEM_RETRIEVE_ERROR: " + str(e) + " "
-                        handle_exception(e, logger=logger, exception_message=status)
+                    # now update BatchRowActionBallotItem table entry, along with the others, after this loop
+                    one_batch_row_action.kind_of_action = IMPORT_ADD_TO_EXISTING
+                    new_ballot_item = results['ballot_item']
+                    batch_row_action_to_update_list.append(one_batch_row_action)
                 else:
                     status += results['status']
             elif update_entry_flag:
@@ -5721,6 +6225,21 @@ def import_ballot_item_data_from_batch_row_actions(batch_header_id, batch_row_id
         else:
             status += "IMPORT_BALLOT_ITEM_ENTRY:MISSING_DISPLAY_NAME-STATE_CODE-OR_ELECTION_ID "
 
+    try:
+        for start_index in range(0, len(batch_row_action_to_update_list), BATCH_ROW_ACTION_BULK_CHUNK_SIZE):
+            BatchRowActionBallotItem.objects.bulk_update(
+                batch_row_action_to_update_list[start_index:start_index + BATCH_ROW_ACTION_BULK_CHUNK_SIZE],
+                ['kind_of_action', 'contest_office_id', 'contest_office_we_vote_id',
+                 'contest_measure_id', 'contest_measure_we_vote_id'])
+    except Exception as e:
+        success = False
+        status += "BALLOT_ITEM_RETRIEVE_ERROR: " + str(e) + " "
+        handle_exception(e, logger=logger, exception_message=status)
+    elapsed_seconds = perf_counter() - t0
+    status += "IMPORT_BALLOT_ITEM_ENTRY-ROWS: " + str(len(batch_row_action_list)) + \
+              " ROWS_PER_SECOND: " + str(round(len(batch_row_action_list) / elapsed_seconds if elapsed_seconds else 0)) \
+              + " "
+
     # if number_of_ballot_items_created or number_of_ballot_items_updated:
     #     if positive_value_exists(polling_location_we_vote_id) and positive_value_exists(google_civic_election_id):
     #         # Make sure there is a ballot_returned entry
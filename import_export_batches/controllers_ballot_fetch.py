@@ -0,0 +1,143 @@
+# import_export_batches/controllers_ballot_fetch.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+import queue
+import threading
+from time import monotonic, sleep
+
+from config.base import get_environment_variable_default
+import wevote_functions.admin
+from wevote_functions.functions import convert_to_int
+from wevote_functions.functions_http import http_get
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+# How many ballot requests to have in flight at once, when retrieving ballots for map points
+BALLOT_FETCH_CONCURRENCY = convert_to_int(get_environment_variable_default("BALLOT_FETCH_CONCURRENCY", 8))
+BALLOT_FETCH_TIMEOUT_SECONDS = 30
+# Per provider, across every thread in this process
+BALLOT_FETCH_REQUESTS_PER_SECOND = {
+    'ctcl':         float(get_environment_variable_default("CTCL_REQUESTS_PER_SECOND", 10)),
+    'google_civic': float(get_environment_variable_default("GOOGLE_CIVIC_REQUESTS_PER_SECOND", 10)),
+    'vote_usa':     float(get_environment_variable_default("VOTE_USA_REQUESTS_PER_SECOND", 10)),
+}
+
+
+class RequestRateLimiter:
+    """
+    Spaces requests at least 1 / requests_per_second apart, however many threads share it
+    """
+
+    def __init__(self, requests_per_second):
+        self.interval_seconds = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self.next_request_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval_seconds:
+            return
+        with self.lock:
+            right_now = monotonic()
+            request_time = max(self.next_request_time, right_now)
+            self.next_request_time = request_time + self.interval_seconds
+        if request_time > right_now:
+            sleep(request_time - right_now)
+
+
+ballot_fetch_lock = threading.Lock()
+ballot_fetch_rate_limiters = {}
+
+
+def get_ballot_fetch_rate_limiter(provider):
+    with ballot_fetch_lock:
+        rate_limiter = ballot_fetch_rate_limiters.get(provider)
+        if rate_limiter is None:
+            rate_limiter = RequestRateLimiter(BALLOT_FETCH_REQUESTS_PER_SECOND.get(provider, 0))
+            ballot_fetch_rate_limiters[provider] = rate_limiter
+        return rate_limiter
+
+
+def fetch_ballot_json(fetch_request):
+    """
+    :param fetch_request: {'provider', 'url', 'params', 'headers'}, from one of the generate_*_fetch_request functions
+    :return: A ballot_fetch_results dict. one_ballot_json is None when the provider sent back an empty body.
+      error is the exception, if the request or the JSON failed.
+    """
+    provider = fetch_request.get('provider', '')
+    one_ballot_json = None
+    error = None
+    url = ''
+    status_code = 0
+    get_ballot_fetch_rate_limiter(provider).wait()
+    try:
+        # http_get reuses kept-alive connections to the provider, so we don't pay a TCP and TLS handshake
+        #  on every map point
+        response = http_get(
+            fetch_request['url'],
+            params=fetch_request.get('params'),
+            headers=fetch_request.get('headers'),
+            timeout=BALLOT_FETCH_TIMEOUT_SECONDS)
+        url = response.url
+        status_code = response.status_code
+        if len(response.content) >= 2:
+            one_ballot_json = response.json()
+    except Exception as e:
+        error = e
+
+    results = {
+        'provider':         provider,
+        'one_ballot_json':  one_ballot_json,
+        'error':            error,
+        'url':              url,
+        'status_code':      status_code,
+    }
+    return results
+
+
+def fetch_ballot_json_concurrently(fetch_request_list, concurrency=BALLOT_FETCH_CONCURRENCY):
+    """
+    Fetch stage for retrieving ballots for many map points. Up to concurrency requests are in flight at once, and
+    each parsed response is handed back, through a bounded queue, to the thread iterating this generator, which does
+    all the storing and grooming (and so all the database work).
+    :param fetch_request_list: (key, fetch_request) tuples. A fetch_request of None is passed straight through.
+    :return: Generator of (key, ballot_fetch_results) tuples, in the order the responses arrive.
+      ballot_fetch_results is None for a fetch_request of None.
+    """
+    fetch_request_list = list(fetch_request_list)
+    request_queue = queue.Queue()
+    for key, fetch_request in fetch_request_list:
+        if fetch_request is None:
+            yield key, None
+        else:
+            request_queue.put((key, fetch_request))
+    fetch_count = request_queue.qsize()
+    if not fetch_count:
+        return
+
+    # Bounded, so fetching can't run far ahead of storing
+    results_queue = queue.Queue(maxsize=2 * max(concurrency, 1))
+    stop_event = threading.Event()
+
+    def fetch_worker():
+        while not stop_event.is_set():
+            try:
+                key, fetch_request = request_queue.get_nowait()
+            except queue.Empty:
+                return
+            ballot_fetch_results = fetch_ballot_json(fetch_request)
+            while not stop_event.is_set():
+                try:
+                    results_queue.put((key, ballot_fetch_results), timeout=1)
+                    break
+                except queue.Full:
+                    continue
+
+    for worker_number in range(min(max(concurrency, 1), fetch_count)):
+        threading.Thread(target=fetch_worker, name='ballot_fetch_' + str(worker_number), daemon=True).start()
+    try:
+        for _ in range(fetch_count):
+            yield results_queue.get()
+    finally:
+        # Also reached when the caller stops iterating early
+        stop_event.set()
@@ -23,7 +23,9 @@ from analytics.controllers import calculate_sitewide_daily_metrics, \
     process_one_analytics_batch_process_augment_with_first_visit, process_sitewide_voter_metrics, \
     retrieve_analytics_processing_next_step
 from analytics.models import AnalyticsManager
+from api_internal_cache.controllers import store_cached_api_response_from_api_internal_cache
 from api_internal_cache.models import ApiInternalCacheManager
+from config.base import get_environment_variable_default
 from ballot.models import BallotReturnedListManager
 from campaign.controllers import update_campaignx_entries_from_politician_list
 from candidate.controllers import fetch_ballotpedia_urls_to_retrieve_for_links_count, \
@@ -47,6 +49,7 @@ from voter_guide.controllers import voter_guides_upcoming_retrieve_for_api
 from voter_guide.models import VoterGuideManager, VoterGuidesGenerated
 import wevote_functions.admin
 from wevote_functions.functions import convert_to_int, positive_value_exists
+from wevote_functions.functions_status import StatusTrace
 from wevote_settings.models import fetch_batch_process_system_on, fetch_batch_process_system_activity_notices_on, \
     fetch_batch_process_system_api_refresh_on, fetch_batch_process_system_ballot_items_on, \
     fetch_batch_process_system_general_maintenance_on, \
@@ -76,6 +79,15 @@ NUMBER_OF_SIMULTANEOUS_BATCH_PROCESSES = 4  # Four processes at a time
 NUMBER_OF_SIMULTANEOUS_BALLOT_ITEM_BATCH_PROCESSES = 4  # Four processes at a time
 NUMBER_OF_SIMULTANEOUS_GENERAL_MAINTENANCE_BATCH_PROCESSES = 1
 NUMBER_OF_SIMULTANEOUS_REPRESENTATIVE_BATCH_PROCESSES = 1  # One processes at a time because of rate limiting
+# When True, the run_batch_process_workers management command runs the kinds of batch processes in
+#  BATCH_PROCESS_WORKER_KINDS ('ballot_items', 'representatives'), and process_next_ballot_items and
+#  process_next_representatives leave those kinds alone
+BATCH_PROCESS_WORKERS_ENABLED = \
+    positive_value_exists(get_environment_variable_default("BATCH_PROCESS_WORKERS_ENABLED", False))
+BATCH_PROCESS_WORKER_KINDS = [
+    kind.strip() for kind in
+    get_environment_variable_default("BATCH_PROCESS_WORKER_KINDS", "ballot_items,representatives").split(',')
+    if kind.strip()]
 
 
 def pass_through_batch_list_incoming_variables(request):
@@ -256,6 +268,14 @@ def process_next_ballot_items():
         }
         return results
 
+    if BATCH_PROCESS_WORKERS_ENABLED and 'ballot_items' in BATCH_PROCESS_WORKER_KINDS:
+        status += "BALLOT_ITEMS_RUN_BY_BATCH_PROCESS_WORKERS "
+        results = {
+            'success': success,
+            'status': status,
+        }
+        return results
+
     batch_process_manager = BatchProcessManager()
     # If we have more than NUMBER_OF_SIMULTANEOUS_BALLOT_ITEM_BATCH_PROCESSES batch_processes that are still active,
     # don't start a new import ballot item batch_process
@@ -266,7 +286,8 @@ def process_next_ballot_items():
 
     # Retrieve list of all ballot item BatchProcesses which have been started but not completed, so we can decide
     #  our next steps
-    # TODO: This logic needs to be looked at. How do we know this batch isn't already running on another process?
+    # NOTE: This doesn't stop two servers from running the same batch_process at once.
+    #  Set BATCH_PROCESS_WORKERS_ENABLED and use the run_batch_process_workers management command for that.
     results = batch_process_manager.retrieve_batch_process_list(
         kind_of_process_list=ballot_item_kind_of_processes,
         process_active=True,
@@ -1030,6 +1051,14 @@ def process_next_representatives():
         }
         return results
 
+    if BATCH_PROCESS_WORKERS_ENABLED and 'representatives' in BATCH_PROCESS_WORKER_KINDS:
+        status += "REPRESENTATIVES_RUN_BY_BATCH_PROCESS_WORKERS "
+        results = {
+            'success': success,
+            'status': status,
+        }
+        return results
+
     batch_process_manager = BatchProcessManager()
     # If we have more than NUMBER_OF_SIMULTANEOUS_REPRESENTATIVE_BATCH_PROCESSES batch_processes that are still active,
     # don't start a new import ballot item batch_process
@@ -1505,6 +1534,9 @@ def process_one_api_refresh_request_batch_process(batch_process):
             status += results['status']
             api_internal_cache_saved = results['success']
             api_internal_cache_id = results['api_internal_cache_id']
+            if api_internal_cache_saved:
+                # Push the new response into the shared response cache, so web servers don't wait to revalidate
+                store_cached_api_response_from_api_internal_cache(results['api_internal_cache'])
         else:
             status += "NEW_API_RESULTS_RETRIEVE_FAILED "
     else:
@@ -1566,7 +1598,7 @@ def process_one_api_refresh_request_batch_process(batch_process):
 
 
 def process_one_ballot_item_batch_process(batch_process):
-    status = ""
+    status = StatusTrace()
     success = True
     batch_manager = BatchManager()
     batch_process_manager = BatchProcessManager()
@@ -1599,17 +1631,17 @@ def process_one_ballot_item_batch_process(batch_process):
         batch_process_id = batch_process.id
     except Exception as e:
         status += "ERROR-CHECKED_OUT_TIME_NOT_SAVED: " + str(e) + " "
-        handle_exception(e, logger=logger, exception_message=status)
+        handle_exception(e, logger=logger, exception_message=str(status))
         batch_process_manager.create_batch_process_log_entry(
             batch_process_id=batch_process.id,
             google_civic_election_id=google_civic_election_id,
             kind_of_process=kind_of_process,
             state_code=state_code,
-            status=status,
+            status=str(status),
         )
         results = {
             'success': success,
-            'status': status,
+            'status': str(status),
         }
         return results
 
@@ -1627,7 +1659,7 @@ def process_one_ballot_item_batch_process(batch_process):
         status += results['status']
         results = {
             'success': success,
-            'status': status,
+            'status': str(status),
         }
         return results
     if results['batch_process_ballot_item_chunk_found']:
@@ -1651,7 +1683,7 @@ def process_one_ballot_item_batch_process(batch_process):
             status += results['status']
             results = {
                 'success': success,
-                'status': status,
+                'status': str(status),
             }
             return results
 
@@ -1672,22 +1704,22 @@ def process_one_ballot_item_batch_process(batch_process):
                 google_civic_election_id=google_civic_election_id,
                 kind_of_process=kind_of_process,
                 state_code=state_code,
-                status=status,
+                status=str(status),
             )
         except Exception as e:
             status += "ERROR-RETRIEVE_DATE_STARTED-CANNOT_SAVE_RETRIEVE_DATE_STARTED: " + str(e) + " "
-            handle_exception(e, logger=logger, exception_message=status)
+            handle_exception(e, logger=logger, exception_message=str(status))
             batch_process_manager.create_batch_process_log_entry(
                 batch_process_id=batch_process_id,
                 batch_process_ballot_item_chunk_id=batch_process_ballot_item_chunk.id,
                 google_civic_election_id=google_civic_election_id,
                 kind_of_process=kind_of_process,
                 state_code=state_code,
-                status=status,
+                status=str(status),
             )
             results = {
                 'success': success,
-                'status': status,
+                'status': str(status),
             }
             return results
         if batch_process.kind_of_process == REFRESH_BALLOT_ITEMS_FROM_POLLING_LOCATIONS:
@@ -1776,11 +1808,11 @@ def process_one_ballot_item_batch_process(batch_process):
                         google_civic_election_id=google_civic_election_id,
                         kind_of_process=kind_of_process,
                         state_code=state_code,
-                        status=status,
+                        status=str(status),
                     )
                 except Exception as e:
                     status += "ERROR-RETRIEVE_DATE_STARTED-CANNOT_SAVE_RETRIEVE_DATE_COMPLETED: " + str(e) + " "
-                    handle_exception(e, logger=logger, exception_message=status)
+                    handle_exception(e, logger=logger, exception_message=str(status))
                     batch_process_manager.create_batch_process_log_entry(
                         batch_process_id=batch_process_id,
                         batch_process_ballot_item_chunk_id=batch_process_ballot_item_chunk.id,
@@ -1788,11 +1820,11 @@ def process_one_ballot_item_batch_process(batch_process):
                         google_civic_election_id=google_civic_election_id,
                         kind_of_process=kind_of_process,
                         state_code=state_code,
-                        status=status,
+                        status=str(status),
                     )
                     results = {
                         'success': success,
-                        'status': status,
+                        'status': str(status),
                     }
                     return results
 
@@ -1831,11 +1863,11 @@ def process_one_ballot_item_batch_process(batch_process):
                     google_civic_election_id=google_civic_election_id,
                     kind_of_process=kind_of_process,
                     state_code=state_code,
-                    status=status)
+                    status=str(status))
                 status += results['status']
                 results = {
                     'success': success,
-                    'status': status,
+                    'status': str(status),
                 }
                 return results
         else:
@@ -1857,7 +1889,7 @@ def process_one_ballot_item_batch_process(batch_process):
                     )
                 except Exception as e:
                     status += "ERROR-CANNOT_SAVE_RETRIEVE_DATE_STARTED: " + str(e) + " "
-                    handle_exception(e, logger=logger, exception_message=status)
+                    handle_exception(e, logger=logger, exception_message=str(status))
                     batch_process_manager.create_batch_process_log_entry(
                         batch_process_id=batch_process_id,
                         batch_process_ballot_item_chunk_id=batch_process_ballot_item_chunk.id,
@@ -1865,11 +1897,11 @@ def process_one_ballot_item_batch_process(batch_process):
                         google_civic_election_id=google_civic_election_id,
                         kind_of_process=kind_of_process,
                         state_code=state_code,
-                        status=status,
+                        status=str(status),
                     )
                 results = {
                     'success': success,
-                    'status': status,
+                    'status': str(status),
                 }
                 return results
             else:
@@ -1883,11 +1915,11 @@ def process_one_ballot_item_batch_process(batch_process):
                         google_civic_election_id=google_civic_election_id,
                         kind_of_process=kind_of_process,
                         state_code=state_code,
-                        status=status,
+                        status=str(status),
                     )
                 except Exception as e:
                     status += "ERROR-CANNOT_WRITE_TO_BATCH_PROCESS_LOG: " + str(e) + " "
-                    handle_exception(e, logger=logger, exception_message=status)
+                    handle_exception(e, logger=logger, exception_message=str(status))
 
     elif batch_process_ballot_item_chunk.retrieve_date_completed is None:
         # Check to see if retrieve process has timed out
@@ -1931,7 +1963,7 @@ def process_one_ballot_item_batch_process(batch_process):
                     google_civic_election_id=google_civic_election_id,
                     kind_of_process=kind_of_process,
                     state_code=state_code,
-                    status=status,
+                    status=str(status),
                 )
                 # But proceed so we can mark the retrieve part of batch_process_ballot_item_chunk as complete
             try:
@@ -1943,7 +1975,7 @@ def process_one_ballot_item_batch_process(batch_process):
                 batch_process_ballot_item_chunk.save()
             except Exception as e:
                 status += "ERROR-RETRIEVE_DATE_COMPLETED-CANNOT_SAVE_RETRIEVE_DATE_COMPLETED: " + str(e) + " "
-                handle_exception(e, logger=logger, exception_message=status)
+                handle_exception(e, logger=logger, exception_message=str(status))
                 batch_process_manager.create_batch_process_log_entry(
                     batch_process_id=batch_process_id,
                     batch_process_ballot_item_chunk_id=batch_process_ballot_item_chunk.id,
@@ -1951,18 +1983,18 @@ def process_one_ballot_item_batch_process(batch_process):
                     google_civic_election_id=google_civic_election_id,
                     kind_of_process=kind_of_process,
                     state_code=state_code,
-                    status=status,
+                    status=str(status),
                 )
                 results = {
                     'success': success,
-                    'status': status,
+                    'status': str(status),
                 }
                 return results
         else:
             # Wait
             results = {
                 'success': success,
-                'status': status,
+                'status': str(status),
             }
             return results
     elif batch_process_ballot_item_chunk.analyze_date_started is None:
@@ -1983,11 +2015,11 @@ def process_one_ballot_item_batch_process(batch_process):
                     google_civic_election_id=google_civic_election_id,
                     kind_of_process=kind_of_process,
                     state_code=state_code,
-                    status=status,
+                    status=str(status),
                 )
             except Exception as e:
                 status += "ERROR-ANALYZE_DATE_STARTED-CANNOT_SAVE_ANALYZE_DATE_COMPLETED: " + str(e) + " "
-                handle_exception(e, logger=logger, exception_message=status)
+                handle_exception(e, logger=logger, exception_message=str(status))
                 batch_process_manager.create_batch_process_log_entry(
                     batch_process_id=batch_process_id,
                     batch_process_ballot_item_chunk_id=batch_process_ballot_item_chunk.id,
@@ -1995,11 +2027,11 @@ def process_one_ballot_item_batch_process(batch_process):
                     google_civic_election_id=google_civic_election_id,
                     kind_of_process=kind_of_process,
                     state_code=state_code,
-                    status=status,
+                    status=str(status),
                 )
             results = {
                 'success': success,
-                'status': status,
+                'status': str(status),
             }
             return results
 
@@ -2023,11 +2055,11 @@ def process_one_ballot_item_batch_process(batch_process):
                 google_civic_election_id=google_civic_election_id,
                 kind_of_process=kind_of_process,
                 state_code=state_code,
-                status=status,
+                status=str(status),
             )
         except Exception as e:
             status += "ERROR-ANALYZE_DATE_STARTED-CANNOT_SAVE_ANALYZE_DATE_STARTED: " + str(e) + " "
-            handle_exception(e, logger=logger, exception_message=status)
+            handle_exception(e, logger=logger, exception_message=str(status))
             batch_process_manager.create_batch_process_log_entry(
                 batch_process_id=batch_process_id,
                 batch_process_ballot_item_chunk_id=batch_process_ballot_item_chunk.id,
@@ -2035,11 +2067,11 @@ def process_one_ballot_item_batch_process(batch_process):
                 google_civic_election_id=google_civic_election_id,
                 kind_of_process=kind_of_process,
                 state_code=state_code,
-                status=status,
+                status=str(status),
             )
             results = {
                 'success': success,
-                'status': status,
+                'status': str(status),
             }
             return results
         # Now analyze the batch that was stored in the "refresh_ballotpedia_ballots..." function
@@ -2081,11 +2113,11 @@ def process_one_ballot_item_batch_process(batch_process):
                 google_civic_election_id=google_civic_election_id,
                 kind_of_process=kind_of_process,
                 state_code=state_code,
-                status=status,
+                status=str(status),
             )
             results = {
                 'success': success,
-                'status': status,
+                'status': str(status),
             }
             return results
         try:
@@ -2100,11 +2132,11 @@ def process_one_ballot_item_batch_process(batch_process):
                 google_civic_election_id=google_civic_election_id,
                 kind_of_process=kind_of_process,
                 state_code=state_code,
-                status=status,
+                status=str(status),
             )
         except Exception as e:
             status += "ERROR-ANALYZE_DATE_STARTED-CANNOT_SAVE_ANALYZE_DATE_COMPLETED: " + str(e) + " "
-            handle_exception(e, logger=logger, exception_message=status)
+            handle_exception(e, logger=logger, exception_message=str(status))
             batch_process_manager.create_batch_process_log_entry(
                 batch_process_id=batch_process_id,
                 batch_process_ballot_item_chunk_id=batch_process_ballot_item_chunk.id,
@@ -2112,11 +2144,11 @@ def process_one_ballot_item_batch_process(batch_process):
                 google_civic_election_id=google_civic_election_id,
                 kind_of_process=kind_of_process,
                 state_code=state_code,
-                status=status,
+                status=str(status),
             )
             results = {
                 'success': success,
-                'status': status,
+                'status': str(status),
             }
             return results
 
@@ -2137,11 +2169,11 @@ def process_one_ballot_item_batch_process(batch_process):
                     google_civic_election_id=google_civic_election_id,
                     kind_of_process=kind_of_process,
                     state_code=state_code,
-                    status=status,
+                    status=str(status),
                 )
             except Exception as e:
                 status += "ERROR-ANALYZE_DATE_COMPLETED-CANNOT_SAVE_ANALYZE_DATE_COMPLETED: " + str(e) + " "
-                handle_exception(e, logger=logger, exception_message=status)
+                handle_exception(e, logger=logger, exception_message=str(status))
                 batch_process_manager.create_batch_process_log_entry(
                     batch_process_id=batch_process_id,
                     batch_process_ballot_item_chunk_id=batch_process_ballot_item_chunk.id,
@@ -2149,11 +2181,11 @@ def process_one_ballot_item_batch_process(batch_process):
                     google_civic_election_id=google_civic_election_id,
                     kind_of_process=kind_of_process,
                     state_code=state_code,
-                    status=status,
+                    status=str(status),
                 )
             results = {
                 'success': success,
-                'status': status,
+                'status': str(status),
             }
             return results
 
@@ -2182,11 +2214,11 @@ def process_one_ballot_item_batch_process(batch_process):
                             google_civic_election_id=google_civic_election_id,
                             kind_of_process=kind_of_process,
                             state_code=state_code,
-                            status=status)
+                            status=str(status))
                         status += results['status']
                         results = {
                             'success': success,
-                            'status': status,
+                            'status': str(status),
                         }
                         return results
 
@@ -2200,15 +2232,15 @@ def process_one_ballot_item_batch_process(batch_process):
                             google_civic_election_id=google_civic_election_id,
                             kind_of_process=kind_of_process,
                             state_code=state_code,
-                            status=status,
+                            status=str(status),
                         )
                     except Exception as e:
                         status += "ERROR-RESTARTED_FAILED_ANALYZE_PROCESS-CANNOT_SAVE_ANALYZE_DATE_COMPLETED " \
                                   "" + str(e) + " "
-                        handle_exception(e, logger=logger, exception_message=status)
+                        handle_exception(e, logger=logger, exception_message=str(status))
                         results = {
                             'success': success,
-                            'status': status,
+                            'status': str(status),
                         }
                         return results
                 else:
@@ -2227,14 +2259,14 @@ def process_one_ballot_item_batch_process(batch_process):
                             google_civic_election_id=google_civic_election_id,
                             kind_of_process=kind_of_process,
                             state_code=state_code,
-                            status=status,
+                            status=str(status),
                         )
                     except Exception as e:
                         status += "ERROR-ANALYZE_DATE_STARTED-CANNOT_SAVE_ANALYZE_DATE_COMPLETED: " + str(e) + " "
-                        handle_exception(e, logger=logger, exception_message=status)
+                        handle_exception(e, logger=logger, exception_message=str(status))
                         results = {
                             'success': success,
-                            'status': status,
+                            'status': str(status),
                         }
                         return results
             else:
@@ -2247,18 +2279,18 @@ def process_one_ballot_item_batch_process(batch_process):
                     google_civic_election_id=google_civic_election_id,
                     kind_of_process=kind_of_process,
                     state_code=state_code,
-                    status=status,
+                    status=str(status),
                 )
                 results = {
                     'success': success,
-                    'status': status,
+                    'status': str(status),
                 }
                 return results
         else:
             # Wait
             results = {
                 'success': success,
-                'status': status,
+                'status': str(status),
             }
             return results
     elif batch_process_ballot_item_chunk.create_date_started is None:
@@ -2274,11 +2306,11 @@ def process_one_ballot_item_batch_process(batch_process):
                 google_civic_election_id=google_civic_election_id,
                 kind_of_process=kind_of_process,
                 state_code=state_code,
-                status=status,
+                status=str(status),
             )
         except Exception as e:
             status += "ERROR-CREATE_DATE_STARTED-CANNOT_SAVE_CREATE_DATE_STARTED: " + str(e) + " "
-            handle_exception(e, logger=logger, exception_message=status)
+            handle_exception(e, logger=logger, exception_message=str(status))
             batch_process_manager.create_batch_process_log_entry(
                 batch_process_id=batch_process_id,
                 batch_process_ballot_item_chunk_id=batch_process_ballot_item_chunk.id,
@@ -2286,11 +2318,11 @@ def process_one_ballot_item_batch_process(batch_process):
                 google_civic_election_id=google_civic_election_id,
                 kind_of_process=kind_of_process,
                 state_code=state_code,
-                status=status,
+                status=str(status),
             )
             results = {
                 'success': success,
-                'status': status,
+                'status': str(status),
             }
             return results
         # Process the create entries
@@ -2306,11 +2338,11 @@ def process_one_ballot_item_batch_process(batch_process):
                 google_civic_election_id=google_civic_election_id,
                 kind_of_process=kind_of_process,
                 state_code=state_code,
-                status=status,
+                status=str(status),
             )
             results = {
                 'success': success,
-                'status': status,
+                'status': str(status),
             }
             return results
         # Process the delete entries
@@ -2325,11 +2357,11 @@ def process_one_ballot_item_batch_process(batch_process):
                 google_civic_election_id=google_civic_election_id,
                 kind_of_process=kind_of_process,
                 state_code=state_code,
-                status=status,
+                status=str(status),
             )
             results = {
                 'success': success,
-                'status': status,
+                'status': str(status),
             }
             return results
         # If here, we know that the process_batch_set has run
@@ -2368,11 +2400,11 @@ def process_one_ballot_item_batch_process(batch_process):
                 google_civic_election_id=google_civic_election_id,
                 kind_of_process=kind_of_process,
                 state_code=state_code,
-                status=status,
+                status=str(status),
             )
         except Exception as e:
             status += "ERROR-CREATE_DATE_STARTED-CANNOT_SAVE_CREATE_DATE_COMPLETED: " + str(e) + " "
-            handle_exception(e, logger=logger, exception_message=status)
+            handle_exception(e, logger=logger, exception_message=str(status))
             batch_process_manager.create_batch_process_log_entry(
                 batch_process_id=batch_process_id,
                 batch_process_ballot_item_chunk_id=batch_process_ballot_item_chunk.id,
@@ -2380,11 +2412,11 @@ def process_one_ballot_item_batch_process(batch_process):
                 google_civic_election_id=google_civic_election_id,
                 kind_of_process=kind_of_process,
                 state_code=state_code,
-                status=status,
+                status=str(status),
             )
             results = {
                 'success': success,
-                'status': status,
+                'status': str(status),
             }
             return results
 
@@ -2434,11 +2466,11 @@ def process_one_ballot_item_batch_process(batch_process):
                     google_civic_election_id=google_civic_election_id,
                     kind_of_process=kind_of_process,
                     state_code=state_code,
-                    status=status,
+                    status=str(status),
                 )
             except Exception as e:
                 status += "ERROR-CREATE_DATE_STARTED-CANNOT_SAVE_CREATE_DATE_COMPLETED: " + str(e) + " "
-                handle_exception(e, logger=logger, exception_message=status)
+                handle_exception(e, logger=logger, exception_message=str(status))
                 batch_process_manager.create_batch_process_log_entry(
                     batch_process_id=batch_process_id,
                     batch_process_ballot_item_chunk_id=batch_process_ballot_item_chunk.id,
@@ -2446,18 +2478,18 @@ def process_one_ballot_item_batch_process(batch_process):
                     google_civic_election_id=google_civic_election_id,
                     kind_of_process=kind_of_process,
                     state_code=state_code,
-                    status=status,
+                    status=str(status),
                 )
                 results = {
                     'success': success,
-                    'status': status,
+                    'status': str(status),
                 }
                 return results
         else:
             # Wait
             results = {
                 'success': success,
-                'status': status,
+                'status': str(status),
             }
             return results
     else:
@@ -2466,7 +2498,7 @@ def process_one_ballot_item_batch_process(batch_process):
 
     results = {
         'success':              success,
-        'status':               status,
+        'status':               str(status),
     }
     return results
 
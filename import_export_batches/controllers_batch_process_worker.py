@@ -0,0 +1,224 @@
+# import_export_batches/controllers_batch_process_worker.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+import os
+import socket
+import threading
+
+from django.db import connections
+
+from .controllers_batch_process import NUMBER_OF_SIMULTANEOUS_BALLOT_ITEM_BATCH_PROCESSES, \
+    NUMBER_OF_SIMULTANEOUS_REPRESENTATIVE_BATCH_PROCESSES, process_one_ballot_item_batch_process
+from .controllers_representatives import process_one_representatives_batch_process
+from .models import BATCH_PROCESS_WORKER_STALLED_SECONDS, BatchProcessManager, \
+    REFRESH_BALLOT_ITEMS_FROM_POLLING_LOCATIONS, REFRESH_BALLOT_ITEMS_FROM_VOTERS, \
+    RETRIEVE_BALLOT_ITEMS_FROM_POLLING_LOCATIONS, RETRIEVE_REPRESENTATIVES_FROM_POLLING_LOCATIONS
+from exception.models import handle_exception
+import wevote_functions.admin
+from wevote_settings.models import fetch_batch_process_system_on, fetch_batch_process_system_ballot_items_on, \
+    fetch_batch_process_system_representatives_on
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+BATCH_PROCESS_WORKER_HEARTBEAT_SECONDS = 30  # Well under BATCH_PROCESS_WORKER_STALLED_SECONDS, and every timeout
+
+BALLOT_ITEMS_WORKER_KIND_OF_PROCESSES = [
+    REFRESH_BALLOT_ITEMS_FROM_POLLING_LOCATIONS,
+    REFRESH_BALLOT_ITEMS_FROM_VOTERS,
+    RETRIEVE_BALLOT_ITEMS_FROM_POLLING_LOCATIONS,
+]
+REPRESENTATIVES_WORKER_KIND_OF_PROCESSES = [RETRIEVE_REPRESENTATIVES_FROM_POLLING_LOCATIONS]
+BATCH_PROCESS_WORKER_KIND_OF_PROCESSES = {
+    'ballot_items':     BALLOT_ITEMS_WORKER_KIND_OF_PROCESSES,
+    'representatives':  REPRESENTATIVES_WORKER_KIND_OF_PROCESSES,
+}
+# The same limits, and the same elections, process_next_ballot_items and process_next_representatives use
+BATCH_PROCESS_WORKER_MAXIMUM_CLAIMED = {
+    'ballot_items':     NUMBER_OF_SIMULTANEOUS_BALLOT_ITEM_BATCH_PROCESSES,
+    'representatives':  NUMBER_OF_SIMULTANEOUS_REPRESENTATIVE_BATCH_PROCESSES,
+}
+BATCH_PROCESS_WORKER_FOR_UPCOMING_ELECTIONS = {
+    'ballot_items':     True,
+    'representatives':  False,
+}
+
+
+def generate_batch_process_worker_name(worker_number):
+    return socket.gethostname() + ':' + str(os.getpid()) + ':' + str(worker_number)
+
+
+def fetch_batch_process_worker_kinds_turned_on(kind_list):
+    """
+    The same switches process_next_ballot_items and process_next_representatives obey
+    :param kind_list: Keys of BATCH_PROCESS_WORKER_KIND_OF_PROCESSES
+    """
+    if not fetch_batch_process_system_on():
+        return []
+    kinds_turned_on = []
+    if 'ballot_items' in kind_list and fetch_batch_process_system_ballot_items_on():
+        kinds_turned_on.append('ballot_items')
+    if 'representatives' in kind_list and fetch_batch_process_system_representatives_on():
+        kinds_turned_on.append('representatives')
+    return kinds_turned_on
+
+
+def process_one_claimed_batch_process(batch_process):
+    if batch_process.kind_of_process in BALLOT_ITEMS_WORKER_KIND_OF_PROCESSES:
+        return process_one_ballot_item_batch_process(batch_process)
+    elif batch_process.kind_of_process in REPRESENTATIVES_WORKER_KIND_OF_PROCESSES:
+        return process_one_representatives_batch_process(batch_process)
+    results = {
+        'success':  False,
+        'status':   "KIND_OF_PROCESS_NOT_RECOGNIZED ",
+    }
+    return results
+
+
+def batch_process_heartbeat(batch_process_id, worker_name, done_event,
+                            heartbeat_seconds=BATCH_PROCESS_WORKER_HEARTBEAT_SECONDS):
+    """
+    Keep our claim on batch_process_id alive until done_event is set
+    """
+    batch_process_manager = BatchProcessManager()
+    try:
+        while not done_event.wait(heartbeat_seconds):
+            try:
+                if not batch_process_manager.heartbeat_batch_process_checkout(batch_process_id, worker_name):
+                    logger.error("batch_process_heartbeat LOST_CLAIM batch_process_id: " + str(batch_process_id) +
+                                 " worker_name: " + worker_name)
+                    return
+            except Exception as e:
+                logger.error("batch_process_heartbeat: " + str(e))
+                connections.close_all()
+    finally:
+        connections.close_all()
+
+
+def claim_next_batch_process_for_worker(worker_name, kind_list, stalled_seconds):
+    """
+    Claim the next batch_process of the first of these kinds with one waiting, and fewer than its
+    BATCH_PROCESS_WORKER_MAXIMUM_CLAIMED already claimed
+    """
+    batch_process_manager = BatchProcessManager()
+    status = ""
+    for kind in kind_list:
+        results = batch_process_manager.claim_next_batch_process(
+            kind_of_process_list=BATCH_PROCESS_WORKER_KIND_OF_PROCESSES[kind],
+            worker_name=worker_name,
+            for_upcoming_elections=BATCH_PROCESS_WORKER_FOR_UPCOMING_ELECTIONS[kind],
+            stalled_seconds=stalled_seconds,
+            maximum_claimed=BATCH_PROCESS_WORKER_MAXIMUM_CLAIMED[kind])
+        status += results['status']
+        if not results['success'] or results['batch_process_found']:
+            return dict(results, status=status)
+    results = {
+        'success':              True,
+        'status':               status,
+        'batch_process':        None,
+        'batch_process_found':  False,
+    }
+    return results
+
+
+def batch_process_worker(
+        worker_name,
+        kind_list=None,
+        poll_seconds=10.0,
+        heartbeat_seconds=BATCH_PROCESS_WORKER_HEARTBEAT_SECONDS,
+        run_once=False,
+        stop_event=None):
+    """
+    Claim one batch_process at a time, run its next step, and release it, until stop_event is set. With run_once,
+    stop as soon as there is nothing to claim instead. A step runs to the end even after stop_event is set.
+    :param kind_list: Keys of BATCH_PROCESS_WORKER_KIND_OF_PROCESSES. Defaults to all of them.
+    """
+    kind_list = kind_list or list(BATCH_PROCESS_WORKER_KIND_OF_PROCESSES)
+    stop_event = stop_event or threading.Event()
+    batch_process_manager = BatchProcessManager()
+    try:
+        while not stop_event.is_set():
+            kinds_turned_on = fetch_batch_process_worker_kinds_turned_on(kind_list)
+            if not len(kinds_turned_on):
+                if run_once:
+                    break
+                stop_event.wait(poll_seconds)
+                continue
+
+            results = claim_next_batch_process_for_worker(
+                worker_name, kinds_turned_on,
+                stalled_seconds=max(BATCH_PROCESS_WORKER_STALLED_SECONDS, 4 * heartbeat_seconds))
+            if not results['success']:
+                logger.error("batch_process_worker " + worker_name + ": " + results['status'])
+                connections.close_all()
+                stop_event.wait(poll_seconds)
+                continue
+            if not results['batch_process_found']:
+                if run_once:
+                    break
+                stop_event.wait(poll_seconds)
+                continue
+
+            batch_process = results['batch_process']
+            done_event = threading.Event()
+            heartbeat = threading.Thread(
+                target=batch_process_heartbeat,
+                name=worker_name + ':heartbeat',
+                args=(batch_process.id, worker_name, done_event, heartbeat_seconds),
+                daemon=True)
+            heartbeat.start()
+            status = ""
+            try:
+                results = process_one_claimed_batch_process(batch_process)
+                status += results['status']
+            except Exception as e:
+                status += "BATCH_PROCESS_WORKER_STEP_FAILED: " + str(e) + " "
+                handle_exception(e, logger=logger, exception_message=status)
+                batch_process_manager.create_batch_process_log_entry(
+                    batch_process_id=batch_process.id,
+                    google_civic_election_id=batch_process.google_civic_election_id,
+                    kind_of_process=batch_process.kind_of_process,
+                    state_code=batch_process.state_code,
+                    status=status,
+                )
+            finally:
+                done_event.set()
+                heartbeat.join()
+                results = batch_process_manager.release_batch_process_checkout(batch_process.id, worker_name)
+                if not results['success']:
+                    logger.error("batch_process_worker " + worker_name + ": " + results['status'])
+    finally:
+        # Each thread has its own database connections
+        connections.close_all()
+
+
+def run_batch_process_workers(
+        worker_count=4,
+        kind_list=None,
+        poll_seconds=10.0,
+        heartbeat_seconds=BATCH_PROCESS_WORKER_HEARTBEAT_SECONDS,
+        run_once=False,
+        stop_event=None):
+    """
+    Start worker_count batch_process_worker threads, and return them. A step is mostly waiting on the ballot data
+    providers, so threads get us parallel retrieval. Run the command on more servers to scale further.
+    """
+    stop_event = stop_event or threading.Event()
+    worker_list = []
+    for worker_number in range(worker_count):
+        worker_name = generate_batch_process_worker_name(worker_number)
+        worker = threading.Thread(
+            target=batch_process_worker,
+            name=worker_name,
+            args=(worker_name,),
+            kwargs={
+                'kind_list':            kind_list,
+                'poll_seconds':         poll_seconds,
+                'heartbeat_seconds':    heartbeat_seconds,
+                'run_once':             run_once,
+                'stop_event':           stop_event,
+            },
+            daemon=True)
+        worker.start()
+        worker_list.append(worker)
+    return worker_list
@@ -0,0 +1,64 @@
+from statistics import median
+from time import perf_counter
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from wevote_functions.functions_status import StatusTrace
+
+
+class Command(BaseCommand):
+    help = 'Compares building status with status += on a str against StatusTrace, for a simulated ballot item ' \
+           'batch process that retrieves ballots for many map points. Reports time, peak memory and the size of ' \
+           'the status that would be written to BatchProcessLogEntry and returned in JSON. No database needed.'
+
+    @staticmethod
+    def add_arguments(parser):
+        parser.add_argument('--map-points', default='1000,10000,50000',
+                            help='Comma separated numbers of map points to simulate')
+        parser.add_argument('--log-every', type=int, default=100,
+                            help='Write a (simulated) BatchProcessLogEntry every this many map points. '
+                                 'Holding on to the status there is what defeats the in-place str += optimization.')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per strategy and size (median is reported)')
+
+    def handle(self, *args, **options):
+        map_point_count_list = [int(count) for count in options['map_points'].split(',') if count.strip()]
+        self.stdout.write('{:>10} {:>12} {:>10} {:>14} {:>14}'.format(
+            'map_points', 'strategy', 'total_ms', 'peak_memory_kb', 'status_chars'))
+        for map_point_count in map_point_count_list:
+            for strategy in ('str', 'status_trace'):
+                total_time_list = []
+                peak_memory_list = []
+                status_length = 0
+                for _ in range(options['repeat']):
+                    tracemalloc.start()
+                    t0 = perf_counter()
+                    status_length = len(self.simulate_batch_process(strategy, map_point_count, options['log_every']))
+                    total_time_list.append((perf_counter() - t0) * 1000)
+                    peak_memory_list.append(tracemalloc.get_traced_memory()[1] / 1024)
+                    tracemalloc.stop()
+                self.stdout.write('{:>10} {:>12} {:>10.1f} {:>14.0f} {:>14}'.format(
+                    map_point_count, strategy, median(total_time_list), median(peak_memory_list), status_length))
+
+    @staticmethod
+    def simulate_batch_process(strategy, map_point_count, log_every):
+        """
+        The same pattern of status codes process_one_ballot_item_batch_process and the functions it calls
+        build, for each map point
+        """
+        status = StatusTrace() if strategy == 'status_trace' else ''
+        batch_process_log_entry_status_list = []
+        for map_point_number in range(map_point_count):
+            polling_location_we_vote_id = 'wv01ploc' + str(map_point_number)
+            status += "RETRIEVE_BALLOT_ITEMS_FROM_POLLING_LOCATION "
+            # The status of a nested call, which is still a str
+            status += "POLLING_LOCATION_FOUND: " + polling_location_we_vote_id + " " \
+                      "BALLOT_ITEMS_RETRIEVED BATCH_ROW_ACTION_BALLOT_ITEM_CREATED " \
+                      "BATCH_ROW_ACTION_BALLOT_ITEM_CREATED BATCH_ROW_ACTION_BALLOT_ITEM_CREATED "
+            if map_point_number % 7 == 0:
+                status += "NO_BALLOT_ITEMS_FOUND_FOR_MAP_POINT: " + polling_location_we_vote_id + " "
+            if log_every and map_point_number % log_every == 0:
+                batch_process_log_entry_status_list.append(str(status))
+                # Only the most recent log entry is still in memory on a real server
+                del batch_process_log_entry_status_list[:-1]
+        return str(status)
@@ -0,0 +1,51 @@
+import threading
+
+from django.core.management.base import BaseCommand
+
+from config.base import get_environment_variable_default
+from import_export_batches.controllers_batch_process import BATCH_PROCESS_WORKER_KINDS
+from import_export_batches.controllers_batch_process_worker import BATCH_PROCESS_WORKER_HEARTBEAT_SECONDS, \
+    BATCH_PROCESS_WORKER_KIND_OF_PROCESSES, run_batch_process_workers
+from wevote_functions.functions import convert_to_int
+
+
+class Command(BaseCommand):
+    help = 'Runs ballot item and representatives batch processes with a pool of worker threads. Each worker claims ' \
+           'one batch process at a time (SELECT ... FOR UPDATE SKIP LOCKED), so this is safe to run on any number ' \
+           'of servers at once. Set BATCH_PROCESS_WORKERS_ENABLED so the process_next_* admin urls leave the ' \
+           'BATCH_PROCESS_WORKER_KINDS to this command.'
+
+    @staticmethod
+    def add_arguments(parser):
+        parser.add_argument('--workers', type=int,
+                            default=convert_to_int(get_environment_variable_default("BATCH_PROCESS_WORKERS", 4)))
+        parser.add_argument('--kind', action='append', choices=sorted(BATCH_PROCESS_WORKER_KIND_OF_PROCESSES),
+                            help='Which batch processes to run (repeatable). Default: BATCH_PROCESS_WORKER_KINDS')
+        parser.add_argument('--poll_seconds', type=float, default=10.0, help='How long an idle worker waits')
+        parser.add_argument('--heartbeat_seconds', type=float, default=BATCH_PROCESS_WORKER_HEARTBEAT_SECONDS)
+        parser.add_argument('--once', action='store_true', help='Exit when there is nothing to claim')
+
+    def handle(self, *args, **options):
+        kind_list = options['kind'] or \
+            [kind for kind in BATCH_PROCESS_WORKER_KINDS if kind in BATCH_PROCESS_WORKER_KIND_OF_PROCESSES]
+
+        stop_event = threading.Event()
+        worker_list = run_batch_process_workers(
+            worker_count=options['workers'],
+            kind_list=kind_list,
+            poll_seconds=options['poll_seconds'],
+            heartbeat_seconds=options['heartbeat_seconds'],
+            run_once=options['once'],
+            stop_event=stop_event)
+        self.stdout.write('Started {} batch process workers for {}'.format(
+            len(worker_list), ', '.join(kind_list)))
+        try:
+            while any(worker.is_alive() for worker in worker_list):
+                for worker in worker_list:
+                    worker.join(1.0)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping after the current steps...')
+            stop_event.set()
+            for worker in worker_list:
+                worker.join()
+        self.stdout.write('Batch process workers stopped')
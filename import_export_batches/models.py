@@ -4,16 +4,19 @@
 
 import codecs
 import csv
+import io
 import json
 import urllib
 import xml.etree.ElementTree as ElementTree
+import zlib
 from datetime import date, timedelta
 from urllib.parse import quote
 from urllib.request import Request, urlopen
 
 import magic
-from django.db import models
-from django.db.models import Q
+from django.db import connection, models, transaction
+from django.db.models import F, Q
+from django.utils.functional import cached_property
 from django.utils.timezone import now
 
 import wevote_functions.admin
@@ -673,6 +676,22 @@ KIND_OF_PROCESS_CHOICES = (
 
 logger = wevote_functions.admin.get_logger(__name__)
 
+# A run_batch_process_workers worker that hasn't heartbeat in this long has died, and its batch_process can be claimed
+BATCH_PROCESS_WORKER_STALLED_SECONDS = 5 * 60
+# BatchRow.batch_row_values holds up to this many values, like the legacy batch_row_000 ... batch_row_050 columns
+BATCH_ROW_COLUMN_COUNT = 51
+BATCH_ROW_COLUMN_NAMES = ['batch_row_' + str(index_number).zfill(3) for index_number in range(BATCH_ROW_COLUMN_COUNT)]
+BATCH_HEADER_MAP_COLUMN_NAMES = \
+    ['batch_header_map_' + str(index_number).zfill(3) for index_number in range(BATCH_ROW_COLUMN_COUNT)]
+BATCH_ROW_COPY_CHUNK_SIZE = 5000
+# The direct children of VipObject that create_batch_set_vip_xml imports. Everything else in a VIP feed (StreetSegment,
+#  PollingLocation, Precinct, Locality...), which is most of a statewide file, is dropped as it streams past.
+VIP_XML_IMPORTED_TAG_LIST = [
+    'BallotMeasureContest', 'Candidate', 'CandidateContest', 'CandidateSelection', 'Election', 'ElectoralDistrict',
+    'Office', 'Party', 'Person', 'Source', 'State',
+]
+VIP_XML_PROGRESS_ELEMENT_COUNT = 100000
+
 
 def get_value_if_index_in_list(incoming_list, index):
     try:
@@ -690,6 +709,76 @@ def get_value_from_dict(structured_json, field_name):
         return ""
 
 
+def generate_copy_text_value(value):
+    """
+    One value for COPY ... FROM STDIN, in Postgres' default text format
+    """
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def parse_vip_xml_streaming(xml_source, imported_tag_list=None, source_name=''):
+    """
+    Reads a VIP XML feed in one pass with iterparse, keeping only the direct children of VipObject with a tag in
+    imported_tag_list, so memory grows with what we import, not with the size of the file.
+    :param xml_source: A file name or a file-like object (an uploaded file, a urlopen response...)
+    :param imported_tag_list: Defaults to VIP_XML_IMPORTED_TAG_LIST
+    :param source_name: For the progress log lines
+    :return: results dict. xml_root is a VipObject element holding only the kept children, in file order, so it
+      works with findall/find like the root of the whole tree does.
+    """
+    status = ''
+    success = False
+    imported_tag_set = set(imported_tag_list if imported_tag_list is not None else VIP_XML_IMPORTED_TAG_LIST)
+    xml_root = None
+    element_count = 0
+    element_count_by_tag = {}
+    depth = 0
+    streamed_root = None
+    try:
+        for event, element in ElementTree.iterparse(xml_source, events=('start', 'end')):
+            if event == 'start':
+                if depth == 0:
+                    streamed_root = element
+                    xml_root = ElementTree.Element(element.tag, element.attrib)
+                depth += 1
+                continue
+            depth -= 1
+            if depth != 1:
+                continue
+            # A complete direct child of VipObject
+            element_count += 1
+            if element.tag in imported_tag_set:
+                xml_root.append(element)
+                element_count_by_tag[element.tag] = element_count_by_tag.get(element.tag, 0) + 1
+            else:
+                element.clear()
+            # So the streamed tree never holds more than the element being read
+            streamed_root.remove(element)
+            if not element_count % VIP_XML_PROGRESS_ELEMENT_COUNT:
+                logger.info("parse_vip_xml_streaming " + str(source_name) + ": " + str(element_count) +
+                            " elements read, " + str(len(xml_root)) + " kept")
+        success = xml_root is not None
+    except ElementTree.ParseError as e:
+        status += "VIP_XML_PARSE_ERROR: " + str(e) + " "
+        xml_root = None
+
+    for tag in sorted(element_count_by_tag):
+        status += "VIP_XML_" + tag.upper() + "_COUNT: " + str(element_count_by_tag[tag]) + " "
+    status += "VIP_XML_ELEMENTS_READ: " + str(element_count) + " "
+    results = {
+        'success':              success,
+        'status':               status,
+        'xml_root':             xml_root,
+        'element_count':        element_count,
+        'element_count_by_tag': element_count_by_tag,
+    }
+    return results
+
+
 def get_header_map_value_if_index_in_list(incoming_list, index, kind_of_batch=""):
     try:
         # The header_value is a value like "Organization Name" or "Street Address"
@@ -710,6 +799,41 @@ def get_header_map_value_if_index_in_list(incoming_list, index, kind_of_batch=""
         return ""
 
 
+def fetch_batch_process_checked_out_expiration_seconds(kind_of_process):
+    """
+    If this kind_of_process has been checked out longer than this (i.e. probably crashed or timed out),
+    consider it to no longer be active. See also longest_activity_notice_processing_run_time_allowed
+    """
+    if kind_of_process == ACTIVITY_NOTICE_PROCESS:
+        return 270  # 4.5 minutes * 60 seconds
+    elif kind_of_process == API_REFRESH_REQUEST:
+        return 360  # 6 minutes * 60 seconds
+    elif kind_of_process == GENERATE_VOTER_GUIDES:
+        return 600  # 10 minutes * 60 seconds
+    elif kind_of_process == MATCH_POLITICIANS_TO_ORGANIZATIONS:
+        return 600  # 10 minutes * 60 seconds
+    elif kind_of_process in [
+            REFRESH_BALLOT_ITEMS_FROM_POLLING_LOCATIONS, REFRESH_BALLOT_ITEMS_FROM_VOTERS,
+            RETRIEVE_BALLOT_ITEMS_FROM_POLLING_LOCATIONS]:
+        return 1800  # 30 minutes * 60 seconds
+    elif kind_of_process in [RETRIEVE_REPRESENTATIVES_FROM_POLLING_LOCATIONS]:
+        return 120  # 2 minutes * 60 seconds
+    elif kind_of_process in [
+            AUGMENT_ANALYTICS_ACTION_WITH_ELECTION_ID, AUGMENT_ANALYTICS_ACTION_WITH_FIRST_VISIT,
+            CALCULATE_ORGANIZATION_DAILY_METRICS, CALCULATE_ORGANIZATION_ELECTION_METRICS,
+            CALCULATE_SITEWIDE_ELECTION_METRICS, CALCULATE_SITEWIDE_VOTER_METRICS,
+            CALCULATE_SITEWIDE_DAILY_METRICS]:
+        return 600  # 10 minutes * 60 seconds
+    elif kind_of_process == RETRIEVE_FROM_BALLOTPEDIA:
+        return 600  # 10 minutes * 60 seconds
+    elif kind_of_process == SEARCH_TWITTER_FOR_CANDIDATE_TWITTER_HANDLE:
+        return 300  # 5 minutes * 60 seconds - See SEARCH_TWITTER_TIMED_OUT
+    elif kind_of_process == UPDATE_TWITTER_DATA_FROM_TWITTER:
+        return 600  # 10 minutes * 60 seconds - See UPDATE_TWITTER_TIMED_OUT
+    else:
+        return 1800  # 30 minutes * 60 seconds
+
+
 class BatchManager(models.Manager):
 
     def __unicode__(self):
@@ -889,6 +1013,7 @@ class BatchManager(models.Manager):
 
         batch_header_id = 0
         batch_header_map_id = 0
+        batch_row_list = []
         for line in csv_data:
             if first_line:
                 first_line = False
@@ -1039,68 +1164,26 @@ class BatchManager(models.Manager):
                 # if number_of_batch_rows >= limit_for_testing:
                 #     break
                 if positive_value_exists(batch_header_id):
-                    try:
-                        batch_row = BatchRow.objects.create(
-                            batch_header_id=batch_header_id,
-                            batch_row_000=get_value_if_index_in_list(line, 0),
-                            batch_row_001=get_value_if_index_in_list(line, 1),
-                            batch_row_002=get_value_if_index_in_list(line, 2),
-                            batch_row_003=get_value_if_index_in_list(line, 3),
-                            batch_row_004=get_value_if_index_in_list(line, 4),
-                            batch_row_005=get_value_if_index_in_list(line, 5),
-                            batch_row_006=get_value_if_index_in_list(line, 6),
-                            batch_row_007=get_value_if_index_in_list(line, 7),
-                            batch_row_008=get_value_if_index_in_list(line, 8),
-                            batch_row_009=get_value_if_index_in_list(line, 9),
-                            batch_row_010=get_value_if_index_in_list(line, 10),
-                            batch_row_011=get_value_if_index_in_list(line, 11),
-                            batch_row_012=get_value_if_index_in_list(line, 12),
-                            batch_row_013=get_value_if_index_in_list(line, 13),
-                            batch_row_014=get_value_if_index_in_list(line, 14),
-                            batch_row_015=get_value_if_index_in_list(line, 15),
-                            batch_row_016=get_value_if_index_in_list(line, 16),
-                            batch_row_017=get_value_if_index_in_list(line, 17),
-                            batch_row_018=get_value_if_index_in_list(line, 18),
-                            batch_row_019=get_value_if_index_in_list(line, 19),
-                            batch_row_020=get_value_if_index_in_list(line, 20),
-                            batch_row_021=get_value_if_index_in_list(line, 21),
-                            batch_row_022=get_value_if_index_in_list(line, 22),
-                            batch_row_023=get_value_if_index_in_list(line, 23),
-                            batch_row_024=get_value_if_index_in_list(line, 24),
-                            batch_row_025=get_value_if_index_in_list(line, 25),
-                            batch_row_026=get_value_if_index_in_list(line, 26),
-                            batch_row_027=get_value_if_index_in_list(line, 27),
-                            batch_row_028=get_value_if_index_in_list(line, 28),
-                            batch_row_029=get_value_if_index_in_list(line, 29),
-                            batch_row_030=get_value_if_index_in_list(line, 30),
-                            batch_row_031=get_value_if_index_in_list(line, 31),
-                            batch_row_032=get_value_if_index_in_list(line, 32),
-                            batch_row_033=get_value_if_index_in_list(line, 33),
-                            batch_row_034=get_value_if_index_in_list(line, 34),
-                            batch_row_035=get_value_if_index_in_list(line, 35),
-                            batch_row_036=get_value_if_index_in_list(line, 36),
-                            batch_row_037=get_value_if_index_in_list(line, 37),
-                            batch_row_038=get_value_if_index_in_list(line, 38),
-                            batch_row_039=get_value_if_index_in_list(line, 39),
-                            batch_row_040=get_value_if_index_in_list(line, 40),
-                            batch_row_041=get_value_if_index_in_list(line, 41),
-                            batch_row_042=get_value_if_index_in_list(line, 42),
-                            batch_row_043=get_value_if_index_in_list(line, 43),
-                            batch_row_044=get_value_if_index_in_list(line, 44),
-                            batch_row_045=get_value_if_index_in_list(line, 45),
-                            batch_row_046=get_value_if_index_in_list(line, 46),
-                            batch_row_047=get_value_if_index_in_list(line, 47),
-                            batch_row_048=get_value_if_index_in_list(line, 48),
-                            batch_row_049=get_value_if_index_in_list(line, 49),
-                            batch_row_050=get_value_if_index_in_list(line, 50),
-                            google_civic_election_id=google_civic_election_id,
-                            polling_location_we_vote_id=polling_location_we_vote_id,
-                        )
-                        number_of_batch_rows += 1
-                    except Exception as e:
-                        # Stop trying to save rows -- break out of the for loop
-                        status += "EXCEPTION_BATCH_ROW: " + str(e) + " "
-                        break
+                    batch_row_list.append(BatchRow(
+                        batch_header_id=batch_header_id,
+                        batch_row_values=list(line[:BATCH_ROW_COLUMN_COUNT]),
+                        google_civic_election_id=google_civic_election_id,
+                        polling_location_we_vote_id=polling_location_we_vote_id,
+                    ))
+                    if len(batch_row_list) >= BATCH_ROW_COPY_CHUNK_SIZE:
+                        results = self.create_batch_row_list(batch_row_list)
+                        batch_row_list = []
+                        number_of_batch_rows += results['number_of_batch_rows']
+                        if not results['success']:
+                            # Stop trying to save rows -- break out of the for loop
+                            status += results['status']
+                            break
+
+        if len(batch_row_list):
+            results = self.create_batch_row_list(batch_row_list)
+            number_of_batch_rows += results['number_of_batch_rows']
+            if not results['success']:
+                status += results['status']
 
         results = {
             'success':              success,
@@ -1111,6 +1194,52 @@ class BatchManager(models.Manager):
         }
         return results
 
+    @staticmethod
+    def create_batch_row_list(batch_row_list):
+        """
+        Save unsaved BatchRow objects in one round trip. On Postgres that is a COPY, which is much faster than an
+        INSERT per row when a statewide import brings in hundreds of thousands of rows.
+        """
+        status = ""
+        success = True
+        number_of_batch_rows = 0
+        try:
+            if connection.vendor == 'postgresql':
+                column_names = [
+                    'batch_header_id', 'google_civic_election_id', 'polling_location_we_vote_id', 'voter_id',
+                    'state_code', 'batch_row_analyzed', 'batch_row_created', 'batch_row_values']
+                copy_buffer = io.StringIO()
+                for batch_row in batch_row_list:
+                    copy_buffer.write('\t'.join([
+                        generate_copy_text_value(batch_row.batch_header_id),
+                        generate_copy_text_value(batch_row.google_civic_election_id),
+                        generate_copy_text_value(batch_row.polling_location_we_vote_id),
+                        generate_copy_text_value(batch_row.voter_id),
+                        generate_copy_text_value(batch_row.state_code),
+                        generate_copy_text_value(batch_row.batch_row_analyzed),
+                        generate_copy_text_value(batch_row.batch_row_created),
+                        generate_copy_text_value(
+                            None if batch_row.batch_row_values is None else json.dumps(batch_row.batch_row_values)),
+                    ]) + '\n')
+                copy_buffer.seek(0)
+                sql = "COPY " + BatchRow._meta.db_table + " (" + ", ".join(column_names) + ") FROM STDIN"
+                with connection.cursor() as cursor:
+                    cursor.copy_expert(sql, copy_buffer)
+            else:
+                BatchRow.objects.bulk_create(batch_row_list, batch_size=1000)
+            number_of_batch_rows = len(batch_row_list)
+        except Exception as e:
+            success = False
+            status += "EXCEPTION_BATCH_ROW: " + str(e) + " "
+            handle_exception(e, logger=logger, exception_message=status)
+
+        results = {
+            'success':              success,
+            'status':               status,
+            'number_of_batch_rows': number_of_batch_rows,
+        }
+        return results
+
     def create_batch_from_json(self, file_name, structured_json_list, mapping_dict, kind_of_batch,
                                google_civic_election_id=0, organization_we_vote_id="", polling_location_we_vote_id="",
                                batch_set_id=0, state_code=""):
@@ -1283,6 +1412,7 @@ class BatchManager(models.Manager):
             handle_exception(e, logger=logger, exception_message=status)
 
         if positive_value_exists(batch_header_id):
+            batch_row_list = []
             for one_dict in structured_json_list:
                 # if number_of_batch_rows >= limit_for_testing:
                 #     break
@@ -1295,68 +1425,25 @@ class BatchManager(models.Manager):
                 local_state_code = state_code  # Use it if it came in to this function
                 if not positive_value_exists(state_code):
                     local_state_code = get_value_from_dict(one_dict, 'state_code')
-                try:
-                    batch_row = BatchRow.objects.create(
-                        batch_header_id=batch_header_id,
-                        batch_row_000=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 0)),
-                        batch_row_001=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 1)),
-                        batch_row_002=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 2)),
-                        batch_row_003=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 3)),
-                        batch_row_004=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 4)),
-                        batch_row_005=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 5)),
-                        batch_row_006=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 6)),
-                        batch_row_007=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 7)),
-                        batch_row_008=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 8)),
-                        batch_row_009=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 9)),
-                        batch_row_010=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 10)),
-                        batch_row_011=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 11)),
-                        batch_row_012=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 12)),
-                        batch_row_013=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 13)),
-                        batch_row_014=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 14)),
-                        batch_row_015=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 15)),
-                        batch_row_016=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 16)),
-                        batch_row_017=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 17)),
-                        batch_row_018=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 18)),
-                        batch_row_019=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 19)),
-                        batch_row_020=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 20)),
-                        batch_row_021=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 21)),
-                        batch_row_022=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 22)),
-                        batch_row_023=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 23)),
-                        batch_row_024=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 24)),
-                        batch_row_025=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 25)),
-                        batch_row_026=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 26)),
-                        batch_row_027=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 27)),
-                        batch_row_028=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 28)),
-                        batch_row_029=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 29)),
-                        batch_row_030=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 30)),
-                        batch_row_031=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 31)),
-                        batch_row_032=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 32)),
-                        batch_row_033=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 33)),
-                        batch_row_034=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 34)),
-                        batch_row_035=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 35)),
-                        batch_row_036=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 36)),
-                        batch_row_037=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 37)),
-                        batch_row_038=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 38)),
-                        batch_row_039=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 39)),
-                        batch_row_040=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 40)),
-                        batch_row_041=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 41)),
-                        batch_row_042=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 42)),
-                        batch_row_043=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 43)),
-                        batch_row_044=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 44)),
-                        batch_row_045=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 45)),
-                        batch_row_046=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 46)),
-                        batch_row_047=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 47)),
-                        batch_row_048=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 48)),
-                        batch_row_049=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 49)),
-                        batch_row_050=get_value_from_dict(one_dict, get_value_if_index_in_list(remote_source_keys, 50)),
-                        google_civic_election_id=local_google_civic_election_id,
-                        polling_location_we_vote_id=local_polling_location_we_vote_id,
-                        state_code=local_state_code,
-                    )
-                    number_of_batch_rows += 1
-                except Exception as e:
+                batch_row_values = []
+                for remote_source_key in remote_source_keys[:BATCH_ROW_COLUMN_COUNT]:
+                    value = get_value_from_dict(one_dict, remote_source_key)
+                    # Stored as text, the way the batch_row_000 ... batch_row_050 TextFields stored it
+                    batch_row_values.append(value if value is None or isinstance(value, str) else str(value))
+                batch_row_list.append(BatchRow(
+                    batch_header_id=batch_header_id,
+                    batch_row_values=batch_row_values,
+                    google_civic_election_id=local_google_civic_election_id,
+                    polling_location_we_vote_id=local_polling_location_we_vote_id,
+                    state_code=local_state_code,
+                ))
+            for start_index in range(0, len(batch_row_list), BATCH_ROW_COPY_CHUNK_SIZE):
+                results = self.create_batch_row_list(
+                    batch_row_list[start_index:start_index + BATCH_ROW_COPY_CHUNK_SIZE])
+                number_of_batch_rows += results['number_of_batch_rows']
+                if not results['success']:
                     # Stop trying to save rows -- break out of the for loop
-                    status += "EXCEPTION_BATCH_ROW_FOR_JSON: " + str(e) + " "
+                    status += results['status'].replace('EXCEPTION_BATCH_ROW', 'EXCEPTION_BATCH_ROW_FOR_JSON')
                     break
         else:
             status += "NO_BATCH_HEADER_ID "
@@ -2107,57 +2194,27 @@ class BatchManager(models.Manager):
         return results
 
     def retrieve_value_from_batch_row(self, batch_header_name_we_want, batch_header_map, one_batch_row):
-        index_number = 0
-        batch_header_name_we_want = batch_header_name_we_want.lower().strip()
-        number_of_columns = 50
-        while index_number < number_of_columns:
-            index_number_string = "00" + str(index_number)
-            index_number_string = index_number_string[-3:]
-            batch_header_map_attribute_name = "batch_header_map_" + index_number_string
-            # If this position in the batch_header_map matches the batch_header_name_we_want, then we know what column
-            # to look in within one_batch_row for the value
-            value_from_batch_header_map = getattr(batch_header_map, batch_header_map_attribute_name)
-            if value_from_batch_header_map is None:
-                # Break out when we stop getting batch_header_map values
-                return ""
-            value_from_batch_header_map = value_from_batch_header_map.replace('"', '')
-            value_from_batch_header_map = value_from_batch_header_map.replace('﻿', '')
-            value_from_batch_header_map = value_from_batch_header_map.lower().strip()
-            if batch_header_name_we_want == value_from_batch_header_map:
-                one_batch_row_attribute_name = "batch_row_" + index_number_string
-                value_from_batch_row = getattr(one_batch_row, one_batch_row_attribute_name)
-                if isinstance(value_from_batch_row, str):
-                    return value_from_batch_row.strip()
-                else:
-                    return value_from_batch_row
-            index_number += 1
-        return ""
+        index_number = batch_header_map.batch_header_index_map.get(batch_header_name_we_want.lower().strip())
+        if index_number is None:
+            return ""
+        value_from_batch_row = one_batch_row.get_batch_row_value(index_number)
+        if isinstance(value_from_batch_row, str):
+            return value_from_batch_row.strip()
+        else:
+            return value_from_batch_row
 
     def retrieve_column_name_from_batch_row(self, batch_header_name_we_want, batch_header_map):
         """
-        Given column name from batch_header_map, retrieve equivalent column name from batch row
-        :param batch_header_name_we_want: 
-        :param batch_header_map: 
+        Given column name from batch_header_map, retrieve equivalent column name from batch row. Only rows saved
+        before batch_row_values use these columns.
+        :param batch_header_name_we_want:
+        :param batch_header_map:
         :return:
         """
-        index_number = 0
-        batch_header_name_we_want = batch_header_name_we_want.lower().strip()
-        number_of_columns = 50
-        while index_number < number_of_columns:
-            index_number_string = "00" + str(index_number)
-            index_number_string = index_number_string[-3:]
-            batch_header_map_attribute_name = "batch_header_map_" + index_number_string
-            # If this position in the batch_header_map matches the batch_header_name_we_want, then we know what column
-            # to look in within one_batch_row for the value, eg: batch_header_map_000 --> measure_batch_id
-            value_from_batch_header_map = getattr(batch_header_map, batch_header_map_attribute_name)
-            if value_from_batch_header_map is None:
-                # Break out when we stop getting batch_header_map values
-                return ""
-            if batch_header_name_we_want == value_from_batch_header_map.lower().strip():
-                one_batch_row_attribute_name = "batch_row_" + index_number_string
-                return one_batch_row_attribute_name
-            index_number += 1
-        return ""
+        index_number = batch_header_map.batch_header_index_map.get(batch_header_name_we_want.lower().strip())
+        if index_number is None:
+            return ""
+        return BATCH_ROW_COLUMN_NAMES[index_number]
 
     def find_file_type(self, batch_uri):
         """
@@ -2207,18 +2264,20 @@ class BatchManager(models.Manager):
         :param organization_we_vote_id:
         :return:
         """
-        # Retrieve from XML
+        # Retrieve from XML, keeping only the elements for this kind_of_batch
+        imported_tag_list = {
+            CANDIDATE:      ['Candidate'],
+            CONTEST_OFFICE: ['CandidateContest'],
+            MEASURE:        ['BallotMeasureContest'],
+            OFFICE_HELD:    ['Office'],
+            POLITICIAN:     ['Person'],
+        }.get(kind_of_batch, [])
         request = urllib.request.urlopen(batch_uri)
-        # xml_data = request.read()
-        # xml_data = xmltodict.parse(xml_data)
-        # # xml_data_list_json = list(xml_data)
-        # structured_json = json.dumps(xml_data)
-
-        xml_tree = ElementTree.parse(request)
+        parse_results = parse_vip_xml_streaming(request, imported_tag_list, source_name=batch_uri)
         request.close()
-        xml_root = xml_tree.getroot()
+        xml_root = parse_results['xml_root']
 
-        if xml_root:
+        if xml_root is not None:
             if kind_of_batch == MEASURE:
                 return self.store_measure_xml(batch_uri, google_civic_election_id, organization_we_vote_id, xml_root)
             elif kind_of_batch == OFFICE_HELD:
@@ -2231,15 +2290,14 @@ class BatchManager(models.Manager):
                 return self.store_candidate_xml(batch_uri, google_civic_election_id, organization_we_vote_id, xml_root)
             elif kind_of_batch == POLITICIAN:
                 return self.store_politician_xml(batch_uri, google_civic_election_id, organization_we_vote_id, xml_root)
-            else:
-                results = {
-                    'success': False,
-                    'status': '',
-                    'batch_header_id': 0,
-                    'batch_saved': False,
-                    'number_of_batch_rows': 0,
-                }
-                return results
+        results = {
+            'success': False,
+            'status': parse_results['status'],
+            'batch_header_id': 0,
+            'batch_saved': False,
+            'number_of_batch_rows': 0,
+        }
+        return results
 
     def store_measure_xml(self, batch_uri, google_civic_election_id, organization_we_vote_id, xml_root, batch_set_id=0):
         """
@@ -3509,34 +3567,32 @@ class BatchManager(models.Manager):
         from import_export_ctcl.controllers import create_candidate_selection_rows
         import_date = date.today()
 
-        # Retrieve from XML
+        # Retrieve from XML. Statewide feeds run to hundreds of MB, so we stream the file and keep only the elements
+        #  we import, then hand them to the batch writers below in the order they depend on each other
+        #  (CandidateContest needs the CandidateSelection rows, Candidate needs the Party entries), whatever
+        #  order the feed lists them in.
         if batch_file:
-            xml_tree = ElementTree.parse(batch_file)
+            parse_results = parse_vip_xml_streaming(batch_file, source_name=batch_file.name)
             batch_set_name = batch_file.name + " - " + str(import_date)
 
         else:
             request = urllib.request.urlopen(batch_uri)
-            # xml_data = request.read()
-            # xml_data = xmltodict.parse(xml_data)
-            # # xml_data_list_json = list(xml_data)
-            # structured_json = json.dumps(xml_data)
-
-            xml_tree = ElementTree.parse(request)
+            parse_results = parse_vip_xml_streaming(request, source_name=batch_uri)
             request.close()
 
             # set batch_set_name as file_name
             batch_set_name_list = batch_uri.split('/')
             batch_set_name = batch_set_name_list[len(batch_set_name_list) - 1] + " - " + str(import_date)
 
-        xml_root = xml_tree.getroot()
+        xml_root = parse_results['xml_root']
 
-        status = ''
+        status = parse_results['status']
         success = False
         number_of_batch_rows = 0
         batch_set_id = 0
         continue_batch_set_processing = True  # Set to False if we run into a problem that requires we stop processing
 
-        if xml_root:
+        if xml_root is not None and len(xml_root):
             # create batch_set object
             try:
                 batch_set = BatchSet.objects.create(batch_set_description_text="", batch_set_name=batch_set_name,
@@ -3835,19 +3891,19 @@ class BatchManager(models.Manager):
             if positive_value_exists(batch_header_id) and office_held_ctcl_id:
                 batch_header_map = BatchHeaderMap.objects.using('readonly').get(batch_header_id=batch_header_id)
 
-                # Get the column name in BatchRow that stores office_held_batch_id - id taken from batch_header_map
-                # eg: batch_row_000 -> office_held_batch_id
-                office_held_id_column_name = batch_manager.retrieve_column_name_from_batch_row(
-                    "office_held_batch_id", batch_header_map)
+                # Get the position in BatchRow that stores office_held_batch_id - taken from batch_header_map
+                # eg: batch_row_values[0] (or batch_row_000 in older rows) -> office_held_batch_id
+                office_held_id_index = batch_header_map.batch_header_index_map.get("office_held_batch_id")
 
-                # we found batch row column name corresponding to office_held_batch_id, now look up batch_row table
-                # with given batch_header_id and office_held_batch_id (batch_row_00)
-                batch_row_on_stage = BatchRow.objects.using('readonly').get(
-                    batch_header_id=batch_header_id,
-                    **{office_held_id_column_name: office_held_ctcl_id})
-                # we know the batch row, next retrieve value for office_held_name eg: off1 -> NC State Senator
-                office_held_name = batch_manager.retrieve_value_from_batch_row('office_held_name',
-                                                                                  batch_header_map, batch_row_on_stage)
+                if office_held_id_index is not None:
+                    # Now look up batch_row table with given batch_header_id and office_held_batch_id
+                    batch_row_on_stage = BatchRow.objects.using('readonly').get(
+                        Q(**{'batch_row_values__' + str(office_held_id_index): office_held_ctcl_id}) |
+                        Q(**{BATCH_ROW_COLUMN_NAMES[office_held_id_index]: office_held_ctcl_id}),
+                        batch_header_id=batch_header_id)
+                    # we know the batch row, next retrieve value for office_held_name eg: off1 -> NC State Senator
+                    office_held_name = batch_manager.retrieve_value_from_batch_row(
+                        'office_held_name', batch_header_map, batch_row_on_stage)
 
         except BatchRow.DoesNotExist:
             office_held_name = ''
@@ -4805,10 +4861,32 @@ class BatchHeaderMap(models.Model):
     batch_header_map_049 = models.TextField(null=True, blank=True)
     batch_header_map_050 = models.TextField(null=True, blank=True)
 
+    @cached_property
+    def batch_header_index_map(self):
+        """
+        {we vote header name: position in the batch row}, worked out once per BatchHeaderMap, instead of once per
+        value we look up. Mapped headers end at the first empty position.
+        """
+        batch_header_index_map = {}
+        for index_number, batch_header_map_column_name in enumerate(BATCH_HEADER_MAP_COLUMN_NAMES):
+            value_from_batch_header_map = getattr(self, batch_header_map_column_name)
+            if value_from_batch_header_map is None:
+                break
+            value_from_batch_header_map = value_from_batch_header_map.replace('"', '')
+            value_from_batch_header_map = value_from_batch_header_map.replace('\ufeff', '')
+            value_from_batch_header_map = value_from_batch_header_map.lower().strip()
+            batch_header_index_map.setdefault(value_from_batch_header_map, index_number)
+        return batch_header_index_map
+
+    def save(self, *args, **kwargs):
+        self.__dict__.pop('batch_header_index_map', None)
+        super().save(*args, **kwargs)
+
 
 class BatchRow(models.Model):
     """
-    Individual data rows
+    Individual data rows. Newer rows keep their values in batch_row_values, and leave batch_row_000 ...
+    batch_row_050 empty. Read values with get_batch_row_value or batch_row_value_list, which handle both.
     """
     batch_header_id = models.PositiveIntegerField(
         verbose_name="unique id of header row", unique=False, null=False, db_index=True)
@@ -4874,6 +4952,22 @@ class BatchRow(models.Model):
     batch_row_048 = models.TextField(null=True, blank=True)
     batch_row_049 = models.TextField(null=True, blank=True)
     batch_row_050 = models.TextField(null=True, blank=True)
+    # The whole row, as a list of up to BATCH_ROW_COLUMN_COUNT values in BatchHeader order
+    batch_row_values = models.JSONField(default=None, null=True, blank=True)
+
+    def get_batch_row_value(self, index_number):
+        if self.batch_row_values is not None:
+            if index_number < len(self.batch_row_values):
+                return self.batch_row_values[index_number]
+            return ""
+        return getattr(self, BATCH_ROW_COLUMN_NAMES[index_number])
+
+    @cached_property
+    def batch_row_value_list(self):
+        """
+        All BATCH_ROW_COLUMN_COUNT values, for templates: one_batch_row.batch_row_value_list.3
+        """
+        return [self.get_batch_row_value(index_number) for index_number in range(BATCH_ROW_COLUMN_COUNT)]
 
 
 class BatchHeaderTranslationSuggestion(models.Model):
@@ -5410,34 +5504,8 @@ class BatchProcessManager(models.Manager):
                     # See also longest_activity_notice_processing_run_time_allowed
                     # If this kind_of_process has run longer than allowed (i.e. probably crashed or timed out)
                     #  consider it to no longer be active
-                    if batch_process.kind_of_process == ACTIVITY_NOTICE_PROCESS:
-                        checked_out_expiration_time = 270  # 4.5 minutes * 60 seconds
-                    elif batch_process.kind_of_process == API_REFRESH_REQUEST:
-                        checked_out_expiration_time = 360  # 6 minutes * 60 seconds
-                    elif batch_process.kind_of_process == GENERATE_VOTER_GUIDES:
-                        checked_out_expiration_time = 600  # 10 minutes * 60 seconds
-                    elif batch_process.kind_of_process == MATCH_POLITICIANS_TO_ORGANIZATIONS:
-                        checked_out_expiration_time = 600  # 10 minutes * 60 seconds
-                    elif batch_process.kind_of_process in [
-                            REFRESH_BALLOT_ITEMS_FROM_POLLING_LOCATIONS, REFRESH_BALLOT_ITEMS_FROM_VOTERS,
-                            RETRIEVE_BALLOT_ITEMS_FROM_POLLING_LOCATIONS]:
-                        checked_out_expiration_time = 1800  # 30 minutes * 60 seconds
-                    elif batch_process.kind_of_process in [RETRIEVE_REPRESENTATIVES_FROM_POLLING_LOCATIONS]:
-                        checked_out_expiration_time = 120  # 2 minutes * 60 seconds
-                    elif batch_process.kind_of_process in [
-                            AUGMENT_ANALYTICS_ACTION_WITH_ELECTION_ID, AUGMENT_ANALYTICS_ACTION_WITH_FIRST_VISIT,
-                            CALCULATE_ORGANIZATION_DAILY_METRICS, CALCULATE_ORGANIZATION_ELECTION_METRICS,
-                            CALCULATE_SITEWIDE_ELECTION_METRICS, CALCULATE_SITEWIDE_VOTER_METRICS,
-                            CALCULATE_SITEWIDE_DAILY_METRICS]:
-                        checked_out_expiration_time = 600  # 10 minutes * 60 seconds
-                    elif batch_process.kind_of_process == RETRIEVE_FROM_BALLOTPEDIA:
-                        checked_out_expiration_time = 600  # 10 minutes * 60 seconds
-                    elif batch_process.kind_of_process == SEARCH_TWITTER_FOR_CANDIDATE_TWITTER_HANDLE:
-                        checked_out_expiration_time = 300  # 5 minutes * 60 seconds - See SEARCH_TWITTER_TIMED_OUT
-                    elif batch_process.kind_of_process == UPDATE_TWITTER_DATA_FROM_TWITTER:
-                        checked_out_expiration_time = 600  # 10 minutes * 60 seconds - See UPDATE_TWITTER_TIMED_OUT
-                    else:
-                        checked_out_expiration_time = 1800  # 30 minutes * 60 seconds
+                    checked_out_expiration_time = \
+                        fetch_batch_process_checked_out_expiration_seconds(batch_process.kind_of_process)
                     date_checked_out_time_out = \
                         batch_process.date_checked_out + timedelta(seconds=checked_out_expiration_time)
                     status += "CHECKED_OUT_PROCESS_FOUND "
@@ -5473,6 +5541,143 @@ class BatchProcessManager(models.Manager):
         }
         return results
 
+    @staticmethod
+    def claim_next_batch_process(
+            kind_of_process_list=[],
+            worker_name='',
+            for_upcoming_elections=True,
+            stalled_seconds=BATCH_PROCESS_WORKER_STALLED_SECONDS,
+            maximum_claimed=0):
+        """
+        Claim one batch_process for a run_batch_process_workers worker: a started one that isn't checked out
+        (or whose checkout has timed out) first, and otherwise the oldest queued one. SELECT ... FOR UPDATE SKIP LOCKED
+        means workers on any number of processes and machines never claim the same batch_process. The claim is
+        recorded in BatchProcessCheckout (which the process_one_* functions don't touch), and lasts until the worker
+        releases it, or stops heartbeating for stalled_seconds.
+        :param maximum_claimed: If this many batch processes of these kinds are already claimed, don't claim another
+          (ex/ NUMBER_OF_SIMULTANEOUS_REPRESENTATIVE_BATCH_PROCESSES). Claims of the same kinds take turns on
+          Postgres, so workers on different machines can't both take the last one.
+        """
+        status = ""
+        success = True
+        batch_process = None
+        batch_process_found = False
+
+        google_civic_election_id_list = [0]
+        if positive_value_exists(for_upcoming_elections):
+            election_manager = ElectionManager()
+            results = election_manager.retrieve_upcoming_elections()
+            for one_election in results['election_list']:
+                google_civic_election_id_list.append(convert_to_int(one_election.google_civic_election_id))
+
+        try:
+            right_now = now()
+            not_checked_out_q = Q(date_checked_out__isnull=True)
+            for kind_of_process in kind_of_process_list:
+                checked_out_expiration_seconds = fetch_batch_process_checked_out_expiration_seconds(kind_of_process)
+                not_checked_out_q |= Q(
+                    kind_of_process=kind_of_process,
+                    date_checked_out__lt=right_now - timedelta(seconds=checked_out_expiration_seconds))
+            live_checkout_queryset = BatchProcessCheckout.objects \
+                .filter(date_heartbeat__gte=right_now - timedelta(seconds=stalled_seconds)) \
+                .values('batch_process_id')
+            with transaction.atomic():
+                if positive_value_exists(maximum_claimed):
+                    if connection.vendor == 'postgresql':
+                        with connection.cursor() as cursor:
+                            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [
+                                zlib.crc32(('claim_next_batch_process:' +
+                                            ','.join(sorted(kind_of_process_list))).encode('utf-8'))])
+                    claimed_count = BatchProcessCheckout.objects \
+                        .filter(kind_of_process__in=kind_of_process_list) \
+                        .filter(date_heartbeat__gte=right_now - timedelta(seconds=stalled_seconds)) \
+                        .count()
+                    if claimed_count >= maximum_claimed:
+                        status += "BATCH_PROCESS_CLAIM_LIMIT_REACHED: " + str(claimed_count) + " "
+                        results = {
+                            'success':              success,
+                            'status':               status,
+                            'batch_process':        None,
+                            'batch_process_found':  False,
+                        }
+                        return results
+                batch_process_queryset = BatchProcess.objects.select_for_update(skip_locked=True) \
+                    .filter(kind_of_process__in=kind_of_process_list) \
+                    .filter(date_completed__isnull=True) \
+                    .exclude(batch_process_paused=True) \
+                    .filter(not_checked_out_q) \
+                    .exclude(id__in=live_checkout_queryset)
+                if positive_value_exists(for_upcoming_elections):
+                    batch_process_queryset = batch_process_queryset.filter(
+                        google_civic_election_id__in=google_civic_election_id_list)
+                batch_process = batch_process_queryset.order_by(F('date_started').asc(nulls_last=True), 'id').first()
+                if batch_process is not None:
+                    BatchProcessCheckout.objects.update_or_create(
+                        batch_process_id=batch_process.id,
+                        defaults={
+                            'kind_of_process':      batch_process.kind_of_process,
+                            'worker_name':          worker_name,
+                            'date_checked_out':     right_now,
+                            'date_heartbeat':       right_now,
+                        })
+                    if batch_process.date_started is None:
+                        batch_process.date_started = right_now
+                    batch_process.date_checked_out = right_now
+                    batch_process.save(update_fields=['date_started', 'date_checked_out'])
+                    batch_process_found = True
+                    status += "BATCH_PROCESS_CLAIMED "
+                else:
+                    status += "NO_BATCH_PROCESS_TO_CLAIM "
+        except Exception as e:
+            status += "FAILED_TO_CLAIM_BATCH_PROCESS: " + str(e) + " "
+            success = False
+            batch_process = None
+
+        results = {
+            'success':              success,
+            'status':               status,
+            'batch_process':        batch_process,
+            'batch_process_found':  batch_process_found,
+        }
+        return results
+
+    @staticmethod
+    def heartbeat_batch_process_checkout(batch_process_id=0, worker_name=''):
+        """
+        Show that worker_name is still working on batch_process_id. While the batch_process is checked out, this
+        also keeps date_checked_out fresh, so a long step doesn't look like it has timed out.
+        :return: False if this worker no longer holds the claim
+        """
+        right_now = now()
+        claim_held = BatchProcessCheckout.objects \
+            .filter(batch_process_id=batch_process_id, worker_name=worker_name) \
+            .update(date_heartbeat=right_now) > 0
+        if claim_held:
+            BatchProcess.objects \
+                .filter(id=batch_process_id, date_checked_out__isnull=False, date_completed__isnull=True) \
+                .update(date_checked_out=right_now)
+        return claim_held
+
+    @staticmethod
+    def release_batch_process_checkout(batch_process_id=0, worker_name=''):
+        status = ""
+        success = True
+        try:
+            if BatchProcessCheckout.objects.filter(batch_process_id=batch_process_id, worker_name=worker_name) \
+                    .delete()[0]:
+                BatchProcess.objects.filter(id=batch_process_id).update(date_checked_out=None)
+                status += "BATCH_PROCESS_CHECKOUT_RELEASED "
+            else:
+                status += "BATCH_PROCESS_CHECKOUT_NOT_HELD "
+        except Exception as e:
+            status += "FAILED_TO_RELEASE_BATCH_PROCESS_CHECKOUT: " + str(e) + " "
+            success = False
+        results = {
+            'success':  success,
+            'status':   status,
+        }
+        return results
+
     def retrieve_active_ballot_item_chunk_not_completed(self, batch_process_id):
         status = ""
         success = True
@@ -5623,6 +5828,18 @@ class BatchProcess(models.Model):
         return election
 
 
+class BatchProcessCheckout(models.Model):
+    """
+    A batch_process claimed by a run_batch_process_workers worker. It lives apart from BatchProcess because the
+    process_one_* functions clear and re-save BatchProcess.date_checked_out as they go.
+    """
+    batch_process_id = models.PositiveIntegerField(unique=True)
+    kind_of_process = models.CharField(max_length=50, default="")
+    worker_name = models.CharField(max_length=255, default="")
+    date_checked_out = models.DateTimeField(null=True)
+    date_heartbeat = models.DateTimeField(null=True, db_index=True)
+
+
 class BatchProcessAnalyticsChunk(models.Model):
     """
     """
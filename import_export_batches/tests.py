@@ -0,0 +1,365 @@
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import json
+import threading
+from time import perf_counter, sleep
+from types import SimpleNamespace
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from ballot.models import BallotItem
+from import_export_batches.controllers import create_batch_row_actions, IMPORT_BALLOT_ITEM, POLITICIAN
+from import_export_batches.controllers_ballot_fetch import fetch_ballot_json_concurrently, RequestRateLimiter
+from import_export_batches.models import BATCH_HEADER_MAP_BALLOT_ITEMS_TO_VOTE_USA_BALLOT_ITEMS, BatchHeaderMap, \
+    BatchManager, BatchProcess, BatchProcessCheckout, BatchProcessManager, BatchRow, BatchRowActionBallotItem, \
+    BatchRowActionPolitician, generate_copy_text_value, IMPORT_ADD_TO_EXISTING, IMPORT_CREATE, MEASURE, \
+    parse_vip_xml_streaming, RETRIEVE_BALLOT_ITEMS_FROM_POLLING_LOCATIONS
+from import_export_vote_usa.controllers import generate_vote_usa_fetch_request_for_polling_location
+from office.models import ContestOffice
+
+
+class BatchProcessClaimTestCase(TestCase):
+    databases = ["default", "readonly"]
+
+    def setUp(self):
+        self.batch_process_manager = BatchProcessManager()
+        self.queued = BatchProcess.objects.create(
+            kind_of_process=RETRIEVE_BALLOT_ITEMS_FROM_POLLING_LOCATIONS, date_added_to_queue=now())
+        self.started = BatchProcess.objects.create(
+            kind_of_process=RETRIEVE_BALLOT_ITEMS_FROM_POLLING_LOCATIONS, date_started=now() - timedelta(hours=1))
+        self.checked_out = BatchProcess.objects.create(
+            kind_of_process=RETRIEVE_BALLOT_ITEMS_FROM_POLLING_LOCATIONS, date_started=now(),
+            date_checked_out=now())
+
+    def claim(self, worker_name):
+        results = self.batch_process_manager.claim_next_batch_process(
+            kind_of_process_list=[RETRIEVE_BALLOT_ITEMS_FROM_POLLING_LOCATIONS],
+            worker_name=worker_name,
+            for_upcoming_elections=False)
+        self.assertTrue(results['success'], results['status'])
+        return results['batch_process']
+
+    def test_workers_never_share_a_batch_process(self):
+        # Started before queued, and never one that is already checked out
+        self.assertEqual(self.claim('worker_a').id, self.started.id)
+        claimed = self.claim('worker_b')
+        self.assertEqual(claimed.id, self.queued.id)
+        self.assertIsNotNone(claimed.date_started)
+        self.assertIsNone(self.claim('worker_c'))
+
+        # Clearing date_checked_out mid-step, as process_one_ballot_item_batch_process does, keeps the claim
+        BatchProcess.objects.filter(id=self.started.id).update(date_checked_out=None)
+        self.assertIsNone(self.claim('worker_c'))
+        self.assertTrue(self.batch_process_manager.heartbeat_batch_process_checkout(self.started.id, 'worker_a'))
+        self.assertFalse(self.batch_process_manager.heartbeat_batch_process_checkout(self.started.id, 'worker_b'))
+
+        self.batch_process_manager.release_batch_process_checkout(self.started.id, 'worker_a')
+        self.assertIsNone(BatchProcess.objects.get(id=self.started.id).date_checked_out)
+        self.assertEqual(self.claim('worker_c').id, self.started.id)
+
+    def test_stalled_worker_loses_its_claim(self):
+        self.assertEqual(self.claim('worker_a').id, self.started.id)
+        self.assertEqual(self.claim('worker_b').id, self.queued.id)
+        # worker_a died an hour ago
+        BatchProcessCheckout.objects.filter(batch_process_id=self.started.id).update(
+            date_heartbeat=now() - timedelta(hours=1))
+        BatchProcess.objects.filter(id=self.started.id).update(date_checked_out=now() - timedelta(hours=1))
+        self.assertEqual(self.claim('worker_c').id, self.started.id)
+        self.assertEqual(BatchProcessCheckout.objects.get(batch_process_id=self.started.id).worker_name, 'worker_c')
+        self.assertFalse(self.batch_process_manager.heartbeat_batch_process_checkout(self.started.id, 'worker_a'))
+
+
+class StubVoterInfoHandler(BaseHTTPRequestHandler):
+    """
+    Answers like voterInfoQuery, slowly. Latitude 0.5 gets a server error.
+    """
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connection_count += 1
+
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        with self.server.lock:
+            self.server.in_flight_count += 1
+            self.server.maximum_in_flight_count = max(self.server.maximum_in_flight_count, self.server.in_flight_count)
+        sleep(0.05)
+        with self.server.lock:
+            self.server.in_flight_count -= 1
+        if params['latitude'][0] == '0.5':
+            body = b'Server Error'
+            self.send_response(500)
+        else:
+            body = json.dumps({'contests': [], 'latitude': params['latitude'][0]}).encode('utf-8')
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class BallotFetchTests(SimpleTestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubVoterInfoHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.connection_count = 0
+        self.server.in_flight_count = 0
+        self.server.maximum_in_flight_count = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:' + str(self.server.server_address[1]) + '/voterInfoQuery'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_fetch_map_points_concurrently(self):
+        polling_location_list = [
+            SimpleNamespace(we_vote_id='wv01ploc' + str(number), latitude=number + 1, longitude=-90.0, state='MS',
+                            get_text_for_map_search=lambda: '123 Main St, Coldwater, MS')
+            for number in range(40)]
+        polling_location_list.append(SimpleNamespace(
+            we_vote_id='wv01plocerror', latitude=0.5, longitude=-90.0, state='MS',
+            get_text_for_map_search=lambda: '1 Error Way, Coldwater, MS'))
+        polling_location_list.append(SimpleNamespace(
+            we_vote_id='wv01plocnolatitude', latitude=None, longitude=None, state='MS',
+            get_text_for_map_search=lambda: ''))
+        with mock.patch('import_export_vote_usa.controllers.VOTE_USA_VOTER_INFO_URL', self.url), \
+                mock.patch.dict('import_export_batches.controllers_ballot_fetch.BALLOT_FETCH_REQUESTS_PER_SECOND',
+                                {'vote_usa': 0}), \
+                mock.patch.dict('import_export_batches.controllers_ballot_fetch.ballot_fetch_rate_limiters',
+                                clear=True):
+            fetch_request_list = [
+                (polling_location.we_vote_id, generate_vote_usa_fetch_request_for_polling_location(
+                    polling_location, election_day_text='2024-11-05'))
+                for polling_location in polling_location_list]
+            t0 = perf_counter()
+            results_by_key = dict(fetch_ballot_json_concurrently(fetch_request_list, concurrency=8))
+            elapsed_seconds = perf_counter() - t0
+
+        self.assertEqual(len(results_by_key), 42)
+        self.assertIsNone(results_by_key['wv01plocnolatitude'])
+        self.assertIsNotNone(results_by_key['wv01plocerror']['error'])
+        self.assertEqual(results_by_key['wv01ploc7']['one_ballot_json'], {'contests': [], 'latitude': '8'})
+        self.assertEqual(results_by_key['wv01ploc7']['status_code'], 200)
+        # 41 requests of 50 ms each, 8 at a time, over a handful of kept-alive connections
+        self.assertLess(elapsed_seconds, 41 * 0.05 / 2)
+        self.assertLessEqual(self.server.maximum_in_flight_count, 8)
+        self.assertGreater(self.server.maximum_in_flight_count, 1)
+        self.assertLessEqual(self.server.connection_count, 8)
+
+    def test_rate_limit(self):
+        rate_limiter = RequestRateLimiter(requests_per_second=100)
+        t0 = perf_counter()
+        thread_list = [threading.Thread(target=rate_limiter.wait) for _ in range(21)]
+        for thread in thread_list:
+            thread.start()
+        for thread in thread_list:
+            thread.join()
+        self.assertGreaterEqual(perf_counter() - t0, 0.19)
+
+
+class BatchRowValuesTests(SimpleTestCase):
+
+    def setUp(self):
+        self.batch_header_map = BatchHeaderMap(
+            batch_header_id=1,
+            batch_header_map_000='office_held_batch_id',
+            batch_header_map_001='"Office_Held_Name"',
+            batch_header_map_002='office_held_name',
+            batch_header_map_004='state_code')
+
+    def test_batch_header_index_map(self):
+        # The first mapping wins, and we stop at the first empty position
+        self.assertEqual(self.batch_header_map.batch_header_index_map,
+                         {'office_held_batch_id': 0, 'office_held_name': 1})
+        self.batch_header_map.batch_header_map_003 = 'ballotpedia_office_id'
+        with mock.patch('django.db.models.Model.save'):
+            self.batch_header_map.save()
+        self.assertEqual(self.batch_header_map.batch_header_index_map['state_code'], 4)
+
+    def test_retrieve_value_from_batch_row(self):
+        batch_manager = BatchManager()
+        batch_row = BatchRow(batch_header_id=1, batch_row_values=['off1', ' NC State Senator ', None])
+        legacy_batch_row = BatchRow(batch_header_id=1, batch_row_000='off1', batch_row_001='NC State Senator')
+        for one_batch_row in [batch_row, legacy_batch_row]:
+            self.assertEqual(batch_manager.retrieve_value_from_batch_row(
+                'Office_Held_Name', self.batch_header_map, one_batch_row), 'NC State Senator')
+            self.assertEqual(batch_manager.retrieve_value_from_batch_row(
+                'office_held_batch_id', self.batch_header_map, one_batch_row), 'off1')
+            self.assertEqual(batch_manager.retrieve_value_from_batch_row(
+                'not_mapped', self.batch_header_map, one_batch_row), '')
+        self.assertEqual(batch_row.batch_row_value_list[:3], ['off1', ' NC State Senator ', None])
+        self.assertEqual(batch_row.batch_row_value_list[50], '')
+        self.assertEqual(batch_manager.retrieve_column_name_from_batch_row(
+            'office_held_name', self.batch_header_map), 'batch_row_001')
+
+    def test_generate_copy_text_value(self):
+        self.assertEqual(generate_copy_text_value(None), '\\N')
+        self.assertEqual(generate_copy_text_value(False), 'f')
+        self.assertEqual(generate_copy_text_value(7), '7')
+        self.assertEqual(generate_copy_text_value('a\tb\\c\n'), 'a\\tb\\\\c\\n')
+
+
+VIP_XML_SAMPLE = b"""<?xml version="1.0" encoding="UTF-8"?>
+<VipObject schemaVersion="5.1">
+  <Source id="src1"><Name>CTCL</Name></Source>
+  <StreetSegment id="ss1"><City>Raleigh</City></StreetSegment>
+  <BallotMeasureContest id="bmc1"><Name>Bond</Name></BallotMeasureContest>
+  <StreetSegment id="ss2"><City>Durham</City></StreetSegment>
+  <Office id="off1"><Name><Text language="en">Governor</Text></Name></Office>
+  <BallotMeasureContest id="bmc2"><Name>Levy</Name></BallotMeasureContest>
+  <PollingLocation id="pl1"><Name>Library</Name></PollingLocation>
+</VipObject>
+"""
+
+
+class VipXmlStreamingTests(SimpleTestCase):
+
+    def test_parse_vip_xml_streaming(self):
+        results = parse_vip_xml_streaming(io.BytesIO(VIP_XML_SAMPLE))
+        self.assertTrue(results['success'])
+        xml_root = results['xml_root']
+        self.assertEqual(xml_root.tag, 'VipObject')
+        self.assertEqual(xml_root.get('schemaVersion'), '5.1')
+        self.assertEqual([element.get('id') for element in xml_root], ['src1', 'bmc1', 'off1', 'bmc2'])
+        self.assertEqual([element.find('Name').text for element in xml_root.findall('BallotMeasureContest')],
+                         ['Bond', 'Levy'])
+        self.assertEqual(xml_root.find('Office/Name/Text').text, 'Governor')
+        self.assertEqual(results['element_count'], 7)
+        self.assertEqual(results['element_count_by_tag'], {'BallotMeasureContest': 2, 'Office': 1, 'Source': 1})
+        self.assertIn('VIP_XML_BALLOTMEASURECONTEST_COUNT: 2', results['status'])
+
+        results = parse_vip_xml_streaming(io.BytesIO(VIP_XML_SAMPLE), ['Office'])
+        self.assertEqual([element.get('id') for element in results['xml_root']], ['off1'])
+
+    def test_parse_vip_xml_streaming_error(self):
+        results = parse_vip_xml_streaming(io.BytesIO(VIP_XML_SAMPLE[:-20]))
+        self.assertFalse(results['success'])
+        self.assertIsNone(results['xml_root'])
+        self.assertIn('VIP_XML_PARSE_ERROR', results['status'])
+
+    def test_create_batch_vip_xml_keeps_one_kind(self):
+        batch_manager = BatchManager()
+        with mock.patch('urllib.request.urlopen', return_value=io.BytesIO(VIP_XML_SAMPLE)), \
+                mock.patch.object(BatchManager, 'store_measure_xml', return_value={'batch_saved': True}) as store:
+            results = batch_manager.create_batch_vip_xml('https://example.org/vipFeed.xml', MEASURE, 1000, '')
+        self.assertTrue(results['batch_saved'])
+        xml_root = store.call_args[0][3]
+        self.assertEqual([element.get('id') for element in xml_root], ['bmc1', 'bmc2'])
+
+
+class BatchRowCopyTestCase(TestCase):
+    databases = ["default", "readonly"]
+
+    def test_create_batch_from_json(self):
+        batch_manager = BatchManager()
+        structured_json_list = [
+            {'id': 'off' + str(number), 'name': 'Office\t' + str(number), 'votes_allowed': number}
+            for number in range(3)]
+        results = batch_manager.create_batch_from_json(
+            'test', structured_json_list,
+            {'office_held_batch_id': 'id', 'office_held_name': 'name', 'number_voting_for': 'votes_allowed'},
+            'OFFICE_HELD', google_civic_election_id=1000000)
+        self.assertTrue(results['success'], results['status'])
+        self.assertEqual(results['number_of_batch_rows'], 3)
+        batch_header_map = BatchHeaderMap.objects.get(batch_header_id=results['batch_header_id'])
+        batch_row = BatchRow.objects.get(batch_header_id=results['batch_header_id'], batch_row_values__0='off2')
+        self.assertEqual(batch_row.batch_row_values, ['off2', 'Office\t2', '2'])
+        self.assertEqual(batch_manager.retrieve_value_from_batch_row(
+            'office_held_name', batch_header_map, batch_row), 'Office\t2')
+
+
+class BatchRowActionBallotItemListTestCase(TransactionTestCase):
+    # TransactionTestCase, so the batch descriptions we read from the readonly database are there
+    databases = ["default", "readonly"]
+
+    def test_analyze_ballot_items_in_bulk(self):
+        for number in range(30):
+            ContestOffice.objects.create(
+                we_vote_id='wv01off' + str(number), office_name='Office ' + str(number),
+                google_civic_election_id='1000000', state_code='MS')
+        BallotItem.objects.create(
+            google_civic_election_id='1000000', polling_location_we_vote_id='wv01ploc1',
+            contest_office_we_vote_id='wv01off3', ballot_item_display_name='Office 3')
+        structured_json_list = [
+            {'contest_office_we_vote_id': 'wv01off' + str(number), 'local_ballot_order': number,
+             'polling_location_we_vote_id': 'wv01ploc1', 'state_code': 'MS'}
+            for number in range(30)]
+        results = BatchManager().create_batch_from_json(
+            'test', structured_json_list, BATCH_HEADER_MAP_BALLOT_ITEMS_TO_VOTE_USA_BALLOT_ITEMS, IMPORT_BALLOT_ITEM,
+            google_civic_election_id=1000000, polling_location_we_vote_id='wv01ploc1')
+        batch_header_id = results['batch_header_id']
+
+        with CaptureQueriesContext(connection) as captured_queries:
+            results = create_batch_row_actions(batch_header_id)
+        self.assertTrue(results['success'], results['status'])
+        self.assertEqual(results['number_of_batch_actions_created'], 30)
+        # Not a query per row
+        self.assertLess(len(captured_queries), 30)
+
+        batch_row_action = BatchRowActionBallotItem.objects.get(
+            batch_header_id=batch_header_id, contest_office_we_vote_id='wv01off3')
+        self.assertEqual(batch_row_action.kind_of_action, IMPORT_ADD_TO_EXISTING)
+        self.assertEqual(batch_row_action.ballot_item_display_name, 'Office 3')
+        self.assertEqual(batch_row_action.local_ballot_order, 3)
+        self.assertEqual(BatchRowActionBallotItem.objects.filter(
+            batch_header_id=batch_header_id, kind_of_action=IMPORT_CREATE).count(), 29)
+        self.assertFalse(BatchRow.objects.filter(batch_header_id=batch_header_id, batch_row_analyzed=False).exists())
+
+        # Analyzing again updates the same entries
+        results = create_batch_row_actions(batch_header_id)
+        self.assertEqual(results['number_of_batch_actions_created'], 0)
+        self.assertEqual(results['number_of_batch_actions_updated'], 30)
+        self.assertEqual(BatchRowActionBallotItem.objects.filter(batch_header_id=batch_header_id).count(), 30)
+
+
+class BatchRowActionListTestCase(TransactionTestCase):
+    # TransactionTestCase, so the batch descriptions we read from the readonly database are there
+    databases = ["default", "readonly"]
+
+    def test_analyze_politicians_in_bulk(self):
+        structured_json_list = [
+            {'name': 'Politician ' + str(number), 'first': 'First' + str(number), 'party': 'Green'}
+            for number in range(20)]
+        results = BatchManager().create_batch_from_json(
+            'test', structured_json_list,
+            {'politician_full_name': 'name', 'politician_first_name': 'first', 'politician_party_name': 'party'},
+            POLITICIAN, google_civic_election_id=1000000)
+        batch_header_id = results['batch_header_id']
+
+        with CaptureQueriesContext(connection) as captured_queries:
+            results = create_batch_row_actions(batch_header_id)
+        self.assertTrue(results['success'], results['status'])
+        self.assertEqual(results['number_of_batch_actions_created'], 20)
+        batch_row_action_insert_list = [
+            query for query in captured_queries.captured_queries
+            if query['sql'].startswith('INSERT INTO "' + BatchRowActionPolitician._meta.db_table + '"')]
+        # Not an insert per row (sqlite splits a bulk_create this wide in two)
+        self.assertLessEqual(len(batch_row_action_insert_list), 2)
+        batch_row_action = BatchRowActionPolitician.objects.get(
+            batch_header_id=batch_header_id, politician_name='Politician 7')
+        self.assertEqual(batch_row_action.first_name, 'First7')
+        self.assertEqual(batch_row_action.political_party, 'Green')
+        self.assertEqual(batch_row_action.kind_of_action, IMPORT_CREATE)
+        self.assertFalse(BatchRow.objects.filter(batch_header_id=batch_header_id, batch_row_analyzed=False).exists())
+
+        # Analyzing again updates the same entries
+        BatchRowActionPolitician.objects.filter(id=batch_row_action.id).update(first_name='')
+        results = create_batch_row_actions(batch_header_id)
+        self.assertEqual(results['number_of_batch_actions_created'], 0)
+        self.assertEqual(results['number_of_batch_actions_updated'], 20)
+        self.assertEqual(BatchRowActionPolitician.objects.filter(batch_header_id=batch_header_id).count(), 20)
+        self.assertEqual(BatchRowActionPolitician.objects.get(id=batch_row_action.id).first_name, 'First7')
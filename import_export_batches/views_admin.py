@@ -22,9 +22,11 @@ from .controllers import create_batch_header_translation_suggestions, create_bat
     update_or_create_batch_header_mapping, export_voter_list_with_emails, import_data_from_batch_row_actions
 from .controllers_batch_process import pass_through_batch_list_incoming_variables, process_next_activity_notices, \
     process_next_ballot_items, process_next_general_maintenance
+from .controllers_ballot_fetch import fetch_ballot_json_concurrently
 from .controllers_ballotpedia import store_ballotpedia_json_response_to_import_batch_system
 from admin_tools.views import redirect_to_sign_in_page
-from ballot.models import BallotReturnedListManager, BallotReturnedManager, MEASURE, CANDIDATE, POLITICIAN
+from ballot.models import BallotReturnedListManager, BallotReturnedManager, MEASURE, CANDIDATE, POLITICIAN, \
+    defer_ballot_returned_spatial_index_invalidation
 import csv
 from datetime import date
 from django.contrib.auth.decorators import login_required
@@ -3267,6 +3269,7 @@ def retrieve_ballots_for_polling_locations_api_v4_view(request):
             use_vote_usa=use_vote_usa)
 
 
+@defer_ballot_returned_spatial_index_invalidation()
 def retrieve_ballots_for_polling_locations_api_v4_internal_view(
         request=None,
         batch_process_id=0,
@@ -3748,12 +3751,29 @@ def retrieve_ballots_for_polling_locations_api_v4_internal_view(
             from import_export_ballotpedia.controllers import \
                 retrieve_ballotpedia_ballot_items_from_polling_location_api_v4
         elif positive_value_exists(use_ctcl):
-            from import_export_ctcl.controllers import retrieve_ctcl_ballot_items_from_polling_location_api
+            from import_export_ctcl.controllers import generate_ctcl_fetch_request_for_polling_location, \
+                retrieve_ctcl_ballot_items_from_polling_location_api
         elif positive_value_exists(use_vote_usa):
-            from import_export_vote_usa.controllers import retrieve_vote_usa_ballot_items_from_polling_location_api
+            from import_export_vote_usa.controllers import generate_vote_usa_fetch_request_for_polling_location, \
+                retrieve_vote_usa_ballot_items_from_polling_location_api
+        # Fetch the ballots for all the map points concurrently, and store each one here as it arrives
+        if positive_value_exists(use_ballotpedia):
+            fetch_request_list = [(polling_location, None) for polling_location in polling_location_list]
+        elif positive_value_exists(use_ctcl):
+            fetch_request_list = [
+                (polling_location, generate_ctcl_fetch_request_for_polling_location(
+                    polling_location, ctcl_election_uuid=ctcl_election_uuid))
+                for polling_location in polling_location_list]
+        elif positive_value_exists(use_vote_usa):
+            fetch_request_list = [
+                (polling_location, generate_vote_usa_fetch_request_for_polling_location(
+                    polling_location, election_day_text=election_day_text, state_code=state_code))
+                for polling_location in polling_location_list]
+        else:
+            fetch_request_list = [(polling_location, None) for polling_location in polling_location_list]
         contest_not_returned_from_data_source_polling_location_we_vote_id_list = []
         contest_returned_from_data_source_polling_location_we_vote_id_list = []
-        for polling_location in polling_location_list:
+        for polling_location, ballot_fetch_results in fetch_ballot_json_concurrently(fetch_request_list):
             one_ballot_results = {}
             if positive_value_exists(use_ballotpedia):
                 one_ballot_results = retrieve_ballotpedia_ballot_items_from_polling_location_api_v4(
@@ -3789,6 +3809,7 @@ def retrieve_ballots_for_polling_locations_api_v4_internal_view(
                     new_candidate_we_vote_ids_list=new_candidate_we_vote_ids_list,
                     new_measure_we_vote_ids_list=new_measure_we_vote_ids_list,
                     update_or_create_rules=update_or_create_rules,
+                    ballot_fetch_results=ballot_fetch_results,
                 )
             elif positive_value_exists(use_vote_usa):
                 one_ballot_results = retrieve_vote_usa_ballot_items_from_polling_location_api(
@@ -3807,6 +3828,7 @@ def retrieve_ballots_for_polling_locations_api_v4_internal_view(
                     new_candidate_we_vote_ids_list=new_candidate_we_vote_ids_list,
                     new_measure_we_vote_ids_list=new_measure_we_vote_ids_list,
                     update_or_create_rules=update_or_create_rules,
+                    ballot_fetch_results=ballot_fetch_results,
                 )
             else:
                 # Should not be possible to get here
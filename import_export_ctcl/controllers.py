@@ -9,6 +9,7 @@ from config.base import get_environment_variable
 from datetime import datetime
 from electoral_district.controllers import electoral_district_import_from_xml_data
 from exception.models import handle_exception, handle_record_found_more_than_one_exception
+from import_export_batches.controllers_ballot_fetch import fetch_ballot_json
 from import_export_batches.controllers_ctcl import store_ctcl_json_response_to_import_batch_system
 from import_export_google_civic.controllers import groom_and_store_google_civic_ballot_json_2021
 import json
@@ -16,10 +17,10 @@ from party.controllers import party_import_from_xml_data
 from polling_location.models import KIND_OF_LOG_ENTRY_ADDRESS_PARSE_ERROR, \
     KIND_OF_LOG_ENTRY_API_END_POINT_CRASH, KIND_OF_LOG_ENTRY_BALLOT_RECEIVED, KIND_OF_LOG_ENTRY_NO_CONTESTS, \
     KIND_OF_LOG_ENTRY_NO_BALLOT_JSON, PollingLocationManager
-import requests
 import wevote_functions.admin
 from wevote_functions.functions import extract_state_code_from_address_string, positive_value_exists
 from wevote_functions.functions_date import convert_we_vote_date_string_to_date
+from wevote_functions.functions_http import http_get
 
 logger = wevote_functions.admin.get_logger(__name__)
 
@@ -416,7 +417,7 @@ def retrieve_ctcl_ballot_items_for_one_voter_api(
     try:
         api_key = CTCL_API_KEY
         # Get the ballot info at this address
-        response = requests.get(
+        response = http_get(
             CTCL_VOTER_INFO_URL,
             headers=HEADERS_FOR_CTCL_API_CALL,
             params={
@@ -540,6 +541,34 @@ def retrieve_ctcl_ballot_items_for_one_voter_api(
     return results
 
 
+def generate_ctcl_voter_info_fetch_request(ctcl_election_uuid='', text_for_map_search=''):
+    return {
+        'provider': 'ctcl',
+        'url':      CTCL_VOTER_INFO_URL,
+        'headers':  HEADERS_FOR_CTCL_API_CALL,
+        'params': {
+            "key": CTCL_API_KEY,
+            "electionId": ctcl_election_uuid,
+            "address": text_for_map_search,
+        },
+    }
+
+
+def generate_ctcl_fetch_request_for_polling_location(polling_location, ctcl_election_uuid=''):
+    """
+    The request retrieve_ctcl_ballot_items_from_polling_location_api would make for this map point,
+    or None if it wouldn't make one
+    """
+    if not polling_location or not positive_value_exists(ctcl_election_uuid):
+        return None
+    text_for_map_search = polling_location.get_text_for_map_search()
+    if not positive_value_exists(text_for_map_search):
+        return None
+    return generate_ctcl_voter_info_fetch_request(
+        ctcl_election_uuid=ctcl_election_uuid,
+        text_for_map_search=text_for_map_search)
+
+
 def retrieve_ctcl_ballot_items_from_polling_location_api(
         google_civic_election_id=0,
         ctcl_election_uuid="",
@@ -556,7 +585,11 @@ def retrieve_ctcl_ballot_items_from_polling_location_api(
         new_office_we_vote_ids_list=[],
         new_candidate_we_vote_ids_list=[],
         new_measure_we_vote_ids_list=[],
-        update_or_create_rules={}):
+        update_or_create_rules={},
+        ballot_fetch_results=None):
+    """
+    :param ballot_fetch_results: The response, already fetched by fetch_ballot_json_concurrently
+    """
     success = True
     status = ""
     polling_location_found = False
@@ -654,21 +687,17 @@ def retrieve_ctcl_ballot_items_from_polling_location_api(
         one_ballot_json_found = False
         ballot_returned_manager = BallotReturnedManager()
         try:
-            api_key = CTCL_API_KEY
             # Get the ballot info at this address
-            response = requests.get(
-                CTCL_VOTER_INFO_URL,
-                headers=HEADERS_FOR_CTCL_API_CALL,
-                params={
-                    "key": api_key,
-                    "electionId": ctcl_election_uuid,
-                    "address": text_for_map_search,
-                })
-            if positive_value_exists(response.url):
-                status += str(response.url) + ' '
-            if len(response.text) >= 2:
-                # one_ballot_json = json.loads(response.text)
-                one_ballot_json = response.json()
+            if ballot_fetch_results is None:
+                ballot_fetch_results = fetch_ballot_json(generate_ctcl_voter_info_fetch_request(
+                    ctcl_election_uuid=ctcl_election_uuid,
+                    text_for_map_search=text_for_map_search))
+            if positive_value_exists(ballot_fetch_results['url']):
+                status += str(ballot_fetch_results['url']) + ' '
+            if ballot_fetch_results['error'] is not None:
+                raise ballot_fetch_results['error']
+            if ballot_fetch_results['one_ballot_json'] is not None:
+                one_ballot_json = ballot_fetch_results['one_ballot_json']
                 one_ballot_json_found = True
             else:
                 status += "NO_RESULT_FOR: " + str(text_for_map_search) + " "
@@ -930,7 +959,7 @@ def retrieve_from_ctcl_api_election_query():
         }
         return results
 
-    response = requests.get(
+    response = http_get(
         CTCL_ELECTION_QUERY_URL,
         headers=HEADERS_FOR_CTCL_API_CALL,
         params={
@@ -16,11 +16,11 @@ from config.base import get_environment_variable
 from django.utils.timezone import localtime, now
 from election.models import ElectionManager
 from geopy.geocoders import get_geocoder_for_service
+from import_export_batches.controllers_ballot_fetch import fetch_ballot_json
 import json
 from measure.models import ContestMeasureManager, ContestMeasureListManager
 from office.models import ContestOfficeManager, ContestOfficeListManager
 from polling_location.models import PollingLocationManager
-import requests
 from voter.models import fetch_voter_id_from_voter_device_link, VoterAddressManager
 from wevote_functions.functions import convert_district_scope_to_ballotpedia_race_office_level, \
     convert_level_to_race_office_level, convert_state_text_to_state_code, convert_to_int, \
@@ -29,6 +29,7 @@ from wevote_functions.functions import convert_district_scope_to_ballotpedia_rac
     extract_state_code_from_address_string, extract_state_from_ocd_division_id, \
     extract_twitter_handle_from_text_string, extract_vote_usa_measure_id, extract_vote_usa_office_id, \
     is_voter_device_id_valid, logger, positive_value_exists, STATE_CODE_MAP
+from wevote_functions.functions_http import http_get
 
 GEOCODE_TIMEOUT = 10
 GOOGLE_CIVIC_API_KEY = get_environment_variable("GOOGLE_CIVIC_API_KEY")
@@ -1817,30 +1818,39 @@ def process_contests_from_structured_json(
     return results
 
 
+def generate_google_civic_voter_info_fetch_request(text_for_map_search, incoming_google_civic_election_id=0,
+                                                   use_test_election=False):
+    params = {
+        "key": GOOGLE_CIVIC_API_KEY,
+        "address": text_for_map_search,
+    }
+    if positive_value_exists(use_test_election):
+        params["electionId"] = 2000  # The Google Civic API Test election
+    elif positive_value_exists(incoming_google_civic_election_id):
+        params["electionId"] = incoming_google_civic_election_id
+    return {
+        'provider': 'google_civic',
+        'url':      VOTER_INFO_URL,
+        'params':   params,
+    }
+
+
 def retrieve_one_ballot_from_google_civic_api(text_for_map_search, incoming_google_civic_election_id=0,
-                                              use_test_election=False):
+                                              use_test_election=False, ballot_fetch_results=None):
+    """
+    :param ballot_fetch_results: The response, already fetched by fetch_ballot_json_concurrently
+    """
     # Request json file from Google servers
     # logger.info("Loading ballot for one address from voterInfoQuery from Google servers")
     print("retrieving one ballot for " + str(incoming_google_civic_election_id) + ": " + str(text_for_map_search))
-    if positive_value_exists(use_test_election):
-        response = requests.get(VOTER_INFO_URL, params={
-            "key": GOOGLE_CIVIC_API_KEY,
-            "address": text_for_map_search,
-            "electionId": 2000,  # The Google Civic API Test election
-        })
-    elif positive_value_exists(incoming_google_civic_election_id):
-        response = requests.get(VOTER_INFO_URL, params={
-            "key": GOOGLE_CIVIC_API_KEY,
-            "address": text_for_map_search,
-            "electionId": incoming_google_civic_election_id,
-        })
-    else:
-        response = requests.get(VOTER_INFO_URL, params={
-            "key": GOOGLE_CIVIC_API_KEY,
-            "address": text_for_map_search,
-        })
-
-    structured_json = json.loads(response.text)
+    if ballot_fetch_results is None:
+        ballot_fetch_results = fetch_ballot_json(generate_google_civic_voter_info_fetch_request(
+            text_for_map_search, incoming_google_civic_election_id, use_test_election))
+    if ballot_fetch_results['error'] is not None:
+        raise ballot_fetch_results['error']
+    structured_json = ballot_fetch_results['one_ballot_json']
+    if structured_json is None:
+        raise ValueError("EMPTY_RESPONSE_FROM " + str(ballot_fetch_results['url']))
     if 'success' in structured_json and structured_json['success'] is False:
         import_results = {
             'success': False,
@@ -2103,7 +2113,7 @@ def retrieve_from_google_civic_api_election_query():
         }
         return results
 
-    response = requests.get(ELECTION_QUERY_URL, params={
+    response = http_get(ELECTION_QUERY_URL, params={
         "key": GOOGLE_CIVIC_API_KEY,  # This comes from an environment variable
     })
 
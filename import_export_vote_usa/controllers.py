@@ -8,14 +8,15 @@ from candidate.models import PROFILE_IMAGE_TYPE_UNKNOWN, PROFILE_IMAGE_TYPE_VOTE
 from config.base import get_environment_variable
 from exception.models import handle_exception, handle_record_found_more_than_one_exception
 from image.controllers import cache_master_and_resized_image, IMAGE_SOURCE_VOTE_USA
+from import_export_batches.controllers_ballot_fetch import fetch_ballot_json
 from import_export_batches.controllers_vote_usa import store_vote_usa_json_response_to_import_batch_system
 import json
 from polling_location.models import KIND_OF_LOG_ENTRY_ADDRESS_PARSE_ERROR, KIND_OF_LOG_ENTRY_API_END_POINT_CRASH, \
     KIND_OF_LOG_ENTRY_BALLOT_RECEIVED, KIND_OF_LOG_ENTRY_NO_CONTESTS, KIND_OF_LOG_ENTRY_NO_BALLOT_JSON, \
     PollingLocationManager
-import requests
 import wevote_functions.admin
 from wevote_functions.functions import positive_value_exists
+from wevote_functions.functions_http import http_get
 
 logger = wevote_functions.admin.get_logger(__name__)
 
@@ -37,6 +38,38 @@ HEADERS_FOR_VOTE_USA_API_CALL = {
 }
 
 
+def generate_vote_usa_voter_info_fetch_request(election_day_text='', latitude=0.0, longitude=0.0, state_code=''):
+    return {
+        'provider': 'vote_usa',
+        'url':      VOTE_USA_VOTER_INFO_URL,
+        'headers':  HEADERS_FOR_VOTE_USA_API_CALL,
+        'params': {
+            "accessKey": VOTE_USA_API_KEY,
+            "electionDay": election_day_text,
+            "latitude": latitude,
+            "longitude": longitude,
+            "state": state_code,
+        },
+    }
+
+
+def generate_vote_usa_fetch_request_for_polling_location(polling_location, election_day_text='', state_code=''):
+    """
+    The request retrieve_vote_usa_ballot_items_from_polling_location_api would make for this map point,
+    or None if it wouldn't make one
+    """
+    if not polling_location or not polling_location.latitude or not polling_location.longitude \
+            or not positive_value_exists(polling_location.get_text_for_map_search()):
+        return None
+    if not positive_value_exists(state_code):
+        state_code = polling_location.state if positive_value_exists(polling_location.state) else "na"
+    return generate_vote_usa_voter_info_fetch_request(
+        election_day_text=election_day_text,
+        latitude=polling_location.latitude,
+        longitude=polling_location.longitude,
+        state_code=state_code)
+
+
 def retrieve_and_store_vote_usa_candidate_photo(candidate):
     success = True
     status = ''
@@ -96,7 +129,7 @@ def retrieve_from_vote_usa_api_election_query():
         }
         return results
 
-    response = requests.get(
+    response = http_get(
         VOTE_USA_ELECTION_QUERY_URL,
         headers=HEADERS_FOR_VOTE_USA_API_CALL,
         params={
@@ -182,7 +215,7 @@ def retrieve_vote_usa_ballot_items_for_one_voter_api(
     try:
         api_key = VOTE_USA_API_KEY
         # Get the ballot info at this address
-        response = requests.get(
+        response = http_get(
             VOTE_USA_VOTER_INFO_URL,
             headers=HEADERS_FOR_VOTE_USA_API_CALL,
             params={
@@ -306,7 +339,8 @@ def retrieve_vote_usa_ballot_items_from_polling_location_api(
         new_office_we_vote_ids_list=[],
         new_candidate_we_vote_ids_list=[],
         new_measure_we_vote_ids_list=[],
-        update_or_create_rules={}):
+        update_or_create_rules={},
+        ballot_fetch_results=None):
     """
 
     :param google_civic_election_id:
@@ -324,6 +358,7 @@ def retrieve_vote_usa_ballot_items_from_polling_location_api(
     :param new_candidate_we_vote_ids_list:
     :param new_measure_we_vote_ids_list:
     :param update_or_create_rules:
+    :param ballot_fetch_results: The response, already fetched by fetch_ballot_json_concurrently
     :return:
     """
     success = True
@@ -444,19 +479,18 @@ def retrieve_vote_usa_ballot_items_from_polling_location_api(
                 state_code = "na"
 
         try:
-            api_key = VOTE_USA_API_KEY
             # Get the ballot info at this address
-            response = requests.get(
-                VOTE_USA_VOTER_INFO_URL,
-                headers=HEADERS_FOR_VOTE_USA_API_CALL,
-                params={
-                    "accessKey": api_key,
-                    "electionDay": election_day_text,
-                    "latitude": latitude,
-                    "longitude": longitude,
-                    "state": state_code,
-                })
-            one_ballot_json = json.loads(response.text)
+            if ballot_fetch_results is None:
+                ballot_fetch_results = fetch_ballot_json(generate_vote_usa_voter_info_fetch_request(
+                    election_day_text=election_day_text,
+                    latitude=latitude,
+                    longitude=longitude,
+                    state_code=state_code))
+            if ballot_fetch_results['error'] is not None:
+                raise ballot_fetch_results['error']
+            one_ballot_json = ballot_fetch_results['one_ballot_json']
+            if one_ballot_json is None:
+                raise ValueError("EMPTY_RESPONSE_FROM " + str(ballot_fetch_results['url']))
         except Exception as e:
             success = False
             status += 'VOTE_USA_API_END_POINT_CRASH: ' + str(e) + ' '
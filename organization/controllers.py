@@ -45,9 +45,10 @@ from wevote_functions.functions import convert_to_int, convert_to_political_part
     DEMOCRAT, GREEN, INDEPENDENT, LIBERTARIAN, REPUBLICAN
 from .controllers_fastly import add_wevote_subdomain_to_fastly, add_subdomain_route53_record, \
     get_wevote_subdomain_status
-from .models import Organization, OrganizationChangeLog, OrganizationListManager, OrganizationManager, \
-    OrganizationMembershipLinkToVoter, \
-    OrganizationReservedDomain, OrganizationTeamMember, ORGANIZATION_UNIQUE_IDENTIFIERS, PUBLIC_FIGURE
+from .models import normalize_site_configuration_hostname, Organization, \
+    OrganizationChangeLog, OrganizationListManager, OrganizationManager, OrganizationMembershipLinkToVoter, \
+    OrganizationReservedDomain, OrganizationTeamMember, ORGANIZATION_UNIQUE_IDENTIFIERS, PUBLIC_FIGURE, \
+    retrieve_site_configuration_from_hostname, SITE_CONFIGURATION_FIELD_LIST
 
 logger = wevote_functions.admin.get_logger(__name__)
 
@@ -3615,11 +3616,8 @@ def site_configuration_retrieve_for_api(hostname):  # siteConfigurationRetrieve
         }
         return results
 
-    organization_manager = OrganizationManager()
     try:
-        hostname = hostname.strip().lower()
-        hostname = hostname.replace('http://', '')
-        hostname = hostname.replace('https://', '')
+        hostname = normalize_site_configuration_hostname(hostname)
     except Exception as e:
         status += "COULD_NOT_MODIFY_HOSTNAME: " + str(e) + " "
         success = False
@@ -3642,28 +3640,40 @@ def site_configuration_retrieve_for_api(hostname):  # siteConfigurationRetrieve
             'reserved_by_we_vote':                      reserved_by_we_vote,
         }
         return results
-    results = organization_manager.retrieve_organization_from_incoming_hostname(hostname, read_only=True)
-    organization_found = results['organization_found']
-    organization = results['organization']
+    results = retrieve_site_configuration_from_hostname(hostname)
     status += results['status']
-
-    if organization_found:
-        chosen_about_organization_external_url = organization.chosen_about_organization_external_url
-        chosen_domain_type_is_campaign = organization.chosen_domain_type_is_campaign
-        chosen_google_analytics_tracking_id = organization.chosen_google_analytics_tracking_id
-        chosen_hide_we_vote_logo = organization.chosen_hide_we_vote_logo
-        chosen_logo_url_https = organization.chosen_logo_url_https
-        chosen_prevent_sharing_opinions = organization.chosen_prevent_sharing_opinions
-        chosen_ready_introduction_text = organization.chosen_ready_introduction_text
-        chosen_ready_introduction_title = organization.chosen_ready_introduction_title
-        chosen_website_name = organization.chosen_website_name
-        features_provided_bitmap = organization.features_provided_bitmap
-        organization_we_vote_id = organization.we_vote_id
+    if results['success']:
+        site_configuration = results['site_configuration']
+        hostname_is_reserved = results['hostname_is_reserved']
     else:
-        reserved_results = organization_manager.retrieve_organization_reserved_hostname(hostname, read_only=True)
-        if reserved_results['hostname_is_reserved']:
-            reserved_by_we_vote = True
-            status += "HOSTNAME_RESERVED_BY_WE_VOTE "
+        # The index couldn't be built, so look this hostname up directly
+        organization_manager = OrganizationManager()
+        site_configuration = None
+        hostname_is_reserved = False
+        results = organization_manager.retrieve_organization_from_incoming_hostname(hostname, read_only=True)
+        status += results['status']
+        if results['organization_found']:
+            site_configuration = {field_name: getattr(results['organization'], field_name)
+                                  for field_name in SITE_CONFIGURATION_FIELD_LIST}
+        else:
+            reserved_results = organization_manager.retrieve_organization_reserved_hostname(hostname, read_only=True)
+            hostname_is_reserved = reserved_results['hostname_is_reserved']
+
+    if site_configuration is not None:
+        chosen_about_organization_external_url = site_configuration['chosen_about_organization_external_url']
+        chosen_domain_type_is_campaign = site_configuration['chosen_domain_type_is_campaign']
+        chosen_google_analytics_tracking_id = site_configuration['chosen_google_analytics_tracking_id']
+        chosen_hide_we_vote_logo = site_configuration['chosen_hide_we_vote_logo']
+        chosen_logo_url_https = site_configuration['chosen_logo_url_https']
+        chosen_prevent_sharing_opinions = site_configuration['chosen_prevent_sharing_opinions']
+        chosen_ready_introduction_text = site_configuration['chosen_ready_introduction_text']
+        chosen_ready_introduction_title = site_configuration['chosen_ready_introduction_title']
+        chosen_website_name = site_configuration['chosen_website_name']
+        features_provided_bitmap = site_configuration['features_provided_bitmap']
+        organization_we_vote_id = site_configuration['we_vote_id']
+    elif hostname_is_reserved:
+        reserved_by_we_vote = True
+        status += "HOSTNAME_RESERVED_BY_WE_VOTE "
 
     if not positive_value_exists(organization_we_vote_id) and not reserved_by_we_vote:
         # If this hostname is not owned by organization or reserved by We Vote, return empty string so the WebApp
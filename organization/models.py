@@ -2,12 +2,18 @@
 # Brought to you by We Vote. Be good.
 # -*- coding: UTF-8 -*-
 
+import threading
+from time import monotonic, time
+
 from django.core.validators import RegexValidator
 from django.db import models
 from django.db.models import Q
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
 
 from candidate.models import PROFILE_IMAGE_TYPE_FACEBOOK, PROFILE_IMAGE_TYPE_TWITTER, PROFILE_IMAGE_TYPE_UNKNOWN, \
     PROFILE_IMAGE_TYPE_UPLOADED, PROFILE_IMAGE_TYPE_VOTE_USA, PROFILE_IMAGE_TYPE_CURRENTLY_ACTIVE_CHOICES
+from config.base import get_environment_variable_default
 from exception.models import handle_exception, \
     handle_record_found_more_than_one_exception, handle_record_not_saved_exception, handle_record_not_found_exception
 from import_export_facebook.models import FacebookManager
@@ -16,7 +22,8 @@ from twitter.models import TwitterApiCounterManager, TwitterLinkToOrganization,
 from voter.models import VoterManager
 import wevote_functions.admin
 from wevote_functions.functions import convert_to_int, extract_twitter_handle_from_text_string, positive_value_exists
-from wevote_settings.models import fetch_next_we_vote_id_org_integer, fetch_site_unique_id_prefix
+from wevote_settings.models import fetch_next_we_vote_id_org_integer, fetch_site_unique_id_prefix, WeVoteSetting, \
+    WeVoteSettingsManager
 
 
 # Also see a copy of these in wevote_function/functions.py
@@ -190,6 +197,36 @@ alphanumeric = RegexValidator(r'^[0-9a-zA-Z]*$', message='Only alphanumeric char
 
 logger = wevote_functions.admin.get_logger(__name__)
 
+# siteConfigurationRetrieve runs every time the WebApp boots, so each process keeps an index of every hostname an
+#  organization has chosen, and every hostname We Vote has reserved, and answers from it without a query (including
+#  for hostnames nobody has chosen). Saving or deleting a reserved domain, or an organization that has (or had) a
+#  chosen domain or subdomain, drops this process's index and bumps a generation number we keep as a WeVoteSetting,
+#  so other processes, on this server or another, rebuild theirs within SITE_CONFIGURATION_INDEX_RECHECK_SECONDS.
+#  Every index is also rebuilt after SITE_CONFIGURATION_INDEX_SECONDS, which picks up changes made without save()
+#  (ex/ a queryset update).
+SITE_CONFIGURATION_HOSTNAME_FIELD_LIST = [
+    'chosen_domain_string', 'chosen_domain_string2', 'chosen_domain_string3', 'chosen_subdomain_string',
+]
+SITE_CONFIGURATION_INDEX_SECONDS = int(get_environment_variable_default("SITE_CONFIGURATION_INDEX_SECONDS", 3600))
+SITE_CONFIGURATION_INDEX_RECHECK_SECONDS = 15
+SITE_CONFIGURATION_INDEX_GENERATION_KEY = 'site_configuration_index_generation'
+# Only the columns siteConfigurationRetrieve returns
+SITE_CONFIGURATION_FIELD_LIST = [
+    'id', 'we_vote_id', 'chosen_about_organization_external_url', 'chosen_domain_type_is_campaign',
+    'chosen_google_analytics_tracking_id', 'chosen_hide_we_vote_logo', 'chosen_logo_url_https',
+    'chosen_prevent_sharing_opinions', 'chosen_ready_introduction_text', 'chosen_ready_introduction_title',
+    'chosen_website_name', 'features_provided_bitmap',
+]
+# We Vote's own hostnames, which no organization can choose
+SITE_CONFIGURATION_HOSTNAMES_NOT_CHOSEN = ['wevote.us', 'quality.wevote.us', 'localhost', 'wevotedeveloper']
+site_configuration_index_state = {
+    'site_configuration_index': None,
+    'generation':               0,
+    'built_at':                 0.0,
+    'checked_at':               0.0,
+}
+site_configuration_index_lock = threading.Lock()
+
 
 class OrganizationLinkToHashtag(models.Model):
 
@@ -3647,3 +3684,208 @@ class OrganizationTeamMember(models.Model):
     voter_we_vote_id = models.CharField(max_length=255, null=True, blank=True, unique=False, db_index=True)
     we_vote_hosted_profile_image_url_tiny = models.TextField(blank=True, null=True)
     date_last_changed = models.DateTimeField(verbose_name='date last changed', null=True, auto_now=True, db_index=True)
+
+
+def normalize_site_configuration_hostname(hostname):
+    hostname = hostname.strip().lower()
+    hostname = hostname.replace('http://', '')
+    return hostname.replace('https://', '')
+
+
+def fetch_site_configuration_index_generation():
+    # Not from readonly: a replica that hasn't caught up would hide the change until SITE_CONFIGURATION_INDEX_SECONDS
+    results = WeVoteSettingsManager.fetch_setting_results(SITE_CONFIGURATION_INDEX_GENERATION_KEY, read_only=False)
+    if not results['success']:
+        logger.error("fetch_site_configuration_index_generation: " + results['status'])
+    return results['setting_value'] or 0
+
+
+def invalidate_site_configuration_index():
+    """
+    Called when an organization with a chosen domain or subdomain, or a reserved domain, is saved or deleted
+    """
+    site_configuration_index_state['site_configuration_index'] = None
+    # Microseconds, so we don't have to read the old generation to make a new one
+    results = WeVoteSettingsManager.save_setting(
+        setting_name=SITE_CONFIGURATION_INDEX_GENERATION_KEY,
+        setting_value=int(time() * 1000000),
+        value_type=WeVoteSetting.INTEGER)
+    if not results['success']:
+        logger.error("invalidate_site_configuration_index: could not save " + SITE_CONFIGURATION_INDEX_GENERATION_KEY)
+
+
+def build_site_configuration_index():
+    """
+    Two queries: organizations with a chosen domain or subdomain, and reserved domains
+    :return: dict with site_configuration_list_by_hostname and site_configuration_list_by_subdomain (lower case
+      hostname -> list of dicts of SITE_CONFIGURATION_FIELD_LIST), reserved_hostname_set and reserved_subdomain_set
+    """
+    chosen_hostname_field_list = ['chosen_domain_string', 'chosen_domain_string2', 'chosen_domain_string3']
+    site_configuration_list_by_hostname = {}
+    site_configuration_list_by_subdomain = {}
+    # Not from readonly: we rebuild right after a change, and a replica that hasn't caught up would keep the old
+    #  answer for SITE_CONFIGURATION_INDEX_SECONDS
+    organization_query = Organization.objects \
+        .filter(Q(chosen_domain_string__gt='') |
+                Q(chosen_domain_string2__gt='') |
+                Q(chosen_domain_string3__gt='') |
+                Q(chosen_subdomain_string__gt='')) \
+        .values('chosen_subdomain_string', *chosen_hostname_field_list, *SITE_CONFIGURATION_FIELD_LIST)
+    for values_dict in organization_query.iterator():
+        site_configuration = {field_name: values_dict[field_name] for field_name in SITE_CONFIGURATION_FIELD_LIST}
+        for field_name in chosen_hostname_field_list:
+            if values_dict[field_name]:
+                site_configuration_list_by_hostname.setdefault(values_dict[field_name].lower(), []) \
+                    .append(site_configuration)
+        if values_dict['chosen_subdomain_string']:
+            site_configuration_list_by_subdomain.setdefault(values_dict['chosen_subdomain_string'].lower(), []) \
+                .append(site_configuration)
+
+    reserved_hostname_set = set()
+    reserved_subdomain_set = set()
+    reserved_domain_query = OrganizationReservedDomain.objects \
+        .values_list('full_domain_string', 'subdomain_string')
+    for full_domain_string, subdomain_string in reserved_domain_query.iterator():
+        if full_domain_string:
+            reserved_hostname_set.add(full_domain_string.lower())
+        if subdomain_string:
+            reserved_subdomain_set.add(subdomain_string.lower())
+    return {
+        'site_configuration_list_by_hostname':  site_configuration_list_by_hostname,
+        'site_configuration_list_by_subdomain': site_configuration_list_by_subdomain,
+        'reserved_hostname_set':                reserved_hostname_set,
+        'reserved_subdomain_set':               reserved_subdomain_set,
+    }
+
+
+def rebuild_site_configuration_index():
+    t0 = monotonic()
+    state = site_configuration_index_state
+    # Read the generation first, so a change saved while we build is picked up at the next recheck
+    generation = fetch_site_configuration_index_generation()
+    site_configuration_index = build_site_configuration_index()
+    state['site_configuration_index'] = site_configuration_index
+    state['generation'] = generation
+    state['built_at'] = state['checked_at'] = monotonic()
+    logger.info("rebuild_site_configuration_index: " +
+                str(len(site_configuration_index['site_configuration_list_by_hostname'])) + " domains, " +
+                str(len(site_configuration_index['site_configuration_list_by_subdomain'])) + " subdomains in " +
+                str(round(monotonic() - t0, 2)) + " seconds")
+
+
+def retrieve_site_configuration_index():
+    state = site_configuration_index_state
+    site_configuration_index = state['site_configuration_index']
+    if site_configuration_index is None:
+        site_configuration_index_lock.acquire()
+    else:
+        if monotonic() - state['built_at'] < SITE_CONFIGURATION_INDEX_SECONDS:
+            if monotonic() - state['checked_at'] < SITE_CONFIGURATION_INDEX_RECHECK_SECONDS:
+                return site_configuration_index
+            if fetch_site_configuration_index_generation() == state['generation']:
+                state['checked_at'] = monotonic()
+                return site_configuration_index
+        # If another thread is already rebuilding, keep answering from the index we have
+        if not site_configuration_index_lock.acquire(blocking=False):
+            return site_configuration_index
+    try:
+        # Unless another thread rebuilt it while we waited for the lock
+        if state['site_configuration_index'] is None or \
+                state['site_configuration_index'] is site_configuration_index:
+            rebuild_site_configuration_index()
+    finally:
+        site_configuration_index_lock.release()
+    return state['site_configuration_index']
+
+
+def retrieve_site_configuration_from_hostname(hostname):
+    """
+    Like retrieve_organization_from_incoming_hostname followed by retrieve_organization_reserved_hostname, but
+    answered from this process's index, with no queries (unless the index needs to be rebuilt)
+    :param hostname: Already normalized with normalize_site_configuration_hostname, ex/ "zoom.wevote.us"
+    :return: results dict. site_configuration is a dict of SITE_CONFIGURATION_FIELD_LIST for the organization that
+      chose this hostname, if exactly one did. If none did, hostname_is_reserved tells us if We Vote reserved it.
+    """
+    status = ""
+    site_configuration = None
+    site_configuration_found = False
+    hostname_is_reserved = False
+    try:
+        site_configuration_index = retrieve_site_configuration_index()
+    except Exception as e:
+        status += "SITE_CONFIGURATION_INDEX_NOT_BUILT: " + str(e) + " "
+        results = {
+            'success':                  False,
+            'status':                   status,
+            'site_configuration':       site_configuration,
+            'site_configuration_found': site_configuration_found,
+            'hostname_is_reserved':     hostname_is_reserved,
+        }
+        return results
+
+    incoming_subdomain = hostname.replace('.wevote.us', '')
+    if hostname in SITE_CONFIGURATION_HOSTNAMES_NOT_CHOSEN:
+        status += "ORGANIZATION_CHECK_FOR_WEVOTE_US "
+    else:
+        site_configuration_by_id = {}
+        for site_configuration_list in [
+                site_configuration_index['site_configuration_list_by_hostname'].get(hostname, []),
+                site_configuration_index['site_configuration_list_by_subdomain'].get(incoming_subdomain, [])]:
+            for site_configuration_candidate in site_configuration_list:
+                site_configuration_by_id[site_configuration_candidate['id']] = site_configuration_candidate
+        if len(site_configuration_by_id) == 1:
+            site_configuration = list(site_configuration_by_id.values())[0]
+            site_configuration_found = True
+            status += "ORGANIZATION_FOUND_WITH_INCOMING_HOSTNAME "
+        elif len(site_configuration_by_id) > 1:
+            status += "ERROR_MORE_THAN_ONE_ORGANIZATION_FOUND "
+        else:
+            status += "ORGANIZATION_NOT_FOUND_WITH_INCOMING_HOSTNAME "
+
+    if not site_configuration_found:
+        hostname_is_reserved = hostname == 'localhost' or \
+            hostname in site_configuration_index['reserved_hostname_set'] or \
+            incoming_subdomain in site_configuration_index['reserved_subdomain_set']
+    results = {
+        'success':                  True,
+        'status':                   status,
+        'site_configuration':       site_configuration,
+        'site_configuration_found': site_configuration_found,
+        'hostname_is_reserved':     hostname_is_reserved,
+    }
+    return results
+
+
+def warm_site_configuration_index():
+    """
+    Called as each server process starts (config/wsgi.py), so the first siteConfigurationRetrieve doesn't wait
+    """
+    try:
+        retrieve_site_configuration_index()
+    except Exception as e:
+        logger.error("warm_site_configuration_index: " + str(e))
+
+
+def organization_has_site_configuration_hostname(organization):
+    # From __dict__, so an organization loaded with only() or defer() doesn't cost a query for each deferred field
+    return any(organization.__dict__.get(field_name) for field_name in SITE_CONFIGURATION_HOSTNAME_FIELD_LIST)
+
+
+@receiver(post_init, sender=Organization)
+def remember_site_configuration_hostname_signal(sender, instance, **kwargs):
+    instance.site_configuration_hostname_loaded = organization_has_site_configuration_hostname(instance)
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+def invalidate_site_configuration_index_for_organization_signal(sender, instance, **kwargs):
+    # Only organizations in the index, before or after this change (ex/ a chosen domain cleared)
+    if instance.site_configuration_hostname_loaded or organization_has_site_configuration_hostname(instance):
+        invalidate_site_configuration_index()
+    instance.site_configuration_hostname_loaded = organization_has_site_configuration_hostname(instance)
+
+
+@receiver(post_save, sender=OrganizationReservedDomain)
+@receiver(post_delete, sender=OrganizationReservedDomain)
+def invalidate_site_configuration_index_signal(sender, instance, **kwargs):
+    invalidate_site_configuration_index()
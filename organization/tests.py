@@ -0,0 +1,110 @@
+# organization/tests.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from unittest import mock
+from django.test import TransactionTestCase
+from .models import fetch_site_configuration_index_generation, Organization, OrganizationManager, \
+    OrganizationReservedDomain, retrieve_site_configuration_from_hostname, site_configuration_index_state
+
+
+class SiteConfigurationIndexTests(TransactionTestCase):
+    # TransactionTestCase, so the organization lookups we compare against, from readonly, see the rows saved here
+    databases = ["default", "readonly"]
+
+    def setUp(self):
+        patcher = mock.patch.dict('organization.models.site_configuration_index_state', {
+            'site_configuration_index': None,
+            'generation':               0,
+            'built_at':                 0.0,
+            'checked_at':               0.0,
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def retrieve_we_vote_id(self, hostname):
+        results = retrieve_site_configuration_from_hostname(hostname)
+        self.assertTrue(results['success'])
+        if results['site_configuration_found']:
+            return results['site_configuration']['we_vote_id']
+        return None
+
+    def test_hostname_lookup(self):
+        organization = Organization.objects.create(
+            chosen_domain_string2='Vote.Example.org', chosen_website_name='Example', we_vote_id='wv01org1')
+        OrganizationReservedDomain.objects.create(full_domain_string='reserved.example.org')
+        OrganizationReservedDomain.objects.create(subdomain_string='zoom')
+
+        results = retrieve_site_configuration_from_hostname('vote.example.org')
+        self.assertTrue(results['site_configuration_found'])
+        self.assertEqual(results['site_configuration']['chosen_website_name'], 'Example')
+        self.assertEqual(results['site_configuration']['id'], organization.id)
+        self.assertIsNone(self.retrieve_we_vote_id('example.org'))
+        for hostname in ['reserved.example.org', 'zoom.wevote.us', 'localhost']:
+            results = retrieve_site_configuration_from_hostname(hostname)
+            self.assertFalse(results['site_configuration_found'])
+            self.assertTrue(results['hostname_is_reserved'], hostname)
+        self.assertFalse(retrieve_site_configuration_from_hostname('nobody.example.org')['hostname_is_reserved'])
+
+    def test_chosen_domain_and_subdomain_match_the_direct_lookup(self):
+        Organization.objects.create(
+            chosen_domain_string='one.example.org', chosen_subdomain_string='one', we_vote_id='wv01org1')
+        Organization.objects.create(chosen_domain_string='two.wevote.us', we_vote_id='wv01org2')
+        Organization.objects.create(chosen_subdomain_string='two', we_vote_id='wv01org3')
+
+        # Both of an organization's hostnames find it, and a hostname two organizations chose finds neither
+        expected_we_vote_id_by_hostname = {
+            'one.example.org':  'wv01org1',
+            'one.wevote.us':    'wv01org1',
+            'two.wevote.us':    None,
+            'wevote.us':        None,
+        }
+        organization_manager = OrganizationManager()
+        for hostname, expected_we_vote_id in expected_we_vote_id_by_hostname.items():
+            self.assertEqual(self.retrieve_we_vote_id(hostname), expected_we_vote_id, hostname)
+            results = organization_manager.retrieve_organization_from_incoming_hostname(hostname, read_only=True)
+            direct_we_vote_id = results['organization'].we_vote_id if results['organization_found'] else None
+            self.assertEqual(direct_we_vote_id, expected_we_vote_id, hostname)
+
+    def test_saves_invalidate_the_index(self):
+        organization = Organization.objects.create(chosen_subdomain_string='zoom', we_vote_id='wv01org1')
+        Organization.objects.create(we_vote_id='wv01org2')
+        self.assertEqual(self.retrieve_we_vote_id('zoom.wevote.us'), 'wv01org1')
+        self.assertIsNotNone(site_configuration_index_state['site_configuration_index'])
+
+        # An organization not in the index leaves it alone
+        generation = fetch_site_configuration_index_generation()
+        other_organization = Organization.objects.get(we_vote_id='wv01org2')
+        other_organization.organization_name = 'Renamed'
+        other_organization.save()
+        self.assertEqual(fetch_site_configuration_index_generation(), generation)
+        self.assertIsNotNone(site_configuration_index_state['site_configuration_index'])
+
+        # Saved the way donate/controllers.py changes features_provided_bitmap
+        organization = Organization.objects.get(id=organization.id)
+        organization.features_provided_bitmap = 7
+        organization.save()
+        self.assertNotEqual(fetch_site_configuration_index_generation(), generation)
+        results = retrieve_site_configuration_from_hostname('zoom.wevote.us')
+        self.assertEqual(results['site_configuration']['features_provided_bitmap'], 7)
+
+        organization.chosen_subdomain_string = ''
+        organization.save()
+        self.assertIsNone(self.retrieve_we_vote_id('zoom.wevote.us'))
+
+        reserved_domain = OrganizationReservedDomain.objects.create(subdomain_string='zoom')
+        self.assertTrue(retrieve_site_configuration_from_hostname('zoom.wevote.us')['hostname_is_reserved'])
+        reserved_domain.delete()
+        self.assertFalse(retrieve_site_configuration_from_hostname('zoom.wevote.us')['hostname_is_reserved'])
+
+    def test_other_process_rebuilds_after_generation_changes(self):
+        organization = Organization.objects.create(chosen_subdomain_string='zoom', we_vote_id='wv01org1')
+        self.assertEqual(self.retrieve_we_vote_id('zoom.wevote.us'), 'wv01org1')
+        # Another process, maybe on another server, saves the change: our index stays, but the generation moves on
+        site_configuration_index = site_configuration_index_state['site_configuration_index']
+        organization.delete()
+        site_configuration_index_state['site_configuration_index'] = site_configuration_index
+        self.assertEqual(self.retrieve_we_vote_id('zoom.wevote.us'), 'wv01org1')  # Until we recheck
+
+        site_configuration_index_state['checked_at'] = 0.0
+        self.assertIsNone(self.retrieve_we_vote_id('zoom.wevote.us'))
@@ -20,8 +20,8 @@ from office.models import ContestOfficeManager, ContestOfficeListManager
 from office_held.controllers import generate_office_held_dict_list_from_office_held_we_vote_id_list
 from organization.models import Organization, OrganizationManager
 from politician.controllers_generate_seo_friendly_path import generate_campaign_title_from_politician
-from politician.models import Politician, PoliticianManager, PoliticianSEOFriendlyPath, \
-    POLITICIAN_UNIQUE_ATTRIBUTES_TO_BE_CLEARED, POLITICIAN_UNIQUE_IDENTIFIERS, UNKNOWN
+from politician.models import Politician, PoliticianManager, PoliticiansAreNotDuplicates, \
+    PoliticianSEOFriendlyPath, POLITICIAN_UNIQUE_ATTRIBUTES_TO_BE_CLEARED, POLITICIAN_UNIQUE_IDENTIFIERS, UNKNOWN
 from position.controllers import move_positions_to_another_politician
 import pytz
 from representative.controllers import generate_representative_dict_list_from_representative_object_list, \
@@ -31,11 +31,13 @@ from voter.models import Voter, VoterManager
 from config.base import get_environment_variable
 import wevote_functions.admin
 from wevote_functions.functions import candidate_party_display, convert_to_int, \
-    convert_to_political_party_constant, extract_instagram_handle_from_text_string, \
+    convert_to_political_party_constant, extract_first_name_from_full_name, extract_instagram_handle_from_text_string, \
+    extract_last_name_from_full_name, extract_twitter_handle_from_text_string, \
     generate_random_string, positive_value_exists, \
     process_request_from_master, remove_middle_initial_from_name
 from wevote_functions.functions_date import convert_we_vote_date_string_to_date_as_integer, generate_date_as_integer, \
     generate_localized_datetime_from_obj, DATE_FORMAT_YMD_HMS
+from wevote_functions.functions_duplicates import find_duplicates_in_list, normalize_duplicate_key_text
 
 logger = wevote_functions.admin.get_logger(__name__)
 
@@ -44,6 +46,14 @@ POLITICIANS_SYNC_URL = get_environment_variable("POLITICIANS_SYNC_URL")  # polit
 # Also search image/controllers.py for these constants
 PROFILE_IMAGE_ORIGINAL_MAX_WIDTH = 2048
 PROFILE_IMAGE_ORIGINAL_MAX_HEIGHT = 2048
+# How much each kind of shared blocking key counts, when ranking possible duplicate politicians
+POLITICIAN_DUPLICATE_KEY_WEIGHTS = {
+    'ballotpedia':  10,
+    'twitter':      10,
+    'vote_usa':     10,
+    'name':         5,
+    'last_first':   3,
+}
 
 
 def add_alternate_names_to_next_spot(politician):
@@ -275,6 +285,58 @@ def find_duplicate_politician(we_vote_politician, ignore_politician_id_list, rea
     return results
 
 
+def generate_politician_duplicate_blocking_keys(politician):
+    """
+    The blocking keys find_duplicate_politicians_in_list files a politician under. They mirror what
+    retrieve_politicians_from_non_unique_identifiers matches on: a shared Twitter handle, the same name, or the same
+    first and last names, all within one state. Shared Ballotpedia or Vote USA ids count too.
+    """
+    state_code = (politician.state_code or '').lower()
+    blocking_key_list = []
+    for twitter_handle in [
+            politician.politician_twitter_handle, politician.politician_twitter_handle2,
+            politician.politician_twitter_handle3, politician.politician_twitter_handle4,
+            politician.politician_twitter_handle5]:
+        if positive_value_exists(twitter_handle):
+            twitter_handle_cleaned = extract_twitter_handle_from_text_string(twitter_handle)
+            if positive_value_exists(twitter_handle_cleaned):
+                blocking_key_list.append(('twitter', state_code, twitter_handle_cleaned.lower()))
+    if positive_value_exists(politician.ballotpedia_id):
+        blocking_key_list.append(('ballotpedia', str(politician.ballotpedia_id).strip().lower()))
+    if positive_value_exists(politician.vote_usa_politician_id):
+        blocking_key_list.append(('vote_usa', str(politician.vote_usa_politician_id).strip().lower()))
+    if positive_value_exists(politician.first_name) and positive_value_exists(politician.last_name):
+        blocking_key_list.append(('last_first', state_code, normalize_duplicate_key_text(politician.last_name),
+                                  normalize_duplicate_key_text(politician.first_name)))
+    for politician_name in [
+            politician.politician_name, politician.google_civic_candidate_name,
+            politician.google_civic_candidate_name2, politician.google_civic_candidate_name3]:
+        if not positive_value_exists(politician_name):
+            continue
+        blocking_key_list.append(('name', state_code, normalize_duplicate_key_text(politician_name)))
+        first_name = extract_first_name_from_full_name(politician_name)
+        last_name = extract_last_name_from_full_name(politician_name)
+        if positive_value_exists(first_name) and positive_value_exists(last_name):
+            blocking_key_list.append(('last_first', state_code, normalize_duplicate_key_text(last_name),
+                                      normalize_duplicate_key_text(first_name)))
+    return blocking_key_list
+
+
+def find_duplicate_politicians_in_list(politician_list, read_only=True):
+    """
+    Pair up possible duplicates among politician_list (ex/ every politician in one state) in memory, instead of
+    calling find_duplicate_politician for each one. Pairs already marked PoliticiansAreNotDuplicates are skipped,
+    and each politician is in at most one pair, its best one.
+    :param politician_list:
+    :param read_only:
+    :return: results dict. duplicate_pair_list holds dicts with politician1, politician2, score and
+      matched_key_kind_list. unmatched_politician_list holds everyone else.
+    """
+    return find_duplicates_in_list(
+        politician_list, POLITICIAN_DUPLICATE_KEY_WEIGHTS, generate_politician_duplicate_blocking_keys,
+        PoliticiansAreNotDuplicates, 'politician', read_only=positive_value_exists(read_only))
+
+
 def find_campaignx_list_to_link_to_this_politician(politician=None):
     """
     Find Campaigns to Link to this Politician
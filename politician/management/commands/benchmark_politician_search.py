@@ -0,0 +1,76 @@
+import random
+from statistics import median
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from politician.models import build_politician_search_index, Politician, PoliticianManager, \
+    POLITICIAN_SEARCH_LIMIT
+
+
+class Command(BaseCommand):
+    help = 'Compares the icontains politician search query with the in-memory TrigramSearchIndex, using search ' \
+           'text taken from real politician names and twitter handles (whole words, prefixes and fragments).'
+
+    @staticmethod
+    def add_arguments(parser):
+        parser.add_argument('--queries', type=int, default=200, help='How many search texts to try')
+        parser.add_argument('--limit', type=int, default=POLITICIAN_SEARCH_LIMIT)
+        parser.add_argument('--seed', type=int, default=4184)
+
+    def handle(self, *args, **options):
+        random_generator = random.Random(options['seed'])
+        limit = options['limit']
+
+        t0 = perf_counter()
+        search_index, date_last_updated_seen = build_politician_search_index()
+        build_seconds = perf_counter() - t0
+        self.stdout.write('Index of {:,} politicians built in {:.2f} s ({:,} trigrams)'.format(
+            len(search_index), build_seconds, len(search_index.postings)))
+
+        name_list = list(Politician.objects.using('readonly')
+                         .exclude(politician_name__isnull=True).exclude(politician_name='')
+                         .values_list('politician_name', flat=True)[:5000])
+        handle_list = list(Politician.objects.using('readonly')
+                           .exclude(politician_twitter_handle__isnull=True).exclude(politician_twitter_handle='')
+                           .values_list('politician_twitter_handle', flat=True)[:5000])
+        if not name_list:
+            self.stdout.write('No politicians to search')
+            return
+        search_text_list = []
+        for query_number in range(options['queries']):
+            kind = query_number % 4
+            if kind == 3 and handle_list:
+                handle = random_generator.choice(handle_list)
+                search_text_list.append(handle[:random_generator.randint(3, max(3, len(handle)))])
+                continue
+            word_list = random_generator.choice(name_list).split()
+            if kind == 0:
+                search_text_list.append(word_list[-1])  # Last name
+            elif kind == 1:
+                search_text_list.append(' '.join(word_list))  # Full name
+            else:
+                # What someone has typed so far: the first word, and the start of the next
+                search_text = word_list[0]
+                if len(word_list) > 1:
+                    search_text += ' ' + word_list[-1][:random_generator.randint(1, len(word_list[-1]))]
+                search_text_list.append(search_text)
+
+        self.stdout.write('{:>16} {:>10} {:>10} {:>10} {:>14}'.format(
+            'strategy', 'median_ms', 'p95_ms', 'max_ms', 'avg_results'))
+        for strategy in ('icontains', 'icontains_limit', 'trigram_index'):
+            time_list = []
+            result_count_total = 0
+            for search_text in search_text_list:
+                t0 = perf_counter()
+                if strategy == 'trigram_index':
+                    result_count_total += len(search_index.search(search_text, limit=limit))
+                else:
+                    results = PoliticianManager.search_politicians_from_database(
+                        search_text, limit=None if strategy == 'icontains' else limit)
+                    result_count_total += len(results['politician_search_results_list'])
+                time_list.append((perf_counter() - t0) * 1000)
+            time_list.sort()
+            self.stdout.write('{:>16} {:>10.2f} {:>10.2f} {:>10.2f} {:>14.1f}'.format(
+                strategy, median(time_list), time_list[int(len(time_list) * 0.95) - 1 if len(time_list) > 1 else 0],
+                time_list[-1], result_count_total / len(search_text_list)))
@@ -3,13 +3,16 @@
 # -*- coding: UTF-8 -*-
 
 import re
+import threading
 from datetime import datetime
+from time import monotonic
 
 import gender_guesser.detector as gender
 from django.db import models
 from django.db.models import Q
 
 import wevote_functions.admin
+from config.base import get_environment_variable_default
 from candidate.models import PROFILE_IMAGE_TYPE_TWITTER, PROFILE_IMAGE_TYPE_UNKNOWN, \
     PROFILE_IMAGE_TYPE_CURRENTLY_ACTIVE_CHOICES
 from organization.models import Organization
@@ -20,6 +23,7 @@ from wevote_functions.functions import candidate_party_display, convert_to_int,
     extract_middle_name_from_full_name, extract_last_name_from_full_name, \
     extract_twitter_handle_from_text_string, positive_value_exists
 from wevote_functions.functions_date import convert_date_to_date_as_integer
+from wevote_functions.functions_search import TrigramSearchIndex
 from wevote_settings.models import fetch_next_we_vote_id_politician_integer, fetch_site_unique_id_prefix
 
 FEMALE = 'F'
@@ -347,7 +351,7 @@ class Politician(models.Model):
     twitter_description = models.CharField(
         verbose_name="Text description of this organization from twitter.", max_length=255, null=True, blank=True)
     youtube_url = models.TextField(blank=True, null=True)
-    date_last_updated = models.DateTimeField(null=True, auto_now=True)
+    date_last_updated = models.DateTimeField(null=True, auto_now=True, db_index=True)
     date_last_updated_from_candidate = models.DateTimeField(null=True, default=None)
     profile_image_background_color = models.CharField(blank=True, null=True, max_length=7)
     profile_image_background_color_needed = models.BooleanField(null=True)
@@ -564,6 +568,135 @@ class PoliticianChangeLog(models.Model):
             return ''
 
 
+# Only the columns a search result card needs
+POLITICIAN_SEARCH_RESULT_FIELD_LIST = [
+    'id', 'we_vote_id', 'politician_name', 'first_name', 'last_name', 'google_civic_candidate_name', 'state_code',
+    'we_vote_hosted_profile_image_url_medium', 'politician_twitter_handle', 'politician_twitter_handle2',
+    'politician_twitter_handle3', 'politician_twitter_handle4', 'politician_twitter_handle5', 'date_last_updated',
+]
+POLITICIAN_SEARCH_FIELD_LIST = [
+    'politician_name', 'politician_twitter_handle', 'politician_twitter_handle2',
+    'politician_twitter_handle3', 'politician_twitter_handle4', 'politician_twitter_handle5',
+]
+POLITICIAN_SEARCH_FIELD_WEIGHT_LIST = [2, 1, 1, 1, 1, 1]
+POLITICIAN_SEARCH_LIMIT = 50
+# Each process keeps its own TrigramSearchIndex of every politician. Saves and deletes in this process update it
+#  right away (see search/models.py), changes made by other processes are picked up from date_last_updated every
+#  POLITICIAN_SEARCH_INDEX_REFRESH_SECONDS, and the index is rebuilt from scratch (which also drops politicians
+#  deleted elsewhere) every POLITICIAN_SEARCH_INDEX_REBUILD_SECONDS.
+POLITICIAN_SEARCH_INDEX_REFRESH_SECONDS = 30
+POLITICIAN_SEARCH_INDEX_REBUILD_SECONDS = \
+    int(get_environment_variable_default("POLITICIAN_SEARCH_INDEX_REBUILD_SECONDS", 3600))
+politician_search_index_state = {
+    'search_index':             None,
+    'built_at':                 0.0,
+    'refreshed_at':             0.0,
+    'date_last_updated_seen':   None,
+}
+politician_search_index_lock = threading.Lock()
+
+
+class PoliticianSearchResult(object):
+    """
+    The search result card columns of one Politician, from .values(*POLITICIAN_SEARCH_RESULT_FIELD_LIST)
+    """
+    __slots__ = POLITICIAN_SEARCH_RESULT_FIELD_LIST
+
+    def __init__(self, values_dict):
+        for field_name in POLITICIAN_SEARCH_RESULT_FIELD_LIST:
+            setattr(self, field_name, values_dict.get(field_name))
+
+    def display_full_name(self):
+        if self.politician_name:
+            return self.politician_name
+        elif self.first_name and self.last_name:
+            return self.first_name + " " + self.last_name
+        elif self.google_civic_candidate_name:
+            return self.google_civic_candidate_name
+        else:
+            return (self.first_name or '') + " " + (self.last_name or '')
+
+
+def add_politician_to_search_index(search_index, values_dict):
+    search_index.add_document(
+        values_dict['id'],
+        [values_dict.get(field_name) for field_name in POLITICIAN_SEARCH_FIELD_LIST],
+        PoliticianSearchResult(values_dict))
+
+
+def build_politician_search_index():
+    search_index = TrigramSearchIndex(field_weight_list=POLITICIAN_SEARCH_FIELD_WEIGHT_LIST)
+    date_last_updated_seen = None
+    for values_dict in Politician.objects.using('readonly').values(*POLITICIAN_SEARCH_RESULT_FIELD_LIST).iterator():
+        add_politician_to_search_index(search_index, values_dict)
+        if values_dict['date_last_updated'] is not None and \
+                (date_last_updated_seen is None or values_dict['date_last_updated'] > date_last_updated_seen):
+            date_last_updated_seen = values_dict['date_last_updated']
+    return search_index, date_last_updated_seen
+
+
+def rebuild_politician_search_index():
+    t0 = monotonic()
+    search_index, date_last_updated_seen = build_politician_search_index()
+    politician_search_index_state['search_index'] = search_index
+    politician_search_index_state['date_last_updated_seen'] = date_last_updated_seen
+    politician_search_index_state['built_at'] = politician_search_index_state['refreshed_at'] = monotonic()
+    logger.info("rebuild_politician_search_index: " + str(len(search_index)) + " politicians in " +
+                str(round(monotonic() - t0, 2)) + " seconds")
+
+
+def refresh_politician_search_index():
+    state = politician_search_index_state
+    state['refreshed_at'] = monotonic()
+    refresh_query = Politician.objects.using('readonly').values(*POLITICIAN_SEARCH_RESULT_FIELD_LIST)
+    if state['date_last_updated_seen'] is not None:
+        # >= rather than >, so we don't miss a politician saved in the same instant as the last one we saw
+        refresh_query = refresh_query.filter(date_last_updated__gte=state['date_last_updated_seen'])
+    for values_dict in refresh_query:
+        add_politician_to_search_index(state['search_index'], values_dict)
+        if values_dict['date_last_updated'] is not None and (
+                state['date_last_updated_seen'] is None or
+                values_dict['date_last_updated'] > state['date_last_updated_seen']):
+            state['date_last_updated_seen'] = values_dict['date_last_updated']
+
+
+def retrieve_politician_search_index():
+    state = politician_search_index_state
+    if state['search_index'] is None:
+        with politician_search_index_lock:
+            if state['search_index'] is None:
+                rebuild_politician_search_index()
+        return state['search_index']
+
+    rebuild_due = monotonic() - state['built_at'] > POLITICIAN_SEARCH_INDEX_REBUILD_SECONDS
+    refresh_due = monotonic() - state['refreshed_at'] > POLITICIAN_SEARCH_INDEX_REFRESH_SECONDS
+    # If another thread is already rebuilding or refreshing, keep searching the index we have
+    if (rebuild_due or refresh_due) and politician_search_index_lock.acquire(blocking=False):
+        try:
+            if rebuild_due:
+                rebuild_politician_search_index()
+            else:
+                refresh_politician_search_index()
+        finally:
+            politician_search_index_lock.release()
+    return state['search_index']
+
+
+def update_politician_search_index(politician):
+    search_index = politician_search_index_state['search_index']
+    if search_index is None:
+        return
+    values_dict = {field_name: getattr(politician, field_name, None)
+                   for field_name in POLITICIAN_SEARCH_RESULT_FIELD_LIST}
+    add_politician_to_search_index(search_index, values_dict)
+
+
+def remove_politician_from_search_index(politician_id):
+    search_index = politician_search_index_state['search_index']
+    if search_index is not None:
+        search_index.remove_document(politician_id)
+
+
 class PoliticianManager(models.Manager):
 
     def __init__(self):
@@ -1352,7 +1485,51 @@ class PoliticianManager(models.Manager):
         return results
 
     @staticmethod
-    def search_politicians(name_search_terms=None):
+    def search_politicians(name_search_terms=None, limit=POLITICIAN_SEARCH_LIMIT):
+        """
+        Every word in name_search_terms has to appear in politician_name or one of the twitter handles.
+        Results are ranked (whole field, then start of the field, then start of a word, then anywhere, with name
+        matches counting double) and limited. Searches this process's TrigramSearchIndex, and only falls back to
+        the database if the index can't be built.
+        :param name_search_terms:
+        :param limit:
+        :return: politician_search_results_list of PoliticianSearchResult (not Politician), best match first,
+         and politician_search_score_list in the same order
+        """
+        status = ""
+        success = True
+        politician_search_results_list = []
+        politician_search_score_list = []
+
+        try:
+            search_index = retrieve_politician_search_index()
+            for score, politician_search_result in search_index.search(name_search_terms, limit=limit):
+                politician_search_results_list.append(politician_search_result)
+                politician_search_score_list.append(score)
+        except Exception as e:
+            status += "POLITICIAN_SEARCH_INDEX_NOT_AVAILABLE: " + str(e) + " "
+            results = PoliticianManager.search_politicians_from_database(name_search_terms, limit=limit)
+            success = results['success']
+            status += results['status']
+            politician_search_results_list = results['politician_search_results_list']
+            politician_search_score_list = [0] * len(politician_search_results_list)
+
+        results = {
+            'status':                           status,
+            'success':                          success,
+            'politician_search_results_list':   politician_search_results_list,
+            'politician_search_score_list':     politician_search_score_list,
+        }
+        return results
+
+    @staticmethod
+    def search_politicians_from_database(name_search_terms=None, limit=POLITICIAN_SEARCH_LIMIT):
+        """
+        The icontains query search_politicians used before it had an index: unranked, and a sequential scan.
+        :param name_search_terms:
+        :param limit: None for no limit
+        :return:
+        """
         status = ""
         success = True
         politician_search_results_list = []
@@ -1365,23 +1542,8 @@ class PoliticianManager(models.Manager):
                 name_search_words = []
             for one_word in name_search_words:
                 filters = []  # Reset for each search word
-                new_filter = Q(politician_name__icontains=one_word)
-                filters.append(new_filter)
-
-                new_filter = Q(politician_twitter_handle__icontains=one_word)
-                filters.append(new_filter)
-
-                new_filter = Q(politician_twitter_handle2__icontains=one_word)
-                filters.append(new_filter)
-
-                new_filter = Q(politician_twitter_handle3__icontains=one_word)
-                filters.append(new_filter)
-
-                new_filter = Q(politician_twitter_handle4__icontains=one_word)
-                filters.append(new_filter)
-
-                new_filter = Q(politician_twitter_handle5__icontains=one_word)
-                filters.append(new_filter)
+                for field_name in POLITICIAN_SEARCH_FIELD_LIST:
+                    filters.append(Q(**{field_name + '__icontains': one_word}))
 
                 # Add the first query
                 if len(filters):
@@ -1393,7 +1555,10 @@ class PoliticianManager(models.Manager):
 
                     queryset = queryset.filter(final_filters)
 
-            politician_search_results_list = list(queryset)
+            queryset = queryset.values(*POLITICIAN_SEARCH_RESULT_FIELD_LIST)
+            if limit is not None:
+                queryset = queryset[:limit]
+            politician_search_results_list = [PoliticianSearchResult(values_dict) for values_dict in queryset]
         except Exception as e:
             success = False
             status += "ERROR_SEARCHING_POLITICIANS: " + str(e) + " "
@@ -53,7 +53,7 @@ from wevote_functions.functions_date import convert_date_to_we_vote_date_string,
     convert_we_vote_date_string_to_date_as_integer, generate_localized_datetime_from_obj, DATE_FORMAT_YMD_HMS
 from wevote_settings.constants import IS_BATTLEGROUND_YEARS_AVAILABLE
 from .controllers import add_alternate_names_to_next_spot, add_twitter_handle_to_next_politician_spot, \
-    fetch_duplicate_politician_count, figure_out_politician_conflict_values, find_duplicate_politician, \
+    fetch_duplicate_politician_count, figure_out_politician_conflict_values, find_duplicate_politicians_in_list, \
     generate_campaignx_for_politician, politician_save_photo_from_file_reader, \
     update_politician_details_from_candidate, \
     merge_if_duplicate_politicians, merge_these_two_politicians, politicians_import_from_master_server
@@ -141,7 +141,6 @@ def find_and_merge_duplicate_politicians_view(request):
     find_number_of_duplicates = request.GET.get('find_number_of_duplicates', 0)
     state_code = request.GET.get('state_code', "")
     status = ""
-    politician_manager = PoliticianManager()
 
     queryset = PoliticiansArePossibleDuplicates.objects.using('readonly').all()
     if positive_value_exists(state_code):
@@ -189,67 +188,54 @@ def find_and_merge_duplicate_politicians_view(request):
         status += 'FAILED_TO_CREATE_VOLUNTEER_TASK_COMPLETED: ' \
                   '{error} [type: {error_type}]'.format(error=e, error_type=type(e))
 
-    # Loop through all the politicians in this election
-    for we_vote_politician in politician_list:
-        if we_vote_politician.we_vote_id in exclude_politician_we_vote_id_list:
-            continue
-        # Start ignore list with entries already reviewed
-        ignore_politician_id_list = exclude_politician_we_vote_id_list
-        # Add current entry to ignore list
-        ignore_politician_id_list.append(we_vote_politician.we_vote_id)
-        # Now check for others we have already labeled as "not a duplicate"
-        not_a_duplicate_list = politician_manager.fetch_politicians_are_not_duplicates_list_we_vote_ids(
-            we_vote_politician.we_vote_id)
-        ignore_politician_id_list += not_a_duplicate_list
-
-        results = find_duplicate_politician(we_vote_politician, ignore_politician_id_list, read_only=True)
-
-        # If we find politicians to merge, store them for review
-        if results['politician_merge_possibility_found']:
-            politician_option1_for_template = we_vote_politician
-            politician_option2_for_template = results['politician_merge_possibility']
-
-            # Can we automatically merge these politicians?
-            merge_results = merge_if_duplicate_politicians(
-                politician_option1_for_template,
-                politician_option2_for_template,
-                results['politician_merge_conflict_values'])
-
-            if merge_results['politicians_merged']:
-                politician = merge_results['politician']
-                if politician.we_vote_id not in exclude_politician_we_vote_id_list:
-                    exclude_politician_we_vote_id_list.append(politician.we_vote_id)
-                if we_vote_politician.we_vote_id not in exclude_politician_we_vote_id_list:
-                    exclude_politician_we_vote_id_list.append(we_vote_politician.we_vote_id)
-                PoliticiansArePossibleDuplicates.objects.create(
-                    politician1_we_vote_id=politician.we_vote_id,
-                    politician2_we_vote_id=None,
-                    state_code=state_code,
-                )
-                PoliticiansArePossibleDuplicates.objects.create(
-                    politician1_we_vote_id=we_vote_politician.we_vote_id,
+    # Pair up possible duplicates across the whole state at once, then merge or queue each pair
+    results = find_duplicate_politicians_in_list(politician_list, read_only=True)
+    status += results['status']
+    possible_duplicates_list = []
+    for duplicate_pair in results['duplicate_pair_list']:
+        politician_option1_for_template = duplicate_pair['politician1']
+        politician_option2_for_template = duplicate_pair['politician2']
+        conflict_results = figure_out_politician_conflict_values(
+            politician_option1_for_template, politician_option2_for_template)
+
+        # Can we automatically merge these politicians?
+        merge_results = merge_if_duplicate_politicians(
+            politician_option1_for_template,
+            politician_option2_for_template,
+            conflict_results['politician_merge_conflict_values'])
+
+        if merge_results['politicians_merged']:
+            politician = merge_results['politician']
+            possible_duplicates_list.append(PoliticiansArePossibleDuplicates(
+                politician1_we_vote_id=politician.we_vote_id,
+                politician2_we_vote_id=None,
+                state_code=state_code,
+            ))
+            if politician.we_vote_id != politician_option1_for_template.we_vote_id:
+                possible_duplicates_list.append(PoliticiansArePossibleDuplicates(
+                    politician1_we_vote_id=politician_option1_for_template.we_vote_id,
                     politician2_we_vote_id=None,
                     state_code=state_code,
-                )
-                messages.add_message(request, messages.INFO,
-                                     "Politician {politician_name} automatically merged."
-                                     "".format(politician_name=politician.politician_name))
-            else:
-                # Add an entry showing that this is a possible match
-                PoliticiansArePossibleDuplicates.objects.create(
-                    politician1_we_vote_id=we_vote_politician.we_vote_id,
-                    politician2_we_vote_id=politician_option2_for_template.we_vote_id,
-                    state_code=state_code,
-                )
-                if politician_option2_for_template.we_vote_id not in exclude_politician_we_vote_id_list:
-                    exclude_politician_we_vote_id_list.append(politician_option2_for_template.we_vote_id)
+                ))
+            messages.add_message(request, messages.INFO,
+                                 "Politician {politician_name} automatically merged."
+                                 "".format(politician_name=politician.politician_name))
         else:
-            # No matches found
-            PoliticiansArePossibleDuplicates.objects.create(
-                politician1_we_vote_id=we_vote_politician.we_vote_id,
-                politician2_we_vote_id=None,
+            # Add an entry showing that this is a possible match
+            possible_duplicates_list.append(PoliticiansArePossibleDuplicates(
+                politician1_we_vote_id=politician_option1_for_template.we_vote_id,
+                politician2_we_vote_id=politician_option2_for_template.we_vote_id,
                 state_code=state_code,
-            )
+            ))
+    for we_vote_politician in results['unmatched_politician_list']:
+        # No matches found
+        possible_duplicates_list.append(PoliticiansArePossibleDuplicates(
+            politician1_we_vote_id=we_vote_politician.we_vote_id,
+            politician2_we_vote_id=None,
+            state_code=state_code,
+        ))
+    if len(possible_duplicates_list):
+        PoliticiansArePossibleDuplicates.objects.bulk_create(possible_duplicates_list)
 
     return HttpResponseRedirect(reverse('politician:duplicates_list', args=()) +
                                 "?state_code={state_code}"
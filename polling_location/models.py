@@ -6,6 +6,7 @@ from config.base import get_environment_variable
 from django.db import models
 from django.db.models import Q
 from exception.models import handle_record_not_found_exception
+from geoip.controllers import geocode_with_cache
 from geopy.geocoders import get_geocoder_for_service
 from geopy.exc import GeocoderQuotaExceeded
 import wevote_functions.admin
@@ -740,7 +741,7 @@ class PollingLocationManager(models.Manager):
             polling_location.state,
             polling_location.zip_long)
         try:
-            location = self.google_client.geocode(full_ballot_address, sensor=False, timeout=GEOCODE_TIMEOUT)
+            location = geocode_with_cache(self.google_client, full_ballot_address, timeout=GEOCODE_TIMEOUT)
         except GeocoderQuotaExceeded:
             status += "GeocoderQuotaExceeded "
             results = {
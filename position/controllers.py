@@ -16,7 +16,7 @@ from exception.models import handle_record_not_saved_exception
 from follow.models import FollowOrganizationManager
 from friend.models import FriendManager
 from measure.models import ContestMeasure, ContestMeasureManager, ContestMeasureListManager
-from office.models import ContestOfficeManager, ContestOfficeListManager
+from office.models import ContestOffice, ContestOfficeManager, ContestOfficeListManager
 from operator import itemgetter
 from organization.models import Organization, OrganizationManager, PUBLIC_FIGURE, UNKNOWN
 from share.models import ShareManager
@@ -2134,6 +2134,123 @@ def position_save_for_api(  # positionSave
         return results
 
 
+def generate_public_position_list_for_api(position_objects, position_info_dicts=None):
+    """
+    Turn public PositionEntered objects into the dicts returned by positionListForBallotItem and
+    positionListForBallotItemList. Pass the same position_info_dicts in for every ballot item on a ballot so
+    refresh_cached_position_info doesn't look up the same organization or candidate more than once.
+    :param position_objects:
+    :param position_info_dicts:
+    :return:
+    """
+    if position_info_dicts is None:
+        position_info_dicts = {}
+    position_manager = PositionManager()
+    position_list = []
+    offices_dict = position_info_dicts.get('offices_dict', {})
+    candidates_dict = position_info_dicts.get('candidates_dict', {})
+    measures_dict = position_info_dicts.get('measures_dict', {})
+    organizations_dict = position_info_dicts.get('organizations_dict', {})
+    voters_by_linked_org_dict = position_info_dicts.get('voters_by_linked_org_dict', {})
+    voters_dict = position_info_dicts.get('voters_dict', {})
+    for one_position in position_objects:
+        # Is there sufficient information in the position to display it?
+        some_data_exists = True if one_position.is_support_or_positive_rating() \
+                           or one_position.is_oppose_or_negative_rating() \
+                           or one_position.is_information_only() \
+                           or positive_value_exists(one_position.vote_smart_rating) \
+                           or positive_value_exists(one_position.statement_text) \
+                           or positive_value_exists(one_position.more_info_url) else False
+        if not some_data_exists:
+            # Skip this position if there isn't any data to display
+            continue
+
+        # Whose position is it?
+        if positive_value_exists(one_position.organization_we_vote_id):
+            speaker_id = one_position.organization_id
+            speaker_we_vote_id = one_position.organization_we_vote_id
+            one_position_success = True
+            # Make sure we have this data to display
+            if not positive_value_exists(one_position.speaker_display_name) \
+                    or not positive_value_exists(one_position.speaker_image_url_https_large) \
+                    or not positive_value_exists(one_position.speaker_image_url_https_medium) \
+                    or not positive_value_exists(one_position.speaker_image_url_https_tiny) \
+                    or not positive_value_exists(one_position.speaker_twitter_handle) \
+                    or one_position.speaker_type == UNKNOWN:
+                results = position_manager.refresh_cached_position_info(
+                    one_position,
+                    offices_dict=offices_dict,
+                    candidates_dict=candidates_dict,
+                    measures_dict=measures_dict,
+                    organizations_dict=organizations_dict,
+                    voters_by_linked_org_dict=voters_by_linked_org_dict,
+                    voters_dict=voters_dict)
+                one_position = results['position']
+                offices_dict = results['offices_dict']
+                candidates_dict = results['candidates_dict']
+                measures_dict = results['measures_dict']
+                organizations_dict = results['organizations_dict']
+                voters_by_linked_org_dict = results['voters_by_linked_org_dict']
+                voters_dict = results['voters_dict']
+            speaker_display_name = one_position.speaker_display_name
+        else:
+            speaker_display_name = "Unknown"
+            speaker_id = None
+            speaker_we_vote_id = None
+            one_position_success = False
+
+        if one_position_success:
+            one_position_dict_for_api = {
+                'ballot_item_display_name':         one_position.ballot_item_display_name,
+                'ballot_item_image_url_https_large':    one_position.ballot_item_image_url_https_large
+                if positive_value_exists(one_position.ballot_item_image_url_https_large)
+                else one_position.ballot_item_image_url_https,
+                'ballot_item_image_url_https_medium':   one_position.ballot_item_image_url_https_medium,
+                'ballot_item_image_url_https_tiny':     one_position.ballot_item_image_url_https_tiny,
+                'ballot_item_id':                   one_position.get_ballot_item_id(),
+                'ballot_item_we_vote_id':           one_position.get_ballot_item_we_vote_id(),
+                'is_support':                       one_position.is_support(),
+                'is_positive_rating':               one_position.is_positive_rating(),
+                'is_support_or_positive_rating':    one_position.is_support_or_positive_rating(),
+                'is_oppose':                        one_position.is_oppose(),
+                'is_negative_rating':               one_position.is_negative_rating(),
+                'is_oppose_or_negative_rating':     one_position.is_oppose_or_negative_rating(),
+                'is_information_only':              one_position.is_information_only(),
+                'is_public_position':               one_position.is_public_position(),
+                'has_video':                        is_link_to_video(one_position.more_info_url),
+                'kind_of_ballot_item':              one_position.get_kind_of_ballot_item(),
+                'last_updated':                     one_position.last_updated(),
+                'more_info_url':                    one_position.more_info_url,
+                'position_we_vote_id':              one_position.we_vote_id,
+                'position_ultimate_election_date':  one_position.position_ultimate_election_date,
+                'position_year':                    one_position.position_year,
+                'speaker_type':                     one_position.speaker_type,
+                'speaker_id':                       speaker_id,
+                'speaker_we_vote_id':               speaker_we_vote_id,
+                'speaker_display_name':             speaker_display_name,
+                'speaker_image_url_https_large':    one_position.speaker_image_url_https_large
+                if positive_value_exists(one_position.speaker_image_url_https_large)
+                else one_position.speaker_image_url_https,
+                'speaker_image_url_https_medium':   one_position.speaker_image_url_https_medium,
+                'speaker_image_url_https_tiny':     one_position.speaker_image_url_https_tiny,
+                'speaker_twitter_handle':           one_position.speaker_twitter_handle,
+                'twitter_followers_count':          one_position.twitter_followers_count,
+                'statement_text':                   one_position.statement_text,
+                'vote_smart_rating':                one_position.vote_smart_rating,
+                'vote_smart_time_span':             one_position.vote_smart_time_span,
+                'voter_we_vote_id':                 one_position.voter_we_vote_id,
+            }
+            position_list.append(one_position_dict_for_api)
+
+    position_info_dicts['offices_dict'] = offices_dict
+    position_info_dicts['candidates_dict'] = candidates_dict
+    position_info_dicts['measures_dict'] = measures_dict
+    position_info_dicts['organizations_dict'] = organizations_dict
+    position_info_dicts['voters_by_linked_org_dict'] = voters_by_linked_org_dict
+    position_info_dicts['voters_dict'] = voters_dict
+    return position_list
+
+
 def position_list_for_ballot_item_for_api(office_id, office_we_vote_id,  # positionListForBallotItem
                                           candidate_id, candidate_we_vote_id,
                                           measure_id, measure_we_vote_id,
@@ -2145,7 +2262,6 @@ def position_list_for_ballot_item_for_api(office_id, office_we_vote_id,  # posit
     status = "POSITION_LIST_FOR_BALLOT_ITEM "
     success = True
 
-    position_manager = PositionManager()
     position_list_manager = PositionListManager()
     ballot_item_found = False
     if positive_value_exists(candidate_id) or positive_value_exists(candidate_we_vote_id):
@@ -2276,101 +2392,7 @@ def position_list_for_ballot_item_for_api(office_id, office_we_vote_id,  # posit
         }
         return HttpResponse(json.dumps(json_data), content_type='application/json')
 
-    position_list = []
-    offices_dict = {}
-    candidates_dict = {}
-    measures_dict = {}
-    organizations_dict = {}
-    voters_by_linked_org_dict = {}
-    voters_dict = {}
-    for one_position in position_objects:
-        # Is there sufficient information in the position to display it?
-        some_data_exists = True if one_position.is_support_or_positive_rating() \
-                           or one_position.is_oppose_or_negative_rating() \
-                           or one_position.is_information_only() \
-                           or positive_value_exists(one_position.vote_smart_rating) \
-                           or positive_value_exists(one_position.statement_text) \
-                           or positive_value_exists(one_position.more_info_url) else False
-        if not some_data_exists:
-            # Skip this position if there isn't any data to display
-            continue
-
-        # Whose position is it?
-        if positive_value_exists(one_position.organization_we_vote_id):
-            speaker_id = one_position.organization_id
-            speaker_we_vote_id = one_position.organization_we_vote_id
-            one_position_success = True
-            # Make sure we have this data to display
-            if not positive_value_exists(one_position.speaker_display_name) \
-                    or not positive_value_exists(one_position.speaker_image_url_https_large) \
-                    or not positive_value_exists(one_position.speaker_image_url_https_medium) \
-                    or not positive_value_exists(one_position.speaker_image_url_https_tiny) \
-                    or not positive_value_exists(one_position.speaker_twitter_handle) \
-                    or one_position.speaker_type == UNKNOWN:
-                results = position_manager.refresh_cached_position_info(
-                    one_position,
-                    offices_dict=offices_dict,
-                    candidates_dict=candidates_dict,
-                    measures_dict=measures_dict,
-                    organizations_dict=organizations_dict,
-                    voters_by_linked_org_dict=voters_by_linked_org_dict,
-                    voters_dict=voters_dict)
-                one_position = results['position']
-                offices_dict = results['offices_dict']
-                candidates_dict = results['candidates_dict']
-                measures_dict = results['measures_dict']
-                organizations_dict = results['organizations_dict']
-                voters_by_linked_org_dict = results['voters_by_linked_org_dict']
-                voters_dict = results['voters_dict']
-            speaker_display_name = one_position.speaker_display_name
-        else:
-            speaker_display_name = "Unknown"
-            speaker_id = None
-            speaker_we_vote_id = None
-            one_position_success = False
-
-        if one_position_success:
-            one_position_dict_for_api = {
-                'ballot_item_display_name':         one_position.ballot_item_display_name,
-                'ballot_item_image_url_https_large':    one_position.ballot_item_image_url_https_large
-                if positive_value_exists(one_position.ballot_item_image_url_https_large)
-                else one_position.ballot_item_image_url_https,
-                'ballot_item_image_url_https_medium':   one_position.ballot_item_image_url_https_medium,
-                'ballot_item_image_url_https_tiny':     one_position.ballot_item_image_url_https_tiny,
-                'ballot_item_id':                   one_position.get_ballot_item_id(),
-                'ballot_item_we_vote_id':           one_position.get_ballot_item_we_vote_id(),
-                'is_support':                       one_position.is_support(),
-                'is_positive_rating':               one_position.is_positive_rating(),
-                'is_support_or_positive_rating':    one_position.is_support_or_positive_rating(),
-                'is_oppose':                        one_position.is_oppose(),
-                'is_negative_rating':               one_position.is_negative_rating(),
-                'is_oppose_or_negative_rating':     one_position.is_oppose_or_negative_rating(),
-                'is_information_only':              one_position.is_information_only(),
-                'is_public_position':               one_position.is_public_position(),
-                'has_video':                        is_link_to_video(one_position.more_info_url),
-                'kind_of_ballot_item':              one_position.get_kind_of_ballot_item(),
-                'last_updated':                     one_position.last_updated(),
-                'more_info_url':                    one_position.more_info_url,
-                'position_we_vote_id':              one_position.we_vote_id,
-                'position_ultimate_election_date':  one_position.position_ultimate_election_date,
-                'position_year':                    one_position.position_year,
-                'speaker_type':                     one_position.speaker_type,
-                'speaker_id':                       speaker_id,
-                'speaker_we_vote_id':               speaker_we_vote_id,
-                'speaker_display_name':             speaker_display_name,
-                'speaker_image_url_https_large':    one_position.speaker_image_url_https_large
-                if positive_value_exists(one_position.speaker_image_url_https_large)
-                else one_position.speaker_image_url_https,
-                'speaker_image_url_https_medium':   one_position.speaker_image_url_https_medium,
-                'speaker_image_url_https_tiny':     one_position.speaker_image_url_https_tiny,
-                'speaker_twitter_handle':           one_position.speaker_twitter_handle,
-                'twitter_followers_count':          one_position.twitter_followers_count,
-                'statement_text':                   one_position.statement_text,
-                'vote_smart_rating':                one_position.vote_smart_rating,
-                'vote_smart_time_span':             one_position.vote_smart_time_span,
-                'voter_we_vote_id':                 one_position.voter_we_vote_id,
-            }
-            position_list.append(one_position_dict_for_api)
+    position_list = generate_public_position_list_for_api(position_objects)
 
     positions_count = len(position_list)
 
@@ -2387,6 +2409,109 @@ def position_list_for_ballot_item_for_api(office_id, office_we_vote_id,  # posit
     return HttpResponse(json.dumps(json_data), content_type='application/json')
 
 
+def position_list_for_ballot_item_list_for_api(  # positionListForBallotItemList
+        ballot_item_we_vote_id_list=[],
+        stance_we_are_looking_for=ANY_STANCE,
+        private_citizens_only=False):
+    """
+    The public positions for every ballot item on a ballot in one call, instead of one positionListForBallotItem
+    call per candidate, office and measure. Each entry in ballot_item_list has the same shape as a
+    positionListForBallotItem response.
+    """
+    status = "POSITION_LIST_FOR_BALLOT_ITEM_LIST "
+    success = True
+
+    ballot_item_we_vote_id_list = [ballot_item_we_vote_id.strip() for ballot_item_we_vote_id
+                                   in ballot_item_we_vote_id_list if positive_value_exists(ballot_item_we_vote_id)]
+    if not len(ballot_item_we_vote_id_list):
+        status += "POSITION_LIST_RETRIEVE_MISSING_BALLOT_ITEM_WE_VOTE_ID_LIST "
+        json_data = {
+            'status':                   status,
+            'success':                  False,
+            'count':                                0,
+            'ballot_item_list':                     [],
+            'ballot_item_we_vote_ids_not_found':    [],
+            'private_citizens_only':                private_citizens_only,
+        }
+        return HttpResponse(json.dumps(json_data), content_type='application/json')
+
+    # Since we want to return the id for each ballot item, and we don't know for sure that there are any
+    # positions for it, we look up all the ballot items at once (per the request of the WebApp team)
+    kind_of_ballot_item_by_we_vote_id = {}
+    ballot_item_id_by_we_vote_id = {}
+    try:
+        candidate_query = CandidateCampaign.objects.using('readonly') \
+            .filter(we_vote_id__in=ballot_item_we_vote_id_list) \
+            .values_list('we_vote_id', 'id')
+        for we_vote_id, ballot_item_id in candidate_query:
+            kind_of_ballot_item_by_we_vote_id[we_vote_id] = CANDIDATE
+            ballot_item_id_by_we_vote_id[we_vote_id] = ballot_item_id
+        measure_query = ContestMeasure.objects.using('readonly') \
+            .filter(we_vote_id__in=ballot_item_we_vote_id_list) \
+            .values_list('we_vote_id', 'id')
+        for we_vote_id, ballot_item_id in measure_query:
+            kind_of_ballot_item_by_we_vote_id[we_vote_id] = MEASURE
+            ballot_item_id_by_we_vote_id[we_vote_id] = ballot_item_id
+        office_query = ContestOffice.objects.using('readonly') \
+            .filter(we_vote_id__in=ballot_item_we_vote_id_list) \
+            .values_list('we_vote_id', 'id')
+        for we_vote_id, ballot_item_id in office_query:
+            kind_of_ballot_item_by_we_vote_id[we_vote_id] = OFFICE
+            ballot_item_id_by_we_vote_id[we_vote_id] = ballot_item_id
+    except Exception as e:
+        status += "POSITION_LIST_RETRIEVE_BALLOT_ITEMS_ERROR: " + str(e) + " "
+        success = False
+
+    ballot_item_we_vote_id_found_list = []
+    ballot_item_we_vote_id_not_found_list = []
+    for ballot_item_we_vote_id in ballot_item_we_vote_id_list:
+        if ballot_item_we_vote_id in kind_of_ballot_item_by_we_vote_id:
+            if ballot_item_we_vote_id not in ballot_item_we_vote_id_found_list:
+                ballot_item_we_vote_id_found_list.append(ballot_item_we_vote_id)
+        elif ballot_item_we_vote_id not in ballot_item_we_vote_id_not_found_list:
+            ballot_item_we_vote_id_not_found_list.append(ballot_item_we_vote_id)
+
+    position_list_by_ballot_item_we_vote_id = {}
+    if len(ballot_item_we_vote_id_found_list):
+        # We intentionally do not use 'readonly' here since refresh_cached_position_info may save the positions
+        position_list_manager = PositionListManager()
+        results = position_list_manager.retrieve_all_positions_for_ballot_item_we_vote_id_list(
+            ballot_item_we_vote_id_list=ballot_item_we_vote_id_found_list,
+            stance_we_are_looking_for=stance_we_are_looking_for,
+            most_recent_only=True,
+            read_only=False)
+        status += results['status']
+        if not results['success']:
+            success = False
+        position_list_by_ballot_item_we_vote_id = results['position_list_by_ballot_item_we_vote_id']
+
+    ballot_item_list = []
+    positions_count = 0
+    position_info_dicts = {}
+    for ballot_item_we_vote_id in ballot_item_we_vote_id_found_list:
+        position_list = generate_public_position_list_for_api(
+            position_list_by_ballot_item_we_vote_id.get(ballot_item_we_vote_id, []),
+            position_info_dicts=position_info_dicts)
+        positions_count += len(position_list)
+        ballot_item_list.append({
+            'count':                    len(position_list),
+            'kind_of_ballot_item':      kind_of_ballot_item_by_we_vote_id[ballot_item_we_vote_id],
+            'ballot_item_id':           ballot_item_id_by_we_vote_id[ballot_item_we_vote_id],
+            'ballot_item_we_vote_id':   ballot_item_we_vote_id,
+            'position_list':            position_list,
+        })
+
+    json_data = {
+        'status':                               status,
+        'success':                              success,
+        'count':                                positions_count,
+        'ballot_item_list':                     ballot_item_list,
+        'ballot_item_we_vote_ids_not_found':    ballot_item_we_vote_id_not_found_list,
+        'private_citizens_only':                private_citizens_only,
+    }
+    return HttpResponse(json.dumps(json_data), content_type='application/json')
+
+
 def position_list_for_ballot_item_from_friends_for_api(  # positionListForBallotItemFromFriends
         voter_device_id='',
         friends_vs_public=FRIENDS_AND_PUBLIC,
@@ -0,0 +1,66 @@
+import json
+from statistics import median
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from organization.models import Organization
+from position.models import PositionEntered
+from wevote_functions.functions_query import generate_value_list_filter
+
+
+class Command(BaseCommand):
+    help = 'Compares Postgres planning and execution time for OR-chained Q filters, IN (...) and = ANY(array) ' \
+           'when filtering PositionEntered by lists of organization_we_vote_ids of increasing size.'
+
+    @staticmethod
+    def add_arguments(parser):
+        parser.add_argument('--sizes', default='10,100,1000,5000,20000',
+                            help='Comma separated list sizes to try')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per strategy and size (median is reported)')
+        parser.add_argument('--database', default='readonly')
+
+    def handle(self, *args, **options):
+        database = options['database']
+        size_list = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        organization_we_vote_id_list = list(
+            Organization.objects.using(database).order_by('id').values_list('we_vote_id', flat=True)[:max(size_list)])
+        # Pad with ids that don't exist, so large sizes still work on a small database
+        synthetic_number = 0
+        while len(organization_we_vote_id_list) < max(size_list):
+            synthetic_number += 1
+            organization_we_vote_id_list.append('wv00orgbenchmark' + str(synthetic_number))
+
+        self.stdout.write('{:>7} {:>10} {:>12} {:>12} {:>12} {:>10}'.format(
+            'size', 'strategy', 'sql_chars', 'planning_ms', 'execution_ms', 'total_ms'))
+        for size in size_list:
+            value_list = organization_we_vote_id_list[:size]
+            for strategy in ('or_chain', 'in_list', 'any_array'):
+                query = PositionEntered.objects.using(database).filter(self.generate_filter(strategy, value_list))
+                sql, params = query.query.sql_with_params()
+                planning_time_list = []
+                execution_time_list = []
+                total_time_list = []
+                for _ in range(options['repeat']):
+                    t0 = perf_counter()
+                    explain_output = json.loads(query.explain(format='json', analyze=True))
+                    total_time_list.append((perf_counter() - t0) * 1000)
+                    planning_time_list.append(explain_output[0]['Planning Time'])
+                    execution_time_list.append(explain_output[0]['Execution Time'])
+                self.stdout.write('{:>7} {:>10} {:>12} {:>12.2f} {:>12.2f} {:>10.2f}'.format(
+                    size, strategy, len(sql) + sum(len(str(param)) for param in params),
+                    median(planning_time_list), median(execution_time_list), median(total_time_list)))
+
+    @staticmethod
+    def generate_filter(strategy, value_list):
+        if strategy == 'or_chain':
+            # What position/models.py used to build
+            we_vote_id_filter = Q()
+            for we_vote_id in value_list:
+                we_vote_id_filter |= Q(organization_we_vote_id=we_vote_id)
+            return we_vote_id_filter
+        elif strategy == 'in_list':
+            return Q(organization_we_vote_id__in=value_list)
+        else:
+            return generate_value_list_filter('organization_we_vote_id', value_list)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from position.models import PositionTallyManager
+
+
+class Command(BaseCommand):
+    help = 'Recounts PositionEntered and PositionForFriends and corrects any PositionTally rows that have drifted, ' \
+           'ex/ after positions were changed with queryset.update() or bulk_create, which do not send signals.'
+
+    @staticmethod
+    def add_arguments(parser):
+        parser.add_argument('--ballot_item_we_vote_id', action='append', default=None,
+                            help='Only rebuild this candidate or measure (may be repeated). Default is all.')
+
+    def handle(self, *args, **options):
+        results = PositionTallyManager().rebuild_position_tallies(
+            ballot_item_we_vote_id_list=options['ballot_item_we_vote_id'])
+        self.stdout.write(results['status'])
+        if not results['success']:
+            self.stderr.write('rebuild_position_tallies did not finish cleanly')
@@ -9,8 +9,10 @@ from candidate.models import CandidateCampaign, CandidateListManager, CandidateM
 from ballot.controllers import figure_out_google_civic_election_id_voter_is_watching, \
     figure_out_google_civic_election_id_voter_is_watching_by_voter_we_vote_id
 from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
-from django.db import models
-from django.db.models import Q
+from django.db import models, transaction
+from django.db.models import Count, F, Q
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
 from django.utils.timezone import now
 from election.models import Election
 from exception.models import handle_exception, handle_record_found_more_than_one_exception,\
@@ -30,6 +32,7 @@ from voter_guide.models import VoterGuideManager
 import wevote_functions.admin
 from wevote_functions.functions import convert_to_int, positive_value_exists
 from wevote_functions.functions_date import DATE_FORMAT_YMD_HMS
+from wevote_functions.functions_query import filter_by_value_list, generate_value_list_filter
 from wevote_settings.models import fetch_next_we_vote_id_position_integer, fetch_site_unique_id_prefix
 
 
@@ -211,7 +214,7 @@ class PositionEntered(models.Model):
                                                    null=True, blank=True, db_index=True)
     candidate_campaign_we_vote_id = models.CharField(
         verbose_name="we vote permanent id for the candidate", max_length=255, null=True,
-        blank=True, unique=False)
+        blank=True, unique=False, db_index=True)
     # The candidate's name as passed over by Google Civic. We save this so we can match to this candidate if an import
     # doesn't include a we_vote_id we recognize.
     google_civic_candidate_name = models.CharField(verbose_name="candidate name exactly as received from google civic",
@@ -1002,6 +1005,58 @@ class PositionNetworkScore(models.Model):
         return ""
 
 
+# The PositionEntered / PositionForFriends fields a PositionRecord carries
+POSITION_RECORD_FIELD_LIST = [
+    'id',
+    'we_vote_id',
+    'date_entered',
+    'stance',
+    'vote_smart_rating',
+    'vote_smart_time_span',
+    'organization_id',
+    'organization_we_vote_id',
+    'voter_id',
+    'voter_we_vote_id',
+    'candidate_campaign_we_vote_id',
+    'contest_measure_we_vote_id',
+]
+
+
+class PositionRecord(object):
+    """
+    A read-only stand-in for PositionEntered or PositionForFriends, built from a values() query, for code that
+    counts or filters positions without displaying or saving them. Skips model instantiation, which is most of
+    the cost of loading thousands of positions for a popular candidate.
+    """
+    __slots__ = POSITION_RECORD_FIELD_LIST
+
+    def __init__(self, values_dict):
+        for field_name in POSITION_RECORD_FIELD_LIST:
+            setattr(self, field_name, values_dict.get(field_name))
+
+    def is_support(self):
+        return self.stance == SUPPORT
+
+    def is_oppose(self):
+        return self.stance == OPPOSE
+
+    def is_positive_rating(self):
+        if self.stance == PERCENT_RATING:
+            if self.vote_smart_rating:
+                rating_percentage = convert_to_int(self.vote_smart_rating)
+                if rating_percentage >= 66:
+                    return True
+        return False
+
+    def is_negative_rating(self):
+        if self.stance == PERCENT_RATING:
+            if self.vote_smart_rating:
+                rating_percentage = convert_to_int(self.vote_smart_rating)
+                if rating_percentage <= 33:
+                    return True
+        return False
+
+
 class PositionListManager(models.Manager):
     # 2018-05 We now have an "is_public_position()" function
     # def add_is_public_position(self, incoming_position_list, is_public_position):
@@ -1028,11 +1083,13 @@ class PositionListManager(models.Manager):
         """
 
         positions_followed_by_voter = []
+        voter_friend_set = set(voter_friend_list)
+        organizations_followed_by_voter_by_id = set(organizations_followed_by_voter_by_id)
         # Only return the positions if they are from organizations the voter follows
         for position in all_positions_list:
             if position.voter_id == voter_id:  # We include the voter currently viewing the ballot in this list
                 positions_followed_by_voter.append(position)
-            elif position.voter_we_vote_id in voter_friend_list:
+            elif position.voter_we_vote_id in voter_friend_set:
                 positions_followed_by_voter.append(position)
             elif position.organization_id in organizations_followed_by_voter_by_id:
                 positions_followed_by_voter.append(position)
@@ -1053,6 +1110,8 @@ class PositionListManager(models.Manager):
         :return:
         """
         positions_not_followed_by_voter = []
+        voter_friend_set = set(voter_friend_list)
+        organizations_followed_by_voter = set(organizations_followed_by_voter)
         # Only return the positions if they are from organizations the voter follows
         for position in all_positions_list:
             # Some positions are for individual voters, so we want to filter those out
@@ -1061,7 +1120,7 @@ class PositionListManager(models.Manager):
                 # Do not add
                 pass
             elif position.voter_we_vote_id \
-                    and position.voter_we_vote_id in voter_friend_list:
+                    and position.voter_we_vote_id in voter_friend_set:
                 # Do not add
                 pass
             else:
@@ -1807,7 +1866,8 @@ class PositionListManager(models.Manager):
             organizations_followed_we_vote_id_list=False,
             retrieve_all_admin_override=False,
             private_citizens_only=False,
-            read_only=False):
+            read_only=False,
+            return_position_records=False):
         """
         We do not attempt to retrieve public positions and friend's-only positions in the same call.
         :param retrieve_public_positions:
@@ -1824,6 +1884,8 @@ class PositionListManager(models.Manager):
         :param private_citizens_only: If False, only retrieve positions from groups and public figures.
             If True, only return positions from private citizens.
         :param read_only:
+        :param return_position_records: Return PositionRecord objects instead of model instances, when the
+         positions are only going to be counted or filtered, not displayed or saved
         :return:
         """
         if stance_we_are_looking_for not \
@@ -1903,21 +1965,21 @@ class PositionListManager(models.Manager):
             if friends_we_vote_id_list is not False:
                 if type(friends_we_vote_id_list) is list and len(friends_we_vote_id_list) > 0:
                     # Find positions from friends. Look for we_vote_id case-insensitive.
-                    we_vote_id_filter = Q()
-                    for we_vote_id in friends_we_vote_id_list:
-                        we_vote_id_filter |= Q(voter_we_vote_id=we_vote_id)  # Removed __iexact
-                    position_list_query = position_list_query.filter(we_vote_id_filter)
+                    position_list_query = filter_by_value_list(
+                        position_list_query, 'voter_we_vote_id', friends_we_vote_id_list)
             if retrieve_public_positions and organizations_followed_we_vote_id_list:
                 if type(organizations_followed_we_vote_id_list) is list \
                         and len(organizations_followed_we_vote_id_list) > 0:
                     # Find positions from organizations voter follows.
-                    we_vote_id_filter = Q()
-                    for we_vote_id in organizations_followed_we_vote_id_list:
-                        we_vote_id_filter |= Q(organization_we_vote_id=we_vote_id)  # Removed __iexact
-                    position_list_query = position_list_query.filter(we_vote_id_filter)
+                    position_list_query = filter_by_value_list(
+                        position_list_query, 'organization_we_vote_id', organizations_followed_we_vote_id_list)
             # Limit to positions in the last x years - currently we are not limiting
             # position_list = position_list.filter(election_id=election_id)
-            position_list = list(position_list_query)
+            if return_position_records:
+                position_list = [PositionRecord(values_dict) for values_dict
+                                 in position_list_query.values(*POSITION_RECORD_FIELD_LIST)]
+            else:
+                position_list = list(position_list_query)
 
             # Now filter out the positions that have a percent rating that doesn't match the stance_we_are_looking_for
             if stance_we_are_looking_for == SUPPORT or stance_we_are_looking_for == OPPOSE:
@@ -2033,10 +2095,8 @@ class PositionListManager(models.Manager):
 
             if type(shared_by_organization_we_vote_id_list) is list and len(shared_by_organization_we_vote_id_list) > 0:
                 # Find positions from organizations in shared_items. Look for we_vote_id case insensitive.
-                we_vote_id_filter = Q()
-                for we_vote_id in shared_by_organization_we_vote_id_list:
-                    we_vote_id_filter |= Q(organization_we_vote_id=we_vote_id)
-                position_list_query = position_list_query.filter(we_vote_id_filter)
+                position_list_query = filter_by_value_list(
+                    position_list_query, 'organization_we_vote_id', shared_by_organization_we_vote_id_list)
             position_list = list(position_list_query)
 
             # Now filter out the positions that have a percent rating that doesn't match the stance_we_are_looking_for
@@ -2079,7 +2139,8 @@ class PositionListManager(models.Manager):
             most_recent_only=True,
             friends_we_vote_id_list=False,
             organizations_followed_we_vote_id_list=False,
-            read_only=False):
+            read_only=False,
+            return_position_records=False):
         """
 
         :param retrieve_public_positions:
@@ -2093,6 +2154,8 @@ class PositionListManager(models.Manager):
          If it comes in as False, we can consider looking up the values if they are needed,
          but we will then need voter_device_id passed in too.
         :param read_only:
+        :param return_position_records: Return PositionRecord objects instead of model instances, when the
+         positions are only going to be counted or filtered, not displayed or saved
         :return:
         """
         if stance_we_are_looking_for not \
@@ -2160,24 +2223,25 @@ class PositionListManager(models.Manager):
                 # PERCENT_RATING data with measures
 
             # Only one of these blocks will be used at a time
-            if friends_we_vote_id_list is not False:
+            if type(friends_we_vote_id_list) is list and len(friends_we_vote_id_list) > 0:
                 # Find positions from friends. Look for we_vote_id case insensitive.
-                we_vote_id_filter = Q()
-                for we_vote_id in friends_we_vote_id_list:
-                    we_vote_id_filter |= Q(voter_we_vote_id=we_vote_id)
-                position_list_query = position_list_query.filter(we_vote_id_filter)
-            if retrieve_public_positions and organizations_followed_we_vote_id_list is not False:
+                position_list_query = filter_by_value_list(
+                    position_list_query, 'voter_we_vote_id', friends_we_vote_id_list)
+            if retrieve_public_positions and type(organizations_followed_we_vote_id_list) is list \
+                    and len(organizations_followed_we_vote_id_list) > 0:
                 # Find positions from organizations voter follows.
-                we_vote_id_filter = Q()
-                for we_vote_id in organizations_followed_we_vote_id_list:
-                    we_vote_id_filter |= Q(organization_we_vote_id=we_vote_id)
-                position_list_query = position_list_query.filter(we_vote_id_filter)
+                position_list_query = filter_by_value_list(
+                    position_list_query, 'organization_we_vote_id', organizations_followed_we_vote_id_list)
             # Limit to positions in the last x years - currently we are not limiting
             # position_list = position_list.filter(election_id=election_id)
 
             # We don't need to filter out the positions that have a percent rating that doesn't match
             # the stance_we_are_looking_for (like we do for candidates)
-            position_list = list(position_list_query)
+            if return_position_records:
+                position_list = [PositionRecord(values_dict) for values_dict
+                                 in position_list_query.values(*POSITION_RECORD_FIELD_LIST)]
+            else:
+                position_list = list(position_list_query)
             if len(position_list):
                 position_list_found = True
         except Exception as e:
@@ -2272,10 +2336,8 @@ class PositionListManager(models.Manager):
 
             # Find positions from shared_items. Look for we_vote_id case insensitive.
             if type(shared_by_organization_we_vote_id_list) is list and len(shared_by_organization_we_vote_id_list) > 0:
-                we_vote_id_filter = Q()
-                for we_vote_id in shared_by_organization_we_vote_id_list:
-                    we_vote_id_filter |= Q(organization_we_vote_id=we_vote_id)
-                position_list_query = position_list_query.filter(we_vote_id_filter)
+                position_list_query = filter_by_value_list(
+                    position_list_query, 'organization_we_vote_id', shared_by_organization_we_vote_id_list)
 
             # We don't need to filter out the positions that have a percent rating that doesn't match
             # the stance_we_are_looking_for (like we do for candidates)
@@ -2301,7 +2363,8 @@ class PositionListManager(models.Manager):
             stance_we_are_looking_for=ANY_STANCE,
             most_recent_only=True,
             friends_we_vote_id_list=False,
-            read_only=False):
+            read_only=False,
+            return_position_records=False):
         status = ""
         if stance_we_are_looking_for not \
                 in (ANY_STANCE, SUPPORT, STILL_DECIDING, INFORMATION_ONLY, NO_STANCE, OPPOSE, PERCENT_RATING):
@@ -2367,18 +2430,20 @@ class PositionListManager(models.Manager):
                 # "if stance_we_are_looking_for == SUPPORT or stance_we_are_looking_for == OPPOSE"
                 # for contest_office (like we do for candidate) because we don't have to deal with
                 # PERCENT_RATING data with measures
-            if friends_we_vote_id_list is not False:
+            if type(friends_we_vote_id_list) is list and len(friends_we_vote_id_list) > 0:
                 # Find positions from friends. Look for we_vote_id case-insensitive.
-                we_vote_id_filter = Q()
-                for we_vote_id in friends_we_vote_id_list:
-                    we_vote_id_filter |= Q(voter_we_vote_id=we_vote_id)
-                position_list_query = position_list_query.filter(we_vote_id_filter)
+                position_list_query = filter_by_value_list(
+                    position_list_query, 'voter_we_vote_id', friends_we_vote_id_list)
             # Limit to positions in the last x years - currently we are not limiting
             # position_list = position_list.filter(election_id=election_id)
 
             # We don't need to filter out the positions that have a percent rating that doesn't match
             # the stance_we_are_looking_for (like we do for candidates)
-            position_list = list(position_list_query)
+            if return_position_records:
+                position_list = [PositionRecord(values_dict) for values_dict
+                                 in position_list_query.values(*POSITION_RECORD_FIELD_LIST)]
+            else:
+                position_list = list(position_list_query)
             if len(position_list):
                 position_list_found = True
         except Exception as e:
@@ -2400,6 +2465,136 @@ class PositionListManager(models.Manager):
             position_list_filtered = []
             return position_list_filtered
 
+    def retrieve_all_positions_for_ballot_item_we_vote_id_list(
+            self,
+            ballot_item_we_vote_id_list=[],
+            stance_we_are_looking_for=ANY_STANCE,
+            most_recent_only=True,
+            read_only=False):
+        """
+        Public positions for a whole ballot at once. Equivalent to calling retrieve_all_positions_for_candidate,
+        retrieve_all_positions_for_contest_measure and retrieve_all_positions_for_contest_office once per ballot item,
+        but with two queries to find the candidates in each office, and one PositionEntered query.
+        :param ballot_item_we_vote_id_list: Any mix of candidate, measure and office we_vote_ids
+        :param stance_we_are_looking_for:
+        :param most_recent_only:
+        :param read_only:
+        :return: position_list_by_ballot_item_we_vote_id has an entry (possibly empty) for every recognized ballot item
+        """
+        status = ""
+        success = True
+        position_list_by_ballot_item_we_vote_id = {}
+        if stance_we_are_looking_for not \
+                in (ANY_STANCE, SUPPORT, STILL_DECIDING, INFORMATION_ONLY, NO_STANCE, OPPOSE, PERCENT_RATING):
+            status += "RETRIEVE_POSITIONS_FOR_BALLOT_ITEM_LIST-INVALID_STANCE "
+            results = {
+                'success':                                  False,
+                'status':                                   status,
+                'position_list_by_ballot_item_we_vote_id':  position_list_by_ballot_item_we_vote_id,
+            }
+            return results
+
+        candidate_we_vote_id_list = []
+        contest_measure_we_vote_id_list = []
+        contest_office_we_vote_id_list = []
+        for ballot_item_we_vote_id in ballot_item_we_vote_id_list:
+            if not positive_value_exists(ballot_item_we_vote_id) \
+                    or ballot_item_we_vote_id in position_list_by_ballot_item_we_vote_id:
+                continue
+            if "cand" in ballot_item_we_vote_id:
+                candidate_we_vote_id_list.append(ballot_item_we_vote_id)
+            elif "meas" in ballot_item_we_vote_id:
+                contest_measure_we_vote_id_list.append(ballot_item_we_vote_id)
+            elif "off" in ballot_item_we_vote_id:
+                contest_office_we_vote_id_list.append(ballot_item_we_vote_id)
+            else:
+                status += "UNRECOGNIZED_BALLOT_ITEM_WE_VOTE_ID: " + str(ballot_item_we_vote_id) + " "
+                continue
+            position_list_by_ballot_item_we_vote_id[ballot_item_we_vote_id] = []
+
+        # Office positions are the positions on the candidates running for that office, leaving out the ones
+        #  not displayed on the ballot, the same way retrieve_all_candidates_for_office does
+        office_we_vote_id_list_by_candidate_we_vote_id = {}
+        if len(contest_office_we_vote_id_list):
+            results = CandidateListManager.retrieve_all_candidates_for_office_list(
+                office_we_vote_id_list=contest_office_we_vote_id_list,
+                read_only=True)
+            if not positive_value_exists(results['success']):
+                status += results['status']
+                success = False
+            for contest_office_we_vote_id, candidate_list in results['candidate_list_by_office_dict'].items():
+                for candidate in candidate_list:
+                    office_we_vote_id_list_by_candidate_we_vote_id.setdefault(candidate.we_vote_id, []).append(
+                        contest_office_we_vote_id)
+
+        all_candidate_we_vote_id_list = \
+            list(set(candidate_we_vote_id_list) | set(office_we_vote_id_list_by_candidate_we_vote_id.keys()))
+        if not len(all_candidate_we_vote_id_list) and not len(contest_measure_we_vote_id_list):
+            results = {
+                'success':                                  success,
+                'status':                                   status,
+                'position_list_by_ballot_item_we_vote_id':  position_list_by_ballot_item_we_vote_id,
+            }
+            return results
+
+        try:
+            if read_only:
+                position_list_query = PositionEntered.objects.using('readonly').order_by('-date_entered')
+            else:
+                # We intentionally do not use 'readonly' here for when we save based on the results of this query
+                position_list_query = PositionEntered.objects.order_by('-date_entered')
+            ballot_item_filter = Q()
+            if len(all_candidate_we_vote_id_list):
+                ballot_item_filter |= generate_value_list_filter(
+                    'candidate_campaign_we_vote_id', all_candidate_we_vote_id_list)
+            if len(contest_measure_we_vote_id_list):
+                ballot_item_filter |= generate_value_list_filter(
+                    'contest_measure_we_vote_id', contest_measure_we_vote_id_list)
+            position_list_query = position_list_query.filter(ballot_item_filter)
+            if stance_we_are_looking_for != ANY_STANCE:
+                position_list_query = position_list_query.filter(stance=stance_we_are_looking_for)
+
+            # Results stay in '-date_entered' order within each ballot item
+            for one_position in position_list_query:
+                if positive_value_exists(one_position.candidate_campaign_we_vote_id):
+                    candidate_we_vote_id = one_position.candidate_campaign_we_vote_id
+                    if candidate_we_vote_id in position_list_by_ballot_item_we_vote_id:
+                        # Only filter out the percent ratings that don't match the stance for candidates,
+                        #  the same way retrieve_all_positions_for_candidate does
+                        if one_position.stance == PERCENT_RATING and stance_we_are_looking_for == SUPPORT:
+                            if one_position.is_positive_rating():
+                                position_list_by_ballot_item_we_vote_id[candidate_we_vote_id].append(one_position)
+                        elif one_position.stance == PERCENT_RATING and stance_we_are_looking_for == OPPOSE:
+                            if one_position.is_negative_rating():
+                                position_list_by_ballot_item_we_vote_id[candidate_we_vote_id].append(one_position)
+                        else:
+                            position_list_by_ballot_item_we_vote_id[candidate_we_vote_id].append(one_position)
+                    for contest_office_we_vote_id in \
+                            office_we_vote_id_list_by_candidate_we_vote_id.get(candidate_we_vote_id, []):
+                        position_list_by_ballot_item_we_vote_id[contest_office_we_vote_id].append(one_position)
+                elif positive_value_exists(one_position.contest_measure_we_vote_id):
+                    if one_position.contest_measure_we_vote_id in position_list_by_ballot_item_we_vote_id:
+                        position_list_by_ballot_item_we_vote_id[one_position.contest_measure_we_vote_id].append(
+                            one_position)
+        except Exception as e:
+            handle_record_not_found_exception(e, logger=logger)
+            status += "ERROR_IN_POSITION_LIST_FOR_BALLOT_ITEM_LIST_QUERY: " + str(e) + " "
+            success = False
+
+        # If we have multiple positions for one org, we only want to show the most recent.
+        if most_recent_only:
+            for ballot_item_we_vote_id, position_list in position_list_by_ballot_item_we_vote_id.items():
+                if len(position_list) > 1:
+                    position_list_by_ballot_item_we_vote_id[ballot_item_we_vote_id] = \
+                        self.remove_older_positions_for_each_org(position_list)
+
+        results = {
+            'success':                                  success,
+            'status':                                   status,
+            'position_list_by_ballot_item_we_vote_id':  position_list_by_ballot_item_we_vote_id,
+        }
+        return results
+
     @staticmethod
     def retrieve_shared_item_positions_for_contest_office(
             retrieve_public_positions=True,
@@ -2471,10 +2666,8 @@ class PositionListManager(models.Manager):
 
             if type(shared_by_organization_we_vote_id_list) is list and len(shared_by_organization_we_vote_id_list) > 0:
                 # Find positions from friends. Look for we_vote_id case insensitive.
-                we_vote_id_filter = Q()
-                for we_vote_id in shared_by_organization_we_vote_id_list:
-                    we_vote_id_filter |= Q(organization_we_vote_id=we_vote_id)
-                    position_list_query = position_list_query.filter(we_vote_id_filter)
+                position_list_query = filter_by_value_list(
+                    position_list_query, 'organization_we_vote_id', shared_by_organization_we_vote_id_list)
 
             # We don't need to filter out the positions that have a percent rating that doesn't match
             # the stance_we_are_looking_for (like we do for candidates)
@@ -3700,41 +3893,43 @@ class PositionListManager(models.Manager):
 
     @staticmethod
     def remove_older_positions_for_each_org(position_list):
-        # If we have multiple positions for one org, we only want to show the most recent
-        organization_already_reviewed = []
-        organization_with_multiple_positions = []
-        newest_position_for_org = {}  # Figure out the newest position per org that we should show
+        """
+        If an organization has more than one position with a vote_smart_time_span, only keep the first of its
+        positions from the newest time span (and drop its positions without a time span).
+        Linear in len(position_list). Works on PositionEntered, PositionForFriends or PositionRecord objects.
+        :param position_list:
+        :return:
+        """
+        # Figure out the newest time span per org, and which orgs have more than one time-span position
+        newest_year_for_org = {}
+        organization_with_multiple_positions = set()
         for one_position in position_list:
-            if one_position.organization_we_vote_id:
-                if one_position.organization_we_vote_id not in organization_already_reviewed:
-                    organization_already_reviewed.append(one_position.organization_we_vote_id)
-                # Are we dealing with a time span (instead of google_civic_election_id)?
-                if positive_value_exists(one_position.vote_smart_time_span):
-                    # Take the first four digits of one_position.vote_smart_time_span
-                    first_four_digits = convert_to_int(one_position.vote_smart_time_span[:4])
-                    # And figure out the newest position for each org
-                    if one_position.organization_we_vote_id in newest_position_for_org:
-                        # If we are here, it means we have seen this organization once already
-                        if one_position.organization_we_vote_id not in organization_with_multiple_positions:
-                            organization_with_multiple_positions.append(one_position.organization_we_vote_id)
-                        # If this position is newer than the one already looked at, update newest_position_for_org
-                        if first_four_digits > newest_position_for_org[one_position.organization_we_vote_id]:
-                            newest_position_for_org[one_position.organization_we_vote_id] = first_four_digits
-                    else:
-                        newest_position_for_org[one_position.organization_we_vote_id] = first_four_digits
+            organization_we_vote_id = one_position.organization_we_vote_id
+            if organization_we_vote_id and positive_value_exists(one_position.vote_smart_time_span):
+                # Take the first four digits of one_position.vote_smart_time_span
+                first_four_digits = convert_to_int(one_position.vote_smart_time_span[:4])
+                if organization_we_vote_id in newest_year_for_org:
+                    organization_with_multiple_positions.add(organization_we_vote_id)
+                    if first_four_digits > newest_year_for_org[organization_we_vote_id]:
+                        newest_year_for_org[organization_we_vote_id] = first_four_digits
+                else:
+                    newest_year_for_org[organization_we_vote_id] = first_four_digits
+
+        if not organization_with_multiple_positions:
+            return list(position_list)
 
         position_list_filtered = []
-        position_included_for_this_org = {}
+        position_included_for_this_org = set()
         for one_position in position_list:
-            if one_position.organization_we_vote_id in organization_with_multiple_positions:
-                if positive_value_exists(one_position.vote_smart_time_span):
-                    first_four_digits = convert_to_int(one_position.vote_smart_time_span[:4])
-                    if (newest_position_for_org[one_position.organization_we_vote_id] == first_four_digits) and \
-                            (one_position.organization_we_vote_id not in position_included_for_this_org):
-                        # If this position is the newest from among the organization's positions, include in results
-                        position_list_filtered.append(one_position)
-                        # Only add one position to position_list_filtered once
-                        position_included_for_this_org[one_position.organization_we_vote_id] = True
+            organization_we_vote_id = one_position.organization_we_vote_id
+            if organization_we_vote_id in organization_with_multiple_positions:
+                if positive_value_exists(one_position.vote_smart_time_span) \
+                        and organization_we_vote_id not in position_included_for_this_org \
+                        and newest_year_for_org[organization_we_vote_id] == \
+                        convert_to_int(one_position.vote_smart_time_span[:4]):
+                    # Only add the newest position for this organization, and only once
+                    position_list_filtered.append(one_position)
+                    position_included_for_this_org.add(organization_we_vote_id)
             else:
                 position_list_filtered.append(one_position)
 
@@ -3926,6 +4121,16 @@ class PositionListManager(models.Manager):
             if type(friends_we_vote_id_list) is list and len(friends_we_vote_id_list) == 0:
                 return 0
 
+        # The tallies are kept per ballot item, so they can only answer when we aren't narrowing to a network
+        if positive_value_exists(candidate_we_vote_id) and type(friends_we_vote_id_list) is not list \
+                and type(organizations_followed_we_vote_id_list) is not list:
+            position_count = PositionTallyManager().fetch_position_tally_count(
+                ballot_item_we_vote_id_list=[candidate_we_vote_id],
+                stance_we_are_looking_for=stance_we_are_looking_for,
+                is_public_position=retrieve_public_positions)
+            if position_count is not None:
+                return position_count
+
         # Retrieve the support positions for this candidate_id
         position_count = 0
         try:
@@ -3962,18 +4167,15 @@ class PositionListManager(models.Manager):
                 position_list_query = position_list_query.filter(stance__iexact=stance_we_are_looking_for)
 
             # Only one of these blocks will be used at a time
-            if friends_we_vote_id_list is not False:
+            if type(friends_we_vote_id_list) is list and len(friends_we_vote_id_list) > 0:
                 # Find positions from friends. Look for we_vote_id case insensitive.
-                we_vote_id_filter = Q()
-                for we_vote_id in friends_we_vote_id_list:
-                    we_vote_id_filter |= Q(voter_we_vote_id=we_vote_id)
-                position_list_query = position_list_query.filter(we_vote_id_filter)
-            if retrieve_public_positions and organizations_followed_we_vote_id_list is not False:
+                position_list_query = filter_by_value_list(
+                    position_list_query, 'voter_we_vote_id', friends_we_vote_id_list)
+            if retrieve_public_positions and type(organizations_followed_we_vote_id_list) is list \
+                    and len(organizations_followed_we_vote_id_list) > 0:
                 # Find positions from organizations voter follows.
-                we_vote_id_filter = Q()
-                for we_vote_id in organizations_followed_we_vote_id_list:
-                    we_vote_id_filter |= Q(organization_we_vote_id=we_vote_id)
-                position_list_query = position_list_query.filter(we_vote_id_filter)
+                position_list_query = filter_by_value_list(
+                    position_list_query, 'organization_we_vote_id', organizations_followed_we_vote_id_list)
 
             # Limit to positions in the last x years - currently we are not limiting
             # position_list = position_list.filter(election_id=election_id)
@@ -4045,6 +4247,13 @@ class PositionListManager(models.Manager):
         for one_candidate in candidate_list:
             candidate_we_vote_id_list.append(one_candidate.we_vote_id)
 
+        position_count = PositionTallyManager().fetch_position_tally_count(
+            ballot_item_we_vote_id_list=candidate_we_vote_id_list,
+            stance_we_are_looking_for=stance_we_are_looking_for,
+            is_public_position=public_or_private != FRIENDS_ONLY)
+        if position_count is not None:
+            return position_count
+
         # As of Aug 2018 we are no longer using PERCENT_RATING
         # position_list_query = position_list_query.exclude(stance__iexact=PERCENT_RATING)
 
@@ -4119,6 +4328,14 @@ class PositionListManager(models.Manager):
         else:
             position_list_query = PositionEntered.objects.using('readonly').all()
 
+        if positive_value_exists(contest_measure_we_vote_id):
+            position_count = PositionTallyManager().fetch_position_tally_count(
+                ballot_item_we_vote_id_list=[contest_measure_we_vote_id],
+                stance_we_are_looking_for=stance_we_are_looking_for,
+                is_public_position=public_or_private != FRIENDS_ONLY)
+            if position_count is not None:
+                return position_count
+
         # As of Aug 2018 we are no longer using PERCENT_RATING
         # position_list_query = position_list_query.exclude(stance__iexact=PERCENT_RATING)
 
@@ -4297,18 +4514,15 @@ class PositionListManager(models.Manager):
                 position_list_query = position_list_query.filter(stance__iexact=stance_we_are_looking_for)
 
             # Only one of these blocks will be used at a time
-            if friends_we_vote_id_list is not False:
+            if type(friends_we_vote_id_list) is list and len(friends_we_vote_id_list) > 0:
                 # Find positions from friends. Look for we_vote_id case insensitive.
-                we_vote_id_filter = Q()
-                for we_vote_id in friends_we_vote_id_list:
-                    we_vote_id_filter |= Q(voter_we_vote_id=we_vote_id)
-                position_list_query = position_list_query.filter(we_vote_id_filter)
-            if retrieve_public_positions and organizations_followed_we_vote_id_list is not False:
+                position_list_query = filter_by_value_list(
+                    position_list_query, 'voter_we_vote_id', friends_we_vote_id_list)
+            if retrieve_public_positions and type(organizations_followed_we_vote_id_list) is list \
+                    and len(organizations_followed_we_vote_id_list) > 0:
                 # Find positions from organizations voter follows.
-                we_vote_id_filter = Q()
-                for we_vote_id in organizations_followed_we_vote_id_list:
-                    we_vote_id_filter |= Q(organization_we_vote_id=we_vote_id)
-                position_list_query = position_list_query.filter(we_vote_id_filter)
+                position_list_query = filter_by_value_list(
+                    position_list_query, 'organization_we_vote_id', organizations_followed_we_vote_id_list)
 
             # Limit to positions in the last x years - currently we are not limiting
             # position_list = position_list.filter(election_id=election_id)
@@ -9208,3 +9422,331 @@ class PositionMetricsManager(models.Manager):
         total_positions_count = position_entered_count + position_for_friends_count
 
         return total_positions_count
+
+
+# position_count of an ANY_STANCE row while seed_position_tallies is counting that ballot item
+POSITION_TALLY_SEEDING = -1
+
+
+class PositionTally(models.Model):
+    """
+    The number of positions for one ballot item (candidate or measure), for one visibility and one stance.
+    Kept up to date by the PositionEntered / PositionForFriends signals at the bottom of this file, so ballot
+    rendering doesn't need to COUNT positions live. The row with stance=ANY_STANCE holds the total for the ballot
+    item and visibility, and marks that ballot item as seeded -- we only adjust tallies for seeded ballot items.
+    Stances are matched case-insensitively, like the live counts, so the stance is stored in upper case.
+    """
+    ballot_item_we_vote_id = models.CharField(max_length=255, null=False, db_index=True)
+    is_public_position = models.BooleanField(default=True)
+    stance = models.CharField(max_length=15, null=False)
+    position_count = models.IntegerField(default=0)
+    date_last_changed = models.DateTimeField(null=True, auto_now=True)
+
+    class Meta:
+        unique_together = ('ballot_item_we_vote_id', 'is_public_position', 'stance')
+
+
+class PositionTallyManager(models.Manager):
+
+    @staticmethod
+    def adjust_position_tally(ballot_item_we_vote_id, is_public_position, stance, change, using='default'):
+        tally_query = PositionTally.objects.using(using).filter(
+            ballot_item_we_vote_id=ballot_item_we_vote_id,
+            is_public_position=is_public_position)
+        number_updated = tally_query.filter(stance=ANY_STANCE).update(position_count=F('position_count') + change)
+        if not number_updated:
+            # Not seeded yet. It will be seeded from a live count the first time it is read.
+            return
+        number_updated = tally_query.filter(stance=stance).update(position_count=F('position_count') + change)
+        if not number_updated:
+            PositionTally.objects.using(using).get_or_create(
+                ballot_item_we_vote_id=ballot_item_we_vote_id,
+                is_public_position=is_public_position,
+                stance=stance)
+            tally_query.filter(stance=stance).update(position_count=F('position_count') + change)
+
+    @staticmethod
+    def count_positions_by_ballot_item_and_stance(
+            is_public_position=True,
+            ballot_item_we_vote_id_list=None,
+            using='default'):
+        """
+        Live counts from PositionEntered or PositionForFriends.
+        :param is_public_position:
+        :param ballot_item_we_vote_id_list: None means every ballot item
+        :param using:
+        :return: {ballot_item_we_vote_id: {stance: count}}
+        """
+        if is_public_position:
+            position_query = PositionEntered.objects.using(using).all()
+        else:
+            position_query = PositionForFriends.objects.using(using).all()
+        if ballot_item_we_vote_id_list is not None:
+            position_query = position_query.filter(
+                generate_value_list_filter('candidate_campaign_we_vote_id', ballot_item_we_vote_id_list) |
+                generate_value_list_filter('contest_measure_we_vote_id', ballot_item_we_vote_id_list))
+        position_query = position_query \
+            .values('candidate_campaign_we_vote_id', 'contest_measure_we_vote_id', 'stance') \
+            .annotate(position_count=Count('id')) \
+            .order_by()
+
+        count_by_ballot_item_and_stance = {}
+        for one_count in position_query:
+            ballot_item_we_vote_id = \
+                one_count['candidate_campaign_we_vote_id'] or one_count['contest_measure_we_vote_id']
+            if not positive_value_exists(ballot_item_we_vote_id):
+                continue
+            if ballot_item_we_vote_id not in count_by_ballot_item_and_stance:
+                count_by_ballot_item_and_stance[ballot_item_we_vote_id] = {}
+            stance = (one_count['stance'] or '').upper()
+            count_by_stance = count_by_ballot_item_and_stance[ballot_item_we_vote_id]
+            count_by_stance[stance] = count_by_stance.get(stance, 0) + one_count['position_count']
+        return count_by_ballot_item_and_stance
+
+    def retrieve_position_tally_counts(self, ballot_item_we_vote_id_list=[], is_public_position=True):
+        """
+        One indexed read of the tally table. Ballot items we haven't seen before are seeded with one grouped
+        COUNT query against the position table.
+        :param ballot_item_we_vote_id_list:
+        :param is_public_position:
+        :return: {ballot_item_we_vote_id: {stance: count, ANY_STANCE: total}}
+        """
+        status = ''
+        success = True
+        count_by_ballot_item_and_stance = {}
+        ballot_item_we_vote_id_list = list(set(ballot_item_we_vote_id_list))
+        try:
+            tally_query = PositionTally.objects.using('readonly').filter(is_public_position=is_public_position)
+            tally_query = filter_by_value_list(tally_query, 'ballot_item_we_vote_id', ballot_item_we_vote_id_list)
+            for position_tally in tally_query.values_list('ballot_item_we_vote_id', 'stance', 'position_count'):
+                ballot_item_we_vote_id, stance, position_count = position_tally
+                if ballot_item_we_vote_id not in count_by_ballot_item_and_stance:
+                    count_by_ballot_item_and_stance[ballot_item_we_vote_id] = {}
+                count_by_ballot_item_and_stance[ballot_item_we_vote_id][stance] = position_count
+
+            ballot_item_we_vote_id_to_seed_list = [
+                ballot_item_we_vote_id for ballot_item_we_vote_id in ballot_item_we_vote_id_list
+                if ANY_STANCE not in count_by_ballot_item_and_stance.get(ballot_item_we_vote_id, {})]
+            if len(ballot_item_we_vote_id_to_seed_list):
+                results = self.seed_position_tallies(
+                    ballot_item_we_vote_id_list=ballot_item_we_vote_id_to_seed_list,
+                    is_public_position=is_public_position)
+                status += results['status']
+                count_by_ballot_item_and_stance.update(results['count_by_ballot_item_and_stance'])
+        except Exception as e:
+            status += "RETRIEVE_POSITION_TALLY_COUNTS_FAILED: " + str(e) + " "
+            success = False
+
+        results = {
+            'success':                          success,
+            'status':                           status,
+            'count_by_ballot_item_and_stance':  count_by_ballot_item_and_stance,
+        }
+        return results
+
+    def seed_position_tallies(self, ballot_item_we_vote_id_list=[], is_public_position=True):
+        """
+        Claim each ballot item by inserting its ANY_STANCE row with position_count POSITION_TALLY_SEEDING, then lock
+        the ANY_STANCE rows and count only the ballot items we claimed. The unique constraint lets only one process
+        seed a ballot item, and adjust_position_tally can't see the row (so doesn't adjust it) until we commit the
+        counts. A position saved between our count and our commit is missed, which rebuild_position_tallies corrects.
+        """
+        status = ''
+        count_by_ballot_item_and_stance = {}
+        with transaction.atomic():
+            PositionTally.objects.bulk_create([
+                PositionTally(
+                    ballot_item_we_vote_id=ballot_item_we_vote_id,
+                    is_public_position=is_public_position,
+                    stance=ANY_STANCE,
+                    position_count=POSITION_TALLY_SEEDING)
+                for ballot_item_we_vote_id in ballot_item_we_vote_id_list], ignore_conflicts=True)
+            seeding_query = PositionTally.objects.select_for_update().filter(
+                is_public_position=is_public_position, stance=ANY_STANCE)
+            seeding_query = filter_by_value_list(seeding_query, 'ballot_item_we_vote_id', ballot_item_we_vote_id_list)
+            position_tally_to_seed_list = [
+                position_tally for position_tally in seeding_query
+                if position_tally.position_count == POSITION_TALLY_SEEDING]
+            ballot_item_we_vote_id_to_seed_list = \
+                [position_tally.ballot_item_we_vote_id for position_tally in position_tally_to_seed_list]
+
+            if len(ballot_item_we_vote_id_to_seed_list):
+                count_by_ballot_item_and_stance = self.count_positions_by_ballot_item_and_stance(
+                    is_public_position=is_public_position,
+                    ballot_item_we_vote_id_list=ballot_item_we_vote_id_to_seed_list)
+            position_tally_list = []
+            for position_tally in position_tally_to_seed_list:
+                count_by_stance = count_by_ballot_item_and_stance.get(position_tally.ballot_item_we_vote_id, {})
+                for stance, position_count in count_by_stance.items():
+                    position_tally_list.append(PositionTally(
+                        ballot_item_we_vote_id=position_tally.ballot_item_we_vote_id,
+                        is_public_position=is_public_position,
+                        stance=stance,
+                        position_count=position_count))
+                count_by_stance[ANY_STANCE] = sum(count_by_stance.values())
+                count_by_ballot_item_and_stance[position_tally.ballot_item_we_vote_id] = count_by_stance
+                position_tally.position_count = count_by_stance[ANY_STANCE]
+            # Replace any stance rows left over from before (ex/ a ballot item whose ANY_STANCE row was deleted)
+            PositionTally.objects.bulk_create(
+                position_tally_list,
+                update_conflicts=True,
+                unique_fields=['ballot_item_we_vote_id', 'is_public_position', 'stance'],
+                update_fields=['position_count'])
+            PositionTally.objects.bulk_update(position_tally_to_seed_list, ['position_count'], batch_size=1000)
+
+            # Seeded by another process while we waited for the lock
+            ballot_item_we_vote_id_seeded_elsewhere_list = [
+                ballot_item_we_vote_id for ballot_item_we_vote_id in ballot_item_we_vote_id_list
+                if ballot_item_we_vote_id not in ballot_item_we_vote_id_to_seed_list]
+            if len(ballot_item_we_vote_id_seeded_elsewhere_list):
+                tally_query = PositionTally.objects.filter(is_public_position=is_public_position)
+                tally_query = filter_by_value_list(
+                    tally_query, 'ballot_item_we_vote_id', ballot_item_we_vote_id_seeded_elsewhere_list)
+                for ballot_item_we_vote_id, stance, position_count in \
+                        tally_query.values_list('ballot_item_we_vote_id', 'stance', 'position_count'):
+                    if ballot_item_we_vote_id not in count_by_ballot_item_and_stance:
+                        count_by_ballot_item_and_stance[ballot_item_we_vote_id] = {}
+                    count_by_ballot_item_and_stance[ballot_item_we_vote_id][stance] = position_count
+        status += "POSITION_TALLIES_SEEDED: " + str(len(ballot_item_we_vote_id_to_seed_list)) + " "
+        return {
+            'success':                          True,
+            'status':                           status,
+            'count_by_ballot_item_and_stance':  count_by_ballot_item_and_stance,
+        }
+
+    def fetch_position_tally_count(
+            self,
+            ballot_item_we_vote_id_list=[],
+            stance_we_are_looking_for=ANY_STANCE,
+            is_public_position=True):
+        """
+        :return: The number of positions across all the ballot items in ballot_item_we_vote_id_list, or None if
+         the tally couldn't be read (so the caller can fall back on a live count)
+        """
+        results = self.retrieve_position_tally_counts(
+            ballot_item_we_vote_id_list=ballot_item_we_vote_id_list,
+            is_public_position=is_public_position)
+        if not results['success']:
+            logger.error("fetch_position_tally_count: " + results['status'])
+            return None
+        position_count = 0
+        for count_by_stance in results['count_by_ballot_item_and_stance'].values():
+            position_count += count_by_stance.get(stance_we_are_looking_for.upper(), 0)
+        return position_count
+
+    def rebuild_position_tallies(self, ballot_item_we_vote_id_list=None):
+        """
+        Recount from the position tables and fix any tallies that have drifted (ex/ from queryset.update() calls,
+        which don't send signals). Ballot items with no tallies yet are left to be seeded when first read.
+        :param ballot_item_we_vote_id_list: None means every ballot item
+        :return:
+        """
+        status = ''
+        success = True
+        position_tallies_corrected = 0
+        position_tallies_checked = 0
+        for is_public_position in (True, False):
+            try:
+                count_by_ballot_item_and_stance = self.count_positions_by_ballot_item_and_stance(
+                    is_public_position=is_public_position,
+                    ballot_item_we_vote_id_list=ballot_item_we_vote_id_list)
+                tally_query = PositionTally.objects.filter(is_public_position=is_public_position)
+                if ballot_item_we_vote_id_list is not None:
+                    tally_query = filter_by_value_list(
+                        tally_query, 'ballot_item_we_vote_id', ballot_item_we_vote_id_list)
+                position_tally_by_ballot_item_and_stance = {}
+                for position_tally in tally_query.iterator():
+                    if position_tally.ballot_item_we_vote_id not in position_tally_by_ballot_item_and_stance:
+                        position_tally_by_ballot_item_and_stance[position_tally.ballot_item_we_vote_id] = {}
+                    position_tally_by_ballot_item_and_stance[position_tally.ballot_item_we_vote_id][
+                        position_tally.stance] = position_tally
+
+                position_tally_to_update_list = []
+                position_tally_to_create_list = []
+                for ballot_item_we_vote_id, position_tally_by_stance in \
+                        position_tally_by_ballot_item_and_stance.items():
+                    if ANY_STANCE not in position_tally_by_stance:
+                        # Never seeded, so never adjusted either
+                        continue
+                    count_by_stance = dict(count_by_ballot_item_and_stance.get(ballot_item_we_vote_id, {}))
+                    count_by_stance[ANY_STANCE] = sum(count_by_stance.values())
+                    for stance in position_tally_by_stance.keys():
+                        if stance not in count_by_stance:
+                            count_by_stance[stance] = 0
+                    for stance, position_count in count_by_stance.items():
+                        position_tallies_checked += 1
+                        position_tally = position_tally_by_stance.get(stance)
+                        if position_tally is None:
+                            position_tally_to_create_list.append(PositionTally(
+                                ballot_item_we_vote_id=ballot_item_we_vote_id,
+                                is_public_position=is_public_position,
+                                stance=stance,
+                                position_count=position_count))
+                        elif position_tally.position_count != position_count:
+                            position_tally.position_count = position_count
+                            position_tally_to_update_list.append(position_tally)
+                PositionTally.objects.bulk_update(position_tally_to_update_list, ['position_count'], batch_size=1000)
+                PositionTally.objects.bulk_create(position_tally_to_create_list, ignore_conflicts=True)
+                position_tallies_corrected += len(position_tally_to_update_list) + len(position_tally_to_create_list)
+            except Exception as e:
+                status += "REBUILD_POSITION_TALLIES_FAILED: " + str(e) + " "
+                success = False
+
+        status += "POSITION_TALLIES_CHECKED: " + str(position_tallies_checked) + \
+            " POSITION_TALLIES_CORRECTED: " + str(position_tallies_corrected) + " "
+        results = {
+            'success':                      success,
+            'status':                       status,
+            'position_tallies_checked':     position_tallies_checked,
+            'position_tallies_corrected':   position_tallies_corrected,
+        }
+        return results
+
+
+def generate_position_tally_key(position_field_dict):
+    # Read from the instance __dict__, so we never trigger a query for a deferred field
+    ballot_item_we_vote_id = position_field_dict.get('candidate_campaign_we_vote_id') \
+        or position_field_dict.get('contest_measure_we_vote_id')
+    if not positive_value_exists(ballot_item_we_vote_id) or 'stance' not in position_field_dict:
+        return None
+    return ballot_item_we_vote_id, (position_field_dict.get('stance') or '').upper()
+
+
+def update_position_tallies(sender, old_position_tally_key, new_position_tally_key, using):
+    if old_position_tally_key == new_position_tally_key:
+        return
+    is_public_position = sender is PositionEntered
+    position_tally_manager = PositionTallyManager()
+    try:
+        if old_position_tally_key is not None:
+            position_tally_manager.adjust_position_tally(
+                old_position_tally_key[0], is_public_position, old_position_tally_key[1], -1, using=using)
+        if new_position_tally_key is not None:
+            position_tally_manager.adjust_position_tally(
+                new_position_tally_key[0], is_public_position, new_position_tally_key[1], 1, using=using)
+    except Exception as e:
+        # Never block saving a position. rebuild_position_tallies will correct the drift.
+        logger.error("update_position_tallies failed: " + str(e))
+
+
+@receiver(post_init, sender=PositionEntered)
+@receiver(post_init, sender=PositionForFriends)
+def remember_position_tally_key_signal(sender, instance, **kwargs):
+    instance._position_tally_key = generate_position_tally_key(instance.__dict__)
+
+
+@receiver(post_save, sender=PositionEntered)
+@receiver(post_save, sender=PositionForFriends)
+def save_position_tally_signal(sender, instance, created, using, **kwargs):
+    new_position_tally_key = generate_position_tally_key(instance.__dict__)
+    old_position_tally_key = None if created else getattr(instance, '_position_tally_key', None)
+    update_position_tallies(sender, old_position_tally_key, new_position_tally_key, using)
+    instance._position_tally_key = new_position_tally_key
+
+
+@receiver(post_delete, sender=PositionEntered)
+@receiver(post_delete, sender=PositionForFriends)
+def delete_position_tally_signal(sender, instance, using, **kwargs):
+    old_position_tally_key = getattr(instance, '_position_tally_key', None) \
+        or generate_position_tally_key(instance.__dict__)
+    update_position_tallies(sender, old_position_tally_key, None, using)
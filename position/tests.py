@@ -0,0 +1,140 @@
+# position/tests.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from unittest import mock
+from django.test import SimpleTestCase, TransactionTestCase
+from candidate.models import CandidateCampaign, CandidateToOfficeLink
+from .models import ANY_STANCE, generate_position_tally_key, save_position_tally_signal, OPPOSE, PositionEntered, \
+    PositionListManager, PositionRecord, PositionTally, PositionTallyManager, PERCENT_RATING, SUPPORT
+
+
+def generate_position_record(position_id, organization_we_vote_id, vote_smart_time_span=None, stance=SUPPORT):
+    return PositionRecord({
+        'id':                       position_id,
+        'organization_we_vote_id':  organization_we_vote_id,
+        'vote_smart_time_span':     vote_smart_time_span,
+        'stance':                   stance,
+    })
+
+
+class PositionListManagerTests(SimpleTestCase):
+
+    def test_remove_older_positions_for_each_org(self):
+        position_list = [
+            generate_position_record(1, 'wv02org1', '2016'),
+            generate_position_record(2, 'wv02org1', '2018-2019'),
+            generate_position_record(3, 'wv02org1'),  # Dropped, since wv02org1 has time span positions
+            generate_position_record(4, 'wv02org1', '2018'),  # Same year as #2, which came first
+            generate_position_record(5, 'wv02org2', '2014'),  # Only one position for this org
+            generate_position_record(6, 'wv02org3'),
+            generate_position_record(7, 'wv02org3'),
+            generate_position_record(8, None, '2012'),
+        ]
+        position_list_filtered = PositionListManager.remove_older_positions_for_each_org(position_list)
+        self.assertEqual([one_position.id for one_position in position_list_filtered], [2, 5, 6, 7, 8])
+
+    def test_remove_older_positions_for_each_org_is_linear(self):
+        # 20,000 orgs with two time spans each would take minutes with list membership tests
+        position_list = []
+        for organization_number in range(20000):
+            organization_we_vote_id = 'wv02org' + str(organization_number)
+            position_list.append(generate_position_record(organization_number * 2, organization_we_vote_id, '2016'))
+            position_list.append(generate_position_record(organization_number * 2 + 1, organization_we_vote_id, '2020'))
+        position_list_filtered = PositionListManager.remove_older_positions_for_each_org(position_list)
+        self.assertEqual(len(position_list_filtered), 20000)
+        self.assertTrue(all(one_position.vote_smart_time_span == '2020' for one_position in position_list_filtered))
+
+    def test_position_record_ratings(self):
+        position = PositionRecord({'stance': PERCENT_RATING, 'vote_smart_rating': '80'})
+        self.assertTrue(position.is_positive_rating())
+        self.assertFalse(position.is_negative_rating())
+        self.assertIsNone(position.voter_id)
+
+
+class PositionListForBallotItemListTests(TransactionTestCase):
+    # TransactionTestCase, so the candidate lookups, from readonly, see the rows saved here
+    databases = ["default", "readonly"]
+
+    def test_office_positions_leave_out_hidden_candidates(self):
+        for candidate_we_vote_id, do_not_display_on_ballot in [('wv01cand1', False), ('wv01cand2', True)]:
+            CandidateCampaign.objects.create(we_vote_id=candidate_we_vote_id,
+                                             do_not_display_on_ballot=do_not_display_on_ballot)
+            CandidateToOfficeLink.objects.create(candidate_we_vote_id=candidate_we_vote_id,
+                                                 contest_office_we_vote_id='wv01off1', google_civic_election_id=1)
+            PositionEntered.objects.create(we_vote_id='wv01pos' + candidate_we_vote_id[-1],
+                                           candidate_campaign_we_vote_id=candidate_we_vote_id,
+                                           organization_we_vote_id='wv01org1', stance=SUPPORT)
+
+        results = PositionListManager().retrieve_all_positions_for_ballot_item_we_vote_id_list(
+            ballot_item_we_vote_id_list=['wv01off1', 'wv01cand2'], read_only=True)
+        self.assertTrue(results['success'], results['status'])
+        position_list_by_ballot_item_we_vote_id = results['position_list_by_ballot_item_we_vote_id']
+        self.assertEqual([position.we_vote_id for position in position_list_by_ballot_item_we_vote_id['wv01off1']],
+                         ['wv01pos1'])
+        # Asked for by itself, a hidden candidate's positions still come back, like retrieve_all_positions_for_candidate
+        self.assertEqual([position.we_vote_id for position in position_list_by_ballot_item_we_vote_id['wv01cand2']],
+                         ['wv01pos2'])
+
+
+class PositionTallyTests(SimpleTestCase):
+
+    def test_generate_position_tally_key(self):
+        self.assertEqual(
+            generate_position_tally_key({'candidate_campaign_we_vote_id': 'wv02cand1', 'stance': SUPPORT}),
+            ('wv02cand1', SUPPORT))
+        self.assertEqual(
+            generate_position_tally_key({'contest_measure_we_vote_id': 'wv02meas1', 'stance': OPPOSE}),
+            ('wv02meas1', OPPOSE))
+        self.assertIsNone(generate_position_tally_key({'candidate_campaign_we_vote_id': '', 'stance': SUPPORT}))
+        # Deferred stance field: don't guess
+        self.assertIsNone(generate_position_tally_key({'candidate_campaign_we_vote_id': 'wv02cand1'}))
+
+    def test_stance_change_moves_one_position_between_tallies(self):
+        position = PositionEntered(candidate_campaign_we_vote_id='wv02cand1', stance=SUPPORT)
+        position.stance = OPPOSE
+        with mock.patch.object(PositionTallyManager, 'adjust_position_tally') as adjust_position_tally:
+            save_position_tally_signal(PositionEntered, position, created=False, using='default')
+            # Saving again without a change doesn't touch the tallies
+            save_position_tally_signal(PositionEntered, position, created=False, using='default')
+        self.assertEqual(adjust_position_tally.call_args_list, [
+            mock.call('wv02cand1', True, SUPPORT, -1, using='default'),
+            mock.call('wv02cand1', True, OPPOSE, 1, using='default'),
+        ])
+
+
+class PositionTallySeedingTests(TransactionTestCase):
+    # TransactionTestCase, so the tally reads, from readonly, see the rows saved here
+    databases = ["default", "readonly"]
+
+    def test_stance_matched_case_insensitively(self):
+        PositionEntered.objects.create(we_vote_id='wv02pos1', candidate_campaign_we_vote_id='wv02cand1',
+                                       organization_we_vote_id='wv02org1', stance='support')
+        PositionEntered.objects.create(we_vote_id='wv02pos2', candidate_campaign_we_vote_id='wv02cand1',
+                                       organization_we_vote_id='wv02org2', stance=SUPPORT)
+        position_tally_manager = PositionTallyManager()
+        self.assertEqual(position_tally_manager.fetch_position_tally_count(
+            ballot_item_we_vote_id_list=['wv02cand1'], stance_we_are_looking_for=SUPPORT), 2)
+
+        # Now seeded, so this one is counted by the post_save signal
+        PositionEntered.objects.create(we_vote_id='wv02pos3', candidate_campaign_we_vote_id='wv02cand1',
+                                       organization_we_vote_id='wv02org3', stance='Oppose')
+        self.assertEqual(position_tally_manager.fetch_position_tally_count(
+            ballot_item_we_vote_id_list=['wv02cand1'], stance_we_are_looking_for=OPPOSE), 1)
+        self.assertEqual(position_tally_manager.fetch_position_tally_count(
+            ballot_item_we_vote_id_list=['wv02cand1'], stance_we_are_looking_for=ANY_STANCE), 3)
+
+    def test_ballot_item_seeded_by_another_process_not_recounted(self):
+        PositionEntered.objects.create(we_vote_id='wv02pos1', candidate_campaign_we_vote_id='wv02cand1',
+                                       organization_we_vote_id='wv02org1', stance=SUPPORT)
+        # Another process seeded wv02cand1, and adjusted its tallies since
+        PositionTally.objects.create(ballot_item_we_vote_id='wv02cand1', stance=ANY_STANCE, position_count=2)
+        PositionTally.objects.create(ballot_item_we_vote_id='wv02cand1', stance=SUPPORT, position_count=2)
+
+        results = PositionTallyManager().seed_position_tallies(ballot_item_we_vote_id_list=['wv02cand1', 'wv02cand2'])
+        self.assertIn('POSITION_TALLIES_SEEDED: 1 ', results['status'])
+        self.assertEqual(results['count_by_ballot_item_and_stance'], {
+            'wv02cand1': {ANY_STANCE: 2, SUPPORT: 2},
+            'wv02cand2': {ANY_STANCE: 0},
+        })
+        self.assertEqual(PositionTally.objects.get(ballot_item_we_vote_id='wv02cand2').position_count, 0)
@@ -14,16 +14,25 @@ from politician.models import PoliticianManager
 from wevote_settings.constants import IS_BATTLEGROUND_YEARS_AVAILABLE
 import wevote_functions.admin
 from wevote_functions.functions import add_period_to_middle_name_initial, add_period_to_name_prefix_and_suffix, \
-    convert_to_int, convert_to_political_party_constant, positive_value_exists, process_request_from_master, \
-    remove_period_from_middle_name_initial, remove_period_from_name_prefix_and_suffix
+    convert_to_int, convert_to_political_party_constant, extract_first_name_from_full_name, \
+    extract_last_name_from_full_name, extract_twitter_handle_from_text_string, positive_value_exists, \
+    process_request_from_master, remove_period_from_middle_name_initial, remove_period_from_name_prefix_and_suffix
 from wevote_functions.functions_date import DATE_FORMAT_YMD_HMS
-from .models import Representative, RepresentativeManager, REPRESENTATIVE_UNIQUE_IDENTIFIERS
+from wevote_functions.functions_duplicates import find_duplicates_in_list, normalize_duplicate_key_text
+from .models import Representative, RepresentativeManager, RepresentativesAreNotDuplicates, \
+    REPRESENTATIVE_UNIQUE_IDENTIFIERS
 
 logger = wevote_functions.admin.get_logger(__name__)
 
 REPRESENTATIVE_SYNC_URL = "https://api.wevoteusa.org/apis/v1/representativesSyncOut/"
 # REPRESENTATIVE_SYNC_URL = "http://localhost:8001/apis/v1/representativesSyncOut/"
 WE_VOTE_API_KEY = get_environment_variable("WE_VOTE_API_KEY")
+# How much each kind of shared blocking key counts, when ranking possible duplicate representatives
+REPRESENTATIVE_DUPLICATE_KEY_WEIGHTS = {
+    'twitter':      10,
+    'name':         5,
+    'last_first':   3,
+}
 
 
 def add_value_to_next_representative_spot(
@@ -242,6 +251,48 @@ def fetch_duplicate_representative_count(
         ignore_representative_we_vote_id_list=ignore_representative_we_vote_id_list)
 
 
+def generate_representative_duplicate_blocking_keys(representative):
+    """
+    The blocking keys find_duplicate_representatives_in_list files a representative under. Like
+    retrieve_representatives_from_non_unique_identifiers, these only match within one state and OCD division.
+    """
+    state_code = (representative.state_code or '').lower()
+    ocd_division_id = representative.ocd_division_id or ''
+    blocking_key_list = []
+    for twitter_handle in [
+            representative.representative_twitter_handle, representative.representative_twitter_handle2,
+            representative.representative_twitter_handle3]:
+        if positive_value_exists(twitter_handle):
+            twitter_handle_cleaned = extract_twitter_handle_from_text_string(twitter_handle)
+            if positive_value_exists(twitter_handle_cleaned):
+                blocking_key_list.append(('twitter', state_code, ocd_division_id, twitter_handle_cleaned.lower()))
+    if positive_value_exists(representative.representative_name):
+        blocking_key_list.append(
+            ('name', state_code, ocd_division_id, normalize_duplicate_key_text(representative.representative_name)))
+        first_name = extract_first_name_from_full_name(representative.representative_name)
+        last_name = extract_last_name_from_full_name(representative.representative_name)
+        if positive_value_exists(first_name) and positive_value_exists(last_name):
+            blocking_key_list.append((
+                'last_first', state_code, ocd_division_id,
+                normalize_duplicate_key_text(last_name), normalize_duplicate_key_text(first_name)))
+    return blocking_key_list
+
+
+def find_duplicate_representatives_in_list(representative_list, read_only=True):
+    """
+    Pair up possible duplicates among representative_list (ex/ every representative in one state) in memory,
+    instead of calling find_duplicate_representative for each one. Pairs already marked
+    RepresentativesAreNotDuplicates are skipped, and each representative is in at most one pair, its best one.
+    :param representative_list:
+    :param read_only:
+    :return: results dict. duplicate_pair_list holds dicts with representative1, representative2, score and
+      matched_key_kind_list.
+    """
+    return find_duplicates_in_list(
+        representative_list, REPRESENTATIVE_DUPLICATE_KEY_WEIGHTS, generate_representative_duplicate_blocking_keys,
+        RepresentativesAreNotDuplicates, 'representative', read_only=positive_value_exists(read_only))
+
+
 def figure_out_representative_conflict_values(representative1, representative2):
     representative_merge_conflict_values = {}
 
@@ -2,8 +2,8 @@
 # Brought to you by We Vote. Be good.
 # -*- coding: UTF-8 -*-
 
-from .controllers import fetch_duplicate_representative_count, figure_out_representative_conflict_values, \
-    find_duplicate_representative, merge_if_duplicate_representatives, merge_these_two_representatives, \
+from .controllers import figure_out_representative_conflict_values, find_duplicate_representative, \
+    find_duplicate_representatives_in_list, merge_if_duplicate_representatives, merge_these_two_representatives, \
     representative_politician_match, update_representative_details_from_politician
 from .models import attach_defaults_values_to_representative_object, Representative, RepresentativeManager, \
     REPRESENTATIVE_UNIQUE_IDENTIFIERS
@@ -109,7 +109,6 @@ def find_and_merge_duplicate_representatives_view(request):
     google_civic_election_id = request.GET.get('google_civic_election_id', 0)
     google_civic_election_id = convert_to_int(google_civic_election_id)
     state_code = request.GET.get('state_code', "")
-    representative_manager = RepresentativeManager()
 
     representative_list = []
     try:
@@ -119,72 +118,53 @@ def find_and_merge_duplicate_representatives_view(request):
     except Exception as e:
         status += "REPRESENTATIVE_QUERY_FAILED: " + str(e) + " "
 
-    # Loop through all the representatives in this election to see how many have possible duplicates
+    # Pair up possible duplicates across the whole state at once
+    results = find_duplicate_representatives_in_list(representative_list, read_only=True)
+    status += results['status']
     if positive_value_exists(find_number_of_duplicates):
-        ignore_representative_we_vote_id_list = []
-        duplicate_representative_count = 0
-        for we_vote_representative in representative_list:
-            # Note that we don't reset the ignore_representative_list. We don't search for a duplicate both directions
-            ignore_representative_we_vote_id_list.append(we_vote_representative.we_vote_id)
-            duplicate_representative_count_temp = \
-                fetch_duplicate_representative_count(we_vote_representative, ignore_representative_we_vote_id_list)
-            duplicate_representative_count += duplicate_representative_count_temp
-
+        duplicate_representative_count = len(results['duplicate_pair_list'])
         if positive_value_exists(duplicate_representative_count):
             messages.add_message(request, messages.INFO,
                                  "There are approximately {duplicate_representative_count} possible duplicates."
                                  "".format(duplicate_representative_count=duplicate_representative_count))
 
-    # Loop through all the representatives in this year or election
-    ignore_representative_we_vote_id_list = []
-    for we_vote_representative in representative_list:
-        # Add current representative entry to ignore list
-        ignore_representative_we_vote_id_list.append(we_vote_representative.we_vote_id)
-        # Now check to for other representatives we have labeled as "not a duplicate"
-        not_a_duplicate_list = representative_manager.fetch_representatives_are_not_duplicates_list_we_vote_ids(
-            we_vote_representative.we_vote_id)
-
-        ignore_representative_we_vote_id_list += not_a_duplicate_list
-
-        results = find_duplicate_representative(
-            we_vote_representative, ignore_representative_we_vote_id_list, read_only=True)
-        ignore_representative_we_vote_id_list = []
-
+    for duplicate_pair in results['duplicate_pair_list']:
         # If we find representatives to merge, stop and ask for confirmation (if we need to)
-        if results['representative_merge_possibility_found']:
-            representative_option1_for_template = we_vote_representative
-            representative_option2_for_template = results['representative_merge_possibility']
+        representative_option1_for_template = duplicate_pair['representative1']
+        representative_option2_for_template = duplicate_pair['representative2']
+        representative_merge_conflict_values = figure_out_representative_conflict_values(
+            representative_option1_for_template, representative_option2_for_template)
 
-            # Can we automatically merge these representatives?
-            merge_results = merge_if_duplicate_representatives(
+        # Can we automatically merge these representatives?
+        merge_results = merge_if_duplicate_representatives(
+            representative_option1_for_template,
+            representative_option2_for_template,
+            representative_merge_conflict_values)
+
+        if not merge_results['success']:
+            status += merge_results['status']
+            messages.add_message(request, messages.ERROR, status)
+            return HttpResponseRedirect(reverse('representative:representative_list', args=()) +
+                                        "?google_civic_election_id={google_civic_election_id}"
+                                        "&state_code={state_code}"
+                                        "".format(
+                                            google_civic_election_id=google_civic_election_id,
+                                            state_code=state_code))
+
+        elif merge_results['representatives_merged']:
+            representative = merge_results['representative']
+            messages.add_message(request, messages.INFO,
+                                 "Representative {representative_name} automatically merged."
+                                 "".format(representative_name=representative.representative_name))
+        else:
+            messages.add_message(request, messages.INFO, merge_results['status'])
+            remove_duplicate_process = True  # Try to find another representative to merge after finishing
+            return render_representative_merge_form(
+                request,
                 representative_option1_for_template,
                 representative_option2_for_template,
-                results['representative_merge_conflict_values'])
-
-            if not merge_results['success']:
-                status += merge_results['status']
-                messages.add_message(request, messages.ERROR, status)
-                return HttpResponseRedirect(reverse('representative:representative_list', args=()) +
-                                            "?google_civic_election_id={google_civic_election_id}"
-                                            "&state_code={state_code}"
-                                            "".format(
-                                                google_civic_election_id=google_civic_election_id,
-                                                state_code=state_code))
-
-            elif merge_results['representatives_merged']:
-                representative = merge_results['representative']
-                messages.add_message(request, messages.INFO,
-                                     "Representative {representative_name} automatically merged."
-                                     "".format(representative_name=representative.representative_name))
-            else:
-                messages.add_message(request, messages.INFO, merge_results['status'])
-                remove_duplicate_process = True  # Try to find another representative to merge after finishing
-                return render_representative_merge_form(
-                    request,
-                    representative_option1_for_template,
-                    representative_option2_for_template,
-                    results['representative_merge_conflict_values'],
-                    remove_duplicate_process=remove_duplicate_process)
+                representative_merge_conflict_values,
+                remove_duplicate_process=remove_duplicate_process)
 
     if positive_value_exists(state_code):
         message = "No more duplicate representatives found"
@@ -2,9 +2,11 @@
 # Brought to you by We Vote. Be good.
 # -*- coding: UTF-8 -*-
 
+import csv
 import json
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 
 import numpy as np
@@ -16,9 +18,10 @@ from django.http import HttpResponse
 from sqlalchemy.engine.reflection import Inspector
 
 import wevote_functions.admin
-from config.base import get_environment_variable
+from config.base import get_environment_variable, get_environment_variable_default
 from retrieve_tables.controllers_master import allowable_tables
-from wevote_functions.functions import get_voter_api_device_id
+from wevote_functions.functions import convert_to_int, get_voter_api_device_id, positive_value_exists
+from wevote_functions.functions_http import http_get
 
 logger = wevote_functions.admin.get_logger(__name__)
 
@@ -26,6 +29,8 @@ logger = wevote_functions.admin.get_logger(__name__)
 
 dummy_unique_id = 10000000
 LOCAL_TMP_PATH = '/tmp/'
+FAST_LOAD_WORKERS = int(get_environment_variable_default("FAST_LOAD_WORKERS", 4))
+FAST_LOAD_PROGRESS_EVERY_N_LINES = 50000
 
 
 def save_off_database():
@@ -45,7 +50,7 @@ def update_fast_load_db(host, voter_api_device_id, table_name, additional_record
     :return:
     """
     try:
-       response = requests.get(host + '/apis/v1/fastLoadStatusUpdate/',
+       response = http_get(host + '/apis/v1/fastLoadStatusUpdate/',
                      verify=True,
                      params={'table_name': table_name,
                              'additional_records': additional_records,
@@ -87,7 +92,8 @@ def fetch_data_from_api(url, params, max_retries=10):
     for attempt in range(max_retries):
         # print(f'Attempt {attempt} of {max_retries} attempts to fetch data from api')
         try:
-            response = requests.get(url, params=params, verify=True, timeout=5)
+            # We retry here, so the session doesn't retry each of our attempts too
+            response = http_get(url, params=params, verify=True, timeout=5, retries=0)
             if response.status_code == 200:
                 return response.json()
             else:
@@ -109,7 +115,7 @@ def get_max_id(params):
     """
     host = 'https://api.wevoteusa.org'
     try:
-        response = requests.get(host + '/apis/v1/retrieveMaxID', params=params)
+        response = http_get(host + '/apis/v1/retrieveMaxID', params=params)
         if response.status_code == 200:
             return response.json()
         else:
@@ -123,6 +129,9 @@ def retrieve_sql_files_from_master_server(request):
     """
     Get the json data, and create new entries in the developers local database
     Runs on the Local server (developer's Mac)
+    By default each table is streamed from retrieveSQLTablesStream straight into COPY FROM STDIN, with
+    FAST_LOAD_WORKERS tables loading at once. Pass streaming=false to use the older 10,000 row json chunks. A
+    table also falls back to chunks if streaming it fails, or if the master has columns our local table doesn't.
     :return:
     """
     t0 = time.time()
@@ -136,63 +145,199 @@ def retrieve_sql_files_from_master_server(request):
     print('Saved off local database in ' + str(int(dt)) + ' seconds \n')
     stats |= {'save_off': str(int(dt))}
 
+    streaming = positive_value_exists(request.GET.get('streaming', True))
+    number_of_workers = convert_to_int(request.GET.get('workers', FAST_LOAD_WORKERS)) or 1
+
     # ONLY CHANGE host to 'wevotedeveloper.com' while debugging the fast load code, where Master and Client are the same
     # host = 'https://wevotedeveloper.com:8000'
     host = 'https://api.wevoteusa.org'
     voter_api_device_id = get_voter_api_device_id(request)
-    requests.get(host + '/apis/v1/fastLoadStatusRetrieve',
-                 params={"initialize": True, "voter_api_device_id": voter_api_device_id}, verify=True)
+    http_get(host + '/apis/v1/fastLoadStatusRetrieve',
+             params={"initialize": True, "voter_api_device_id": voter_api_device_id}, verify=True)
+
+    # Clear every table before loading any of them, since TRUNCATE ... CASCADE on one table can empty another
     for table_name in allowable_tables:
-        print(f"{table_name.upper()}\n--------------------")
         truncate_table(engine, table_name)
 
-        max_id_params = {'table_name': table_name}
-        max_id_response = get_max_id(max_id_params)
-        max_id = max_id_response['maxID']
-        chunk_size = 10000
-        start = 0
-        end = chunk_size - 1
-        structured_json = {}
-        table_start_time = time.time()
-        # filling table with 10,000 line chunks
-        if max_id and max_id != -1:
-            while end - chunk_size < max_id:
-                print(f"{table_name}:   {((start / max_id) * 100):.0f}% -- Chunk {start} to {end} of {max_id} rows")
-                try:
-                    url = f'{host}/apis/v1/retrieveSQLTables/'
-                    params = {'table_name': table_name, 'start': start, 'end': end,
-                              'voter_api_device_id': voter_api_device_id}
-
-                    structured_json = fetch_data_from_api(url, params)
-                except Exception as e:
-                    print(f"FETCH_ERROR: {table_name} -- {str(e)}")
-
-                if not structured_json['success']:
-                    print(f"FAILED: Did not receive '{table_name}' from server")
-                    break
+    if streaming:
+        with ThreadPoolExecutor(max_workers=number_of_workers) as executor:
+            futures = [executor.submit(retrieve_one_table_from_master_server, engine, host, voter_api_device_id,
+                                       table_name)
+                       for table_name in allowable_tables]
+            for future in as_completed(futures):
                 try:
-                    data = structured_json['files'].get(table_name, "")
-                    split_data = data.splitlines(keepends=True)
-                    update_fast_load_db(host, voter_api_device_id, table_name, len(split_data))
-                    lines_count = process_table_data(table_name, split_data)
-                    # print(f'{lines_count} lines in chunk')
+                    future.result()
                 except Exception as e:
-                    print(f"TABLE_PROCESSING_ERROR: {table_name} -- {str(e)}")
-                start += chunk_size
-                end += chunk_size
+                    print(f"TABLE_RETRIEVE_ERROR: {str(e)}")
+    else:
+        for table_name in allowable_tables:
+            retrieve_one_table_from_master_server_in_chunks(engine, host, voter_api_device_id, table_name)
 
-            print(f'Table {table_name} took {((time.time() - table_start_time) / 60):.1f} min\n')
-
-            # reset table's id sequence
-            reset_id_seq(engine, table_name)
-        else:
-            print(f"{table_name} is empty\n")
     minutes = (time.time() - t0) / 60
     print(f"Total time for all tables: {minutes:.1f} minutes")
     results = {'status': 'Completed', 'status_code': 200}
     return HttpResponse(json.dumps(results), content_type='application/json')
 
 
+def retrieve_one_table_from_master_server(engine, host, voter_api_device_id, table_name):
+    """
+    Stream one table, and fall back to json chunks if that doesn't work
+    """
+    table_start_time = time.time()
+    results = stream_table_from_master_server(engine, host, voter_api_device_id, table_name)
+    if results['success']:
+        print(f"{table_name}: streamed {results['rows_loaded']} rows in "
+              f"{((time.time() - table_start_time) / 60):.1f} min")
+        reset_id_seq(engine, table_name)
+    else:
+        # The failed COPY was rolled back, so the table is still empty
+        print(f"{table_name}: STREAMING_FAILED, retrieving in chunks -- {results['status']}")
+        retrieve_one_table_from_master_server_in_chunks(engine, host, voter_api_device_id, table_name)
+
+
+def retrieve_one_table_from_master_server_in_chunks(engine, host, voter_api_device_id, table_name):
+    print(f"{table_name.upper()}\n--------------------")
+    max_id_params = {'table_name': table_name}
+    max_id_response = get_max_id(max_id_params)
+    max_id = max_id_response['maxID']
+    chunk_size = 10000
+    start = 0
+    end = chunk_size - 1
+    structured_json = {}
+    table_start_time = time.time()
+    # filling table with 10,000 line chunks
+    if max_id and max_id != -1:
+        while end - chunk_size < max_id:
+            print(f"{table_name}:   {((start / max_id) * 100):.0f}% -- Chunk {start} to {end} of {max_id} rows")
+            try:
+                url = f'{host}/apis/v1/retrieveSQLTables/'
+                params = {'table_name': table_name, 'start': start, 'end': end,
+                          'voter_api_device_id': voter_api_device_id}
+
+                structured_json = fetch_data_from_api(url, params)
+            except Exception as e:
+                print(f"FETCH_ERROR: {table_name} -- {str(e)}")
+
+            if not structured_json['success']:
+                print(f"FAILED: Did not receive '{table_name}' from server")
+                break
+            try:
+                data = structured_json['files'].get(table_name, "")
+                split_data = data.splitlines(keepends=True)
+                update_fast_load_db(host, voter_api_device_id, table_name, len(split_data))
+                lines_count = process_table_data(table_name, split_data)
+                # print(f'{lines_count} lines in chunk')
+            except Exception as e:
+                print(f"TABLE_PROCESSING_ERROR: {table_name} -- {str(e)}")
+            start += chunk_size
+            end += chunk_size
+
+        print(f'Table {table_name} took {((time.time() - table_start_time) / 60):.1f} min\n')
+
+        # reset table's id sequence
+        reset_id_seq(engine, table_name)
+    else:
+        print(f"{table_name} is empty\n")
+
+
+class FastLoadStreamReader(object):
+    """
+    Wraps the decompressed body of a retrieveSQLTablesStream response so psycopg2's copy_expert can read from it
+    directly. Counts lines as they go by, and reports progress to the fast load status page now and then.
+    """
+
+    def __init__(self, raw_response, host='', voter_api_device_id='', table_name='',
+                 progress_every_n_lines=FAST_LOAD_PROGRESS_EVERY_N_LINES):
+        self.raw_response = raw_response
+        self.host = host
+        self.voter_api_device_id = voter_api_device_id
+        self.table_name = table_name
+        self.progress_every_n_lines = progress_every_n_lines
+        self.lines_read = 0
+        self.lines_not_yet_reported = 0
+
+    def readline(self):
+        return self.raw_response.readline()
+
+    def read(self, size=-1):
+        data = self.raw_response.read(size)
+        if data:
+            line_count = data.count(b'\n')
+            self.lines_read += line_count
+            self.lines_not_yet_reported += line_count
+            if self.lines_not_yet_reported >= self.progress_every_n_lines:
+                self.report_progress()
+        return data
+
+    def report_progress(self):
+        if self.lines_not_yet_reported and positive_value_exists(self.host):
+            update_fast_load_db(self.host, self.voter_api_device_id, self.table_name, self.lines_not_yet_reported)
+        self.lines_not_yet_reported = 0
+
+
+def stream_table_from_master_server(engine, host, voter_api_device_id, table_name):
+    """
+    Pipe the gzipped CSV from retrieveSQLTablesStream into COPY FROM STDIN. The only copy of the data held in
+    memory is the block copy_expert is currently sending to Postgres.
+    :return: results dict, with rows_loaded
+    """
+    status = ''
+    success = False
+    rows_loaded = 0
+    url = f'{host}/apis/v1/retrieveSQLTablesStream/'
+    params = {'table_name': table_name, 'voter_api_device_id': voter_api_device_id}
+    try:
+        with http_get(url, params=params, stream=True, verify=True, timeout=(10, 600)) as response:
+            if response.status_code != 200:
+                status += "STREAM_HTTP_STATUS_" + str(response.status_code) + " "
+                return {'success': False, 'status': status, 'rows_loaded': 0}
+            response.raw.decode_content = True
+            stream_reader = FastLoadStreamReader(
+                response.raw, host=host, voter_api_device_id=voter_api_device_id, table_name=table_name)
+
+            # We read the header ourselves, so we can name the columns in the COPY, and detect schema drift
+            header_line = stream_reader.readline().decode('utf-8').strip()
+            if not positive_value_exists(header_line):
+                return {'success': True, 'status': "STREAM_EMPTY_TABLE ", 'rows_loaded': 0}
+            header_column_names = next(csv.reader([header_line], delimiter='|'))
+            local_column_names = [col['name'] for col in Inspector.from_engine(engine).get_columns(table_name)]
+            missing_column_names = [name for name in header_column_names if name not in local_column_names]
+            if missing_column_names:
+                status += "STREAM_COLUMNS_NOT_IN_LOCAL_TABLE: " + ", ".join(missing_column_names) + " "
+                return {'success': False, 'status': status, 'rows_loaded': 0}
+
+            column_list = ", ".join('"' + name + '"' for name in header_column_names)
+            sql = f"COPY {table_name} ({column_list}) FROM STDIN WITH DELIMITER '|' CSV NULL '\\N'"
+            dbapi_conn = engine.raw_connection()
+            try:
+                with dbapi_conn.cursor() as cursor:
+                    try:
+                        # Tables load in parallel, so a row can arrive before the row its foreign key points to.
+                        #  SET LOCAL only lasts until commit, so this pooled connection goes back unchanged.
+                        cursor.execute("SET LOCAL session_replication_role = replica")
+                    except Exception as e:
+                        dbapi_conn.rollback()
+                        status += "COULD_NOT_DEFER_FOREIGN_KEYS: " + str(e) + " "
+                    cursor.copy_expert(sql, stream_reader, size=65536)
+                    rows_loaded = cursor.rowcount if cursor.rowcount >= 0 else stream_reader.lines_read
+                dbapi_conn.commit()
+                success = True
+            except Exception as e:
+                dbapi_conn.rollback()
+                status += "STREAM_COPY_FAILED: " + str(e) + " "
+            finally:
+                dbapi_conn.close()
+            stream_reader.report_progress()
+    except Exception as e:
+        status += "STREAM_REQUEST_FAILED: " + str(e) + " "
+
+    return {
+        'success':      success,
+        'status':       status,
+        'rows_loaded':  rows_loaded,
+    }
+
+
 def truncate_table(engine, table_name):
     """
     Truncates (completely clears contents of) local table
@@ -393,7 +538,7 @@ def strip_whitespace(df):
 def get_row_count_from_master_server():
     try:
         host = 'https://api.wevoteusa.org'
-        response = requests.get(host + '/apis/v1/retrieveSQLTablesRowCount')
+        response = http_get(host + '/apis/v1/retrieveSQLTablesRowCount')
         if response.status_code == 200:
             count = int(response.json()['rowCount'])
             return count
@@ -3,8 +3,11 @@
 # -*- coding: UTF-8 -*-
 
 import json
+import queue
 import re
+import threading
 import time
+import zlib
 from datetime import datetime, timezone
 from io import StringIO
 
@@ -211,6 +214,105 @@ def retrieve_sql_tables_as_csv(voter_api_device_id, table_name, start, end):
         return results
 
 
+class CopyOutputQueueWriter(object):
+    """
+    A file-like target for cursor.copy_expert that gzips whatever COPY writes, and hands it off to the
+    generator in stream_sql_table_as_csv through a bounded queue. If the client goes away, the generator sets
+    cancelled, and the next write raises, which aborts the COPY on the database server.
+    """
+
+    def __init__(self, max_chunks_in_queue=64):
+        self.chunk_queue = queue.Queue(maxsize=max_chunks_in_queue)
+        self.cancelled = False
+        # wbits=31 gives us a gzip header, so the client can use a standard Content-Encoding: gzip decoder
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def put(self, chunk):
+        while not self.cancelled:
+            try:
+                self.chunk_queue.put(chunk, timeout=1)
+                return
+            except queue.Full:
+                pass
+        raise IOError("STREAM_CANCELLED_BY_CLIENT")
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        compressed = self.compressor.compress(data)
+        if compressed:
+            self.put(compressed)
+        return len(data)
+
+
+def stream_sql_table_as_csv(table_name, start='', end=''):
+    """
+    Generator for retrieveSQLTablesStream. Yields the gzipped output of COPY ... TO STDOUT as Postgres produces it,
+    so the master server never holds more than a few chunks of the table in memory. Same pipe-delimited CSV
+    format as retrieve_sql_tables_as_csv. Without start and end, the whole table is streamed.
+    Runs on the Master server
+    """
+    if table_name not in allowable_tables:
+        logger.error("stream_sql_table_as_csv table_name '" + str(table_name) + "' is not in the table list")
+        return
+
+    start = convert_to_int(start)
+    end = convert_to_int(end)
+    if positive_value_exists(end):
+        sql = "COPY (SELECT * FROM public." + table_name + " WHERE id BETWEEN " + str(start) + " AND " + str(end) + \
+              " ORDER BY id) TO STDOUT WITH DELIMITER '|' CSV HEADER NULL '\\N'"
+    else:
+        sql = "COPY public." + table_name + " TO STDOUT WITH DELIMITER '|' CSV HEADER NULL '\\N'"
+
+    writer = CopyOutputQueueWriter()
+    end_of_stream = object()
+    copy_failed = object()
+
+    def copy_table_to_writer():
+        t0 = time.time()
+        conn = None
+        last_chunk = end_of_stream
+        try:
+            conn = psycopg2.connect(
+                database=get_environment_variable('DATABASE_NAME_READONLY'),
+                user=get_environment_variable('DATABASE_USER_READONLY'),
+                password=get_environment_variable('DATABASE_PASSWORD_READONLY'),
+                host=get_environment_variable('DATABASE_HOST_READONLY'),
+                port=get_environment_variable('DATABASE_PORT_READONLY')
+            )
+            with conn.cursor() as cursor:
+                cursor.copy_expert(sql, writer, size=65536)
+            writer.put(writer.compressor.flush())
+            logger.error('Streaming the "' + table_name + '" table took ' + "{:.3f}".format(time.time() - t0) +
+                         ' seconds.  start = ' + str(start) + ', end = ' + str(end))
+        except Exception as e:
+            logger.error("stream_sql_table_as_csv caught " + str(e) + " ")
+            last_chunk = copy_failed
+        finally:
+            if conn is not None:
+                conn.close()
+            try:
+                writer.put(last_chunk)
+            except IOError:
+                pass
+
+    copy_thread = threading.Thread(name='stream_sql_table_as_csv_' + table_name, target=copy_table_to_writer)
+    copy_thread.daemon = True
+    copy_thread.start()
+    try:
+        while True:
+            chunk = writer.chunk_queue.get()
+            if chunk is end_of_stream:
+                break
+            if chunk is copy_failed:
+                # Break the chunked response without a proper ending, so the client can't mistake this for the
+                #  whole table
+                raise IOError("STREAM_SQL_TABLE_COPY_FAILED: " + table_name)
+            yield chunk
+    finally:
+        writer.cancelled = True
+
+
 def dump_row_col_labels_and_errors(table_name, header, row, index):
     if row[0] == index:
         cnt = 0
@@ -70,7 +70,8 @@ def search_all_for_api(text_from_search_field='', voter_device_id='', search_sco
         success = results['success']
         if not positive_value_exists(success):
             status += results['status']
-        for one_politician in politician_search_results_list:
+        politician_search_score_list = results.get('politician_search_score_list', [])
+        for politician_number, one_politician in enumerate(politician_search_results_list):
             # link_internal = "/office/" + one_search_result_dict['we_vote_id']
             link_internal = ''
 
@@ -79,7 +80,8 @@ def search_all_for_api(text_from_search_field='', voter_device_id='', search_sco
                 'result_image':             one_politician.we_vote_hosted_profile_image_url_medium,
                 'result_subtitle':          "",
                 'result_summary':           "",
-                'result_score':             0,
+                'result_score':             politician_search_score_list[politician_number]
+                if politician_number < len(politician_search_score_list) else 0,
                 'link_internal':            link_internal,
                 'kind_of_owner':            "POLITICIAN",
                 'google_civic_election_id': 0,
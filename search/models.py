@@ -12,6 +12,7 @@ from election.models import Election
 from measure.models import ContestMeasure
 from office.models import ContestOffice
 from organization.models import Organization
+from politician.models import Politician, remove_politician_from_search_index, update_politician_search_index
 import wevote_functions.admin
 from wevote_functions.functions import positive_value_exists
 
@@ -278,6 +279,25 @@ def delete_organization_signal(sender, instance, **kwargs):
             logger.error(status)
 
 
+# Politician -- keeps this process's politician search index (politician/models.py) current
+@receiver(post_save, sender=Politician)
+def save_politician_signal(sender, instance, **kwargs):
+    try:
+        update_politician_search_index(instance)
+    except Exception as err:
+        status = "SAVE_POLITICIAN_SIGNAL, err: " + str(err)
+        logger.error(status)
+
+
+@receiver(post_delete, sender=Politician)
+def delete_politician_signal(sender, instance, **kwargs):
+    try:
+        remove_politician_from_search_index(instance.id)
+    except Exception as err:
+        status = "DELETE_POLITICIAN_SIGNAL, err: " + str(err)
+        logger.error(status)
+
+
 # @receiver(post_save)
 # def save_signal(sender, **kwargs):
 #     print("### save")
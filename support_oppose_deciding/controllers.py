@@ -50,6 +50,8 @@ def positions_count_for_api(voter_device_id,
         }
         return HttpResponse(json.dumps(json_data), content_type='application/json')
 
+    # Clients ask for these counts right after voterSupportingSave or voterOpposingSave, so we don't count from the
+    #  'readonly' replica here
     show_positions_this_voter_follows = True
     if positive_value_exists(candidate_id) or positive_value_exists(candidate_we_vote_id):
         results = positions_count_for_candidate(voter_id,
@@ -77,10 +79,12 @@ def positions_count_for_api(voter_device_id,
 
 
 def positions_count_for_candidate(voter_id, candidate_id, candidate_we_vote_id, stance_we_are_looking_for,
-                                  show_positions_this_voter_follows=True):
+                                  show_positions_this_voter_follows=True, read_only=False):
     """
     We want to return a JSON file with the number of orgs, friends and public figures the voter follows who support
     this particular candidate's campaign
+    :param read_only: Leave False when the count may be shown right after the voter saves their own position,
+      since the 'readonly' replica can lag behind that save
     """
     status = ''
     success = True
@@ -107,7 +111,8 @@ def positions_count_for_candidate(voter_id, candidate_id, candidate_we_vote_id,
     public_positions_list_for_candidate = \
         position_list_manager.retrieve_all_positions_for_candidate(
             retrieve_public_positions_now, candidate_id, candidate_we_vote_id,
-            stance_we_are_looking_for, most_recent_only
+            stance_we_are_looking_for, most_recent_only,
+            read_only=read_only, return_position_records=True
         )
 
     organizations_followed_by_voter_by_id = []
@@ -150,7 +155,8 @@ def positions_count_for_candidate(voter_id, candidate_id, candidate_we_vote_id,
             position_list_manager.retrieve_all_positions_for_candidate(
                 retrieve_public_positions_now, candidate_id, candidate_we_vote_id,
                 stance_we_are_looking_for, most_recent_only,
-                friends_we_vote_id_list)
+                friends_we_vote_id_list,
+                read_only=read_only, return_position_records=True)
 
         if len(friends_positions_list_for_candidate):
             position_objects = friends_positions_list_for_candidate + position_objects
@@ -188,10 +194,12 @@ def positions_count_for_candidate(voter_id, candidate_id, candidate_we_vote_id,
 
 
 def positions_count_for_contest_measure(voter_id, measure_id, measure_we_vote_id, stance_we_are_looking_for,
-                                        show_positions_this_voter_follows=True):
+                                        show_positions_this_voter_follows=True, read_only=False):
     """
     We want to return a JSON file with the number of orgs, friends and public figures the voter follows who support
     this particular measure
+    :param read_only: Leave False when the count may be shown right after the voter saves their own position,
+      since the 'readonly' replica can lag behind that save
     """
     status = ''
     success = True
@@ -218,7 +226,8 @@ def positions_count_for_contest_measure(voter_id, measure_id, measure_we_vote_id
     public_positions_list_for_contest_measure = \
         position_list_manager.retrieve_all_positions_for_contest_measure(
             retrieve_public_positions_now, measure_id, measure_we_vote_id,
-            stance_we_are_looking_for, most_recent_only)
+            stance_we_are_looking_for, most_recent_only,
+            read_only=read_only, return_position_records=True)
 
     organizations_followed_by_voter_by_id = []
     if len(public_positions_list_for_contest_measure):
@@ -259,7 +268,8 @@ def positions_count_for_contest_measure(voter_id, measure_id, measure_we_vote_id
             position_list_manager.retrieve_all_positions_for_contest_measure(
                 retrieve_public_positions_now, measure_id, measure_we_vote_id,
                 stance_we_are_looking_for, most_recent_only,
-                friends_we_vote_id_list)
+                friends_we_vote_id_list,
+                read_only=read_only, return_position_records=True)
 
         if len(friends_positions_list_for_contest_measure):
             position_objects = friends_positions_list_for_contest_measure + position_objects
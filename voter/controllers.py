@@ -68,7 +68,7 @@ from voter.models import Voter, VoterAddress, VoterDeviceLinkManager, VoterManag
     NOTIFICATION_FRIEND_OPINIONS_YOUR_BALLOT_EMAIL, NOTIFICATION_FRIEND_OPINIONS_OTHER_REGIONS, \
     NOTIFICATION_FRIEND_OPINIONS_OTHER_REGIONS_EMAIL, MAINTENANCE_STATUS_FLAGS_TASK_TWO, \
     NOTIFICATION_VOTER_DAILY_SUMMARY_EMAIL, fetch_voter_id_from_voter_device_link, VoterAddressManager, \
-    VoterDeviceLink, BALLOT_ADDRESS
+    VoterDeviceLink, BALLOT_ADDRESS, invalidate_voter_identity_cache_for_voter
 from voter_guide.controllers import delete_voter_guides_for_voter, duplicate_voter_guides, \
     move_voter_guides_to_another_voter
 from wevote_functions.functions import generate_voter_device_id, is_voter_device_id_valid, positive_value_exists
@@ -1545,7 +1545,7 @@ def send_ballot_email(voter_device_id, sender_voter, send_now, sender_email_addr
                     if schedule_results['email_scheduled_saved']:
                         # messages_to_send.append(schedule_results['email_scheduled_id'])
                         email_scheduled = schedule_results['email_scheduled']
-                        send_results = email_manager.send_scheduled_email(email_scheduled)
+                        send_results = email_manager.queue_scheduled_email(email_scheduled)
                         email_scheduled_sent = send_results['email_scheduled_sent']
                         status += send_results['status']
                 elif not send_now:
@@ -1637,7 +1637,7 @@ def send_ballot_email(voter_device_id, sender_voter, send_now, sender_email_addr
             if schedule_results['email_scheduled_saved']:
                 # messages_to_send.append(schedule_results['email_scheduled_id'])
                 email_scheduled = schedule_results['email_scheduled']
-                send_results = email_manager.send_scheduled_email(email_scheduled)
+                send_results = email_manager.queue_scheduled_email(email_scheduled)
                 email_scheduled_sent = send_results['email_scheduled_sent']
                 status += send_results['status']
         elif not send_now:
@@ -3706,6 +3706,10 @@ def voter_merge_two_accounts_action(  # voterMergeTwoAccounts, part 2
                  ' seconds, final_position_repair took ' + "{:.6f}".format(final_position_repair_duration) +
                  ' seconds, total took ' + "{:.6f}".format(time_difference) + ' seconds')
 
+    # Devices signed in as either voter may now resolve differently
+    invalidate_voter_identity_cache_for_voter(from_voter_id)
+    invalidate_voter_identity_cache_for_voter(to_voter_id)
+
     results = {
         'status':   status,
         'success':  success,
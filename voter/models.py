@@ -1,6 +1,7 @@
 # voter/models.py
 # Brought to you by We Vote. Be good.
 # -*- coding: UTF-8 -*-
+import hashlib
 import json
 import re
 import string
@@ -11,6 +12,7 @@ import pytz
 import requests
 import usaddress
 from django.contrib.auth.models import (BaseUserManager, AbstractBaseUser)  # PermissionsMixin
+from django.core.cache import caches
 from django.core.validators import RegexValidator
 from django.db import (models, IntegrityError)
 from django.db.models import Q
@@ -28,6 +30,7 @@ from sms.models import SMSManager
 from twitter.models import TwitterUserManager
 from wevote_functions.functions import extract_state_code_from_address_string, convert_to_int, generate_random_string, \
     generate_voter_device_id, get_voter_api_device_id, positive_value_exists
+from wevote_functions.functions_cache import CACHE_VALUE_NOT_FOUND, LocalTTLCache, is_shared_cache_alias
 from wevote_functions.functions_date import generate_localized_datetime_from_obj
 from wevote_settings.models import fetch_next_we_vote_id_voter_integer, fetch_site_unique_id_prefix
 
@@ -114,6 +117,25 @@ VALID_STATES = ['AL', 'AK', 'AZ', 'AR', 'AS', 'CA', 'CO', 'CT', 'DE', 'DC', 'FL'
 GOOGLE_MAPS_API_KEY = get_environment_variable("GOOGLE_MAPS_API_KEY")
 GEOCODE_TIMEOUT = 10
 
+# voter_device_id -> (voter_id, voter_we_vote_id) cache. See retrieve_voter_identity_from_voter_device_id
+# The local tier is per-process, so its time to live bounds how long another process can see a stale link.
+# The shared tier is skipped unless VOTER_IDENTITY_CACHE_ALIAS is a cache every process sees (not LocMemCache),
+#  since an invalidation there would only reach the process that made it.
+VOTER_IDENTITY_CACHE_ALIAS = get_environment_variable_default("VOTER_IDENTITY_CACHE_ALIAS", "default")
+VOTER_IDENTITY_CACHE_LOCAL_SECONDS = int(get_environment_variable_default("VOTER_IDENTITY_CACHE_LOCAL_SECONDS", 30))
+VOTER_IDENTITY_CACHE_SHARED_SECONDS = int(get_environment_variable_default("VOTER_IDENTITY_CACHE_SHARED_SECONDS", 600))
+VOTER_IDENTITY_CACHE_MAX_ENTRIES = int(get_environment_variable_default("VOTER_IDENTITY_CACHE_MAX_ENTRIES", 50000))
+voter_identity_local_cache = LocalTTLCache(
+    cache_name='voter_identity',
+    max_entries=VOTER_IDENTITY_CACHE_MAX_ENTRIES,
+    time_to_live_seconds=VOTER_IDENTITY_CACHE_LOCAL_SECONDS)
+voter_identity_shared_cache_counters = {
+    'shared_hit_count':     0,
+    'shared_miss_count':    0,
+    'shared_error_count':   0,
+    'database_lookup_count': 0,
+}
+
 
 # See AUTH_USER_MODEL in config/base.py
 
@@ -3822,7 +3844,10 @@ class VoterDeviceLinkManager(models.Manager):
 
         try:
             if positive_value_exists(voter_id):
+                voter_device_id_list = list(VoterDeviceLink.objects.filter(voter_id=voter_id)
+                                            .values_list('voter_device_id', flat=True))
                 VoterDeviceLink.objects.filter(voter_id=voter_id).delete()
+                invalidate_voter_identity_cache_for_voter(voter_id, voter_device_id_list=voter_device_id_list)
                 status = "DELETE_ALL_VOTER_DEVICE_LINKS_SUCCESSFUL "
                 success = True
             else:
@@ -3843,7 +3868,10 @@ class VoterDeviceLinkManager(models.Manager):
         status = ""
         try:
             if positive_value_exists(voter_id):
+                voter_device_id_list = list(VoterDeviceLink.objects.filter(voter_id=voter_id)
+                                            .values_list('voter_device_id', flat=True))
                 VoterDeviceLink.objects.filter(voter_id=voter_id).delete()
+                invalidate_voter_identity_cache_for_voter(voter_id, voter_device_id_list=voter_device_id_list)
                 status += "DELETE_ALL_VOTER_DEVICE_LINKS_SUCCESSFUL "
                 success = True
             else:
@@ -3864,6 +3892,7 @@ class VoterDeviceLinkManager(models.Manager):
         try:
             if positive_value_exists(voter_device_id):
                 VoterDeviceLink.objects.filter(voter_device_id=voter_device_id).delete()
+                invalidate_voter_identity_cache(voter_device_id)
                 status = "DELETE_VOTER_DEVICE_LINK_SUCCESSFUL "
                 success = True
             else:
@@ -4067,6 +4096,7 @@ class VoterDeviceLinkManager(models.Manager):
                 voter_device_link_on_stage.voter_device_id = voter_device_id
                 voter_device_link_on_stage.voter_id = voter_id
                 voter_device_link_on_stage.save()
+                invalidate_voter_identity_cache(voter_device_id)
 
                 voter_device_link_id = voter_device_link_on_stage.id
             else:
@@ -4160,6 +4190,8 @@ class VoterDeviceLinkManager(models.Manager):
                     voter_device_link.date_secret_code_generated = None
                     voter_device_link.secret_code_number_of_failed_tries_for_this_code = None
                 voter_device_link.save()
+                if voter_object and positive_value_exists(voter_object.id):
+                    invalidate_voter_identity_cache(voter_device_link.voter_device_id)
                 status += "UPDATED_VOTER_DEVICE_LINK "
                 voter_device_link_id = voter_device_link.id
             else:
@@ -4383,14 +4415,126 @@ class VoterIssuesLookup(models.Model):
     womens_equality = models.BooleanField(default=None, null=True)
 
 
-# This method *just* returns the voter_id or 0
-def fetch_voter_id_from_voter_device_link(voter_device_id):
+def generate_voter_identity_cache_key(voter_device_id):
+    # voter_device_id values can be up to 255 characters, which is longer than memcached allows in a key
+    return 'voter_identity:' + hashlib.sha1(voter_device_id.encode('utf-8')).hexdigest()
+
+
+def invalidate_voter_identity_cache(voter_device_id):
+    if not positive_value_exists(voter_device_id):
+        return
+    voter_identity_local_cache.delete(voter_device_id)
+    if not is_shared_cache_alias(VOTER_IDENTITY_CACHE_ALIAS):
+        return
+    try:
+        caches[VOTER_IDENTITY_CACHE_ALIAS].delete(generate_voter_identity_cache_key(voter_device_id))
+    except Exception as e:
+        voter_identity_shared_cache_counters['shared_error_count'] += 1
+        logger.error('invalidate_voter_identity_cache shared cache error: ' + str(e))
+
+
+def invalidate_voter_identity_cache_for_voter(voter_id=0, voter_device_id_list=None):
+    """
+    Forget every cached voter_device_id that points at this voter. Pass in voter_device_id_list when the
+    VoterDeviceLink rows are about to be deleted, since we can't look them up afterwards.
+    """
+    if voter_device_id_list is None:
+        voter_device_id_list = []
+        if positive_value_exists(voter_id):
+            try:
+                voter_device_id_list = list(VoterDeviceLink.objects.filter(voter_id=voter_id)
+                                            .values_list('voter_device_id', flat=True))
+            except Exception as e:
+                logger.error('invalidate_voter_identity_cache_for_voter query error: ' + str(e))
+    for voter_device_id in voter_device_id_list:
+        invalidate_voter_identity_cache(voter_device_id)
+    if positive_value_exists(voter_id):
+        # Catch any local entries for links we couldn't find in the database
+        voter_identity_local_cache.delete_where(lambda voter_identity: voter_identity['voter_id'] == voter_id)
+
+
+def retrieve_voter_identity_from_voter_device_id(voter_device_id):
+    """
+    Resolve a voter_device_id to {'voter_id': ..., 'voter_we_vote_id': ...} without touching the database when we can.
+    Lookup order: process-local LRU, then the shared Django cache (VOTER_IDENTITY_CACHE_ALIAS, when it is shared
+    between processes), then the readonly database. Only successful lookups are cached, since a brand-new
+    voter_device_id is usually saved right after a miss. All VoterDeviceLinkManager writes call
+    invalidate_voter_identity_cache.
+    :param voter_device_id:
+    :return: dict, or None if the voter_device_id isn't linked to a voter
+    """
+    if not positive_value_exists(voter_device_id):
+        return None
+
+    voter_identity = voter_identity_local_cache.get(voter_device_id)
+    if voter_identity is not CACHE_VALUE_NOT_FOUND:
+        return voter_identity
+
+    shared_cache_key = generate_voter_identity_cache_key(voter_device_id)
+    use_shared_cache = is_shared_cache_alias(VOTER_IDENTITY_CACHE_ALIAS)
+    if use_shared_cache:
+        try:
+            voter_identity = caches[VOTER_IDENTITY_CACHE_ALIAS].get(shared_cache_key)
+        except Exception as e:
+            voter_identity = None
+            voter_identity_shared_cache_counters['shared_error_count'] += 1
+            logger.error('retrieve_voter_identity_from_voter_device_id shared cache error: ' + str(e))
+        if voter_identity is not None:
+            voter_identity_shared_cache_counters['shared_hit_count'] += 1
+            voter_identity_local_cache.set(voter_device_id, voter_identity)
+            return voter_identity
+        voter_identity_shared_cache_counters['shared_miss_count'] += 1
+
+    voter_identity_shared_cache_counters['database_lookup_count'] += 1
     voter_device_link_manager = VoterDeviceLinkManager()
     results = voter_device_link_manager.retrieve_voter_device_link_from_voter_device_id(
         voter_device_id, read_only=True)
-    if results['voter_device_link_found']:
-        voter_device_link = results['voter_device_link']
-        return voter_device_link.voter_id
+    if not results['voter_device_link_found']:
+        return None
+    voter_id = results['voter_device_link'].voter_id
+    try:
+        if 'test' not in sys.argv:
+            voter_query = Voter.objects.using('readonly').filter(id=voter_id)
+        else:
+            voter_query = Voter.objects.filter(id=voter_id)
+        voter_we_vote_id = voter_query.values_list('we_vote_id', flat=True).first()
+    except Exception as e:
+        voter_we_vote_id = None
+        logger.error('retrieve_voter_identity_from_voter_device_id voter query error: ' + str(e))
+    voter_identity = {
+        'voter_id':         voter_id,
+        'voter_we_vote_id': voter_we_vote_id if voter_we_vote_id else '',
+    }
+    if not positive_value_exists(voter_we_vote_id):
+        # Voter record is missing, so don't cache a half-resolved identity
+        return voter_identity
+
+    voter_identity_local_cache.set(voter_device_id, voter_identity)
+    if not use_shared_cache:
+        return voter_identity
+    try:
+        caches[VOTER_IDENTITY_CACHE_ALIAS].set(
+            shared_cache_key, voter_identity, timeout=VOTER_IDENTITY_CACHE_SHARED_SECONDS)
+    except Exception as e:
+        voter_identity_shared_cache_counters['shared_error_count'] += 1
+        logger.error('retrieve_voter_identity_from_voter_device_id shared cache error: ' + str(e))
+    return voter_identity
+
+
+def voter_identity_cache_stats():
+    """
+    Counters for this process only. database_lookup_count is the number of requests the cache did not save.
+    """
+    stats = voter_identity_local_cache.stats()
+    stats.update(voter_identity_shared_cache_counters)
+    return stats
+
+
+# This method *just* returns the voter_id or 0
+def fetch_voter_id_from_voter_device_link(voter_device_id):
+    voter_identity = retrieve_voter_identity_from_voter_device_id(voter_device_id)
+    if voter_identity:
+        return voter_identity['voter_id']
     return 0
 
 
@@ -4464,18 +4608,9 @@ def fetch_voter_from_voter_device_link(voter_device_id):
 
 
 def fetch_voter_we_vote_id_from_voter_device_link(voter_device_id):
-    voter_device_link_manager = VoterDeviceLinkManager()
-    results = voter_device_link_manager.retrieve_voter_device_link_from_voter_device_id(voter_device_id,
-                                                                                        read_only=True)
-    if results['voter_device_link_found']:
-        voter_device_link = results['voter_device_link']
-        voter_id = voter_device_link.voter_id
-        voter_manager = VoterManager()
-        results = voter_manager.retrieve_voter_by_id(voter_id, read_only=True)
-        if results['voter_found']:
-            voter = results['voter']
-            return voter.we_vote_id
-        return ""
+    voter_identity = retrieve_voter_identity_from_voter_device_id(voter_device_id)
+    if voter_identity:
+        return voter_identity['voter_we_vote_id']
 
 
 def retrieve_voter_authority(request):
@@ -20,6 +20,7 @@ from pledge_to_vote.models import PledgeToVoteManager
 from voter.models import VoterManager
 from wevote_functions.functions import convert_to_int, convert_to_str, positive_value_exists
 from wevote_functions.functions_date import generate_localized_datetime_from_obj, DATE_FORMAT_YMD
+from wevote_functions.functions_query import exclude_by_value_list, filter_by_value_list, generate_value_list_filter
 from wevote_settings.models import fetch_site_unique_id_prefix, fetch_next_we_vote_id_voter_guide_integer
 
 logger = wevote_functions.admin.get_logger(__name__)
@@ -1394,8 +1395,8 @@ class VoterGuideListManager(models.Manager):
         try:
             voter_guide_query = VoterGuide.objects.all()
             voter_guide_query = voter_guide_query.exclude(vote_smart_ratings_only=True)
-            voter_guide_query = voter_guide_query.filter(
-                organization_we_vote_id__in=organization_we_vote_ids_followed_by_voter)
+            voter_guide_query = filter_by_value_list(
+                voter_guide_query, 'organization_we_vote_id', organization_we_vote_ids_followed_by_voter)
             test_election = 2000
             voter_guide_query = voter_guide_query.exclude(google_civic_election_id=test_election)
             if filter_by_this_google_civic_election_id:
@@ -1537,7 +1538,7 @@ class VoterGuideListManager(models.Manager):
             if positive_value_exists(len(organization_we_vote_id_list)):
                 voter_guide_query = voter_guide_query.filter(
                     Q(google_civic_election_id=google_civic_election_id) &
-                    Q(organization_we_vote_id__in=organization_we_vote_id_list)
+                    generate_value_list_filter('organization_we_vote_id', organization_we_vote_id_list)
                 )
             else:
                 voter_guide_query = voter_guide_query.filter(google_civic_election_id=google_civic_election_id)
@@ -1670,8 +1671,8 @@ class VoterGuideListManager(models.Manager):
             # voter_guide_query = voter_guide_query.exclude(vote_smart_ratings_only=True)
 
             if positive_value_exists(len(organization_we_vote_ids_followed_or_ignored_by_voter)):
-                voter_guide_query = voter_guide_query.exclude(
-                    organization_we_vote_id__in=organization_we_vote_ids_followed_or_ignored_by_voter)
+                voter_guide_query = exclude_by_value_list(
+                    voter_guide_query, 'organization_we_vote_id', organization_we_vote_ids_followed_or_ignored_by_voter)
 
             if positive_value_exists(len(google_civic_election_id_list)):
                 status += "CONVERTING_GOOGLE_CIVIC_ELECTION_ID_LIST_TO_INTEGER "
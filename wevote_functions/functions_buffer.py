@@ -0,0 +1,411 @@
+# wevote_functions/functions_buffer.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+import atexit
+from collections import deque
+import fcntl
+import glob
+import json
+import os
+import threading
+from time import monotonic, time
+
+from django.db import close_old_connections
+
+import wevote_functions.admin
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+# After a failed flush we wait maximum_seconds, then twice that, and so on, up to this long, before trying again
+SPILLING_ROW_BUFFER_MAXIMUM_RETRY_SECONDS = 300
+# How often the flush thread looks for spill files left behind by processes that have died
+SPILLING_ROW_BUFFER_RECOVER_SECONDS = 60
+# With more full segments than this waiting to be flushed (ex/ the database is slow), the rest are kept on disk only
+SPILLING_ROW_BUFFER_SEGMENTS_IN_MEMORY = 4
+
+
+def lock_spill_file_owner_if_dead(lock_file_path):
+    """
+    Each process holds an exclusive flock on its own lock file for as long as it runs, and the operating system lets
+    go of it when the process dies. This works for processes on other hosts too, when spill_directory is shared.
+    :return: (owner_is_dead, file descriptor now holding the dead owner's lock, or None)
+    """
+    try:
+        lock_file_descriptor = os.open(lock_file_path, os.O_RDWR)
+    except FileNotFoundError:
+        # It let go of its lock at exit, or another process already took over its spill files
+        return True, None
+    except OSError:
+        return False, None
+    try:
+        fcntl.flock(lock_file_descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(lock_file_descriptor)
+        return False, None
+    return True, lock_file_descriptor
+
+
+class SpillingRowBuffer(object):
+    """
+    Accepts rows (dicts that json.dumps can handle) in-process, and hands them to flush_function(row_list) in
+    batches: as soon as maximum_rows are waiting, or once the oldest row has waited maximum_seconds. flush_function
+    raises if the rows were not saved.
+
+    Every row accepted is first appended to a spill file in spill_directory, one JSON line per row, and the file is
+    deleted once its rows are flushed. So:
+    - If a flush fails (ex/ the database is down), the rows stay in their spill file, not in memory, and we retry
+      with backoff. If flushes are slow, the segments past SPILLING_ROW_BUFFER_SEGMENTS_IN_MEMORY also wait on disk
+      only, and are read back when flushed. So memory use is never more than
+      (SPILLING_ROW_BUFFER_SEGMENTS_IN_MEMORY + 1) * maximum_rows rows.
+    - If a process dies with rows not yet flushed, another process using the same spill_directory (or the next one
+      to start) picks up its spill files within SPILLING_ROW_BUFFER_RECOVER_SECONDS and flushes them. Each process
+      holds a flock on its own lock file while it runs, so a process on another host sharing spill_directory never
+      takes over the spill files of one that is still running. A row is lost if the whole server goes down before
+      the operating system writes it to disk, or if no process ever uses that spill_directory again (ex/ a host that
+      doesn't come back, with spill_directory on its own disk). A process that dies between a flush and deleting the
+      spill file leaves rows that are flushed a second time.
+
+    metrics() reports how far behind we are, for backpressure.
+    """
+
+    def __init__(self, buffer_name, flush_function, spill_directory, maximum_rows=500, maximum_seconds=5.0,
+                 maximum_rows_waiting=100000, start_flush_thread=True):
+        """
+        :param buffer_name: Used to name the spill files, so every buffer needs its own
+        :param flush_function:
+        :param spill_directory:
+        :param maximum_rows: Flush when this many rows are waiting
+        :param maximum_seconds: Flush when the oldest row has waited this long
+        :param maximum_rows_waiting: With more rows than this waiting to be flushed, metrics() reports is_backlogged
+        :param start_flush_thread: Without a flush thread, flushes happen in accept() and flush() calls only
+        """
+        self.buffer_name = buffer_name
+        self.flush_function = flush_function
+        self.spill_directory = spill_directory
+        self.maximum_rows = maximum_rows
+        self.maximum_seconds = maximum_seconds
+        self.maximum_rows_waiting = maximum_rows_waiting
+        self.start_flush_thread = start_flush_thread
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_needed = threading.Event()
+        self._flush_thread = None
+        self._process_id = None
+        self._lock_file_descriptor = None
+        self._reset_for_this_process()
+        self.rows_accepted = 0
+        self.rows_flushed = 0
+        self.flush_count = 0
+        self.flush_failure_count = 0
+        self.consecutive_flush_failure_count = 0
+        self.spill_files_recovered = 0
+        self.last_flush_seconds = 0.0
+        self.last_flush_error = ''
+        self.was_backlogged = False
+        atexit.register(self.close)
+
+    def _reset_for_this_process(self):
+        # Also called in a child process after a fork. The parent flushes the rows it accepted, and keeps its lock.
+        if self._lock_file_descriptor is not None:
+            os.close(self._lock_file_descriptor)
+            self._lock_file_descriptor = None
+        self._process_id = os.getpid()
+        self._process_token = str(int(time() * 1000))
+        self._segment_number = 0
+        self._active_path = None
+        self._active_file = None
+        self._active_row_list = []
+        self._active_started_at = 0.0
+        # Each waiting segment is a dict with path, row_count, started_at (when its first row was accepted) and
+        #  row_list (None once its rows are only on disk)
+        self._sealed_segment_list = deque()
+        self._retry_at = 0.0
+        self._recovered_at = 0.0
+        self._flush_thread = None
+
+    def _generate_owner_name(self):
+        return str(self._process_id) + '-' + self._process_token
+
+    def _generate_lock_file_path(self, owner_name):
+        return os.path.join(self.spill_directory, self.buffer_name + '-' + owner_name + '.lock')
+
+    def _generate_spill_file_path(self):
+        self._segment_number += 1
+        return os.path.join(self.spill_directory, self.buffer_name + '-' + self._generate_owner_name() + '-' +
+                            str(self._segment_number) + '.jsonl')
+
+    def _lock_this_process(self):
+        # Call with self._lock held, before we create or take over any spill file
+        if self._lock_file_descriptor is not None:
+            return
+        os.makedirs(self.spill_directory, exist_ok=True)
+        lock_file_descriptor = os.open(
+            self._generate_lock_file_path(self._generate_owner_name()), os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(lock_file_descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._lock_file_descriptor = lock_file_descriptor
+
+    def _unlock_this_process(self):
+        # Call with self._lock held, once none of our spill files are left
+        if self._lock_file_descriptor is None:
+            return
+        try:
+            os.remove(self._generate_lock_file_path(self._generate_owner_name()))
+        except OSError:
+            pass
+        os.close(self._lock_file_descriptor)
+        self._lock_file_descriptor = None
+
+    def _seal_active_segment(self):
+        # Call with self._lock held
+        if self._active_file is None:
+            return
+        self._active_file.close()
+        segments_in_memory = \
+            sum(1 for segment in self._sealed_segment_list if segment['row_list'] is not None)
+        self._sealed_segment_list.append({
+            'path':         self._active_path,
+            'row_count':    len(self._active_row_list),
+            'started_at':   self._active_started_at,
+            'row_list':
+                self._active_row_list if segments_in_memory < SPILLING_ROW_BUFFER_SEGMENTS_IN_MEMORY else None,
+        })
+        self._active_path = None
+        self._active_file = None
+        self._active_row_list = []
+
+    def accept(self, row):
+        """
+        Constant time: one line appended to the spill file. Flushing happens in the flush thread.
+        """
+        line = json.dumps(row, default=str) + '\n'
+        with self._lock:
+            if self._process_id != os.getpid():
+                self._reset_for_this_process()
+            if self._active_file is None:
+                self._lock_this_process()
+                self._active_path = self._generate_spill_file_path()
+                self._active_file = open(self._active_path, 'a', encoding='utf-8')
+                self._active_started_at = time()
+            self._active_file.write(line)
+            # Out of this process, so it survives the process crashing
+            self._active_file.flush()
+            self._active_row_list.append(row)
+            self.rows_accepted += 1
+            if len(self._active_row_list) >= self.maximum_rows:
+                self._seal_active_segment()
+                self._flush_needed.set()
+            if self.start_flush_thread and self._flush_thread is None:
+                self._flush_thread = threading.Thread(
+                    target=self._run_flush_thread, name=self.buffer_name + '_flush', daemon=True)
+                self._flush_thread.start()
+        if not self.start_flush_thread and self.is_flush_due():
+            self.flush()
+
+    def _run_flush_thread(self):
+        process_id = os.getpid()
+        while self._process_id == process_id:
+            self._flush_needed.wait(timeout=self.maximum_seconds / 2)
+            self._flush_needed.clear()
+            recover_due = monotonic() - self._recovered_at > SPILLING_ROW_BUFFER_RECOVER_SECONDS
+            try:
+                self.flush(only_if_due=not recover_due)
+            except Exception as e:
+                logger.error("SpillingRowBuffer " + self.buffer_name + " flush thread: " + str(e))
+            # Django opens a database connection per thread. Let go of ours if it is too old or broken.
+            close_old_connections()
+
+    def is_flush_due(self):
+        with self._lock:
+            if monotonic() < self._retry_at:
+                return False
+            if len(self._sealed_segment_list):
+                return True
+            return self._active_file is not None and time() - self._active_started_at >= self.maximum_seconds
+
+    def flush(self, only_if_due=False):
+        """
+        Hand every row waiting to flush_function, oldest first
+        :param only_if_due: Skip the flush unless maximum_rows or maximum_seconds has been reached, or it is time to
+          retry after a failure
+        :return: results dict with rows_flushed
+        """
+        status = ""
+        success = True
+        rows_flushed = 0
+        if only_if_due and not self.is_flush_due():
+            return {'success': success, 'status': "SPILLING_ROW_BUFFER_FLUSH_NOT_DUE ", 'rows_flushed': rows_flushed}
+        with self._flush_lock:
+            if monotonic() - self._recovered_at > SPILLING_ROW_BUFFER_RECOVER_SECONDS:
+                self.recover_spill_files()
+            with self._lock:
+                self._seal_active_segment()
+                segment_list = list(self._sealed_segment_list)
+            t0 = monotonic()
+            for segment in segment_list:
+                try:
+                    row_list = segment['row_list']
+                    if row_list is None:
+                        row_list = self.read_spill_file(segment['path'])
+                        segment['row_count'] = len(row_list)
+                    if len(row_list):
+                        self.flush_function(row_list)
+                except Exception as e:
+                    success = False
+                    status += "SPILLING_ROW_BUFFER_FLUSH_FAILED: " + str(e) + " "
+                    with self._lock:
+                        # Keep the rows on disk only, until we retry
+                        for waiting_segment in self._sealed_segment_list:
+                            waiting_segment['row_list'] = None
+                        self.flush_failure_count += 1
+                        self.consecutive_flush_failure_count += 1
+                        self.last_flush_error = str(e)
+                        self._retry_at = monotonic() + min(
+                            self.maximum_seconds * 2 ** (self.consecutive_flush_failure_count - 1),
+                            SPILLING_ROW_BUFFER_MAXIMUM_RETRY_SECONDS)
+                    logger.error("SpillingRowBuffer " + self.buffer_name + " flush failed: " + str(e) + " " +
+                                 json.dumps(self.metrics()))
+                    break
+                try:
+                    os.remove(segment['path'])
+                except OSError as e:
+                    logger.error("SpillingRowBuffer " + self.buffer_name + " could not remove " +
+                                 segment['path'] + ": " + str(e))
+                with self._lock:
+                    self._sealed_segment_list.popleft()
+                    self.rows_flushed += segment['row_count']
+                    self.consecutive_flush_failure_count = 0
+                    self._retry_at = 0.0
+                rows_flushed += segment['row_count']
+            if len(segment_list):
+                self.flush_count += 1
+                self.last_flush_seconds = monotonic() - t0
+            self.log_backlog_change()
+        status += "SPILLING_ROW_BUFFER_ROWS_FLUSHED: " + str(rows_flushed) + " "
+        return {'success': success, 'status': status, 'rows_flushed': rows_flushed}
+
+    @staticmethod
+    def read_spill_file(spill_file_path):
+        row_list = []
+        with open(spill_file_path, encoding='utf-8') as spill_file:
+            for line in spill_file:
+                try:
+                    row_list.append(json.loads(line))
+                except ValueError:
+                    # The last line of a process that died while writing it
+                    logger.error("SpillingRowBuffer skipped an incomplete line in " + spill_file_path)
+        return row_list
+
+    def recover_spill_files(self):
+        """
+        Take over the spill files of processes that are no longer running, on this host or another one sharing
+        spill_directory, so the flush thread flushes them with our own. A process is no longer running when we can
+        take its lock.
+        """
+        self._recovered_at = monotonic()
+        buffer_name_pattern = os.path.join(self.spill_directory, glob.escape(self.buffer_name))
+        spill_file_path_list = sorted(glob.glob(buffer_name_pattern + '-*-*-*.jsonl'))
+        lock_file_path_list = glob.glob(buffer_name_pattern + '-*-*.lock')
+        spill_file_path_list_by_owner_name = {}
+        for spill_file_path in spill_file_path_list:
+            name_part_list = os.path.basename(spill_file_path)[len(self.buffer_name) + 1:].split('-')
+            spill_file_path_list_by_owner_name.setdefault(name_part_list[0] + '-' + name_part_list[1], []) \
+                .append(spill_file_path)
+        # Lock files of processes that died with no spill files left are cleaned up too
+        for lock_file_path in lock_file_path_list:
+            spill_file_path_list_by_owner_name.setdefault(
+                os.path.basename(lock_file_path)[len(self.buffer_name) + 1:-len('.lock')], [])
+        spill_file_path_list_by_owner_name.pop(self._generate_owner_name(), None)
+
+        for owner_name, owner_spill_file_path_list in spill_file_path_list_by_owner_name.items():
+            owner_lock_file_path = self._generate_lock_file_path(owner_name)
+            owner_is_dead, owner_lock_file_descriptor = lock_spill_file_owner_if_dead(owner_lock_file_path)
+            if not owner_is_dead:
+                continue
+            try:
+                for spill_file_path in owner_spill_file_path_list:
+                    self._recover_spill_file(spill_file_path)
+                if owner_lock_file_descriptor is not None and os.path.exists(owner_lock_file_path):
+                    os.remove(owner_lock_file_path)
+            except OSError as e:
+                logger.error("SpillingRowBuffer " + self.buffer_name + " could not recover " + owner_name + ": " +
+                             str(e))
+            finally:
+                if owner_lock_file_descriptor is not None:
+                    os.close(owner_lock_file_descriptor)
+
+    def _recover_spill_file(self, spill_file_path):
+        with self._lock:
+            self._lock_this_process()
+            recovered_path = self._generate_spill_file_path()
+            try:
+                # Only one process can rename it, so only one process flushes it
+                os.rename(spill_file_path, recovered_path)
+            except FileNotFoundError:
+                return
+            with open(recovered_path, encoding='utf-8') as recovered_file:
+                row_count = sum(1 for _ in recovered_file)
+            self._sealed_segment_list.append({
+                'path':         recovered_path,
+                'row_count':    row_count,
+                'started_at':   os.path.getmtime(recovered_path),
+                'row_list':     None,
+            })
+            self.spill_files_recovered += 1
+        logger.info("SpillingRowBuffer " + self.buffer_name + " recovered " + spill_file_path)
+
+    def close(self):
+        """
+        Flush whatever is waiting, and let go of our lock if nothing is left. Called when the process exits.
+        """
+        if self._process_id != os.getpid():
+            return
+        if self.rows_waiting():
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("SpillingRowBuffer " + self.buffer_name + " close: " + str(e))
+        with self._lock:
+            if self._active_file is None and not len(self._sealed_segment_list):
+                self._unlock_this_process()
+
+    def rows_waiting(self):
+        with self._lock:
+            return len(self._active_row_list) + \
+                sum(segment['row_count'] for segment in self._sealed_segment_list)
+
+    def log_backlog_change(self):
+        is_backlogged = self.rows_waiting() > self.maximum_rows_waiting
+        if is_backlogged != self.was_backlogged:
+            self.was_backlogged = is_backlogged
+            if is_backlogged:
+                logger.error("SpillingRowBuffer " + self.buffer_name + " is backlogged: " + json.dumps(self.metrics()))
+            else:
+                logger.info("SpillingRowBuffer " + self.buffer_name + " caught up: " + json.dumps(self.metrics()))
+
+    def metrics(self):
+        rows_waiting = self.rows_waiting()
+        with self._lock:
+            started_at_list = [segment['started_at'] for segment in self._sealed_segment_list]
+            if self._active_file is not None:
+                started_at_list.append(self._active_started_at)
+            rows_in_memory = len(self._active_row_list) + sum(
+                len(segment['row_list']) for segment in self._sealed_segment_list if segment['row_list'] is not None)
+            return {
+                'buffer_name':                      self.buffer_name,
+                'rows_accepted':                    self.rows_accepted,
+                'rows_flushed':                     self.rows_flushed,
+                'rows_waiting':                     rows_waiting,
+                'rows_in_memory':                   rows_in_memory,
+                'spill_files_waiting':              len(self._sealed_segment_list) + (
+                    1 if self._active_file is not None else 0),
+                'spill_files_recovered':            self.spill_files_recovered,
+                'oldest_row_age_seconds':
+                    round(time() - min(started_at_list), 3) if len(started_at_list) else 0.0,
+                'flush_count':                      self.flush_count,
+                'flush_failure_count':              self.flush_failure_count,
+                'consecutive_flush_failure_count':  self.consecutive_flush_failure_count,
+                'last_flush_seconds':               round(self.last_flush_seconds, 3),
+                'last_flush_error':                 self.last_flush_error,
+                'is_backlogged':                    rows_waiting > self.maximum_rows_waiting,
+            }
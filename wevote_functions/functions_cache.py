@@ -0,0 +1,113 @@
+# wevote_functions/functions_cache.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from collections import OrderedDict
+import threading
+from time import monotonic
+
+from django.conf import settings
+
+import wevote_functions.admin
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+CACHE_VALUE_NOT_FOUND = object()  # Sentinel, so None can be cached as a legitimate value
+PROCESS_LOCAL_CACHE_BACKEND_LIST = [
+    'django.core.cache.backends.dummy.DummyCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+]
+
+
+def is_shared_cache_alias(cache_alias):
+    """
+    True if every process sees the same entries in the Django cache cache_alias (ex/ memcached or redis). With no
+    CACHES setting, 'default' is a LocMemCache, so deleting an entry there only reaches the process that deleted it.
+    """
+    cache_setting = settings.CACHES.get(cache_alias)
+    if not cache_setting:
+        return False
+    return cache_setting.get('BACKEND', '') not in PROCESS_LOCAL_CACHE_BACKEND_LIST
+
+
+class LocalTTLCache(object):
+    """
+    A small, thread-safe, process-local LRU cache where every entry expires after time_to_live_seconds.
+    Each gunicorn worker gets its own copy, so this should only hold values we can tolerate being stale
+    for time_to_live_seconds, or values we explicitly invalidate.
+    """
+
+    def __init__(self, cache_name='', max_entries=10000, time_to_live_seconds=60):
+        self.cache_name = cache_name
+        self.max_entries = max_entries
+        self.time_to_live_seconds = time_to_live_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hit_count = 0
+        self.miss_count = 0
+        self.eviction_count = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=CACHE_VALUE_NOT_FOUND):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.miss_count += 1
+                return default
+            expires_at, value = entry
+            if expires_at < monotonic():
+                del self._entries[key]
+                self.miss_count += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hit_count += 1
+            return value
+
+    def set(self, key, value, time_to_live_seconds=None):
+        if time_to_live_seconds is None:
+            time_to_live_seconds = self.time_to_live_seconds
+        with self._lock:
+            self._entries[key] = (monotonic() + time_to_live_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.eviction_count += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_where(self, test_function):
+        """
+        Remove every entry whose value passes test_function(value). Linear in the size of the cache, so
+        only use this for rare events (ex/ deleting a voter), not on the request path.
+        """
+        with self._lock:
+            keys_to_delete = [key for key, (expires_at, value) in self._entries.items() if test_function(value)]
+            for key in keys_to_delete:
+                del self._entries[key]
+        return len(keys_to_delete)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def reset_counters(self):
+        with self._lock:
+            self.hit_count = 0
+            self.miss_count = 0
+            self.eviction_count = 0
+
+    def stats(self):
+        lookup_count = self.hit_count + self.miss_count
+        return {
+            'cache_name':       self.cache_name,
+            'entry_count':      len(self._entries),
+            'max_entries':      self.max_entries,
+            'hit_count':        self.hit_count,
+            'miss_count':       self.miss_count,
+            'eviction_count':   self.eviction_count,
+            'hit_rate':         round(self.hit_count / lookup_count, 4) if lookup_count else 0.0,
+        }
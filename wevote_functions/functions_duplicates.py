@@ -0,0 +1,202 @@
+# wevote_functions/functions_duplicates.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from itertools import combinations
+
+from django.db.models import Q
+
+import wevote_functions.admin
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+# A blocking key shared by more records than this (ex/ a placeholder name) is too common to tell us anything
+DUPLICATE_MAXIMUM_BLOCK_SIZE = 50
+
+
+def normalize_duplicate_key_text(text):
+    """
+    Lower case, with runs of whitespace and punctuation collapsed, so "Doe,  Jane" and "doe jane" block together
+    """
+    if not text:
+        return ''
+    return ' '.join(''.join(character if character.isalnum() else ' ' for character in str(text).lower()).split())
+
+
+class DuplicateFinder(object):
+    """
+    Finds possible duplicates among records already loaded in memory, ex/ every politician in one state. Each
+    record is filed under its blocking keys, tuples starting with the kind of key, like ('twitter', 'janedoe') or
+    ('last_first', 'nc', 'doe', 'jane'). Only records sharing at least one key are compared, so a full sweep is a
+    few dict lookups per record instead of a few queries per record. A pair scores the sum of the weights of the
+    kinds of key it shares.
+    """
+
+    def __init__(self, blocking_key_weight_dict, minimum_score=1, maximum_block_size=DUPLICATE_MAXIMUM_BLOCK_SIZE):
+        """
+        :param blocking_key_weight_dict: kind of key -> weight, ex/ {'twitter': 10, 'name': 5}
+        :param minimum_score: Pairs scoring less are not possible duplicates
+        :param maximum_block_size:
+        """
+        self.blocking_key_weight_dict = blocking_key_weight_dict
+        self.minimum_score = minimum_score
+        self.maximum_block_size = maximum_block_size
+        self.record_list = []  # record number -> (we_vote_id, record)
+        self.record_number_list_by_key = {}
+        self.not_duplicates_set = set()
+
+    def __len__(self):
+        return len(self.record_list)
+
+    def add_record(self, we_vote_id, record, blocking_key_list):
+        record_number = len(self.record_list)
+        self.record_list.append((we_vote_id, record))
+        for blocking_key in set(blocking_key_list):
+            self.record_number_list_by_key.setdefault(blocking_key, []).append(record_number)
+
+    def add_not_duplicates(self, we_vote_id1, we_vote_id2):
+        """
+        A pair a person has already reviewed and marked "not a duplicate", in either direction
+        """
+        if we_vote_id1 and we_vote_id2:
+            self.not_duplicates_set.add(frozenset([we_vote_id1, we_vote_id2]))
+
+    def find_duplicate_pairs(self):
+        """
+        :return: results dict. duplicate_pair_list holds every pair scoring minimum_score or more, best first, as
+          dicts with record1, record2 (in the order they were added), score and matched_key_kind_list.
+        """
+        status = ''
+        matched_key_kinds_by_pair = {}
+        oversized_block_count = 0
+        for blocking_key, record_number_list in self.record_number_list_by_key.items():
+            if len(record_number_list) < 2:
+                continue
+            if len(record_number_list) > self.maximum_block_size:
+                oversized_block_count += 1
+                continue
+            for record_number_pair in combinations(record_number_list, 2):
+                matched_key_kinds_by_pair.setdefault(record_number_pair, set()).add(blocking_key[0])
+
+        duplicate_pair_list = []
+        for (record_number1, record_number2), matched_key_kind_set in matched_key_kinds_by_pair.items():
+            we_vote_id1, record1 = self.record_list[record_number1]
+            we_vote_id2, record2 = self.record_list[record_number2]
+            if we_vote_id1 == we_vote_id2 or frozenset([we_vote_id1, we_vote_id2]) in self.not_duplicates_set:
+                continue
+            score = sum(self.blocking_key_weight_dict.get(kind, 0) for kind in matched_key_kind_set)
+            if score < self.minimum_score:
+                continue
+            duplicate_pair_list.append({
+                'record1':                  record1,
+                'record2':                  record2,
+                'score':                    score,
+                'matched_key_kind_list':    sorted(matched_key_kind_set),
+                'record_numbers':           (record_number1, record_number2),
+            })
+        duplicate_pair_list.sort(key=lambda pair: (-pair['score'], pair['record_numbers']))
+
+        status += "DUPLICATE_FINDER_RECORDS: " + str(len(self.record_list)) + " " \
+                  "BLOCKS: " + str(len(self.record_number_list_by_key)) + " " \
+                  "COMPARISONS: " + str(len(matched_key_kinds_by_pair)) + " " \
+                  "PAIRS: " + str(len(duplicate_pair_list)) + " "
+        if oversized_block_count:
+            status += "OVERSIZED_BLOCKS_SKIPPED: " + str(oversized_block_count) + " "
+        results = {
+            'success':              True,
+            'status':               status,
+            'duplicate_pair_list':  duplicate_pair_list,
+        }
+        return results
+
+    def generate_merge_queue(self):
+        """
+        Like find_duplicate_pairs, but each record is in at most one pair, its best one, the way the one-at-a-time
+        duplicate sweeps skip anything already paired up.
+        :return: results dict with duplicate_pair_list and unmatched_record_list (in the order they were added)
+        """
+        results = self.find_duplicate_pairs()
+        paired_record_number_set = set()
+        duplicate_pair_list = []
+        for duplicate_pair in results['duplicate_pair_list']:
+            record_number1, record_number2 = duplicate_pair['record_numbers']
+            if record_number1 in paired_record_number_set or record_number2 in paired_record_number_set:
+                continue
+            paired_record_number_set.update(duplicate_pair['record_numbers'])
+            duplicate_pair_list.append(duplicate_pair)
+        unmatched_record_list = [
+            record for record_number, (we_vote_id, record) in enumerate(self.record_list)
+            if record_number not in paired_record_number_set]
+        results = {
+            'success':                  results['success'],
+            'status':                   results['status'] + "MERGE_QUEUE: " + str(len(duplicate_pair_list)) + " ",
+            'duplicate_pair_list':      duplicate_pair_list,
+            'unmatched_record_list':    unmatched_record_list,
+        }
+        return results
+
+
+def find_duplicates_in_list(
+        record_list,
+        blocking_key_weight_dict,
+        generate_blocking_keys,
+        not_duplicates_model,
+        record_name,
+        read_only=True):
+    """
+    Pair up possible duplicates among record_list in memory, instead of looking for each one's duplicates with its
+    own queries. Pairs already marked in not_duplicates_model are skipped, and each record is in at most one pair,
+    its best one.
+    :param record_list: ex/ every politician in one state
+    :param blocking_key_weight_dict: See DuplicateFinder
+    :param generate_blocking_keys: record -> list of blocking keys
+    :param not_duplicates_model: ex/ PoliticiansAreNotDuplicates, with record_name + '1_we_vote_id' and
+      record_name + '2_we_vote_id' fields
+    :param record_name: ex/ 'politician'
+    :param read_only:
+    :return: results dict. duplicate_pair_list holds dicts with record_name + '1', record_name + '2', score and
+      matched_key_kind_list. 'unmatched_' + record_name + '_list' holds everyone else.
+    """
+    status = ''
+    success = True
+    duplicate_finder = DuplicateFinder(blocking_key_weight_dict)
+    we_vote_id_list = []
+    for record in record_list:
+        we_vote_id_list.append(record.we_vote_id)
+        duplicate_finder.add_record(record.we_vote_id, record, generate_blocking_keys(record))
+
+    if len(we_vote_id_list):
+        we_vote_id1_field_name = record_name + '1_we_vote_id'
+        we_vote_id2_field_name = record_name + '2_we_vote_id'
+        try:
+            if read_only:
+                queryset = not_duplicates_model.objects.using('readonly').all()
+            else:
+                queryset = not_duplicates_model.objects.all()
+            queryset = queryset.filter(
+                Q(**{we_vote_id1_field_name + '__in': we_vote_id_list}) |
+                Q(**{we_vote_id2_field_name + '__in': we_vote_id_list}))
+            for we_vote_id1, we_vote_id2 in queryset.values_list(we_vote_id1_field_name, we_vote_id2_field_name):
+                duplicate_finder.add_not_duplicates(we_vote_id1, we_vote_id2)
+        except Exception as e:
+            status += "FIND_DUPLICATES_IN_LIST_NOT_DUPLICATES_ERROR (" + not_duplicates_model.__name__ + "): " + \
+                      str(e) + " "
+            success = False
+
+    results = duplicate_finder.generate_merge_queue()
+    status += results['status']
+    duplicate_pair_list = []
+    for duplicate_pair in results['duplicate_pair_list']:
+        duplicate_pair_list.append({
+            record_name + '1':          duplicate_pair['record1'],
+            record_name + '2':          duplicate_pair['record2'],
+            'score':                    duplicate_pair['score'],
+            'matched_key_kind_list':    duplicate_pair['matched_key_kind_list'],
+        })
+    results = {
+        'success':                          success,
+        'status':                           status,
+        'duplicate_pair_list':              duplicate_pair_list,
+        'unmatched_' + record_name + '_list':   results['unmatched_record_list'],
+    }
+    return results
@@ -0,0 +1,183 @@
+# wevote_functions/functions_http.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from collections import OrderedDict
+import threading
+from time import perf_counter
+from urllib.parse import urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config.base import get_environment_variable_default
+import wevote_functions.admin
+from wevote_functions.functions import convert_to_int
+from wevote_functions.functions_cache import CACHE_VALUE_NOT_FOUND, LocalTTLCache
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+# Every outbound call to another service (ballot data providers, Fastly, images...) should go through
+#  http_get/http_post/http_put/http_delete, so it reuses a kept-alive connection to that host, can't hang forever,
+#  retries what is safe to retry (pass retries=0 where the caller retries on its own), and shows up in the counters
+#  on the admin statistics page.
+HTTP_DEFAULT_TIMEOUT_SECONDS = \
+    float(get_environment_variable_default("HTTP_DEFAULT_TIMEOUT_SECONDS", 30))
+HTTP_POOL_MAXSIZE = convert_to_int(get_environment_variable_default("HTTP_POOL_MAXSIZE", 16))
+# Sessions for the hosts used least recently are closed past this (ex/ analyze_remote_url reaching any site)
+HTTP_SESSION_MAX_HOSTS = convert_to_int(get_environment_variable_default("HTTP_SESSION_MAX_HOSTS", 64))
+HTTP_COUNTERS_MAX_HOSTS = 256
+HTTP_RETRY_COUNT = convert_to_int(get_environment_variable_default("HTTP_RETRY_COUNT", 2))
+HTTP_RETRY_BACKOFF_SECONDS = 0.5  # Then 1 second, 2 seconds...
+HTTP_RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+http_lock = threading.Lock()
+http_sessions_by_host = OrderedDict()  # Least recently used first
+http_counters_by_host = OrderedDict()
+
+# Only for idempotent GETs, and only when the caller asks, with cache_seconds
+http_response_cache = LocalTTLCache(cache_name='Outbound HTTP responses', max_entries=2000, time_to_live_seconds=60)
+
+
+def get_http_host(url):
+    split_url = urlsplit(url)
+    return split_url.scheme + '://' + split_url.netloc
+
+
+def get_http_session(url, retries=HTTP_RETRY_COUNT):
+    """
+    One requests.Session per host and retries, shared by every thread in this process, for the
+    HTTP_SESSION_MAX_HOSTS hosts used most recently. Only GET, HEAD and OPTIONS
+    are retried on read errors and HTTP_RETRY_STATUS_CODES (honoring Retry-After). PUT, DELETE and POST are only
+    retried when the connection failed, so before the other service saw them.
+    """
+    host = get_http_host(url)
+    evicted_session_list = []
+    with http_lock:
+        session = http_sessions_by_host.get((host, retries))
+        if session is not None:
+            http_sessions_by_host.move_to_end((host, retries))
+        else:
+            retry = Retry(
+                total=retries,
+                backoff_factor=HTTP_RETRY_BACKOFF_SECONDS,
+                status_forcelist=HTTP_RETRY_STATUS_CODES,
+                allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']),
+                raise_on_status=False,
+                respect_retry_after_header=True)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount(host, adapter)
+            http_sessions_by_host[(host, retries)] = session
+            while len(http_sessions_by_host) > max(HTTP_SESSION_MAX_HOSTS, 1):
+                evicted_session_list.append(http_sessions_by_host.popitem(last=False)[1])
+    # A request still running on an evicted session finishes, then its connection is closed instead of pooled
+    for evicted_session in evicted_session_list:
+        evicted_session.close()
+    return session
+
+
+def record_http_call(host, elapsed_seconds, status_code=0, error=None):
+    with http_lock:
+        counters = http_counters_by_host.get(host)
+        if counters is not None:
+            http_counters_by_host.move_to_end(host)
+        else:
+            counters = {
+                'host':                 host,
+                'request_count':        0,
+                'error_count':          0,
+                'server_error_count':   0,
+                'client_error_count':   0,
+                'cache_hit_count':      0,
+                'total_seconds':        0.0,
+                'maximum_seconds':      0.0,
+                'last_error':           '',
+            }
+            http_counters_by_host[host] = counters
+            while len(http_counters_by_host) > HTTP_COUNTERS_MAX_HOSTS:
+                http_counters_by_host.popitem(last=False)
+        if elapsed_seconds is None:
+            counters['cache_hit_count'] += 1
+            return
+        counters['request_count'] += 1
+        counters['total_seconds'] += elapsed_seconds
+        counters['maximum_seconds'] = max(counters['maximum_seconds'], elapsed_seconds)
+        if error is not None:
+            counters['error_count'] += 1
+            counters['last_error'] = str(error)[:255]
+        elif status_code >= 500:
+            counters['server_error_count'] += 1
+        elif status_code >= 400:
+            counters['client_error_count'] += 1
+
+
+def generate_http_cache_key(url, params=None, headers=None):
+    key = url
+    if params:
+        key += '?' + urlencode(sorted(params.items()) if isinstance(params, dict) else params, doseq=True)
+    if headers:
+        key += '|' + urlencode(sorted(headers.items()))
+    return key
+
+
+def http_request(method, url, timeout=None, cache_seconds=0, retries=HTTP_RETRY_COUNT, **kwargs):
+    """
+    Like requests.request, through the pooled session for url's host, with HTTP_DEFAULT_TIMEOUT_SECONDS unless
+    timeout is given. Raises what requests raises.
+    :param retries: 0 when the caller already retries, with its own backoff
+    :param cache_seconds: For a GET whose answer can be reused, keep a successful response this long, in this
+      process. Don't combine with stream=True.
+    """
+    method = method.upper()
+    host = get_http_host(url)
+    cache_key = None
+    if cache_seconds and method == 'GET':
+        cache_key = generate_http_cache_key(url, kwargs.get('params'), kwargs.get('headers'))
+        response = http_response_cache.get(cache_key)
+        if response is not CACHE_VALUE_NOT_FOUND:
+            record_http_call(host, None)
+            return response
+
+    t0 = perf_counter()
+    try:
+        response = get_http_session(url, retries).request(
+            method, url, timeout=HTTP_DEFAULT_TIMEOUT_SECONDS if timeout is None else timeout, **kwargs)
+    except Exception as e:
+        record_http_call(host, perf_counter() - t0, error=e)
+        raise
+    record_http_call(host, perf_counter() - t0, status_code=response.status_code)
+
+    if cache_key is not None and response.status_code == 200:
+        http_response_cache.set(cache_key, response, time_to_live_seconds=cache_seconds)
+    return response
+
+
+def http_get(url, params=None, **kwargs):
+    return http_request('GET', url, params=params, **kwargs)
+
+
+def http_post(url, data=None, json=None, **kwargs):
+    return http_request('POST', url, data=data, json=json, **kwargs)
+
+
+def http_put(url, data=None, **kwargs):
+    return http_request('PUT', url, data=data, **kwargs)
+
+
+def http_delete(url, **kwargs):
+    return http_request('DELETE', url, **kwargs)
+
+
+def http_client_stats():
+    """
+    For the admin statistics page. Per process, like the cache counters.
+    """
+    with http_lock:
+        counters_list = [dict(counters) for counters in http_counters_by_host.values()]
+    for counters in counters_list:
+        counters['average_milliseconds'] = \
+            round(1000 * counters['total_seconds'] / counters['request_count'], 1) if counters['request_count'] else 0
+        counters['maximum_milliseconds'] = round(1000 * counters['maximum_seconds'], 1)
+    return sorted(counters_list, key=lambda counters: -counters['request_count'])
@@ -0,0 +1,77 @@
+# wevote_functions/functions_query.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from django.db.models import Field, Lookup, Q
+
+import wevote_functions.admin
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+# Below this many values we use a plain IN (...), which Postgres plans the same way and which reads better in logs
+VALUE_LIST_ANY_ARRAY_THRESHOLD = 100
+# No single array parameter gets more values than this. Longer lists become "field = ANY(...) OR field = ANY(...)"
+VALUE_LIST_CHUNK_SIZE = 10000
+
+
+@Field.register_lookup
+class AnyArray(Lookup):
+    """
+    field__any_array=['wv02org1', 'wv02org2'] becomes "field = ANY(%s)" with the whole list passed as one
+    Postgres array parameter, instead of one placeholder (or one OR'ed Q term) per value.
+    """
+    lookup_name = 'any_array'
+
+    def get_prep_lookup(self):
+        if hasattr(self.rhs, 'resolve_expression'):
+            return self.rhs
+        return [self.lhs.output_field.get_prep_value(one_value) for one_value in self.rhs]
+
+    def get_db_prep_lookup(self, value, connection):
+        field = self.lhs.output_field
+        return '%s', [[field.get_db_prep_value(one_value, connection, prepared=True) for one_value in value]]
+
+    def as_sql(self, compiler, connection):
+        lhs_sql, lhs_params = self.process_lhs(compiler, connection)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        return '%s = ANY(%s)' % (lhs_sql, rhs_sql), list(lhs_params) + list(rhs_params)
+
+
+def chunk_value_list(value_list, chunk_size=VALUE_LIST_CHUNK_SIZE):
+    for start in range(0, len(value_list), chunk_size):
+        yield value_list[start:start + chunk_size]
+
+
+def generate_value_list_filter(field_name, value_list, chunk_size=VALUE_LIST_CHUNK_SIZE):
+    """
+    Use in place of building up "Q(field=value1) | Q(field=value2) | ..." one term per value, which gives Postgres
+    a huge statement to plan and turns into one index probe per OR'ed term.
+    An empty value_list matches nothing, the same as field__in=[].
+    :param field_name: ex/ 'organization_we_vote_id'
+    :param value_list: Duplicates and empty values are dropped
+    :param chunk_size:
+    :return: Q object
+    """
+    unique_value_list = []
+    values_already_seen = set()
+    for one_value in value_list or []:
+        if one_value is None or one_value == '' or one_value in values_already_seen:
+            continue
+        values_already_seen.add(one_value)
+        unique_value_list.append(one_value)
+
+    if len(unique_value_list) < VALUE_LIST_ANY_ARRAY_THRESHOLD:
+        return Q(**{field_name + '__in': unique_value_list})
+
+    value_list_filter = Q()
+    for value_list_chunk in chunk_value_list(unique_value_list, chunk_size=chunk_size):
+        value_list_filter |= Q(**{field_name + '__any_array': value_list_chunk})
+    return value_list_filter
+
+
+def filter_by_value_list(query, field_name, value_list):
+    return query.filter(generate_value_list_filter(field_name, value_list))
+
+
+def exclude_by_value_list(query, field_name, value_list):
+    return query.exclude(generate_value_list_filter(field_name, value_list))
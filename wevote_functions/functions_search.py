@@ -0,0 +1,167 @@
+# wevote_functions/functions_search.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from array import array
+import heapq
+import threading
+
+import wevote_functions.admin
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+TRIGRAM_LENGTH = 3
+# Removed documents are dropped from the postings once there are this many, or a quarter as many as live documents
+TRIGRAM_SEARCH_INDEX_COMPACT_MINIMUM = 1000
+
+
+def generate_trigram_set(text):
+    return set(text[position:position + TRIGRAM_LENGTH] for position in range(len(text) - TRIGRAM_LENGTH + 1))
+
+
+def score_search_word_in_field(search_word, field_value):
+    """
+    How well one (lower case) search word matches one (lower case) field. 0 means it doesn't appear at all.
+    """
+    if field_value == search_word:
+        return 4
+    if field_value.startswith(search_word):
+        return 3
+    if ' ' + search_word in field_value:
+        return 2  # Start of a later word, ex/ "obama" in "barack obama"
+    if search_word in field_value:
+        return 1
+    return 0
+
+
+class TrigramSearchIndex(object):
+    """
+    An in-memory inverted index from every three-character substring to the documents containing it. A search
+    word of three or more characters only has to be checked against documents that contain all of its trigrams,
+    so "every search word is a case-insensitive substring of one of the fields" doesn't need a scan of every row.
+    Postings are compact arrays of document numbers. Changing or removing a document leaves its old number behind
+    as a tombstone (skipped by search), until enough of them pile up and compact_postings drops them. Writes are
+    serialized. Searches take no lock, since document numbers never change.
+    """
+
+    def __init__(self, field_weight_list=None):
+        """
+        :param field_weight_list: One multiplier per searchable field, ex/ [2, 1, 1] to favor the name over handles
+        """
+        self.field_weight_list = field_weight_list
+        self.document_list = []  # document number -> (key, lower case field tuple, payload), or None if removed
+        self.document_number_by_key = {}
+        self.postings = {}
+        self.tombstone_count = 0
+        self._write_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.document_number_by_key)
+
+    def add_document(self, key, field_value_list, payload):
+        """
+        Add a document, or replace the document already indexed under this key.
+        :param key:
+        :param field_value_list: The searchable text, in the same order as field_weight_list. None is allowed.
+        :param payload: What search returns for this document
+        :return:
+        """
+        field_tuple = tuple((field_value or '').lower() for field_value in field_value_list)
+        trigram_set = set()
+        for field_value in field_tuple:
+            trigram_set.update(generate_trigram_set(field_value))
+        with self._write_lock:
+            self._remove_document(key)
+            document_number = len(self.document_list)
+            self.document_list.append((key, field_tuple, payload))
+            self.document_number_by_key[key] = document_number
+            for trigram in trigram_set:
+                posting = self.postings.get(trigram)
+                if posting is None:
+                    posting = self.postings[trigram] = array('I')
+                posting.append(document_number)
+
+    def remove_document(self, key):
+        with self._write_lock:
+            self._remove_document(key)
+
+    def _remove_document(self, key):
+        document_number = self.document_number_by_key.pop(key, None)
+        if document_number is not None:
+            self.document_list[document_number] = None
+            self.tombstone_count += 1
+            if self.tombstone_count >= \
+                    max(TRIGRAM_SEARCH_INDEX_COMPACT_MINIMUM, len(self.document_number_by_key) // 4):
+                self._compact_postings()
+
+    def compact_postings(self):
+        with self._write_lock:
+            self._compact_postings()
+
+    def _compact_postings(self):
+        """
+        Drop the numbers of removed documents from every posting, replacing each posting whole, so a search
+        running now sees either the old or the new one. The removed documents' slots in document_list stay None.
+        """
+        document_list = self.document_list
+        for trigram, posting in list(self.postings.items()):
+            live_posting = array('I', (document_number for document_number in posting
+                                       if document_list[document_number] is not None))
+            if len(live_posting):
+                self.postings[trigram] = live_posting
+            else:
+                del self.postings[trigram]
+        self.tombstone_count = 0
+
+    def find_candidate_document_numbers(self, search_word_list):
+        trigram_set = set()
+        for search_word in search_word_list:
+            trigram_set.update(generate_trigram_set(search_word))
+        if not trigram_set:
+            # Only one and two character words. Nothing to narrow with, so every document is a candidate.
+            return range(len(self.document_list))
+        posting_list = []
+        for trigram in trigram_set:
+            posting = self.postings.get(trigram)
+            if posting is None:
+                return []
+            posting_list.append(posting)
+        posting_list.sort(key=len)
+        candidate_set = set(posting_list[0])
+        for posting in posting_list[1:]:
+            candidate_set.intersection_update(posting)
+            if not candidate_set:
+                break
+        return candidate_set
+
+    def search(self, search_text, limit=25):
+        """
+        Every word in search_text has to appear (case-insensitive, anywhere) in at least one field.
+        :param search_text:
+        :param limit:
+        :return: Up to limit (score, payload) tuples, best match first. Ties go to the shorter first field.
+        """
+        search_word_list = (search_text or '').lower().split()
+        field_weight_list = self.field_weight_list
+        ranked_list = []
+        for document_number in self.find_candidate_document_numbers(search_word_list):
+            document = self.document_list[document_number]
+            if document is None:
+                continue
+            key, field_tuple, payload = document
+            score = 0
+            for search_word in search_word_list:
+                best_word_score = 0
+                for field_number, field_value in enumerate(field_tuple):
+                    word_score = score_search_word_in_field(search_word, field_value)
+                    if word_score and field_weight_list:
+                        word_score *= field_weight_list[field_number]
+                    if word_score > best_word_score:
+                        best_word_score = word_score
+                if not best_word_score:
+                    break
+                score += best_word_score
+            else:
+                ranked_list.append((-score, len(field_tuple[0]) if field_tuple else 0, document_number, payload))
+        return [(-negative_score, payload) for negative_score, field_length, document_number, payload
+                in heapq.nsmallest(limit, ranked_list, key=lambda ranked: ranked[:3])]
@@ -0,0 +1,94 @@
+# wevote_functions/functions_spatial.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+import heapq
+from math import asin, cos, floor, radians, sin, sqrt
+
+import wevote_functions.admin
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+RADIUS_OF_EARTH_IN_MILES = 3958.756
+MILES_PER_DEGREE_OF_LATITUDE = 68.7  # The shortest a degree of latitude gets, so bounding boxes are never too small
+
+
+def great_circle_distance_in_miles(latitude1, longitude1, latitude2, longitude2):
+    # Haversine, which (unlike the law of cosines) stays accurate for points a few feet apart
+    latitude1, longitude1, latitude2, longitude2 = map(radians, (latitude1, longitude1, latitude2, longitude2))
+    a = sin((latitude2 - latitude1) / 2) ** 2 + \
+        cos(latitude1) * cos(latitude2) * sin((longitude2 - longitude1) / 2) ** 2
+    return 2 * RADIUS_OF_EARTH_IN_MILES * asin(min(1.0, sqrt(a)))
+
+
+class LatLongGridIndex(object):
+    """
+    Buckets points into cell_degrees x cell_degrees cells, so a nearest-point search only measures the distance
+    to points in the cells that overlap the search radius, instead of every point.
+    """
+
+    def __init__(self, point_list=None, cell_degrees=0.1):
+        """
+        :param point_list: iterable of (key, latitude, longitude). Points missing a coordinate are skipped.
+        :param cell_degrees:
+        """
+        self.cell_degrees = cell_degrees
+        self.cells = {}
+        self.point_count = 0
+        for key, latitude, longitude in point_list or []:
+            if latitude is None or longitude is None:
+                continue
+            cell = self.cell_for(latitude, longitude)
+            if cell not in self.cells:
+                self.cells[cell] = []
+            self.cells[cell].append((key, latitude, longitude))
+            self.point_count += 1
+
+    def __len__(self):
+        return self.point_count
+
+    def cell_for(self, latitude, longitude):
+        return floor(latitude / self.cell_degrees), floor(longitude / self.cell_degrees)
+
+    def find_nearest(self, latitude, longitude, k=1, max_distance_in_miles=None):
+        """
+        :param latitude:
+        :param longitude:
+        :param k: How many points to return
+        :param max_distance_in_miles: Leave out points farther than this. Without it every point is measured.
+        :return: Up to k (distance_in_miles, key) tuples, closest first
+        """
+        if max_distance_in_miles is None:
+            candidate_point_lists = self.cells.values()
+        else:
+            latitude_delta = max_distance_in_miles / MILES_PER_DEGREE_OF_LATITUDE
+            # Degrees of longitude shrink toward the poles, so widen the box using the latitude farthest from
+            #  the equator that is still inside it
+            widest_cos = cos(radians(min(90.0, abs(latitude) + latitude_delta)))
+            longitude_delta = 180.0 if widest_cos < 0.01 else min(180.0, latitude_delta / widest_cos)
+            low_latitude_cell, low_longitude_cell = \
+                self.cell_for(latitude - latitude_delta, longitude - longitude_delta)
+            high_latitude_cell, high_longitude_cell = \
+                self.cell_for(latitude + latitude_delta, longitude + longitude_delta)
+            candidate_point_lists = []
+            if (high_latitude_cell - low_latitude_cell + 1) * (high_longitude_cell - low_longitude_cell + 1) \
+                    > len(self.cells):
+                # A huge radius, or a sparse index. Cheaper to look at every cell we have.
+                for (latitude_cell, longitude_cell), point_list in self.cells.items():
+                    if low_latitude_cell <= latitude_cell <= high_latitude_cell \
+                            and low_longitude_cell <= longitude_cell <= high_longitude_cell:
+                        candidate_point_lists.append(point_list)
+            else:
+                for latitude_cell in range(low_latitude_cell, high_latitude_cell + 1):
+                    for longitude_cell in range(low_longitude_cell, high_longitude_cell + 1):
+                        point_list = self.cells.get((latitude_cell, longitude_cell))
+                        if point_list:
+                            candidate_point_lists.append(point_list)
+
+        distance_list = []
+        for point_list in candidate_point_lists:
+            for key, point_latitude, point_longitude in point_list:
+                distance = great_circle_distance_in_miles(latitude, longitude, point_latitude, point_longitude)
+                if max_distance_in_miles is None or distance <= max_distance_in_miles:
+                    distance_list.append((distance, key))
+        return heapq.nsmallest(k, distance_list)
@@ -0,0 +1,135 @@
+# wevote_functions/functions_status.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from collections import deque
+
+import wevote_functions.admin
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+# How many status entries a StatusTrace keeps. Older entries are dropped, but still counted.
+STATUS_TRACE_MAXIMUM_ENTRIES = 500
+# Longer entries (ex/ the status of a nested call that didn't use StatusTrace) are cut to this many characters
+STATUS_TRACE_MAXIMUM_ENTRY_LENGTH = 2000
+# How many different codes we count. Codes after that are counted together as STATUS_TRACE_OTHER_CODES
+STATUS_TRACE_MAXIMUM_CODES = 500
+# How many of the most frequent codes we list when rendering a StatusTrace that dropped entries
+STATUS_TRACE_RENDERED_CODES = 25
+
+
+class StatusTrace(object):
+    """
+    A drop-in replacement for building up a status string with status += "SOME_CODE " in long loops. Instead of
+    copying the whole string on every +=, we keep the most recent maximum_entries entries in a ring buffer and count
+    every entry by its code (the text before the first ":"), so status stays a fixed size however long the batch
+    process runs. Turn it back into the legacy status string with str(status) where it leaves the controller,
+    ex/ in a results dict, a BatchProcessLogEntry or a JSON response.
+
+        status = StatusTrace()
+        for ...:
+            status += "BALLOT_ITEM_CREATED "
+            status += results['status']
+        results = {'success': success, 'status': str(status)}
+
+    If nothing was dropped, str(status) is exactly the string += would have built.
+    """
+
+    def __init__(self, status='', maximum_entries=STATUS_TRACE_MAXIMUM_ENTRIES,
+                 maximum_entry_length=STATUS_TRACE_MAXIMUM_ENTRY_LENGTH):
+        self.maximum_entry_length = maximum_entry_length
+        self._entries = deque(maxlen=maximum_entries)
+        self.entry_count = 0
+        self.count_by_code = {}
+        self.other_code_count = 0
+        if status:
+            self.add(status)
+
+    def add(self, status_text):
+        """
+        Constant time: no string is copied unless status_text is too long, or has a ":" in it
+        """
+        if not status_text:
+            return self
+        if isinstance(status_text, StatusTrace):
+            return self.add_trace(status_text)
+        if not isinstance(status_text, str):
+            status_text = str(status_text)
+        if len(status_text) > self.maximum_entry_length:
+            status_text = status_text[:self.maximum_entry_length] + "... "
+        self._entries.append(status_text)
+        self.entry_count += 1
+        colon_position = status_text.find(':')
+        code = status_text if colon_position < 0 else status_text[:colon_position]
+        code_count = self.count_by_code.get(code)
+        if code_count is not None:
+            self.count_by_code[code] = code_count + 1
+        elif len(self.count_by_code) < STATUS_TRACE_MAXIMUM_CODES:
+            self.count_by_code[code] = 1
+        else:
+            self.other_code_count += 1
+        return self
+
+    def add_trace(self, status_trace):
+        """
+        Fold in the StatusTrace of a nested call, keeping its counts (even for entries it dropped)
+        """
+        for status_text in status_trace._entries:
+            self._entries.append(status_text)
+        self.entry_count += status_trace.entry_count
+        for code, code_count in status_trace.count_by_code.items():
+            if code in self.count_by_code:
+                self.count_by_code[code] += code_count
+            elif len(self.count_by_code) < STATUS_TRACE_MAXIMUM_CODES:
+                self.count_by_code[code] = code_count
+            else:
+                self.other_code_count += code_count
+        self.other_code_count += status_trace.other_code_count
+        return self
+
+    def __iadd__(self, status_text):
+        return self.add(status_text)
+
+    def __add__(self, status_text):
+        # status + "MORE " gives a str, like it did when status was a str
+        return self.render() + str(status_text)
+
+    def __radd__(self, status_text):
+        # So a caller still building a str can do: status += results['status']
+        return str(status_text) + self.render()
+
+    def __bool__(self):
+        return self.entry_count > 0
+
+    def __contains__(self, text):
+        return any(text in status_text for status_text in self._entries)
+
+    def __str__(self):
+        return self.render()
+
+    def count(self, code):
+        """
+        How many entries had this code, ex/ status.count("BALLOT_ITEM_CREATED")
+        """
+        return self.count_by_code.get(code, 0) + self.count_by_code.get(code + ' ', 0)
+
+    @property
+    def dropped_entry_count(self):
+        return self.entry_count - len(self._entries)
+
+    def render(self):
+        """
+        :return: The legacy status string. When entries were dropped, it starts with the number dropped and the
+          counts of the most frequent codes, followed by the entries we kept.
+        """
+        if not self.dropped_entry_count:
+            return ''.join(self._entries)
+        summary = "STATUS_TRACE_DROPPED_ENTRIES: " + str(self.dropped_entry_count) + " "
+        summary += "STATUS_TRACE_COUNTS: "
+        most_frequent_code_list = \
+            sorted(self.count_by_code.items(), key=lambda code_and_count: -code_and_count[1])
+        for code, code_count in most_frequent_code_list[:STATUS_TRACE_RENDERED_CODES]:
+            summary += code.strip() + " x" + str(code_count) + ", "
+        if self.other_code_count:
+            summary += "STATUS_TRACE_OTHER_CODES x" + str(self.other_code_count) + ", "
+        return summary + "... " + ''.join(self._entries)
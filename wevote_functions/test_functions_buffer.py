@@ -0,0 +1,128 @@
+# wevote_functions/test_functions_buffer.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+import fcntl
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+from .functions_buffer import SpillingRowBuffer, SPILLING_ROW_BUFFER_SEGMENTS_IN_MEMORY
+
+
+class WeVoteFunctionsTestsBuffer(SimpleTestCase):
+
+    def setUp(self):
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        self.spill_directory = temporary_directory.name
+        self.flushed_row_list_list = []
+        self.flush_error = None
+
+    def flush_function(self, row_list):
+        if self.flush_error:
+            raise self.flush_error
+        self.flushed_row_list_list.append(row_list)
+
+    def list_spill_files(self):
+        # Leaving out the lock file each running process keeps
+        return sorted(file_name for file_name in os.listdir(self.spill_directory) if file_name.endswith('.jsonl'))
+
+    def generate_buffer(self, maximum_rows=3, maximum_seconds=60):
+        row_buffer = SpillingRowBuffer(
+            'test_action', self.flush_function, self.spill_directory, maximum_rows=maximum_rows,
+            maximum_seconds=maximum_seconds, maximum_rows_waiting=4, start_flush_thread=False)
+        self.addCleanup(row_buffer.close)
+        return row_buffer
+
+    def test_flush_on_size_and_time(self):
+        row_buffer = self.generate_buffer()
+        row_buffer.accept({'action_constant': 1})
+        row_buffer.accept({'action_constant': 2})
+        self.assertEqual(self.flushed_row_list_list, [])
+        self.assertEqual(len(self.list_spill_files()), 1)
+        row_buffer.accept({'action_constant': 3})
+        self.assertEqual(self.flushed_row_list_list, [[{'action_constant': 1}, {'action_constant': 2},
+                                                       {'action_constant': 3}]])
+        self.assertEqual(self.list_spill_files(), [])
+
+        row_buffer.maximum_seconds = 0
+        row_buffer.accept({'action_constant': 4})
+        self.assertEqual(self.flushed_row_list_list[-1], [{'action_constant': 4}])
+        metrics = row_buffer.metrics()
+        self.assertEqual((metrics['rows_accepted'], metrics['rows_flushed'], metrics['rows_waiting']), (4, 4, 0))
+
+    def test_failed_flush_keeps_rows_on_disk(self):
+        row_buffer = self.generate_buffer()
+        self.flush_error = Exception('database is down')
+        for action_constant in range(5):
+            row_buffer.accept({'action_constant': action_constant})
+        metrics = row_buffer.metrics()
+        self.assertEqual(metrics['rows_waiting'], 5)
+        self.assertEqual(metrics['rows_in_memory'], 2)  # Only the segment still being written
+        self.assertEqual(metrics['consecutive_flush_failure_count'], 1)
+        self.assertTrue(metrics['is_backlogged'])
+        self.assertFalse(row_buffer.flush(only_if_due=True)['rows_flushed'])  # Waiting to retry
+
+        self.flush_error = None
+        results = row_buffer.flush()
+        self.assertEqual(results['rows_flushed'], 5)
+        self.assertEqual([row['action_constant'] for row_list in self.flushed_row_list_list for row in row_list],
+                         [0, 1, 2, 3, 4])
+        self.assertFalse(row_buffer.metrics()['is_backlogged'])
+        self.assertEqual(self.list_spill_files(), [])
+
+    def test_slow_flushes_keep_rows_on_disk(self):
+        row_buffer = self.generate_buffer()
+        # The flush thread hasn't caught up yet
+        with mock.patch.object(row_buffer, 'flush'):
+            for action_constant in range(3 * (SPILLING_ROW_BUFFER_SEGMENTS_IN_MEMORY + 3)):
+                row_buffer.accept({'action_constant': action_constant})
+        metrics = row_buffer.metrics()
+        self.assertEqual(metrics['rows_waiting'], 3 * (SPILLING_ROW_BUFFER_SEGMENTS_IN_MEMORY + 3))
+        self.assertEqual(metrics['rows_in_memory'], 3 * SPILLING_ROW_BUFFER_SEGMENTS_IN_MEMORY)
+
+        self.assertEqual(row_buffer.flush()['rows_flushed'], 3 * (SPILLING_ROW_BUFFER_SEGMENTS_IN_MEMORY + 3))
+        self.assertEqual([row['action_constant'] for row_list in self.flushed_row_list_list for row in row_list],
+                         list(range(3 * (SPILLING_ROW_BUFFER_SEGMENTS_IN_MEMORY + 3))))
+
+    def test_recover_spill_files(self):
+        # Left behind by a process that is no longer running, which died while writing its last line
+        with open(os.path.join(self.spill_directory, 'test_action-4194305-1-1.jsonl'), 'w') as spill_file:
+            spill_file.write('{"action_constant": 7}\n{"action_constant": 8}\n{"action_con')
+        # Another buffer's spill file
+        with open(os.path.join(self.spill_directory, 'other_action-4194305-1-1.jsonl'), 'w') as spill_file:
+            spill_file.write('{"action_constant": 9}\n')
+        row_buffer = self.generate_buffer()
+        row_buffer.accept({'action_constant': 10})
+        results = row_buffer.flush()
+        self.assertEqual(results['rows_flushed'], 3)
+        self.assertEqual(self.flushed_row_list_list,
+                         [[{'action_constant': 7}, {'action_constant': 8}], [{'action_constant': 10}]])
+        self.assertEqual(row_buffer.metrics()['spill_files_recovered'], 1)
+        self.assertEqual(sorted(os.listdir(self.spill_directory)),
+                         ['other_action-4194305-1-1.jsonl', 'test_action-' + str(os.getpid()) + '-' +
+                          row_buffer._process_token + '.lock'])
+
+    def test_spill_files_of_running_process_not_recovered(self):
+        # A process that is still running, maybe on another host sharing the spill directory, holds its lock
+        lock_file_path = os.path.join(self.spill_directory, 'test_action-4194305-1.lock')
+        lock_file_descriptor = os.open(lock_file_path, os.O_RDWR | os.O_CREAT)
+        self.addCleanup(os.close, lock_file_descriptor)
+        fcntl.flock(lock_file_descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        with open(os.path.join(self.spill_directory, 'test_action-4194305-1-1.jsonl'), 'w') as spill_file:
+            spill_file.write('{"action_constant": 7}\n')
+        row_buffer = self.generate_buffer()
+        row_buffer.accept({'action_constant': 10})
+        self.assertEqual(row_buffer.flush()['rows_flushed'], 1)
+        self.assertEqual(row_buffer.metrics()['spill_files_recovered'], 0)
+
+        # Once it exits without flushing, we take its spill files and clean up its lock file
+        fcntl.flock(lock_file_descriptor, fcntl.LOCK_UN)
+        row_buffer.recover_spill_files()
+        self.assertEqual(row_buffer.flush()['rows_flushed'], 1)
+        self.assertEqual(self.flushed_row_list_list[-1], [{'action_constant': 7}])
+        self.assertFalse(os.path.exists(lock_file_path))
+        row_buffer.close()
+        self.assertEqual(os.listdir(self.spill_directory), [])
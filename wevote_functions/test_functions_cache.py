@@ -0,0 +1,60 @@
+# wevote_functions/test_functions_cache.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from .functions_cache import CACHE_VALUE_NOT_FOUND, LocalTTLCache, is_shared_cache_alias
+
+
+class WeVoteFunctionsTestsCache(SimpleTestCase):
+
+    def test_get_and_set(self):
+        cache = LocalTTLCache(cache_name='test', max_entries=10, time_to_live_seconds=60)
+        self.assertIs(cache.get('missing'), CACHE_VALUE_NOT_FOUND)
+        cache.set('voter_device_id', {'voter_id': 1})
+        self.assertEqual(cache.get('voter_device_id'), {'voter_id': 1})
+        cache.set('none_is_a_value', None)
+        self.assertIsNone(cache.get('none_is_a_value'))
+        stats = cache.stats()
+        self.assertEqual(stats['hit_count'], 2)
+        self.assertEqual(stats['miss_count'], 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = LocalTTLCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')  # 'b' is now the least recently used
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIs(cache.get('b'), CACHE_VALUE_NOT_FOUND)
+        self.assertEqual(cache.stats()['eviction_count'], 1)
+
+    def test_entries_expire(self):
+        cache = LocalTTLCache(time_to_live_seconds=30)
+        with mock.patch('wevote_functions.functions_cache.monotonic', return_value=1000.0):
+            cache.set('a', 1)
+        with mock.patch('wevote_functions.functions_cache.monotonic', return_value=1029.0):
+            self.assertEqual(cache.get('a'), 1)
+        with mock.patch('wevote_functions.functions_cache.monotonic', return_value=1031.0):
+            self.assertIs(cache.get('a'), CACHE_VALUE_NOT_FOUND)
+        self.assertEqual(len(cache), 0)
+
+    def test_delete_where(self):
+        cache = LocalTTLCache()
+        cache.set('device1', {'voter_id': 1})
+        cache.set('device2', {'voter_id': 2})
+        cache.set('device3', {'voter_id': 1})
+        self.assertEqual(cache.delete_where(lambda value: value['voter_id'] == 1), 2)
+        self.assertEqual(cache.get('device2'), {'voter_id': 2})
+        self.assertIs(cache.get('device1'), CACHE_VALUE_NOT_FOUND)
+
+    @override_settings(CACHES={
+        'default':  {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'shared':   {'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache', 'LOCATION': '127.0.0.1:1'},
+    })
+    def test_is_shared_cache_alias(self):
+        self.assertFalse(is_shared_cache_alias('default'))
+        self.assertTrue(is_shared_cache_alias('shared'))
+        self.assertFalse(is_shared_cache_alias('missing'))
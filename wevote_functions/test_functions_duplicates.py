@@ -0,0 +1,73 @@
+# wevote_functions/test_functions_duplicates.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase, TransactionTestCase
+from .functions_duplicates import DuplicateFinder, find_duplicates_in_list, normalize_duplicate_key_text
+from politician.models import PoliticiansAreNotDuplicates
+
+
+class WeVoteFunctionsTestsDuplicates(SimpleTestCase):
+
+    def setUp(self):
+        self.duplicate_finder = DuplicateFinder({'twitter': 10, 'name': 5, 'last_first': 3}, maximum_block_size=3)
+        for we_vote_id, blocking_key_list in [
+                ('pol1', [('twitter', 'janedoe'), ('name', 'jane doe')]),
+                ('pol2', [('name', 'jane doe')]),
+                ('pol3', [('twitter', 'janedoe'), ('last_first', 'doe', 'jane')]),
+                ('pol4', [('last_first', 'doe', 'jane')]),
+                ('pol5', [('name', 'john smith')])]:
+            self.duplicate_finder.add_record(we_vote_id, SimpleNamespace(we_vote_id=we_vote_id), blocking_key_list)
+
+    def test_normalize_duplicate_key_text(self):
+        self.assertEqual(normalize_duplicate_key_text('  Doe,  Jane Q. '), 'doe jane q')
+        self.assertEqual(normalize_duplicate_key_text(None), '')
+
+    def test_find_duplicate_pairs(self):
+        results = self.duplicate_finder.find_duplicate_pairs()
+        self.assertEqual(
+            [(pair['record1'].we_vote_id, pair['record2'].we_vote_id, pair['score'], pair['matched_key_kind_list'])
+             for pair in results['duplicate_pair_list']],
+            [('pol1', 'pol3', 10, ['twitter']),
+             ('pol1', 'pol2', 5, ['name']),
+             ('pol3', 'pol4', 3, ['last_first'])])
+
+    def test_merge_queue(self):
+        # pol1 pairs with pol3, its best match, which leaves pol2 and pol4 with nobody
+        results = self.duplicate_finder.generate_merge_queue()
+        self.assertEqual([(pair['record1'].we_vote_id, pair['record2'].we_vote_id)
+                          for pair in results['duplicate_pair_list']], [('pol1', 'pol3')])
+        self.assertEqual([record.we_vote_id for record in results['unmatched_record_list']], ['pol2', 'pol4', 'pol5'])
+
+        self.duplicate_finder.add_not_duplicates('pol3', 'pol1')
+        results = self.duplicate_finder.generate_merge_queue()
+        self.assertEqual([(pair['record1'].we_vote_id, pair['record2'].we_vote_id)
+                          for pair in results['duplicate_pair_list']], [('pol1', 'pol2'), ('pol3', 'pol4')])
+
+    def test_oversized_block_skipped(self):
+        for we_vote_id in ['pol6', 'pol7']:
+            self.duplicate_finder.add_record(
+                we_vote_id, SimpleNamespace(we_vote_id=we_vote_id), [('name', 'jane doe')])
+        results = self.duplicate_finder.find_duplicate_pairs()
+        self.assertIn('OVERSIZED_BLOCKS_SKIPPED: 1', results['status'])
+        self.assertNotIn(['name'], [pair['matched_key_kind_list'] for pair in results['duplicate_pair_list']])
+
+
+class WeVoteFunctionsTestsFindDuplicatesInList(TransactionTestCase):
+    # TransactionTestCase, so the not duplicates lookup, from readonly, sees the rows saved here
+    databases = ["default", "readonly"]
+
+    def test_find_duplicates_in_list(self):
+        PoliticiansAreNotDuplicates.objects.create(politician1_we_vote_id='pol2', politician2_we_vote_id='pol1')
+        politician_list = [SimpleNamespace(we_vote_id=we_vote_id, name=name) for we_vote_id, name in [
+            ('pol1', 'jane doe'), ('pol2', 'jane doe'), ('pol3', 'jane doe'), ('pol4', 'john smith')]]
+        results = find_duplicates_in_list(
+            politician_list, {'name': 5}, lambda politician: [('name', politician.name)],
+            PoliticiansAreNotDuplicates, 'politician')
+        self.assertTrue(results['success'])
+        self.assertEqual([(pair['politician1'].we_vote_id, pair['politician2'].we_vote_id, pair['score'])
+                          for pair in results['duplicate_pair_list']], [('pol1', 'pol3', 5)])
+        self.assertEqual([politician.we_vote_id for politician in results['unmatched_politician_list']],
+                         ['pol2', 'pol4'])
@@ -0,0 +1,146 @@
+# wevote_functions/test_functions_http.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+import requests
+
+from .functions_http import get_http_session, http_client_stats, http_get, http_post, http_put, http_sessions_by_host
+
+
+class StubServiceHandler(BaseHTTPRequestHandler):
+    """
+    /flaky answers 503 the first time, /slow takes too long, everything else answers 200
+    """
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connection_count += 1
+
+    def answer(self):
+        with self.server.lock:
+            self.server.request_count += 1
+            request_count = self.server.request_count
+        content_length = int(self.headers.get('Content-Length') or 0)
+        if content_length:
+            self.rfile.read(content_length)
+        status_code = 200
+        if self.path.startswith('/flaky') and request_count == 1:
+            status_code = 503
+        elif self.path.startswith('/slow'):
+            self.server.release_event.wait(2)
+        body = str(request_count).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Length', str(len(body)))
+        try:
+            self.end_headers()
+            self.wfile.write(body)
+        except ConnectionError:
+            pass  # The client timed out and hung up
+
+    def do_GET(self):
+        self.answer()
+
+    def do_POST(self):
+        self.answer()
+
+    def do_PUT(self):
+        self.answer()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class WeVoteFunctionsTestsHttp(SimpleTestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubServiceHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.connection_count = 0
+        self.server.request_count = 0
+        self.server.release_event = threading.Event()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.host = 'http://127.0.0.1:' + str(self.server.server_address[1])
+        patcher = mock.patch.dict('wevote_functions.functions_http.http_counters_by_host', clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.release_event.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def host_stats(self):
+        return [stats for stats in http_client_stats() if stats['host'] == self.host][0]
+
+    def test_connection_reused(self):
+        for _ in range(5):
+            self.assertEqual(http_get(self.host + '/voterInfoQuery').status_code, 200)
+        http_post(self.host + '/purge', data='x')
+        self.assertEqual(self.server.connection_count, 1)
+        stats = self.host_stats()
+        self.assertEqual(stats['request_count'], 6)
+        self.assertEqual(stats['error_count'], 0)
+        self.assertGreater(stats['maximum_milliseconds'], 0)
+
+    def test_least_recently_used_session_closed(self):
+        with mock.patch('wevote_functions.functions_http.HTTP_SESSION_MAX_HOSTS', 2), \
+                mock.patch.dict('wevote_functions.functions_http.http_sessions_by_host', clear=True):
+            first_session = get_http_session(self.host + '/voterInfoQuery')
+            with mock.patch.object(first_session, 'close') as close_mock:
+                get_http_session('http://127.0.0.2:1/')
+                self.assertIs(get_http_session(self.host + '/purge'), first_session)
+                get_http_session('http://127.0.0.3:1/')
+                close_mock.assert_not_called()
+                self.assertEqual(len(http_sessions_by_host), 2)
+
+                get_http_session('http://127.0.0.4:1/')
+                get_http_session('http://127.0.0.5:1/')
+                close_mock.assert_called_once()
+            self.assertIsNot(get_http_session(self.host + '/voterInfoQuery'), first_session)
+
+    def test_get_retried_post_not(self):
+        response = http_get(self.host + '/flaky')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.request_count, 2)
+
+        self.server.request_count = 0
+        response = http_post(self.host + '/flaky', data='x')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.host_stats()['server_error_count'], 1)
+
+    def test_put_and_retries_zero_not_retried(self):
+        response = http_put(self.host + '/flaky', data='x')
+        self.assertEqual(response.status_code, 503)
+
+        self.server.request_count = 0
+        response = http_get(self.host + '/flaky', retries=0)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.server.request_count, 1)
+
+    def test_default_timeout(self):
+        with mock.patch('wevote_functions.functions_http.HTTP_DEFAULT_TIMEOUT_SECONDS', 0.2):
+            with self.assertRaises(requests.exceptions.RequestException):
+                http_post(self.host + '/slow', retries=0)
+        stats = self.host_stats()
+        self.assertEqual(stats['error_count'], 1)
+        self.assertTrue(stats['last_error'])
+
+    def test_cache_seconds(self):
+        first_response = http_get(self.host + '/files', params={'page': 1}, cache_seconds=60)
+        self.assertEqual(http_get(self.host + '/files', params={'page': 1}, cache_seconds=60).text,
+                         first_response.text)
+        self.assertNotEqual(http_get(self.host + '/files', params={'page': 2}, cache_seconds=60).text,
+                            first_response.text)
+        self.assertNotEqual(http_get(self.host + '/files', params={'page': 1}).text, first_response.text)
+        self.assertEqual(self.server.request_count, 3)
+        stats = self.host_stats()
+        self.assertEqual(stats['request_count'], 3)
+        self.assertEqual(stats['cache_hit_count'], 1)
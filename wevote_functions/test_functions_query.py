@@ -0,0 +1,27 @@
+# wevote_functions/test_functions_query.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from django.test import SimpleTestCase
+from .functions_query import VALUE_LIST_ANY_ARRAY_THRESHOLD, generate_value_list_filter
+
+
+class WeVoteFunctionsTestsQuery(SimpleTestCase):
+
+    def test_short_list_uses_in(self):
+        value_list_filter = generate_value_list_filter('organization_we_vote_id', ['wv02org1', '', 'wv02org1', None])
+        self.assertEqual(value_list_filter.children, [('organization_we_vote_id__in', ['wv02org1'])])
+
+    def test_empty_list_matches_nothing(self):
+        value_list_filter = generate_value_list_filter('organization_we_vote_id', [])
+        self.assertEqual(value_list_filter.children, [('organization_we_vote_id__in', [])])
+
+    def test_long_list_uses_one_array_per_chunk(self):
+        value_list = ['wv02org' + str(number) for number in range(VALUE_LIST_ANY_ARRAY_THRESHOLD + 150)]
+        value_list_filter = generate_value_list_filter('organization_we_vote_id', value_list, chunk_size=100)
+        self.assertEqual(value_list_filter.connector, 'OR')
+        self.assertEqual(len(value_list_filter.children), 3)
+        lookup_name, first_chunk = value_list_filter.children[0]
+        self.assertEqual(lookup_name, 'organization_we_vote_id__any_array')
+        self.assertEqual(first_chunk, value_list[:100])
+        self.assertEqual(value_list_filter.children[2][1], value_list[200:])
@@ -0,0 +1,75 @@
+# wevote_functions/test_functions_search.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+import random
+import string
+from unittest import mock
+
+from django.test import SimpleTestCase
+from .functions_search import TrigramSearchIndex
+
+
+class WeVoteFunctionsTestsSearch(SimpleTestCase):
+
+    def test_ranking(self):
+        search_index = TrigramSearchIndex(field_weight_list=[2, 1])
+        search_index.add_document(1, ['Michelle Obama', 'MichelleObama'], 'michelle')
+        search_index.add_document(2, ['Barack Obama', 'BarackObama'], 'barack')
+        search_index.add_document(3, ['Obama Foundation Fellow', None], 'fellow')
+        search_index.add_document(4, ['Jane Doe', 'obama_fan'], 'fan')
+        self.assertEqual([payload for score, payload in search_index.search('obama')],
+                         ['fellow', 'barack', 'michelle', 'fan'])
+        self.assertEqual([payload for score, payload in search_index.search('OBAMA bar')], ['barack'])
+        self.assertEqual(search_index.search('obama', limit=1), [(6, 'fellow')])
+
+    def test_replace_and_remove(self):
+        search_index = TrigramSearchIndex()
+        search_index.add_document(1, ['Jane Doe'], 'old')
+        search_index.add_document(1, ['Jane Smith'], 'new')
+        self.assertEqual(search_index.search('doe'), [])
+        self.assertEqual(search_index.search('smith'), [(2, 'new')])
+        search_index.remove_document(1)
+        self.assertEqual(search_index.search('jane'), [])
+        self.assertEqual(len(search_index), 0)
+
+    def test_tombstones_compacted(self):
+        search_index = TrigramSearchIndex()
+        for document_number in range(40):
+            search_index.add_document(document_number, ['Jane Doe ' + str(document_number)], document_number)
+        with mock.patch('wevote_functions.functions_search.TRIGRAM_SEARCH_INDEX_COMPACT_MINIMUM', 10):
+            for document_number in range(9):
+                search_index.add_document(document_number, ['John Smith ' + str(document_number)], document_number)
+            self.assertEqual(search_index.tombstone_count, 9)
+            self.assertEqual(len(search_index.postings['doe']), 40)
+
+            search_index.remove_document(39)
+            self.assertEqual(search_index.tombstone_count, 0)
+            self.assertEqual(len(search_index.postings['doe']), 30)
+        # Only in documents that were replaced or removed
+        self.assertNotIn('e 0', search_index.postings)
+        self.assertNotIn(' 39', search_index.postings)
+        self.assertEqual(len(search_index.search('jane', limit=100)), 30)
+        self.assertEqual([payload for score, payload in search_index.search('smith 8')], [8])
+
+    def test_matches_icontains(self):
+        random_generator = random.Random(2024)
+        alphabet = string.ascii_lowercase[:8] + ' '
+        document_list = []
+        search_index = TrigramSearchIndex()
+        for document_number in range(2000):
+            field_value_list = [
+                ''.join(random_generator.choice(alphabet) for _ in range(random_generator.randint(0, 15)))
+                for _ in range(3)]
+            document_list.append((document_number, field_value_list))
+            search_index.add_document(document_number, field_value_list, document_number)
+        for _ in range(100):
+            search_text = ' '.join(''.join(random_generator.choice(alphabet[:-1])
+                                           for _ in range(random_generator.randint(1, 4)))
+                                   for _ in range(random_generator.randint(1, 2)))
+            expected = set(
+                document_number for document_number, field_value_list in document_list
+                if all(any(search_word in field_value for field_value in field_value_list)
+                       for search_word in search_text.split()))
+            found = set(payload for score, payload in search_index.search(search_text, limit=5000))
+            self.assertEqual(found, expected, search_text)
@@ -0,0 +1,35 @@
+# wevote_functions/test_functions_spatial.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+import random
+
+from django.test import SimpleTestCase
+from .functions_spatial import great_circle_distance_in_miles, LatLongGridIndex
+
+
+class WeVoteFunctionsTestsSpatial(SimpleTestCase):
+
+    def test_great_circle_distance(self):
+        # Oakland City Hall to San Francisco City Hall is about 8.3 miles
+        distance = great_circle_distance_in_miles(37.8053, -122.2726, 37.7793, -122.4193)
+        self.assertAlmostEqual(distance, 8.25, delta=0.3)
+        self.assertEqual(great_circle_distance_in_miles(37.8, -122.2, 37.8, -122.2), 0.0)
+
+    def test_find_nearest_matches_brute_force(self):
+        random_generator = random.Random(4184)
+        point_list = [
+            ('ploc' + str(number), random_generator.uniform(30.0, 48.0), random_generator.uniform(-124.0, -70.0))
+            for number in range(5000)]
+        index = LatLongGridIndex(point_list + [('no_coordinates', None, -90.0)])
+        self.assertEqual(len(index), 5000)
+        for _ in range(50):
+            latitude = random_generator.uniform(30.0, 48.0)
+            longitude = random_generator.uniform(-124.0, -70.0)
+            expected = sorted(
+                (great_circle_distance_in_miles(latitude, longitude, point_latitude, point_longitude), key)
+                for key, point_latitude, point_longitude in point_list)
+            expected_within_limit = [one for one in expected if one[0] <= 50][:3]
+            self.assertEqual(index.find_nearest(latitude, longitude, k=3, max_distance_in_miles=50),
+                             expected_within_limit)
+            self.assertEqual(index.find_nearest(latitude, longitude), expected[:1])
@@ -0,0 +1,50 @@
+# wevote_functions/test_functions_status.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from django.test import SimpleTestCase
+from .functions_status import StatusTrace
+
+
+class WeVoteFunctionsTestsStatus(SimpleTestCase):
+
+    def test_renders_like_a_string(self):
+        status = StatusTrace()
+        self.assertFalse(status)
+        status += "BATCH_PROCESS_STARTED "
+        status += "ERROR-CHECKED_OUT_TIME_NOT_SAVED: database is gone "
+        status += ""
+        self.assertTrue(status)
+        self.assertEqual(str(status), "BATCH_PROCESS_STARTED ERROR-CHECKED_OUT_TIME_NOT_SAVED: database is gone ")
+        self.assertIn("CHECKED_OUT", status)
+        self.assertEqual(status.count("ERROR-CHECKED_OUT_TIME_NOT_SAVED"), 1)
+        # A caller still building a str
+        legacy_status = "CALLER "
+        legacy_status += status
+        self.assertEqual(legacy_status, "CALLER " + str(status))
+
+    def test_bounded(self):
+        status = StatusTrace(maximum_entries=3, maximum_entry_length=20)
+        for seed_id in range(1000):
+            status += "SEED_PROCESSED "
+            status += "SEED_ID: " + str(seed_id) + " "
+        status += "X" * 100  # Cut to 20 characters
+        self.assertEqual(status.entry_count, 2001)
+        self.assertEqual(status.dropped_entry_count, 1998)
+        self.assertEqual(status.count("SEED_PROCESSED"), 1000)
+        self.assertEqual(status.count("SEED_ID"), 1000)
+        rendered = str(status)
+        self.assertTrue(rendered.startswith("STATUS_TRACE_DROPPED_ENTRIES: 1998 STATUS_TRACE_COUNTS: "))
+        self.assertIn("SEED_PROCESSED x1000", rendered)
+        self.assertTrue(rendered.endswith("SEED_PROCESSED SEED_ID: 999 " + "X" * 20 + "... "))
+
+    def test_add_trace(self):
+        nested_status = StatusTrace(maximum_entries=1)
+        nested_status += "BALLOT_ITEM_CREATED "
+        nested_status += "BALLOT_ITEM_CREATED "
+        status = StatusTrace("BATCH_PROCESS_STARTED ")
+        status += nested_status
+        self.assertEqual(status.count("BALLOT_ITEM_CREATED"), 2)
+        self.assertEqual(status.entry_count, 3)
+        self.assertEqual(str(status), "STATUS_TRACE_DROPPED_ENTRIES: 1 STATUS_TRACE_COUNTS: BALLOT_ITEM_CREATED x2, "
+                                      "BATCH_PROCESS_STARTED x1, ... BATCH_PROCESS_STARTED BALLOT_ITEM_CREATED ")